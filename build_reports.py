@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Build every Word report in one run.
+
+Discovers the report scripts (REPORT_PATTERNS), hashes each one's inputs --
+its source, the local modules it imports (docx_builder etc.), the
+python-docx version and, for reports that read the change store, the
+store's sync watermark -- and skips reports whose inputs are unchanged since the
+last build and whose outputs still exist (LIVE_REPORTS, which read current
+ServiceNow data, are always rebuilt). The rest run concurrently in a
+process pool whose workers import python-docx and docx_builder once, then
+execute each script as __main__ with its output captured. Paths passed to
+Document.save are recorded so the next run can check them.
+
+Usage:
+    python build_reports.py                  # Build changed reports
+    python build_reports.py --force          # Rebuild everything
+    python build_reports.py --only itil4 --workers 2 -v
+    python build_reports.py --list
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import runpy
+import sqlite3
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr, redirect_stdout
+from importlib import metadata
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent
+LIB_DIR = REPO_ROOT / "tools" / "snow-pir"
+STATE_FILE = REPO_ROOT / ".build_reports_state.json"
+CHANGE_STORE = Path(os.environ.get("CHANGE_STORE_DB", LIB_DIR / "change_store.db"))
+# Modules that read the change store: reports importing them depend on its contents too
+STORE_READERS = {"change_metrics.py", "change_store.py"}
+
+# Scripts that build a report with no arguments, relative to the repo root
+REPORT_PATTERNS = [
+    "*_report.py",
+    "gen_*.py",
+    "ccb_prep.py",
+    "scripts/build_*_report.py",
+    "tools/snow-pir/ccb_summary.py",
+]
+
+# Reports built from live ServiceNow data: unchanged inputs don't mean an unchanged report
+LIVE_REPORTS = {"gen_review_state_report.py"}
+
+IMPORT_RE = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))", re.MULTILINE)
+
+
+# ---------------------------------------------------------------------------
+# Discovery and input hashing
+# ---------------------------------------------------------------------------
+
+def discover() -> list[Path]:
+    """Report scripts under REPO_ROOT, in a stable order."""
+    found = {p for pattern in REPORT_PATTERNS for p in REPO_ROOT.glob(pattern)}
+    reports = [p for p in found if "from docx import" in p.read_text(encoding="utf-8", errors="replace")]
+    return sorted(reports, key=lambda p: str(p.relative_to(REPO_ROOT)))
+
+
+def _local_imports(path: Path, seen: set[Path]) -> None:
+    """Add path and every repo module it (transitively) imports to seen."""
+    if path in seen:
+        return
+    seen.add(path)
+    source = path.read_text(encoding="utf-8", errors="replace")
+    for match in IMPORT_RE.finditer(source):
+        name = (match.group(1) or match.group(2)).split(".")[0]
+        for directory in (path.parent, LIB_DIR):
+            candidate = directory / f"{name}.py"
+            if candidate.exists():
+                _local_imports(candidate, seen)
+                break
+
+
+def store_version() -> str:
+    """Sync watermark and row count of the change store ("" when there is none)."""
+    if not CHANGE_STORE.exists():
+        return ""
+    try:
+        conn = sqlite3.connect(f"file:{CHANGE_STORE}?mode=ro", uri=True)
+        try:
+            watermark = conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+            count = conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return ""
+    return f"{watermark[0] if watermark else ''}:{count}"
+
+
+def input_hash(script: Path) -> str:
+    files: set[Path] = set()
+    _local_imports(script, files)
+    digest = hashlib.sha1()
+    try:
+        digest.update(metadata.version("python-docx").encode("utf-8"))
+    except metadata.PackageNotFoundError:
+        pass
+    for path in sorted(files):
+        digest.update(str(path.relative_to(REPO_ROOT)).encode("utf-8"))
+        digest.update(path.read_bytes())
+    if any(path.parent == LIB_DIR and path.name in STORE_READERS for path in files):
+        # Indicators come from the store, so a sync that moved it means a rebuild
+        digest.update(store_version().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_state() -> dict:
+    if STATE_FILE.exists():
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    return {}
+
+
+def _save_state(state: dict) -> None:
+    STATE_FILE.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def _up_to_date(entry: dict | None, digest: str) -> bool:
+    return bool(entry and entry["hash"] == digest and entry["outputs"]
+                and all(Path(p).exists() for p in entry["outputs"]))
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+_saved: list[str] = []
+
+
+def _warm() -> None:
+    """Import the heavy modules once per worker and record Document.save paths."""
+    if str(LIB_DIR) in sys.path:
+        return
+    sys.path.insert(0, str(LIB_DIR))
+    import docx.document
+    import docx.enum.table  # noqa: F401
+    import docx.enum.text  # noqa: F401
+    import docx_builder  # noqa: F401
+
+    original_save = docx.document.Document.save
+
+    def save(self, path_or_stream):
+        if isinstance(path_or_stream, (str, os.PathLike)):
+            _saved.append(os.path.abspath(path_or_stream))
+        return original_save(self, path_or_stream)
+
+    docx.document.Document.save = save
+
+
+def build(script: str) -> dict:
+    """Run one report script as __main__. Never raises; failures are returned."""
+    _saved.clear()
+    # TextIOWrapper rather than StringIO: several scripts call sys.stdout.reconfigure()
+    log = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", write_through=True)
+    argv, path = sys.argv, sys.path[:]
+    sys.argv = [script]
+    sys.path.insert(0, str(Path(script).parent))
+    start = time.perf_counter()
+    error = None
+    try:
+        with redirect_stdout(log), redirect_stderr(log):
+            runpy.run_path(script, run_name="__main__")
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            error = f"exit code {exc.code}"
+    except Exception:
+        error = traceback.format_exc(limit=-3).strip()
+    finally:
+        sys.argv, sys.path[:] = argv, path
+    seconds = time.perf_counter() - start
+    return {
+        "script": script,
+        "status": "FAILED" if error else "built",
+        "seconds": seconds,
+        "outputs": list(dict.fromkeys(_saved)),
+        "log": log.buffer.getvalue().decode("utf-8", errors="replace"),
+        "error": error,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def print_table(results: list[dict], wall: float) -> None:
+    width = max(len(r["name"]) for r in results)
+    print(f"\n  {'Report':<{width}}  {'Status':<8} {'Time':>7}  Output")
+    print(f"  {'-' * width}  {'-' * 8} {'-' * 7}  {'-' * 30}")
+    for r in results:
+        if r["outputs"]:
+            output = Path(r["outputs"][0]).name
+            output += f" (+{len(r['outputs']) - 1})" if len(r["outputs"]) > 1 else ""
+        else:
+            output = r["error"].splitlines()[-1] if r["error"] else ""
+        seconds = "-" if r["status"] == "skipped" else f"{r['seconds']:.2f}s"
+        print(f"  {r['name']:<{width}}  {r['status']:<8} {seconds:>7}  {output}")
+    counts = {s: sum(1 for r in results if r["status"] == s) for s in ("built", "skipped", "FAILED")}
+    serial = sum(r["seconds"] for r in results if r["status"] != "skipped")
+    print(f"\n  {counts['built']} built, {counts['skipped']} skipped, {counts['FAILED']} failed "
+          f"in {wall:.1f}s wall ({serial:.1f}s of report time)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build all Word reports concurrently, skipping unchanged ones")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if inputs are unchanged")
+    parser.add_argument("--only", metavar="TEXT", action="append",
+                        help="Only reports whose path contains TEXT (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes (default: CPUs)")
+    parser.add_argument("--list", action="store_true", help="List discovered reports and whether they are stale")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each report's output")
+    args = parser.parse_args()
+
+    scripts = discover()
+    if args.only:
+        scripts = [s for s in scripts if any(t.lower() in str(s).lower() for t in args.only)]
+    if not scripts:
+        print("ERROR: No report scripts matched.")
+        sys.exit(1)
+
+    state = _load_state()
+    results, pending = [], {}
+    for script in scripts:
+        name = str(script.relative_to(REPO_ROOT))
+        digest = input_hash(script)
+        if not args.force and name not in LIVE_REPORTS and _up_to_date(state.get(name), digest):
+            results.append({"name": name, "status": "skipped", "seconds": 0.0,
+                            "outputs": state[name]["outputs"], "error": None})
+        else:
+            pending[str(script)] = (name, digest)
+
+    if args.list:
+        for r in results:
+            print(f"  {r['name']:<50} up to date")
+        for name, _ in pending.values():
+            print(f"  {name:<50} stale")
+        return
+
+    print(f"Building {len(pending)} of {len(scripts)} report(s) with {min(args.workers, len(pending) or 1)} worker(s)...")
+    start = time.perf_counter()
+    if pending:
+        _warm()     # Forked workers inherit the warm imports; spawned ones run the initializer
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(pending)), initializer=_warm) as pool:
+            futures = {pool.submit(build, script): script for script in pending}
+            for future in as_completed(futures):
+                result = future.result()
+                name, digest = pending[result["script"]]
+                result["name"] = name
+                results.append(result)
+                if args.verbose or result["error"]:
+                    print(f"\n--- {name} ---\n{result['log'].rstrip()}")
+                    if result["error"]:
+                        print(result["error"])
+                if result["error"]:
+                    state.pop(name, None)
+                else:
+                    state[name] = {"hash": digest, "outputs": result["outputs"],
+                                   "seconds": round(result["seconds"], 2)}
+        _save_state(state)
+    wall = time.perf_counter() - start
+
+    order = {str(s.relative_to(REPO_ROOT)): i for i, s in enumerate(scripts)}
+    print_table(sorted(results, key=lambda r: order[r["name"]]), wall)
+    if any(r["status"] == "FAILED" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,34 +4,11 @@ from docx import Document
 from docx.shared import Inches, Pt, Cm, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 import os
+from pathlib import Path
 
-def add_hyperlink(paragraph, text, url):
-    part = paragraph.part
-    r_id = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
-    hyperlink = OxmlElement('w:hyperlink')
-    hyperlink.set(qn('r:id'), r_id)
-    new_run = OxmlElement('w:r')
-    rPr = OxmlElement('w:rPr')
-    c = OxmlElement('w:color')
-    c.set(qn('w:val'), '0563C1')
-    rPr.append(c)
-    u = OxmlElement('w:u')
-    u.set(qn('w:val'), 'single')
-    rPr.append(u)
-    sz = OxmlElement('w:sz')
-    sz.set(qn('w:val'), '20')
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-    return paragraph
-
-def chg_url(number):
-    return f"https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number={number}"
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+from docx_builder import add_hyperlink, chg_url, link_summary
 
 def add_table_row(table, cells, bold_first=True):
     row = table.add_row()
@@ -574,3 +551,4 @@ outpath = os.path.expanduser('~/OneDrive - Vituity/Documents/Change Management/C
 os.makedirs(os.path.dirname(outpath), exist_ok=True)
 doc.save(outpath)
 print(f"Saved: {outpath}")
+print(link_summary(doc))
@@ -1,89 +1,21 @@
 """Generate CCB Prep Report for 2026-02-26 CCB meeting (Final — 02/25 PM)."""
+import sys
+from pathlib import Path
+
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
-
-def set_cell_shading(cell, color):
-    shading = OxmlElement("w:shd")
-    shading.set(qn("w:fill"), color)
-    shading.set(qn("w:val"), "clear")
-    cell._tc.get_or_add_tcPr().append(shading)
 
-
-def add_hyperlink(paragraph, text, url):
-    part = paragraph.part
-    r_id = part.relate_to(
-        url,
-        "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink",
-        is_external=True,
-    )
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-    new_run = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-    c = OxmlElement("w:color")
-    c.set(qn("w:val"), "0563C1")
-    rPr.append(c)
-    u = OxmlElement("w:u")
-    u.set(qn("w:val"), "single")
-    rPr.append(u)
-    sz = OxmlElement("w:sz")
-    sz.set(qn("w:val"), "20")
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-    return paragraph
-
-
-def make_url(chg):
-    return f"https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number={chg}"
-
-
-def styled_header_row(table, headers):
-    for i, t in enumerate(headers):
-        cell = table.rows[0].cells[i]
-        cell.text = ""
-        p = cell.paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(t)
-        run.bold = True
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
-        set_cell_shading(cell, "2F5496")
-
-
-def add_row(table, chg, rest, shade=None):
-    row = table.add_row()
-    cell0 = row.cells[0]
-    cell0.text = ""
-    p = cell0.paragraphs[0]
-    p.paragraph_format.space_before = Pt(1)
-    p.paragraph_format.space_after = Pt(1)
-    add_hyperlink(p, chg, make_url(chg))
-    if shade:
-        set_cell_shading(cell0, shade)
-    for idx, val in enumerate(rest):
-        cell = row.cells[idx + 1]
-        cell.text = ""
-        p = cell.paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(str(val))
-        run.font.size = Pt(9)
-        if shade:
-            set_cell_shading(cell, shade)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+from docx_builder import (
+    add_data_row, add_hyperlink, build_table, chg_url, link_summary, set_cell_shading, styled_header_row,
+)
 
 
 def add_section_heading(doc, chg, title, verdict, verdict_color):
     p = doc.add_paragraph()
-    add_hyperlink(p, chg, make_url(chg))
+    add_hyperlink(p, chg, chg_url(chg))
     run = p.add_run(f" \u2014 {title}  |  ")
     run.font.size = Pt(11)
     run.bold = True
@@ -94,25 +26,9 @@ def add_section_heading(doc, chg, title, verdict, verdict_color):
 
 
 def add_check_table(doc, rows_data):
-    tbl = doc.add_table(rows=1, cols=2)
-    tbl.style = "Table Grid"
-    styled_header_row(tbl, ["Check", "Status"])
-    for label, val in rows_data:
-        row = tbl.add_row()
-        row.cells[0].text = ""
-        p = row.cells[0].paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(label)
-        run.font.size = Pt(9)
-        run.bold = True
-        row.cells[1].text = ""
-        p = row.cells[1].paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(val)
-        run.font.size = Pt(9)
-    return tbl
+    return build_table(doc, ["Check", "Status"], [
+        [{"text": label, "bold": True}, val] for label, val in rows_data
+    ])
 
 
 def bullet(doc, text):
@@ -209,7 +125,7 @@ def main():
     ]
 
     for chg, desc, grp, assign, state, sched, verdict, shade in glance_data:
-        add_row(glance, chg, [desc, grp, assign, state, sched, verdict], shade)
+        add_data_row(glance, chg, [desc, grp, assign, state, sched, verdict], shade)
 
     doc.add_paragraph()
 
@@ -776,7 +692,7 @@ def main():
         p = cell1.paragraphs[0]
         p.paragraph_format.space_before = Pt(1)
         p.paragraph_format.space_after = Pt(1)
-        add_hyperlink(p, chg, make_url(chg))
+        add_hyperlink(p, chg, chg_url(chg))
         row.cells[2].text = ""
         p = row.cells[2].paragraphs[0]
         run = p.add_run(desc)
@@ -808,6 +724,7 @@ def main():
     )
     doc.save(output_path)
     print(f"Report saved to: {output_path}")
+    print(link_summary(doc))
     return output_path
 
 
@@ -1,66 +1,18 @@
 """Generate CCB Meeting Questions for 2026-02-26 CCB."""
+import sys
+from pathlib import Path
+
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
-
-def set_cell_shading(cell, color):
-    shading = OxmlElement("w:shd")
-    shading.set(qn("w:fill"), color)
-    shading.set(qn("w:val"), "clear")
-    cell._tc.get_or_add_tcPr().append(shading)
 
-
-def add_hyperlink(paragraph, text, url):
-    part = paragraph.part
-    r_id = part.relate_to(
-        url,
-        "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink",
-        is_external=True,
-    )
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-    new_run = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-    c = OxmlElement("w:color")
-    c.set(qn("w:val"), "0563C1")
-    rPr.append(c)
-    u = OxmlElement("w:u")
-    u.set(qn("w:val"), "single")
-    rPr.append(u)
-    sz = OxmlElement("w:sz")
-    sz.set(qn("w:val"), "20")
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-    return paragraph
-
-
-def make_url(chg):
-    return f"https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number={chg}"
-
-
-def styled_header_row(table, headers):
-    for i, t in enumerate(headers):
-        cell = table.rows[0].cells[i]
-        cell.text = ""
-        p = cell.paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(t)
-        run.bold = True
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
-        set_cell_shading(cell, "2F5496")
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+from docx_builder import add_hyperlink, chg_url, link_summary
 
 
 def chg_heading(doc, chg, title, verdict, verdict_color):
     p = doc.add_paragraph()
-    add_hyperlink(p, chg, make_url(chg))
+    add_hyperlink(p, chg, chg_url(chg))
     run = p.add_run(f" \u2014 {title}  |  ")
     run.font.size = Pt(11)
     run.bold = True
@@ -394,6 +346,7 @@ def main():
     )
     doc.save(output_path)
     print(f"Report saved to: {output_path}")
+    print(link_summary(doc))
     return output_path
 
 
@@ -1,460 +1,396 @@
-"""Generate Changes in Review State Analysis report for 2026-03-03."""
+"""Generate the Changes in Review State analysis report from live data.
+
+Pulls every change in Review, tops up their state history from sys_audit (see
+tools/snow-pir/state_audit.py -- cached incrementally in the change store),
+computes time in Review, days past planned end and aging buckets in one
+vectorized pass, and derives the findings from the PIR field checks.
+
+Usage:
+    python gen_review_state_report.py                    # Sync change store, build today's report
+    python gen_review_state_report.py --source api       # Query ServiceNow directly
+    python gen_review_state_report.py --no-fetch --output review.docx
+"""
+import argparse
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
 from docx import Document
-from docx.shared import Pt, Inches, RGBColor
+from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 
-
-def set_cell_shading(cell, color):
-    shading = OxmlElement("w:shd")
-    shading.set(qn("w:fill"), color)
-    shading.set(qn("w:val"), "clear")
-    cell._tc.get_or_add_tcPr().append(shading)
-
-
-def add_hyperlink(paragraph, text, url):
-    part = paragraph.part
-    r_id = part.relate_to(
-        url,
-        "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink",
-        is_external=True,
-    )
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-    new_run = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-    c = OxmlElement("w:color")
-    c.set(qn("w:val"), "0563C1")
-    rPr.append(c)
-    u = OxmlElement("w:u")
-    u.set(qn("w:val"), "single")
-    rPr.append(u)
-    sz = OxmlElement("w:sz")
-    sz.set(qn("w:val"), "20")
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-    return paragraph
-
-
-def make_chg_url(chg):
-    return f"https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number={chg}"
-
-
-def styled_header_row(table, headers):
-    for i, t in enumerate(headers):
-        cell = table.rows[0].cells[i]
-        cell.text = ""
-        p = cell.paragraphs[0]
-        run = p.add_run(t)
-        run.bold = True
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
-        set_cell_shading(cell, "2F5496")
-
-
-def add_data_row(table, chg, rest, shade=None):
-    row = table.add_row()
-    cell0 = row.cells[0]
-    cell0.text = ""
-    p = cell0.paragraphs[0]
-    p.paragraph_format.space_before = Pt(1)
-    p.paragraph_format.space_after = Pt(1)
-    add_hyperlink(p, chg, make_chg_url(chg))
-    if shade:
-        set_cell_shading(cell0, shade)
-    for idx, val in enumerate(rest):
-        cell = row.cells[idx + 1]
-        cell.text = ""
-        p = cell.paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(str(val))
-        run.font.size = Pt(9)
-        if shade:
-            set_cell_shading(cell, shade)
-    return row
-
-
-def add_simple_row(table, cells, shade=None, bold_first=False):
-    row = table.add_row()
-    for i, val in enumerate(cells):
-        cell = row.cells[i]
-        cell.text = ""
-        p = cell.paragraphs[0]
-        p.paragraph_format.space_before = Pt(1)
-        p.paragraph_format.space_after = Pt(1)
-        run = p.add_run(str(val))
-        run.font.size = Pt(9)
-        if bold_first and i == 0:
-            run.bold = True
-        if shade:
-            set_cell_shading(cell, shade)
-    return row
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+from ccb_pack import EMERGENCY, _local, full_window
+from change_store import STORE_FIELDS, connect, iter_changes, sync, upsert_changes
+from docx_builder import add_hyperlink, build_table, chg_url, link_summary
+from pir_review import PLAN_FIELDS, REQUIRED_FIELDS, REVIEW_STATE, _field_value, analyze_change, query_changes
+from state_audit import _raw, current_entry, dwell_matrix, segments, state_path, transitions_for
+
+OUTPUT_DIR = Path.home() / "OneDrive - Vituity" / "Documents" / "Change Management" / "CCB"
+
+# Days in Review: bucket lower edges and labels
+AGING_EDGES = [3, 7, 14, 30, 60]
+AGING_LABELS = ["0–2 days", "3–6 days", "7–13 days", "14–29 days", "30–59 days", "60+ days"]
+STALE_REVIEW_DAYS = 30
+STALE_TICKET_DAYS = 90
+CRITICAL_PAST_DAYS = 14
+
+SEV_COLORS = {"High": "FFC7CE", "Medium": "FFEB9C", "Low": "C6EFCE"}
+SEV_RANK = {"High": 0, "Medium": 1, "Low": 2}
+STATUS_COLORS = {"MISSING": "FFC7CE", "WEAK": "FFEB9C"}
+
+# Finding kind -> (finding text, severity, recommended action title, action text)
+FINDINGS = {
+    "overdue": (
+        "Planned end date passed — change stuck in Review", "High",
+        "Move Overdue Changes Out of Review",
+        "Each should be either closed (if implemented successfully) or rescheduled with new "
+        "planned dates. Implementers must add validation work notes confirming outcome before "
+        "the Change Manager can close with appropriate closure code.",
+    ),
+    "retroactive": (
+        "Retroactive emergency change — created after implementation started", "High",
+        "Post-Implementation Review for Retroactive Emergencies",
+        "Document the emergency approval chain and circumstances, complete any unanswered "
+        "risk assessment, and close after review.",
+    ),
+    "no_backout": (
+        "No backout plan", "High",
+        "Document Backout Plans",
+        "Confirm whether rollback was possible; if not by design, record that and the "
+        "Business Owner sign-off on the change before closing.",
+    ),
+    "long_review": (
+        f"In Review more than {STALE_REVIEW_DAYS} days", "Medium",
+        "Close Long-Running Reviews",
+        "The Change Manager should follow up with the assignee and close or reopen these "
+        "changes this week.",
+    ),
+    "missing_fields": (
+        "Required fields missing", "Medium",
+        "Complete Required Fields",
+        "Assignees should complete the missing policy-required fields so the record is "
+        "auditable before closure.",
+    ),
+    "stale": (
+        f"Stale change — created more than {STALE_TICKET_DAYS} days ago", "Medium",
+        "Investigate Stale Changes",
+        "Determine whether each was actually deployed as planned or has stalled. Close or "
+        "cancel accordingly.",
+    ),
+    "weak_plan": (
+        "Thin plan — no discrete steps", "Low",
+        "Strengthen Thin Plans",
+        "Plans without discrete steps should be expanded in the PIR work notes.",
+    ),
+}
+
+
+def fetch_review_changes(source: str, do_sync: bool) -> tuple[list[dict], object]:
+    """Changes currently in Review, plus the store connection (audit cache lives there)."""
+    conn = connect()
+    if source == "api":
+        records = query_changes(f"state={REVIEW_STATE}", fields=STORE_FIELDS)
+        upsert_changes(conn, records)
+    else:
+        if do_sync:
+            sync(conn)
+        records = list(iter_changes(conn, "state = ?", (REVIEW_STATE,)))
+    return sorted(records, key=lambda r: _raw(r, "number")), conn
+
+
+def _days(later: np.ndarray, earlier: np.ndarray) -> np.ndarray:
+    """Differences in days, NaN where either side is missing."""
+    return (later - earlier).astype(np.float64) / 86400
+
+
+def _ts(records: list[dict], field: str) -> np.ndarray:
+    return np.array([_raw(r, field) or "NaT" for r in records], dtype="datetime64[s]")
+
+
+def age_changes(records: list[dict], transitions: dict, now: datetime) -> dict[str, np.ndarray]:
+    """Vectorized aging: entry into Review, days in Review, days past planned end, buckets."""
+    n = len(records)
+    now64 = np.datetime64(now.astimezone(timezone.utc).replace(tzinfo=None), "s")
+    segs = segments(records, transitions, now)
+    entered = current_entry(segs, n)
+    # No audit history: fall back to actual end, then planned end
+    estimated = np.isnat(entered)
+    fallback = _ts(records, "work_end")
+    fallback = np.where(np.isnat(fallback), _ts(records, "end_date"), fallback)
+    entered = np.where(estimated, fallback, entered)
+
+    in_review = np.maximum(_days(now64, entered), 0)
+    past_end = _days(now64, _ts(records, "end_date"))
+    age = _days(now64, _ts(records, "sys_created_on"))
+    return {
+        "entered": entered,
+        "estimated": estimated,
+        "in_review": in_review,
+        "past_end": past_end,
+        "age": age,
+        "bucket": np.digitize(np.nan_to_num(in_review), AGING_EDGES),
+        "dwell": dwell_matrix(segs, n),
+    }
+
+
+def change_findings(change: dict, analysis: dict, aging: dict, i: int) -> list[str]:
+    status = analysis["field_status"]
+    kinds = []
+    if aging["past_end"][i] > 0:
+        kinds.append("overdue")
+    created, start = _raw(change, "sys_created_on"), _raw(change, "start_date")
+    if _raw(change, "type") == EMERGENCY and created and start and created > start:
+        kinds.append("retroactive")
+    if status.get("backout_plan") == "MISSING":
+        kinds.append("no_backout")
+    if aging["in_review"][i] > STALE_REVIEW_DAYS:
+        kinds.append("long_review")
+    if any(s == "MISSING" for f, s in status.items() if f != "backout_plan"):
+        kinds.append("missing_fields")
+    if aging["age"][i] > STALE_TICKET_DAYS:
+        kinds.append("stale")
+    if any(status.get(f) == "WEAK" for f in PLAN_FIELDS):
+        kinds.append("weak_plan")
+    return kinds
+
+
+def finding_text(change: dict, analysis: dict, aging: dict, i: int, kinds: list[str]) -> str:
+    status = analysis["field_status"]
+    parts = []
+    if "overdue" in kinds:
+        parts.append(f"Schedule overdue by {aging['past_end'][i]:.0f} day(s).")
+    if "retroactive" in kinds:
+        created, start = _local(_raw(change, "sys_created_on")), _local(_raw(change, "start_date"))
+        parts.append(f"RETROACTIVE EMERGENCY. Change created {created:%m/%d %H:%M} PT, after the planned "
+                     f"start of {start:%m/%d %H:%M} PT.")
+    if "no_backout" in kinds:
+        parts.append("No backout plan recorded.")
+    if "long_review" in kinds:
+        parts.append(f"In Review for {aging['in_review'][i]:.0f} days.")
+    if "missing_fields" in kinds:
+        missing = [REQUIRED_FIELDS[f] for f, s in status.items() if s == "MISSING" and f != "backout_plan"]
+        parts.append(f"Missing: {', '.join(missing)}.")
+    if "stale" in kinds:
+        parts.append(f"Change is {aging['age'][i]:.0f} days old — determine if deployed or stalled.")
+    if "weak_plan" in kinds:
+        weak = [REQUIRED_FIELDS[f] for f in sorted(PLAN_FIELDS) if status.get(f) == "WEAK"]
+        parts.append(f"Thin {', '.join(weak).lower()} — no discrete steps.")
+    return " ".join(parts) or "No findings. Ready to close once validation is recorded."
+
+
+def severity(kinds: list[str]) -> str:
+    return min((FINDINGS[k][1] for k in kinds), key=SEV_RANK.get, default="Low")
+
+
+def _local64(value: np.datetime64) -> datetime | None:
+    return None if np.isnat(value) else _local(str(value).replace("T", " "))
+
+
+def add_subtitle(doc, text: str) -> None:
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = p.add_run(text)
+    run.font.size = Pt(10)
+    run.font.color.rgb = RGBColor(0x59, 0x56, 0x59)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Changes in Review State analysis report")
+    parser.add_argument("--source", choices=["store", "api"], default="store",
+                        help="Read Review changes from the change store (default) or ServiceNow directly")
+    parser.add_argument("--no-sync", action="store_true", help="Don't sync the change store first")
+    parser.add_argument("--no-fetch", action="store_true", help="Use cached sys_audit history only")
+    parser.add_argument("--output", type=Path, help="Output .docx path")
+    args = parser.parse_args()
+
+    records, conn = fetch_review_changes(args.source, not args.no_sync)
+    if not records:
+        print("No changes in Review state.")
+        return None
+    transitions = transitions_for(conn, records, fetch=not args.no_fetch)
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    aging = age_changes(records, transitions, now)
+
+    analyses = [analyze_change(r) for r in records]
+    kinds = [change_findings(r, a, aging, i) for i, (r, a) in enumerate(zip(records, analyses))]
+    severities = [severity(k) for k in kinds]
+    numbers = [_raw(r, "number") for r in records]
+    total = len(records)
+    types = [_field_value(r, "type") or "Unknown" for r in records]
+    type_counts = {t: types.count(t) for t in sorted(set(types))}
+    overdue = int(np.sum(aging["past_end"] > 0))
+
     doc = Document()
     style = doc.styles["Normal"]
     style.font.name = "Calibri"
     style.font.size = Pt(10)
 
     # Title
-    title = doc.add_heading("Changes in Review State \u2014 Analysis & Audit", level=0)
+    title = doc.add_heading("Changes in Review State — Analysis & Audit", level=0)
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run("Report Date: March 3, 2026  |  Scope: Normal & Emergency Changes  |  State: Review")
-    run.font.size = Pt(10)
-    run.font.color.rgb = RGBColor(0x59, 0x56, 0x59)
-
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run("Prepared by: Dan Fallon, Change Manager")
-    run.font.size = Pt(10)
-    run.font.color.rgb = RGBColor(0x59, 0x56, 0x59)
-
+    add_subtitle(doc, f"Report Date: {today:%B} {today.day}, {today.year}  |  "
+                      f"Scope: {' & '.join(type_counts)} Changes  |  State: Review")
+    add_subtitle(doc, "Prepared by: Dan Fallon, Change Manager")
     doc.add_paragraph()
 
     # ── Executive Summary ─────────────────────────────────────────────────
     doc.add_heading("Executive Summary", level=1)
+    breakdown = ", ".join(f"{count} {t}" for t, count in type_counts.items())
     doc.add_paragraph(
-        "This report audits 9 change requests currently in Review state in ServiceNow "
-        "as of March 3, 2026 (8 Normal, 1 Emergency). Per ISMS-WI-11.01-06 \u00a74.1.2.4\u20135, "
-        "changes in Review state should have post-implementation validation documented "
-        "in work notes before the Change Manager reviews and closes the ticket."
+        f"This report audits {total} change requests currently in Review state in ServiceNow "
+        f"as of {today:%B} {today.day}, {today.year} ({breakdown}). Per ISMS-WI-11.01-06 "
+        "§4.1.2.4–5, changes in Review state should have post-implementation validation "
+        "documented in work notes before the Change Manager reviews and closes the ticket. "
+        f"Median time in Review is {np.median(aging['in_review']):.0f} days."
     )
-
-    p = doc.add_paragraph()
-    run = p.add_run("CRITICAL FINDING: ")
-    run.bold = True
-    run.font.color.rgb = RGBColor(0xC0, 0x00, 0x00)
-    p.add_run(
-        "All 9 changes have planned implementation dates that have already passed "
-        "(02/12\u201302/27). These changes are either implemented but not closed, or were "
-        "never executed and require rescheduling. This backlog represents a process gap "
-        "in change lifecycle management."
-    )
-
+    if overdue:
+        p = doc.add_paragraph()
+        run = p.add_run("CRITICAL FINDING: ")
+        run.bold = True
+        run.font.color.rgb = RGBColor(0xC0, 0x00, 0x00)
+        p.add_run(
+            f"{f'All {total}' if overdue == total else f'{overdue} of {total}'} changes have planned end dates that "
+            f"have already passed (up to {np.nanmax(aging['past_end']):.0f} days ago). These changes are "
+            "either implemented but not closed, or were never executed and require rescheduling."
+        )
     doc.add_paragraph()
 
     # ── Summary Dashboard ─────────────────────────────────────────────────
     doc.add_heading("Summary Dashboard", level=1)
-    tbl = doc.add_table(rows=1, cols=2)
-    tbl.style = "Table Grid"
-    tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
-    styled_header_row(tbl, ["Metric", "Count"])
-
-    dashboard = [
-        ("Total in Review", "9"),
-        ("Normal Changes", "8"),
-        ("Emergency Changes", "1"),
-        ("All Planned Dates Past", "9 (100%)"),
-        ("Retroactive Emergency", "1"),
-        ("No Rollback Plan", "1"),
-        ("SAR Question Missing/Blank", "2"),
-        ("Risk Assessment Incomplete", "1"),
-        ("Tickets >90 Days Old", "1"),
-        ("High Severity Findings", "3"),
-        ("Medium Severity Findings", "3"),
+    count = {k: sum(1 for ks in kinds if k in ks) for k in FINDINGS}
+    dashboard = [("Total in Review", total)]
+    dashboard += [(f"{t} Changes", c) for t, c in type_counts.items()]
+    dashboard += [
+        ("Planned End Date Passed", f"{overdue} ({overdue / total:.0%})"),
+        ("Retroactive Emergency", count["retroactive"]),
+        ("No Backout Plan", count["no_backout"]),
+        ("Required Fields Missing", count["missing_fields"]),
+        (f"In Review >{STALE_REVIEW_DAYS} Days", count["long_review"]),
+        (f"Tickets >{STALE_TICKET_DAYS} Days Old", count["stale"]),
+        ("High Severity Changes", severities.count("High")),
+        ("Medium Severity Changes", severities.count("Medium")),
+        ("Review Entry Estimated (no audit)", int(aging["estimated"].sum())),
     ]
-    for label, val in dashboard:
-        row = tbl.add_row()
-        row.cells[0].text = ""
-        p = row.cells[0].paragraphs[0]
-        run = p.add_run(label)
-        run.font.size = Pt(9)
-        row.cells[1].text = ""
-        p = row.cells[1].paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run(val)
-        run.font.size = Pt(9)
-        run.bold = True
-
+    build_table(doc, ["Metric", "Count"], [
+        [label, {"text": str(val), "bold": True, "align": "center"}] for label, val in dashboard
+    ], align="center", widths=[3.0, 1.5])
     doc.add_paragraph()
 
     # ── Audit Findings Summary ────────────────────────────────────────────
     doc.add_heading("Audit Findings Summary", level=1)
-
-    findings_tbl = doc.add_table(rows=1, cols=4)
-    findings_tbl.style = "Table Grid"
-    findings_tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
-    styled_header_row(findings_tbl, ["#", "Finding", "Severity", "Changes Affected"])
-
-    findings = [
-        ("1", "All planned dates in the past \u2014 changes stuck in Review", "High", "All 9"),
-        ("2", "Retroactive emergency change \u2014 created after implementation", "High", "CHG0039327"),
-        ("3", "No rollback plan on destructive data purge with PHI", "High", "CHG0039351"),
-        ("4", "SAR unanswered despite PHI/PII involvement", "Medium", "CHG0039377, CHG0039351"),
-        ("5", "Risk assessment incomplete \u2014 missing answers", "Medium", "CHG0039327"),
-        ("6", "Stale change \u2014 6 months old in pipeline", "Medium", "CHG0038691"),
-        ("7", "Thin backout plan for 409-record data modification", "Low", "CHG0039359"),
-        ("8", "PHI/PII flag questionable on account disablement", "Low", "CHG0039356"),
-    ]
-
-    sev_colors = {"High": "FFC7CE", "Medium": "FFEB9C", "Low": "C6EFCE"}
-    for num, finding, sev, affected in findings:
-        row = add_simple_row(findings_tbl, [num, finding, sev, affected])
-        set_cell_shading(row.cells[2], sev_colors[sev])
-
+    rows = []
+    for kind, (text, sev, _, _) in FINDINGS.items():
+        affected = [num for num, ks in zip(numbers, kinds) if kind in ks]
+        if affected:
+            rows.append([str(len(rows) + 1), text, {"text": sev, "fill": SEV_COLORS[sev]},
+                         f"All {total}" if len(affected) == total else ", ".join(affected)])
+    if rows:
+        build_table(doc, ["#", "Finding", "Severity", "Changes Affected"], rows,
+                    align="center", widths=[0.3, 3.2, 0.8, 2.2])
+    else:
+        doc.add_paragraph("No findings.")
     doc.add_paragraph()
 
     # ── Aging Analysis ────────────────────────────────────────────────────
-    doc.add_heading("Aging Analysis \u2014 Days Past Planned End", level=1)
+    doc.add_heading("Aging Analysis — Time in Review", level=1)
     doc.add_paragraph(
-        "All 9 changes have planned dates before today (03/03/2026). The table below "
-        "shows each change sorted by how far past its planned end date."
+        "Time in Review is measured from each change's latest transition into Review in the "
+        "sys_audit state history. Where no history exists, the actual (or planned) end date "
+        "is used and the entry is marked *."
     )
+    bucket_counts = np.bincount(aging["bucket"], minlength=len(AGING_LABELS))
+    build_table(doc, ["Time in Review", "Changes", "Share"], [
+        [label, {"text": str(c), "align": "center"}, {"text": f"{c / total:.0%}", "align": "center"}]
+        for label, c in zip(AGING_LABELS, bucket_counts)
+    ], align="center", widths=[1.8, 1.0, 1.0])
+    doc.add_paragraph()
 
-    aging_tbl = doc.add_table(rows=1, cols=6)
-    aging_tbl.style = "Table Grid"
-    aging_tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
-    styled_header_row(aging_tbl, ["CHG", "Short Description", "Type", "Planned End", "Days Past", "Severity"])
-
-    aging_data = [
-        ("CHG0039327", "New AP: MOD-AP03", "Emergency", "02/12/2026", "19 days", "CRITICAL", "FFC7CE"),
-        ("CHG0039379", "Update MS Defender scan freq (Mac)", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0039377", "Disable FTP accounts - Jan 2026 review", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0039375", "Geoblock Cuba and Syria in Okta", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0039359", "409 Provider Errors (Cred Event)", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0039356", "Service Account disable - Jan 2026", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0039351", "2026 Annual Purge SFDC", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0038691", "Preboarding Checklist - Specialist field", "Normal", "02/26/2026", "5 days", "Moderate", "FFEB9C"),
-        ("CHG0039376", "Enable Block malicious IPs in ZIA", "Normal", "02/27/2026", "4 days", "Moderate", "FFEB9C"),
-    ]
-
-    for chg, desc, typ, pend, days, sev, shade in aging_data:
-        add_data_row(aging_tbl, chg, [desc, typ, pend, days, sev], shade)
-
+    order = np.argsort(-aging["in_review"], kind="stable")
+    rows = []
+    for i in order:
+        past = aging["past_end"][i]
+        if past >= CRITICAL_PAST_DAYS:
+            label, shade = "CRITICAL", "FFC7CE"
+        elif past > 0:
+            label, shade = "Moderate", "FFEB9C"
+        else:
+            label, shade = "On schedule", "C6EFCE"
+        entered = _local64(aging["entered"][i])
+        end = _local(_raw(records[i], "end_date"))
+        rows.append([
+            {"text": numbers[i], "url": chg_url(numbers[i]), "bold": True},
+            _field_value(records[i], "short_description")[:45],
+            types[i],
+            (f"{entered:%m/%d/%Y}" if entered else "—") + ("*" if aging["estimated"][i] else ""),
+            {"text": f"{aging['in_review'][i]:.0f} days", "align": "center"},
+            f"{end:%m/%d/%Y}" if end else "—",
+            {"text": "—" if np.isnan(past) else f"{past:.0f} days", "align": "center"},
+            {"text": label, "fill": shade},
+        ])
+    build_table(doc, ["CHG", "Short Description", "Type", "Entered Review", "In Review",
+                      "Planned End", "Days Past", "Severity"], rows,
+                align="center", widths=[1.0, 1.9, 0.7, 0.9, 0.7, 0.9, 0.7, 0.8])
     doc.add_paragraph()
 
     # ── Change-by-Change Analysis ─────────────────────────────────────────
     doc.add_heading("Change-by-Change Analysis", level=1)
+    for i in order:
+        change, analysis, number = records[i], analyses[i], numbers[i]
+        status = analysis["field_status"]
 
-    changes = [
-        {
-            "number": "CHG0039379",
-            "desc": "Update scanning frequency for MS Defender (Mac)",
-            "type": "Normal", "risk": "Low",
-            "group": "Service Delivery Optimization", "assignee": "Jason Nguyen",
-            "planned": "02/26/2026 16:00\u201316:30 PST",
-            "impl": "OK \u2014 discrete steps (modify plist, deploy via Jamf, verify logs)",
-            "backout": "OK \u2014 revert to previous profile via Jamf",
-            "test": "OK \u2014 tested in IT test group",
-            "risk_assess": "Complete",
-            "findings": "Schedule overdue. Otherwise well-documented.",
-            "severity": "Low",
-        },
-        {
-            "number": "CHG0039377",
-            "desc": "Disable FTP accounts - Access review Jan 2026",
-            "type": "Normal", "risk": "Low",
-            "group": "Enterprise Systems", "assignee": "Philip Weiss",
-            "planned": "02/26/2026 14:00\u201314:20 PST",
-            "impl": "OK \u2014 7 accounts listed with manager approvals",
-            "backout": "OK \u2014 re-enable accounts",
-            "test": "OK \u2014 verify account cannot access FTP",
-            "risk_assess": "SAR field blank (unanswered)",
-            "findings": "Schedule overdue. SAR question left blank \u2014 needs response.",
-            "severity": "Medium",
-        },
-        {
-            "number": "CHG0039376",
-            "desc": "Enable Block malicious IPs and domains in ZIA",
-            "type": "Normal", "risk": "Low",
-            "group": "Infosec", "assignee": "Jeffrey How",
-            "planned": "02/27/2026 09:00\u201310:00 PST",
-            "impl": "OK \u2014 4 discrete steps in ZIA Admin",
-            "backout": "OK \u2014 reverse steps to disable",
-            "test": "OK \u2014 check ZIA logs post-implementation",
-            "risk_assess": "Complete",
-            "findings": "Schedule overdue. No subset testing possible; vendor recommendation mitigates risk.",
-            "severity": "Low",
-        },
-        {
-            "number": "CHG0039375",
-            "desc": "Geoblock Cuba and Syria in Okta",
-            "type": "Normal", "risk": "Low",
-            "group": "Infosec", "assignee": "Jeffrey How",
-            "planned": "02/26/2026 15:00\u201316:00 PST",
-            "impl": "OK \u2014 3 discrete steps including Confluence update",
-            "backout": "OK \u2014 reverse steps",
-            "test": "OK \u2014 90-day log analysis shows zero logons from target countries",
-            "risk_assess": "Complete",
-            "findings": "Schedule overdue. Well-justified with 90-day log evidence. Clean change.",
-            "severity": "Low",
-        },
-        {
-            "number": "CHG0039359",
-            "desc": "409 Provider Errors for \"Cred Event In Process\"",
-            "type": "Normal", "risk": "Low",
-            "group": "Enterprise Applications", "assignee": "Parvathi Arun",
-            "planned": "02/26/2026 09:00\u201311:00 PST",
-            "impl": "OK \u2014 very detailed pre/post steps for 409 records",
-            "backout": "Thin \u2014 \"data import task will be stopped\"",
-            "test": "OK \u2014 tested in lower env, 24-48hr monitoring planned",
-            "risk_assess": "Complete but vendor support unavailable during change",
-            "findings": "Schedule overdue. Backout plan is thin for a data modification affecting 409 records. Should confirm backup/export was taken before toggling statuses.",
-            "severity": "Medium",
-        },
-        {
-            "number": "CHG0039356",
-            "desc": "Service Account disable - Access review Jan 2026",
-            "type": "Normal", "risk": "Low",
-            "group": "Enterprise Systems", "assignee": "Philip Weiss",
-            "planned": "02/26/2026 14:00\u201314:15 PST",
-            "impl": "OK \u2014 3 accounts listed with revocation evidence",
-            "backout": "OK \u2014 re-enable accounts",
-            "test": "OK \u2014 verify disabled status",
-            "risk_assess": "Complete \u2014 notes PHI/PII impact and business-critical",
-            "findings": "Schedule overdue. PHI/PII flagged as Yes for service account disablement \u2014 verify accuracy.",
-            "severity": "Low",
-        },
-        {
-            "number": "CHG0039351",
-            "desc": "2026 Annual Purge SFDC",
-            "type": "Normal", "risk": "Low",
-            "group": "Enterprise Applications", "assignee": "Yanyan Meng",
-            "planned": "02/26/2026 19:00\u201321:00 PST",
-            "impl": "OK \u2014 436 contacts, 38 object types listed",
-            "backout": "NONE \u2014 permanent data deletion per retention policy",
-            "test": "OK \u2014 tested in Sandbox2, Racquel verified",
-            "risk_assess": "SAR not completed despite PHI/PII = Yes; Business-critical = Yes",
-            "findings": "Schedule overdue. No rollback by design \u2014 permanent destructive purge of PHI data. SAR not completed despite PHI/PII = Yes. Verify Sandbox2 sign-off and BO approval is attached before closing.",
-            "severity": "High",
-        },
-        {
-            "number": "CHG0038691",
-            "desc": "Preboarding Checklist Parent/Child Logic - Add Specialist field",
-            "type": "Normal", "risk": "Low",
-            "group": "Enterprise Applications", "assignee": "Parvathi Arun",
-            "planned": "02/26/2026 09:00\u201311:00 PST",
-            "impl": "OK \u2014 detailed pre-deployment and production deployment steps",
-            "backout": "OK \u2014 detailed rollback triggers and monitoring steps",
-            "test": "OK \u2014 tested in sb2 with documentation",
-            "risk_assess": "Complete",
-            "findings": "Schedule overdue. Change is ~6 months old (created 09/11/2025). Best-documented change in batch. Determine if deployed or stalled.",
-            "severity": "Medium",
-        },
-        {
-            "number": "CHG0039327",
-            "desc": "New AP: MOD-AP03 (EMERGENCY)",
-            "type": "Emergency", "risk": "Low",
-            "group": "Enterprise Networking", "assignee": "Daniel Anderson",
-            "planned": "02/12/2026 16:00\u201319:51 PST",
-            "impl": "OK \u2014 detailed Meraki/AP configuration steps",
-            "backout": "OK \u2014 tear down WAP, delete from dashboard",
-            "test": "OK \u2014 connectivity verified",
-            "risk_assess": "Incomplete \u2014 business-critical question unanswered",
-            "findings": "RETROACTIVE EMERGENCY. Change created at 19:54 PST \u2014 3 minutes AFTER the planned end time of 19:51 PST. Implemented before the CR was filed. Now 19 days old in Review. Risk assessment incomplete. Needs immediate closure with post-implementation review.",
-            "severity": "High",
-        },
-    ]
-
-    for chg in changes:
-        # Heading with hyperlink
         h = doc.add_heading(level=2)
-        add_hyperlink(h, chg["number"], make_chg_url(chg["number"]))
-        h.add_run(f" \u2014 {chg['desc']}")
-
-        # Detail table
-        info_tbl = doc.add_table(rows=0, cols=2)
-        info_tbl.style = "Table Grid"
-
-        fields = [
-            ("Type", chg["type"]),
-            ("Risk", chg["risk"]),
-            ("Assignment Group", chg["group"]),
-            ("Assigned To", chg["assignee"]),
-            ("Planned Window", chg["planned"]),
-            ("Implementation Plan", chg["impl"]),
-            ("Backout Plan", chg["backout"]),
-            ("Test Plan", chg["test"]),
-            ("Risk Assessment", chg["risk_assess"]),
+        add_hyperlink(h, number, chg_url(number))
+        h.add_run(f" — {analysis['short_description']}")
+
+        def plan(field):
+            return {"text": status[field], "fill": STATUS_COLORS.get(status[field])}
+
+        missing = [REQUIRED_FIELDS[f] for f, s in status.items() if s == "MISSING" and f not in PLAN_FIELDS]
+        details = [
+            ("Type", types[i]),
+            ("Risk", _field_value(change, "risk")),
+            ("Assignment Group", analysis["assignment_group"]),
+            ("Assigned To", analysis["assigned_to"]),
+            ("Planned Window", full_window(change)),
+            ("State History", state_path(aging["dwell"][i]) or "No sys_audit history"),
+            ("Implementation Plan", plan("implementation_plan")),
+            ("Backout Plan", plan("backout_plan")),
+            ("Test Plan", plan("test_plan")),
+            ("Required Fields", {"text": f"{analysis['score']} complete"
+                                 + (f" — missing {', '.join(missing)}" if missing else ""),
+                                 "fill": STATUS_COLORS["WEAK"] if missing else None}),
         ]
+        build_table(doc, None, [[{"text": label, "bold": True}, value] for label, value in details],
+                    widths=[1.6, 4.9])
 
-        for label, value in fields:
-            row = info_tbl.add_row()
-            row.cells[0].text = ""
-            p0 = row.cells[0].paragraphs[0]
-            run = p0.add_run(label)
-            run.bold = True
-            run.font.size = Pt(9)
-            row.cells[1].text = ""
-            p1 = row.cells[1].paragraphs[0]
-            run = p1.add_run(value)
-            run.font.size = Pt(9)
-
-            # Color-code issues
-            val_lower = value.lower()
-            if "none" in val_lower and "backout" in label.lower():
-                set_cell_shading(row.cells[1], "FFC7CE")
-            elif "thin" in val_lower:
-                set_cell_shading(row.cells[1], "FFEB9C")
-            elif "blank" in val_lower or "incomplete" in val_lower or "not completed" in val_lower:
-                set_cell_shading(row.cells[1], "FFEB9C")
-
-        # Findings
         p = doc.add_paragraph()
         run = p.add_run("Findings: ")
         run.bold = True
         run.font.size = Pt(10)
-        run = p.add_run(chg["findings"])
+        run = p.add_run(finding_text(change, analysis, aging, i, kinds[i]))
         run.font.size = Pt(10)
-        if chg["severity"] == "High":
+        if severities[i] == "High":
             run.font.color.rgb = RGBColor(0xC0, 0x00, 0x00)
-
         doc.add_paragraph()
 
     # ── Recommended Actions ───────────────────────────────────────────────
     doc.add_heading("Recommended Actions", level=1)
-
-    actions = [
-        (
-            "1. Move All 9 Changes Out of Review",
-            "All 9 changes have planned dates that have passed. Each should be either "
-            "closed (if implemented successfully) or rescheduled with new planned dates. "
-            "Implementers must add validation work notes confirming outcome before "
-            "the Change Manager can close with appropriate closure code.",
-        ),
-        (
-            "2. Post-Implementation Review for CHG0039327",
-            "The retroactive emergency change (New AP: MOD-AP03) requires a post-mortem "
-            "review. Daniel Anderson should document the emergency approval chain and "
-            "circumstances. Complete the unanswered risk assessment question. Close after review.",
-        ),
-        (
-            "3. SAR Compliance for CHG0039351 (SFDC Purge)",
-            "This is a permanent, destructive data purge affecting PHI/PII with no rollback. "
-            "Confirm whether a Security Architecture Review is required given PHI/PII = Yes. "
-            "Verify Sandbox2 sign-off and Business Owner approval documentation is attached "
-            "to the change record before closing.",
-        ),
-        (
-            "4. Complete SAR Field on CHG0039377",
-            "The FTP account disablement change (Philip Weiss) has the SAR question blank "
-            "in the Risk Assessment. This should be answered to complete the record.",
-        ),
-        (
-            "5. Investigate Stale Change CHG0038691",
-            "This change was created on 09/11/2025 (~6 months ago) for a Salesforce Flow "
-            "deployment. Determine whether it was actually deployed on 02/26/2026 as planned, "
-            "or if it has been stalled. Close or cancel accordingly.",
-        ),
-    ]
-
-    for title_text, body_text in actions:
+    step = 0
+    for kind, (_, _, action, body) in FINDINGS.items():
+        affected = [num for num, ks in zip(numbers, kinds) if kind in ks]
+        if not affected:
+            continue
+        step += 1
         p = doc.add_paragraph()
-        run = p.add_run(title_text)
+        run = p.add_run(f"{step}. {action} ({len(affected)})")
         run.bold = True
         run.font.size = Pt(10)
-        doc.add_paragraph(body_text, style="List Bullet")
-
+        doc.add_paragraph(f"{', '.join(affected)}. {body}", style="List Bullet")
+    if not step:
+        doc.add_paragraph("None — close each change once validation work notes are recorded.")
     doc.add_paragraph()
 
     # ── Policy References ─────────────────────────────────────────────────
@@ -471,17 +407,17 @@ def main():
     # Footer
     p = doc.add_paragraph()
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run("Generated 2026-03-03 by EA  |  Data source: ServiceNow Production")
+    run = p.add_run(f"Generated {today.isoformat()} by EA  |  Data source: ServiceNow Production "
+                    "(change_request, sys_audit state history)")
     run.font.size = Pt(8)
     run.font.color.rgb = RGBColor(0x99, 0x99, 0x99)
 
     # Save
-    output_path = (
-        r"C:\Users\FallonD\OneDrive - Vituity\Documents\Change Management"
-        r"\CCB\2026\Changes in Review State Analysis 2026-03-03.docx"
-    )
-    doc.save(output_path)
+    output_path = args.output or OUTPUT_DIR / str(today.year) / f"Changes in Review State Analysis {today.isoformat()}.docx"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(output_path))
     print(f"Report saved to: {output_path}")
+    print(link_summary(doc))
     return output_path
 
 
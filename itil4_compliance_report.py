@@ -4,41 +4,16 @@ from docx import Document
 from docx.shared import Inches, Pt, Cm, RGBColor, Emu
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT, WD_ALIGN_VERTICAL
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 import os
+from datetime import date
 import subprocess
+from pathlib import Path
 
-SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
-
-def add_hyperlink(paragraph, text, url):
-    part = paragraph.part
-    r_id = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
-    hyperlink = OxmlElement('w:hyperlink')
-    hyperlink.set(qn('r:id'), r_id)
-    new_run = OxmlElement('w:r')
-    rPr = OxmlElement('w:rPr')
-    c = OxmlElement('w:color')
-    c.set(qn('w:val'), '0563C1')
-    rPr.append(c)
-    u = OxmlElement('w:u')
-    u.set(qn('w:val'), 'single')
-    rPr.append(u)
-    sz = OxmlElement('w:sz')
-    sz.set(qn('w:val'), '20')
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+from change_metrics import indicator_rows, trailing_indicators
+from docx_builder import add_hyperlink, build_table, link_summary, set_cell_shading
 
-def set_cell_shading(cell, color):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    shading = OxmlElement('w:shd')
-    shading.set(qn('w:fill'), color)
-    shading.set(qn('w:val'), 'clear')
-    tcPr.append(shading)
+SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
 
 def set_cell_text(cell, text, bold=False, font_size=10, alignment=None, color=None):
     cell.text = ""
@@ -58,96 +33,24 @@ def set_cell_hyperlink(cell, text, url, font_size=10):
     p = cell.paragraphs[0]
     add_hyperlink(p, text, url)
 
-def add_status_badge(cell, status):
-    colors = {
-        "PASS": ("2E7D32", "PASS"),
-        "FLAG": ("E65100", "FLAG"),
-        "FAIL": ("C62828", "FAIL"),
-        "PASS w/ minor flags": ("558B2F", "PASS*"),
-        "FLAG — needs CCB discussion": ("BF360C", "FLAG"),
-    }
-    color_hex, label = colors.get(status, ("757575", status))
-    set_cell_text(cell, label, bold=True, font_size=10, alignment=WD_ALIGN_PARAGRAPH.CENTER, color=RGBColor.from_string(color_hex))
-
-doc = Document()
-
-# Page margins
-for section in doc.sections:
-    section.top_margin = Cm(1.5)
-    section.bottom_margin = Cm(1.5)
-    section.left_margin = Cm(1.5)
-    section.right_margin = Cm(1.5)
-
-# Title
-title = doc.add_heading('ITIL 4 Change Enablement Compliance Review', level=0)
-title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-# Subtitle
-sub = doc.add_paragraph()
-sub.alignment = WD_ALIGN_PARAGRAPH.CENTER
-run = sub.add_run('CAB Date: March 5, 2026 — 14 Change Requests')
-run.font.size = Pt(14)
-run.font.color.rgb = RGBColor(0x44, 0x44, 0x44)
-
-doc.add_paragraph()
-
-# ── Executive Summary ──
-doc.add_heading('Executive Summary', level=1)
-
-summary_data = [
-    ("PASS", "9", "CHG0039423, CHG0039418, CHG0039415, CHG0039403, CHG0039383, CHG0039339, CHG0039284, CHG0039414, CHG0039213"),
-    ("PASS w/ minor flags", "3", "CHG0039420, CHG0039399, CHG0039283"),
-    ("FLAG — needs CCB discussion", "2", "CHG0039412, CHG0039386"),
-]
-
-tbl = doc.add_table(rows=1, cols=3)
-tbl.style = 'Light Grid Accent 1'
-tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
-hdr = tbl.rows[0].cells
-set_cell_text(hdr[0], "Status", bold=True, font_size=10)
-set_cell_text(hdr[1], "Count", bold=True, font_size=10)
-set_cell_text(hdr[2], "Changes", bold=True, font_size=10)
-set_cell_shading(hdr[0], "D6E4F0")
-set_cell_shading(hdr[1], "D6E4F0")
-set_cell_shading(hdr[2], "D6E4F0")
-
-for status, count, changes in summary_data:
-    row = tbl.add_row().cells
-    add_status_badge(row[0], status)
-    set_cell_text(row[1], count, font_size=10, alignment=WD_ALIGN_PARAGRAPH.CENTER)
-    # Add changes as hyperlinks
-    row[2].text = ""
-    p = row[2].paragraphs[0]
-    chg_list = [c.strip() for c in changes.split(",")]
-    for i, chg in enumerate(chg_list):
-        if i > 0:
-            p.add_run(", ").font.size = Pt(9)
-        add_hyperlink(p, chg, SNOW_URL + chg)
-
-doc.add_paragraph()
+CAB_DATE = date(2026, 3, 5)
+SUMMARY_ORDER = ["PASS", "PASS w/ minor flags", "FLAG — needs CCB discussion"]
 
-# ── Key Items for CCB Attention ──
-doc.add_heading('Key Items for CCB Attention', level=1)
+STATUS_BADGES = {
+    "PASS": ("2E7D32", "PASS"),
+    "FLAG": ("E65100", "FLAG"),
+    "FAIL": ("C62828", "FAIL"),
+    "PASS w/ minor flags": ("558B2F", "PASS*"),
+    "FLAG — needs CCB discussion": ("BF360C", "FLAG"),
+}
 
-attention_items = [
-    ("CHG0039412 — ORDC Hx Firmware", "Backout plan explicitly states HXDP/ESXi downgrade is \"generally not supported\" and risks data loss. CCB should confirm acceptable risk given Cisco TAC standby. ESXi target version is missing from the version field."),
-    ("CHG0039386 — trust-manager Emergency", "Already implemented 2/23. This is a retroactive authorization. CCB should confirm the emergency was justified (PDRS/Athena IDX outage) and that post-implementation review was completed."),
-    ("General Observation", "Three changes have weak pre-implementation test plans (CHG0039420, CHG0039399, CHG0039283) relying on \"not applicable\" or \"historical experience.\" While acceptable for their risk levels, this is a recurring pattern worth noting."),
-]
-
-for title_text, body_text in attention_items:
-    p = doc.add_paragraph()
-    run = p.add_run(title_text + ": ")
-    run.bold = True
-    run.font.size = Pt(10)
-    run = p.add_run(body_text)
-    run.font.size = Pt(10)
-
-doc.add_page_break()
-
-# ── Individual Change Reviews ──
-doc.add_heading('Individual Change Reviews', level=1)
+def add_status_badge(cell, status):
+    color_hex, label = STATUS_BADGES.get(status, ("757575", status))
+    set_cell_text(cell, label, bold=True, font_size=10, alignment=WD_ALIGN_PARAGRAPH.CENTER, color=RGBColor.from_string(color_hex))
 
+# ── Change assessments ──
+# Reviewer judgments recorded for this CAB, not derived from ServiceNow data;
+# only the summary counts below are computed (from these entries)
 changes = [
     {
         "number": "CHG0039423",
@@ -390,6 +293,108 @@ changes = [
     },
 ]
 
+doc = Document()
+
+# Page margins
+for section in doc.sections:
+    section.top_margin = Cm(1.5)
+    section.bottom_margin = Cm(1.5)
+    section.left_margin = Cm(1.5)
+    section.right_margin = Cm(1.5)
+
+# Title
+title = doc.add_heading('ITIL 4 Change Enablement Compliance Review', level=0)
+title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+# Subtitle
+sub = doc.add_paragraph()
+sub.alignment = WD_ALIGN_PARAGRAPH.CENTER
+run = sub.add_run(f'CAB Date: March 5, 2026 — {len(changes)} Change Requests')
+run.font.size = Pt(14)
+run.font.color.rgb = RGBColor(0x44, 0x44, 0x44)
+
+doc.add_paragraph()
+
+# ── Executive Summary ──
+doc.add_heading('Executive Summary', level=1)
+
+summary_data = [
+    (status, str(len(numbers)), ", ".join(numbers))
+    for status in SUMMARY_ORDER
+    if (numbers := [c["number"] for c in changes if c["overall"] == status])
+]
+
+tbl = doc.add_table(rows=1, cols=3)
+tbl.style = 'Light Grid Accent 1'
+tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
+hdr = tbl.rows[0].cells
+set_cell_text(hdr[0], "Status", bold=True, font_size=10)
+set_cell_text(hdr[1], "Count", bold=True, font_size=10)
+set_cell_text(hdr[2], "Changes", bold=True, font_size=10)
+set_cell_shading(hdr[0], "D6E4F0")
+set_cell_shading(hdr[1], "D6E4F0")
+set_cell_shading(hdr[2], "D6E4F0")
+
+for status, count, numbers in summary_data:
+    row = tbl.add_row().cells
+    add_status_badge(row[0], status)
+    set_cell_text(row[1], count, font_size=10, alignment=WD_ALIGN_PARAGRAPH.CENTER)
+    # Add changes as hyperlinks
+    row[2].text = ""
+    p = row[2].paragraphs[0]
+    chg_list = [c.strip() for c in numbers.split(",")]
+    for i, chg in enumerate(chg_list):
+        if i > 0:
+            p.add_run(", ").font.size = Pt(9)
+        add_hyperlink(p, chg, SNOW_URL + chg)
+
+doc.add_paragraph()
+
+# ── Practice Indicators ──
+indicators = trailing_indicators(CAB_DATE)
+if indicators:
+    doc.add_heading('Practice Indicators (Trailing 12 Months)', level=1)
+    first_month, last_month = indicators["window"]
+    p = doc.add_paragraph()
+    run = p.add_run(f"From the change store, planned starts {first_month} to {last_month}: "
+                    f"{indicators['changes']} changes ({indicators['canceled']} canceled not counted).")
+    run.font.size = Pt(9)
+    rows = []
+    for label, value, status, target in indicator_rows(indicators):
+        color_hex, badge = STATUS_BADGES.get(status, ("757575", status))
+        rows.append([
+            label,
+            {"text": value, "align": "center"},
+            {"text": badge, "bold": True, "color": color_hex, "align": "center"},
+            {"text": target, "align": "center"},
+        ])
+    build_table(doc, ["Indicator", "Value", "Status", "Target"], rows, style='Light Grid Accent 1', font='Calibri',
+                space_pt=None, header_fill="D6E4F0", header_color=None)
+    doc.add_paragraph()
+
+# ── Key Items for CCB Attention ──
+doc.add_heading('Key Items for CCB Attention', level=1)
+
+attention_items = [
+    ("CHG0039412 — ORDC Hx Firmware", "Backout plan explicitly states HXDP/ESXi downgrade is \"generally not supported\" and risks data loss. CCB should confirm acceptable risk given Cisco TAC standby. ESXi target version is missing from the version field."),
+    ("CHG0039386 — trust-manager Emergency", "Already implemented 2/23. This is a retroactive authorization. CCB should confirm the emergency was justified (PDRS/Athena IDX outage) and that post-implementation review was completed."),
+    ("General Observation", "Three changes have weak pre-implementation test plans (CHG0039420, CHG0039399, CHG0039283) relying on \"not applicable\" or \"historical experience.\" While acceptable for their risk levels, this is a recurring pattern worth noting."),
+]
+
+for title_text, body_text in attention_items:
+    p = doc.add_paragraph()
+    run = p.add_run(title_text + ": ")
+    run.bold = True
+    run.font.size = Pt(10)
+    run = p.add_run(body_text)
+    run.font.size = Pt(10)
+
+doc.add_page_break()
+
+# ── Individual Change Reviews ──
+doc.add_heading('Individual Change Reviews', level=1)
+
+
 for chg in changes:
     # Change header
     h = doc.add_heading(level=2)
@@ -423,25 +428,17 @@ for chg in changes:
         verdict_run.font.color.rgb = RGBColor(0x2E, 0x7D, 0x32)
 
     # Criteria table
-    tbl = doc.add_table(rows=1, cols=3)
-    tbl.style = 'Light Grid Accent 1'
-    hdr = tbl.rows[0].cells
-    set_cell_text(hdr[0], "Criteria", bold=True, font_size=9)
-    set_cell_text(hdr[1], "Status", bold=True, font_size=9)
-    set_cell_text(hdr[2], "Notes", bold=True, font_size=9)
-    set_cell_shading(hdr[0], "D6E4F0")
-    set_cell_shading(hdr[1], "D6E4F0")
-    set_cell_shading(hdr[2], "D6E4F0")
-
+    rows = []
     for crit_name, crit_status, crit_notes in chg["criteria"]:
-        row = tbl.add_row().cells
-        set_cell_text(row[0], crit_name, font_size=9)
-        add_status_badge(row[1], crit_status)
-        set_cell_text(row[2], crit_notes, font_size=9)
-        if crit_status == "FLAG":
-            set_cell_shading(row[0], "FFF3E0")
-            set_cell_shading(row[1], "FFF3E0")
-            set_cell_shading(row[2], "FFF3E0")
+        color_hex, label = STATUS_BADGES.get(crit_status, ("757575", crit_status))
+        fill = "FFF3E0" if crit_status == "FLAG" else None
+        rows.append([
+            {"text": crit_name, "fill": fill},
+            {"text": label, "bold": True, "color": color_hex, "align": "center", "size": 10, "fill": fill},
+            {"text": crit_notes, "fill": fill},
+        ])
+    build_table(doc, ["Criteria", "Status", "Notes"], rows, style='Light Grid Accent 1', font='Calibri',
+                space_pt=None, header_fill="D6E4F0", header_color=None)
 
     doc.add_paragraph()
 
@@ -451,3 +448,4 @@ os.makedirs(output_dir, exist_ok=True)
 output_path = os.path.join(output_dir, "ITIL4 Compliance Review - CAB 2026-03-05.docx")
 doc.save(output_path)
 print(f"Saved to: {output_path}")
+print(link_summary(doc))
@@ -4,40 +4,15 @@ from docx import Document
 from docx.shared import Inches, Pt, Cm, RGBColor, Emu
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT, WD_ALIGN_VERTICAL
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 import os
+from datetime import date
+from pathlib import Path
 
-SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+from change_metrics import indicator_rows, trailing_indicators
+from docx_builder import add_hyperlink, build_table, link_summary, set_cell_shading
 
-def add_hyperlink(paragraph, text, url):
-    part = paragraph.part
-    r_id = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
-    hyperlink = OxmlElement('w:hyperlink')
-    hyperlink.set(qn('r:id'), r_id)
-    new_run = OxmlElement('w:r')
-    rPr = OxmlElement('w:rPr')
-    c = OxmlElement('w:color')
-    c.set(qn('w:val'), '0563C1')
-    rPr.append(c)
-    u = OxmlElement('w:u')
-    u.set(qn('w:val'), 'single')
-    rPr.append(u)
-    sz = OxmlElement('w:sz')
-    sz.set(qn('w:val'), '20')
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-
-def set_cell_shading(cell, color):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    shading = OxmlElement('w:shd')
-    shading.set(qn('w:fill'), color)
-    shading.set(qn('w:val'), 'clear')
-    tcPr.append(shading)
+SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
 
 def set_cell_text(cell, text, bold=False, font_size=10, alignment=None, color=None):
     cell.text = ""
@@ -57,18 +32,36 @@ def set_cell_hyperlink(cell, text, url, font_size=10):
     p = cell.paragraphs[0]
     add_hyperlink(p, text, url)
 
+CAB_DATE = date(2026, 3, 5)
+SUMMARY_ORDER = ["PASS", "PASS w/ minor flags", "FLAG - needs CCB discussion"]
+
+STATUS_BADGES = {
+    "PASS": ("2E7D32", "PASS"),
+    "FLAG": ("E65100", "FLAG"),
+    "FAIL": ("C62828", "FAIL"),
+    "N/A": ("757575", "N/A"),
+    "PASS w/ minor flags": ("558B2F", "PASS*"),
+    "FLAG - needs CCB discussion": ("BF360C", "FLAG"),
+}
+
 def add_status_badge(cell, status):
-    colors = {
-        "PASS": ("2E7D32", "PASS"),
-        "FLAG": ("E65100", "FLAG"),
-        "FAIL": ("C62828", "FAIL"),
-        "N/A": ("757575", "N/A"),
-        "PASS w/ minor flags": ("558B2F", "PASS*"),
-        "FLAG - needs CCB discussion": ("BF360C", "FLAG"),
-    }
-    color_hex, label = colors.get(status, ("757575", status))
+    color_hex, label = STATUS_BADGES.get(status, ("757575", status))
     set_cell_text(cell, label, bold=True, font_size=9, alignment=WD_ALIGN_PARAGRAPH.CENTER, color=RGBColor.from_string(color_hex))
 
+def criteria_table(doc, headers, header_fill, criteria):
+    """Criterion / status badge / notes table; FLAG rows shaded."""
+    rows = []
+    for crit_name, crit_status, crit_notes in criteria:
+        color_hex, label = STATUS_BADGES.get(crit_status, ("757575", crit_status))
+        fill = "FFF3E0" if crit_status == "FLAG" else None
+        rows.append([
+            {"text": crit_name, "fill": fill},
+            {"text": label, "bold": True, "color": color_hex, "align": "center", "fill": fill},
+            {"text": crit_notes, "fill": fill},
+        ])
+    return build_table(doc, headers, rows, style='Light Grid Accent 1', font='Calibri', space_pt=None,
+                       header_fill=header_fill, header_color=None)
+
 def add_bold_run(paragraph, text, font_size=10):
     run = paragraph.add_run(text)
     run.bold = True
@@ -86,164 +79,12 @@ def add_run(paragraph, text, font_size=10, color=None, bold=False):
         run.bold = True
     return run
 
-doc = Document()
-
-# Page margins
-for section in doc.sections:
-    section.top_margin = Cm(1.5)
-    section.bottom_margin = Cm(1.5)
-    section.left_margin = Cm(1.5)
-    section.right_margin = Cm(1.5)
-
-# ════════════════════════════════════════════════════════════════
-# TITLE PAGE
-# ════════════════════════════════════════════════════════════════
-for _ in range(6):
-    doc.add_paragraph()
-
-title = doc.add_heading('Change Enablement Compliance Review', level=0)
-title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-sub = doc.add_paragraph()
-sub.alignment = WD_ALIGN_PARAGRAPH.CENTER
-add_run(sub, 'Dual-Framework Assessment', font_size=16, color=RGBColor(0x44, 0x44, 0x44))
-
-sub2 = doc.add_paragraph()
-sub2.alignment = WD_ALIGN_PARAGRAPH.CENTER
-add_run(sub2, 'ITIL 4 Change Enablement  |  ISMS-STA-11.01-01', font_size=13, color=RGBColor(0x66, 0x66, 0x66))
-
-doc.add_paragraph()
-
-meta_p = doc.add_paragraph()
-meta_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-add_run(meta_p, 'CAB Date: Thursday, March 5, 2026 — 1:00 PM PST\n', font_size=12)
-add_run(meta_p, '14 Change Requests Under Review\n', font_size=12)
-add_run(meta_p, 'Prepared by: EA / Change Management\n', font_size=11, color=RGBColor(0x66, 0x66, 0x66))
-add_run(meta_p, 'Date Prepared: March 4, 2026', font_size=11, color=RGBColor(0x66, 0x66, 0x66))
-
-doc.add_page_break()
-
 # ════════════════════════════════════════════════════════════════
-# FRAMEWORK REFERENCE
+# CHANGE ASSESSMENTS
 # ════════════════════════════════════════════════════════════════
-doc.add_heading('Assessment Frameworks', level=1)
-
-doc.add_heading('ITIL 4 Change Enablement', level=2)
-p = doc.add_paragraph()
-add_run(p, 'This review applies the ITIL 4 Change Enablement practice as defined in the ITIL 4 Foundation and Practice Guides (Axelos/PeopleCert). Key assessment dimensions include:', font_size=10)
-
-itil_items = [
-    ("Seven Rs of Change", "Who Raised it? What is the Reason? What Return is expected? What are the Risks? What Resources are required? Who is Responsible? What is the Relationship to other changes?"),
-    ("Change Type Classification", "Normal changes require full risk assessment and CAB authorization. Emergency changes are time-sensitive with expedited authorization and mandatory post-implementation review (PIR). Standard changes are pre-approved, low-risk, repeatable."),
-    ("Risk Assessment", "Every change must have risks identified, categorized, and accepted by the appropriate change authority."),
-    ("Change Schedule", "Changes must be scheduled to minimize conflict with other changes and business operations."),
-    ("Authorization Model", "Normal changes authorized by CAB/CCB. Emergency changes authorized by delegated authority with retroactive CAB review. Standard changes pre-authorized."),
-    ("Post-Implementation Review (PIR)", "Required for all emergency changes; recommended for normal changes to confirm objectives met."),
-    ("Continual Improvement", "Change models should be reviewed for optimization; patterns in failures/flags should drive process improvement."),
-]
-
-for title_text, body_text in itil_items:
-    p = doc.add_paragraph(style='List Bullet')
-    add_bold_run(p, f"{title_text}: ", font_size=10)
-    add_run(p, body_text, font_size=10)
-
-doc.add_paragraph()
-doc.add_heading('ISMS-STA-11.01-01 Enterprise Change Management Program', level=2)
-p = doc.add_paragraph()
-add_run(p, 'This review simultaneously validates compliance against Vituity\'s internal policy. Key requirements extracted from the policy:', font_size=10)
-
-isms_items = [
-    ("Minimum CR Fields (Section: Provisions)", "Change Request Type, Requested By, Category, Configuration Item, Environment, Assignment Group, Short Description, Description, Justification/Business Value, Implementation Plan, Risk and Impact Analysis, Backout Plan, Test Plan, Planned Date and Time of Change."),
-    ("CCB Submission Deadline", "Change requests must be submitted and at Assess state by Wednesday 3:00 PM PT for Thursday CCB review."),
-    ("Business Owner Approval", "Requester must obtain Business Owner approval prior to submitting to CCB."),
-    ("Pre-Implementation Testing", "Changes to applications and operating systems are tested for security, usability, and impact prior to promoting to production. Testing in environment segregated from production where possible."),
-    ("Backout Plan Requirement", "Detailed backout plan required; if implementation experiences issues, Implementor must initiate roll-back procedures to return resource to pre-change state."),
-    ("Version Control", "Implementor maintains version control for all software updates."),
-    ("Security Review", "InfoSec approval is required on all changes. CCB ensures changes do not compromise security."),
-    ("Implementation Authorization", "All changes listed as Yes for 'CCB Approval Required' must be approved before implementation."),
-    ("Post-Change Validation", "Requestor confirms and validates work is available and working as designed after production promotion."),
-    ("Unauthorized Changes", "Changes implemented without full approval, outside change windows, or causing incidents are logged as unauthorized."),
-    ("Communication", "Business is notified in advance of maintenance impacting service availability."),
-    ("Documentation", "System documentation, operating documentation, and user procedures updated as needed."),
-]
-
-for title_text, body_text in isms_items:
-    p = doc.add_paragraph(style='List Bullet')
-    add_bold_run(p, f"{title_text}: ", font_size=10)
-    add_run(p, body_text, font_size=10)
-
-p = doc.add_paragraph()
-add_run(p, '\nReferences: HITRUST CSF v9.2 (Change Management), ISMS Manual, Risk Management Program [ISMS-STA-05.02-01], Continuous Monitoring Program [ISMS-STA-11.09-01].', font_size=9, color=RGBColor(0x66, 0x66, 0x66))
-
-doc.add_page_break()
-
-# ════════════════════════════════════════════════════════════════
-# EXECUTIVE SUMMARY
-# ════════════════════════════════════════════════════════════════
-doc.add_heading('Executive Summary', level=1)
-
-summary_data = [
-    ("PASS", "9", "CHG0039423, CHG0039418, CHG0039415, CHG0039403, CHG0039383, CHG0039339, CHG0039284, CHG0039414, CHG0039213"),
-    ("PASS w/ minor flags", "3", "CHG0039420, CHG0039399, CHG0039283"),
-    ("FLAG - needs CCB discussion", "2", "CHG0039412, CHG0039386"),
-]
-
-tbl = doc.add_table(rows=1, cols=3)
-tbl.style = 'Light Grid Accent 1'
-tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
-hdr = tbl.rows[0].cells
-set_cell_text(hdr[0], "Status", bold=True, font_size=10)
-set_cell_text(hdr[1], "Count", bold=True, font_size=10)
-set_cell_text(hdr[2], "Changes", bold=True, font_size=10)
-set_cell_shading(hdr[0], "D6E4F0")
-set_cell_shading(hdr[1], "D6E4F0")
-set_cell_shading(hdr[2], "D6E4F0")
-
-for status, count, changes in summary_data:
-    row = tbl.add_row().cells
-    add_status_badge(row[0], status)
-    set_cell_text(row[1], count, font_size=10, alignment=WD_ALIGN_PARAGRAPH.CENTER)
-    row[2].text = ""
-    p = row[2].paragraphs[0]
-    chg_list = [c.strip() for c in changes.split(",")]
-    for i, chg in enumerate(chg_list):
-        if i > 0:
-            p.add_run(", ").font.size = Pt(9)
-        add_hyperlink(p, chg, SNOW_URL + chg)
-
-doc.add_paragraph()
-
-# Key Items
-doc.add_heading('Key Items for CCB Attention', level=2)
-
-attention_items = [
-    ("CHG0039412 - ORDC Hx Firmware Upgrade",
-     "ITIL 4 Risk: Backout plan explicitly states HXDP/ESXi downgrade is \"generally not supported\" and risks data loss. ITIL 4 requires identified risks to be accepted by the change authority. "
-     "ISMS Gap: ESXi target version incomplete - policy requires version control for all software updates (Section: Provisions). "
-     "Recommendation: CCB should formally acknowledge limited reversibility risk and confirm Cisco TAC availability. Implementor should complete the ESXi target version field."),
-    ("CHG0039386 - trust-manager Emergency (Retroactive)",
-     "ITIL 4: Emergency changes require expedited authorization AND mandatory Post-Implementation Review (PIR). This change was implemented 2/23 and is now at Authorize state for retroactive CCB review. "
-     "ISMS: Policy states \"full approval not obtained prior to implementation\" triggers the Unauthorized Change process (Section 7: Operating Procedures). However, the Change Manager may approve emergency changes and schedule them for CCB post-mortem review. "
-     "Recommendation: CCB should confirm: (1) Was the emergency justified? (2) Was PIR completed? (3) Did the Change Manager authorize the emergency per policy?"),
-    ("Recurring Pattern: Weak Pre-Implementation Testing",
-     "ITIL 4: Risk assessment should consider testing adequacy. "
-     "ISMS: Policy requires changes \"tested for security, usability, and impact prior to promoting to production.\" "
-     "Three changes (CHG0039420, CHG0039399, CHG0039283) cite \"Not applicable\" or \"None\" for pre-implementation testing. While their risk levels may justify this, the pattern should be noted for continual improvement per ITIL 4."),
-]
-
-for title_text, body_text in attention_items:
-    p = doc.add_paragraph()
-    add_bold_run(p, title_text + "\n", font_size=10)
-    add_run(p, body_text, font_size=10)
-
-doc.add_page_break()
-
-# ════════════════════════════════════════════════════════════════
-# INDIVIDUAL CHANGE REVIEWS
-# ════════════════════════════════════════════════════════════════
-doc.add_heading('Individual Change Reviews', level=1)
-
-# Each change has ITIL 4 criteria AND ISMS criteria
+# Each change has ITIL 4 criteria AND ISMS criteria. The statuses are reviewer
+# judgments recorded for this CAB, not derived from ServiceNow data; only the
+# summary counts below are computed (from these entries)
 changes = [
     {
         "number": "CHG0039423",
@@ -664,6 +505,186 @@ changes = [
     },
 ]
 
+doc = Document()
+
+# Page margins
+for section in doc.sections:
+    section.top_margin = Cm(1.5)
+    section.bottom_margin = Cm(1.5)
+    section.left_margin = Cm(1.5)
+    section.right_margin = Cm(1.5)
+
+# ════════════════════════════════════════════════════════════════
+# TITLE PAGE
+# ════════════════════════════════════════════════════════════════
+for _ in range(6):
+    doc.add_paragraph()
+
+title = doc.add_heading('Change Enablement Compliance Review', level=0)
+title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+sub = doc.add_paragraph()
+sub.alignment = WD_ALIGN_PARAGRAPH.CENTER
+add_run(sub, 'Dual-Framework Assessment', font_size=16, color=RGBColor(0x44, 0x44, 0x44))
+
+sub2 = doc.add_paragraph()
+sub2.alignment = WD_ALIGN_PARAGRAPH.CENTER
+add_run(sub2, 'ITIL 4 Change Enablement  |  ISMS-STA-11.01-01', font_size=13, color=RGBColor(0x66, 0x66, 0x66))
+
+doc.add_paragraph()
+
+meta_p = doc.add_paragraph()
+meta_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+add_run(meta_p, 'CAB Date: Thursday, March 5, 2026 — 1:00 PM PST\n', font_size=12)
+add_run(meta_p, f'{len(changes)} Change Requests Under Review\n', font_size=12)
+add_run(meta_p, 'Prepared by: EA / Change Management\n', font_size=11, color=RGBColor(0x66, 0x66, 0x66))
+add_run(meta_p, 'Date Prepared: March 4, 2026', font_size=11, color=RGBColor(0x66, 0x66, 0x66))
+
+doc.add_page_break()
+
+# ════════════════════════════════════════════════════════════════
+# FRAMEWORK REFERENCE
+# ════════════════════════════════════════════════════════════════
+doc.add_heading('Assessment Frameworks', level=1)
+
+doc.add_heading('ITIL 4 Change Enablement', level=2)
+p = doc.add_paragraph()
+add_run(p, 'This review applies the ITIL 4 Change Enablement practice as defined in the ITIL 4 Foundation and Practice Guides (Axelos/PeopleCert). Key assessment dimensions include:', font_size=10)
+
+itil_items = [
+    ("Seven Rs of Change", "Who Raised it? What is the Reason? What Return is expected? What are the Risks? What Resources are required? Who is Responsible? What is the Relationship to other changes?"),
+    ("Change Type Classification", "Normal changes require full risk assessment and CAB authorization. Emergency changes are time-sensitive with expedited authorization and mandatory post-implementation review (PIR). Standard changes are pre-approved, low-risk, repeatable."),
+    ("Risk Assessment", "Every change must have risks identified, categorized, and accepted by the appropriate change authority."),
+    ("Change Schedule", "Changes must be scheduled to minimize conflict with other changes and business operations."),
+    ("Authorization Model", "Normal changes authorized by CAB/CCB. Emergency changes authorized by delegated authority with retroactive CAB review. Standard changes pre-authorized."),
+    ("Post-Implementation Review (PIR)", "Required for all emergency changes; recommended for normal changes to confirm objectives met."),
+    ("Continual Improvement", "Change models should be reviewed for optimization; patterns in failures/flags should drive process improvement."),
+]
+
+for title_text, body_text in itil_items:
+    p = doc.add_paragraph(style='List Bullet')
+    add_bold_run(p, f"{title_text}: ", font_size=10)
+    add_run(p, body_text, font_size=10)
+
+doc.add_paragraph()
+doc.add_heading('ISMS-STA-11.01-01 Enterprise Change Management Program', level=2)
+p = doc.add_paragraph()
+add_run(p, 'This review simultaneously validates compliance against Vituity\'s internal policy. Key requirements extracted from the policy:', font_size=10)
+
+isms_items = [
+    ("Minimum CR Fields (Section: Provisions)", "Change Request Type, Requested By, Category, Configuration Item, Environment, Assignment Group, Short Description, Description, Justification/Business Value, Implementation Plan, Risk and Impact Analysis, Backout Plan, Test Plan, Planned Date and Time of Change."),
+    ("CCB Submission Deadline", "Change requests must be submitted and at Assess state by Wednesday 3:00 PM PT for Thursday CCB review."),
+    ("Business Owner Approval", "Requester must obtain Business Owner approval prior to submitting to CCB."),
+    ("Pre-Implementation Testing", "Changes to applications and operating systems are tested for security, usability, and impact prior to promoting to production. Testing in environment segregated from production where possible."),
+    ("Backout Plan Requirement", "Detailed backout plan required; if implementation experiences issues, Implementor must initiate roll-back procedures to return resource to pre-change state."),
+    ("Version Control", "Implementor maintains version control for all software updates."),
+    ("Security Review", "InfoSec approval is required on all changes. CCB ensures changes do not compromise security."),
+    ("Implementation Authorization", "All changes listed as Yes for 'CCB Approval Required' must be approved before implementation."),
+    ("Post-Change Validation", "Requestor confirms and validates work is available and working as designed after production promotion."),
+    ("Unauthorized Changes", "Changes implemented without full approval, outside change windows, or causing incidents are logged as unauthorized."),
+    ("Communication", "Business is notified in advance of maintenance impacting service availability."),
+    ("Documentation", "System documentation, operating documentation, and user procedures updated as needed."),
+]
+
+for title_text, body_text in isms_items:
+    p = doc.add_paragraph(style='List Bullet')
+    add_bold_run(p, f"{title_text}: ", font_size=10)
+    add_run(p, body_text, font_size=10)
+
+p = doc.add_paragraph()
+add_run(p, '\nReferences: HITRUST CSF v9.2 (Change Management), ISMS Manual, Risk Management Program [ISMS-STA-05.02-01], Continuous Monitoring Program [ISMS-STA-11.09-01].', font_size=9, color=RGBColor(0x66, 0x66, 0x66))
+
+doc.add_page_break()
+
+# ════════════════════════════════════════════════════════════════
+# EXECUTIVE SUMMARY
+# ════════════════════════════════════════════════════════════════
+doc.add_heading('Executive Summary', level=1)
+
+summary_data = [
+    (status, str(len(numbers)), ", ".join(numbers))
+    for status in SUMMARY_ORDER
+    if (numbers := [c["number"] for c in changes if c["overall"] == status])
+]
+
+tbl = doc.add_table(rows=1, cols=3)
+tbl.style = 'Light Grid Accent 1'
+tbl.alignment = WD_TABLE_ALIGNMENT.CENTER
+hdr = tbl.rows[0].cells
+set_cell_text(hdr[0], "Status", bold=True, font_size=10)
+set_cell_text(hdr[1], "Count", bold=True, font_size=10)
+set_cell_text(hdr[2], "Changes", bold=True, font_size=10)
+set_cell_shading(hdr[0], "D6E4F0")
+set_cell_shading(hdr[1], "D6E4F0")
+set_cell_shading(hdr[2], "D6E4F0")
+
+for status, count, numbers in summary_data:
+    row = tbl.add_row().cells
+    add_status_badge(row[0], status)
+    set_cell_text(row[1], count, font_size=10, alignment=WD_ALIGN_PARAGRAPH.CENTER)
+    row[2].text = ""
+    p = row[2].paragraphs[0]
+    chg_list = [c.strip() for c in numbers.split(",")]
+    for i, chg in enumerate(chg_list):
+        if i > 0:
+            p.add_run(", ").font.size = Pt(9)
+        add_hyperlink(p, chg, SNOW_URL + chg)
+
+doc.add_paragraph()
+
+# ── Practice Indicators ──
+indicators = trailing_indicators(CAB_DATE)
+if indicators:
+    doc.add_heading('Practice Indicators (Trailing 12 Months)', level=2)
+    first_month, last_month = indicators["window"]
+    p = doc.add_paragraph()
+    run = p.add_run(f"From the change store, planned starts {first_month} to {last_month}: "
+                    f"{indicators['changes']} changes ({indicators['canceled']} canceled not counted).")
+    run.font.size = Pt(9)
+    rows = []
+    for label, value, status, target in indicator_rows(indicators):
+        color_hex, badge = STATUS_BADGES.get(status, ("757575", status))
+        rows.append([
+            label,
+            {"text": value, "align": "center"},
+            {"text": badge, "bold": True, "color": color_hex, "align": "center"},
+            {"text": target, "align": "center"},
+        ])
+    build_table(doc, ["Indicator", "Value", "Status", "Target"], rows, style='Light Grid Accent 1', font='Calibri',
+                space_pt=None, header_fill="D6E4F0", header_color=None)
+    doc.add_paragraph()
+
+# Key Items
+doc.add_heading('Key Items for CCB Attention', level=2)
+
+attention_items = [
+    ("CHG0039412 - ORDC Hx Firmware Upgrade",
+     "ITIL 4 Risk: Backout plan explicitly states HXDP/ESXi downgrade is \"generally not supported\" and risks data loss. ITIL 4 requires identified risks to be accepted by the change authority. "
+     "ISMS Gap: ESXi target version incomplete - policy requires version control for all software updates (Section: Provisions). "
+     "Recommendation: CCB should formally acknowledge limited reversibility risk and confirm Cisco TAC availability. Implementor should complete the ESXi target version field."),
+    ("CHG0039386 - trust-manager Emergency (Retroactive)",
+     "ITIL 4: Emergency changes require expedited authorization AND mandatory Post-Implementation Review (PIR). This change was implemented 2/23 and is now at Authorize state for retroactive CCB review. "
+     "ISMS: Policy states \"full approval not obtained prior to implementation\" triggers the Unauthorized Change process (Section 7: Operating Procedures). However, the Change Manager may approve emergency changes and schedule them for CCB post-mortem review. "
+     "Recommendation: CCB should confirm: (1) Was the emergency justified? (2) Was PIR completed? (3) Did the Change Manager authorize the emergency per policy?"),
+    ("Recurring Pattern: Weak Pre-Implementation Testing",
+     "ITIL 4: Risk assessment should consider testing adequacy. "
+     "ISMS: Policy requires changes \"tested for security, usability, and impact prior to promoting to production.\" "
+     "Three changes (CHG0039420, CHG0039399, CHG0039283) cite \"Not applicable\" or \"None\" for pre-implementation testing. While their risk levels may justify this, the pattern should be noted for continual improvement per ITIL 4."),
+]
+
+for title_text, body_text in attention_items:
+    p = doc.add_paragraph()
+    add_bold_run(p, title_text + "\n", font_size=10)
+    add_run(p, body_text, font_size=10)
+
+doc.add_page_break()
+
+# ════════════════════════════════════════════════════════════════
+# INDIVIDUAL CHANGE REVIEWS
+# ════════════════════════════════════════════════════════════════
+doc.add_heading('Individual Change Reviews', level=1)
+
+
 for chg in changes:
     # Change header
     h = doc.add_heading(level=2)
@@ -694,47 +715,11 @@ for chg in changes:
 
     # ITIL 4 Seven Rs Table
     doc.add_heading('ITIL 4 \u2014 Seven Rs of Change', level=3)
-    tbl = doc.add_table(rows=1, cols=3)
-    tbl.style = 'Light Grid Accent 1'
-    hdr = tbl.rows[0].cells
-    set_cell_text(hdr[0], "Question", bold=True, font_size=9)
-    set_cell_text(hdr[1], "Status", bold=True, font_size=9)
-    set_cell_text(hdr[2], "Assessment", bold=True, font_size=9)
-    set_cell_shading(hdr[0], "E8EAF6")
-    set_cell_shading(hdr[1], "E8EAF6")
-    set_cell_shading(hdr[2], "E8EAF6")
-
-    for crit_name, crit_status, crit_notes in chg["seven_rs"]:
-        row = tbl.add_row().cells
-        set_cell_text(row[0], crit_name, font_size=9)
-        add_status_badge(row[1], crit_status)
-        set_cell_text(row[2], crit_notes, font_size=9)
-        if crit_status == "FLAG":
-            set_cell_shading(row[0], "FFF3E0")
-            set_cell_shading(row[1], "FFF3E0")
-            set_cell_shading(row[2], "FFF3E0")
+    criteria_table(doc, ["Question", "Status", "Assessment"], "E8EAF6", chg["seven_rs"])
 
     # ISMS Policy Compliance Table
     doc.add_heading('ISMS-STA-11.01-01 Policy Compliance', level=3)
-    tbl2 = doc.add_table(rows=1, cols=3)
-    tbl2.style = 'Light Grid Accent 1'
-    hdr2 = tbl2.rows[0].cells
-    set_cell_text(hdr2[0], "Requirement", bold=True, font_size=9)
-    set_cell_text(hdr2[1], "Status", bold=True, font_size=9)
-    set_cell_text(hdr2[2], "Evidence / Notes", bold=True, font_size=9)
-    set_cell_shading(hdr2[0], "E8F5E9")
-    set_cell_shading(hdr2[1], "E8F5E9")
-    set_cell_shading(hdr2[2], "E8F5E9")
-
-    for crit_name, crit_status, crit_notes in chg["isms"]:
-        row = tbl2.add_row().cells
-        set_cell_text(row[0], crit_name, font_size=9)
-        add_status_badge(row[1], crit_status)
-        set_cell_text(row[2], crit_notes, font_size=9)
-        if crit_status == "FLAG":
-            set_cell_shading(row[0], "FFF3E0")
-            set_cell_shading(row[1], "FFF3E0")
-            set_cell_shading(row[2], "FFF3E0")
+    criteria_table(doc, ["Requirement", "Status", "Evidence / Notes"], "E8F5E9", chg["isms"])
 
     doc.add_paragraph()
     if chg != changes[-1]:
@@ -776,3 +761,4 @@ os.makedirs(output_dir, exist_ok=True)
 output_path = os.path.join(output_dir, "ITIL4-ISMS Compliance Review - CAB 2026-03-05.docx")
 doc.save(output_path)
 print(f"Saved to: {output_path}")
+print(link_summary(doc))
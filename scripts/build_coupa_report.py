@@ -2,10 +2,14 @@
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 from datetime import date
+from pathlib import Path
 import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools" / "snow-pir"))
+import docx_builder
+from docx_builder import link_summary, set_table_borders
 
 SN = "https://vituity.service-now.com"
 
@@ -31,65 +35,11 @@ def jira_url(key: str) -> str:
 
 
 def add_hyperlink(paragraph, url, text, bold=False):
-    part = paragraph.part
-    r_id = part.relate_to(
-        url,
-        "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink",
-        is_external=True,
-    )
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-    new_run = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-    color = OxmlElement("w:color")
-    color.set(qn("w:val"), "0563C1")
-    rPr.append(color)
-    underline = OxmlElement("w:u")
-    underline.set(qn("w:val"), "single")
-    rPr.append(underline)
-    if bold:
-        b = OxmlElement("w:b")
-        rPr.append(b)
-    new_run.append(rPr)
-    t = OxmlElement("w:t")
-    t.text = text
-    t.set(qn("xml:space"), "preserve")
-    new_run.append(t)
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-
-
-def shade_cell(cell, color_hex):
-    tc_pr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement("w:shd")
-    shd.set(qn("w:val"), "clear")
-    shd.set(qn("w:color"), "auto")
-    shd.set(qn("w:fill"), color_hex)
-    tc_pr.append(shd)
-
-
-def set_table_borders(table):
-    tbl = table._tbl
-    tblPr = tbl.tblPr
-    tblBorders = OxmlElement("w:tblBorders")
-    for edge in ("top", "left", "bottom", "right", "insideH", "insideV"):
-        b = OxmlElement(f"w:{edge}")
-        b.set(qn("w:val"), "single")
-        b.set(qn("w:sz"), "4")
-        b.set(qn("w:color"), "BFBFBF")
-        tblBorders.append(b)
-    tblPr.append(tblBorders)
+    docx_builder.add_hyperlink(paragraph, text, url, bold=bold, size=None)
 
 
 def add_header_row(table, headers):
-    hdr_cells = table.rows[0].cells
-    for i, h in enumerate(headers):
-        hdr_cells[i].text = ""
-        p = hdr_cells[i].paragraphs[0]
-        run = p.add_run(h)
-        run.bold = True
-        run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
-        shade_cell(hdr_cells[i], "1F4E79")
+    docx_builder.styled_header_row(table, headers, fill="1F4E79", size=None, space_pt=None)
 
 
 def add_h(doc, text, level=1):
@@ -430,3 +380,4 @@ os.makedirs(out_dir, exist_ok=True)
 out_path = os.path.join(out_dir, f"Coupa Cross-System Inventory {date.today().isoformat()}.docx")
 doc.save(out_path)
 print(out_path)
+print(link_summary(doc))
@@ -2,10 +2,14 @@
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 from datetime import date
+from pathlib import Path
 import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools" / "snow-pir"))
+import docx_builder
+from docx_builder import link_summary, set_table_borders
 
 SN = "https://vituity.service-now.com"
 def chg(n): return f"{SN}/change_request.do?sysparm_query=number={n}"
@@ -16,41 +20,11 @@ def jira(k): return f"https://medamerica.atlassian.net/browse/{k}"
 
 
 def add_hyperlink(p, url, text, bold=False):
-    part = p.part
-    rid = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
-    h = OxmlElement("w:hyperlink"); h.set(qn("r:id"), rid)
-    r = OxmlElement("w:r"); rPr = OxmlElement("w:rPr")
-    c = OxmlElement("w:color"); c.set(qn("w:val"), "0563C1"); rPr.append(c)
-    u = OxmlElement("w:u"); u.set(qn("w:val"), "single"); rPr.append(u)
-    if bold: rPr.append(OxmlElement("w:b"))
-    r.append(rPr)
-    t = OxmlElement("w:t"); t.text = text; t.set(qn("xml:space"), "preserve"); r.append(t)
-    h.append(r); p._p.append(h)
-
-
-def shade(cell, hex_):
-    tc = cell._tc.get_or_add_tcPr()
-    s = OxmlElement("w:shd"); s.set(qn("w:val"), "clear"); s.set(qn("w:color"), "auto"); s.set(qn("w:fill"), hex_)
-    tc.append(s)
-
-
-def borders(table):
-    tbl = table._tbl; tblPr = tbl.tblPr
-    b = OxmlElement("w:tblBorders")
-    for e in ("top", "left", "bottom", "right", "insideH", "insideV"):
-        x = OxmlElement(f"w:{e}")
-        x.set(qn("w:val"), "single"); x.set(qn("w:sz"), "4"); x.set(qn("w:color"), "BFBFBF")
-        b.append(x)
-    tblPr.append(b)
+    docx_builder.add_hyperlink(p, text, url, bold=bold, size=None)
 
 
 def header_row(t, headers):
-    cells = t.rows[0].cells
-    for i, h in enumerate(headers):
-        cells[i].text = ""
-        run = cells[i].paragraphs[0].add_run(h)
-        run.bold = True; run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
-        shade(cells[i], "1F4E79")
+    docx_builder.styled_header_row(t, headers, fill="1F4E79", size=None, space_pt=None)
 
 
 def add_h(doc, text, level=1):
@@ -117,7 +91,7 @@ for title_text, body, link, url in [
 
 # CMDB
 add_h(doc, "ServiceNow CMDB", 1)
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Name", "Class", "Status", "Support Group"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Name", "Class", "Status", "Support Group"])
 for n, c, s, g in [
     ("Navan", "Application", "Operational", "—"),
     ("TripActions", "Business Application", "Operational", "Enterprise Applications"),
@@ -127,7 +101,7 @@ for n, c, s, g in [
 
 # Changes
 add_h(doc, "ServiceNow — Change Requests (6 total)", 1)
-t = doc.add_table(rows=1, cols=5); borders(t); header_row(t, ["Number", "Short Description", "State", "Type", "Assignee"])
+t = doc.add_table(rows=1, cols=5); set_table_borders(t); header_row(t, ["Number", "Short Description", "State", "Type", "Assignee"])
 for num, desc, state, typ, who in [
     ("CHG0039562", "Request to Add new \"Travel\" Assignment Group", "New", "Normal", "Edmund Trinidad"),
     ("CHG0038147", "Patti Cordle unable to login to Navan", "Canceled", "Normal", "Zach Olsen"),
@@ -144,7 +118,7 @@ for num, desc, state, typ, who in [
 add_h(doc, "ServiceNow — Incidents (33)", 1)
 doc.add_paragraph("All P3–P5 except 2 P2-High; no P1. Volume dominated by login/access. Routing pattern: most route to Coupa Administrator group (gap CHG0039562 is fixing).")
 doc.add_paragraph("Notable / Open incidents:", style="Intense Quote")
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Number", "Short Description", "Priority/State", "Assignee"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Number", "Short Description", "Priority/State", "Assignee"])
 for num, desc, ps, who in [
     ("INC1085765", "Reservation link for Vituity Health", "P4 / On Hold", "Diane Hoover"),
     ("INC1082226", "Delegate Access for Mike Harrington", "P3 / In Progress", "Bharat Reddy"),
@@ -164,7 +138,7 @@ for num, desc, ps, who in [
 
 # Problems
 add_h(doc, "ServiceNow — Problems (2)", 1)
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Number", "Short Description", "Priority", "Assignee"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Number", "Short Description", "Priority", "Assignee"])
 for num, desc, pri, who in [
     ("PRB0041001", "Navan App Access", "P3", "Andrew Sanchez (Service Delivery Optimization)"),
     ("PRB0040797", "Okta: Block Login from Anonymizers (Navan-related)", "P4", "Andrew Sanchez (Service Delivery Optimization)"),
@@ -189,7 +163,7 @@ for s in [
 
 # KB
 add_h(doc, "ServiceNow — Knowledge Base (2)", 1)
-t = doc.add_table(rows=1, cols=2); borders(t); header_row(t, ["Article", "Title"])
+t = doc.add_table(rows=1, cols=2); set_table_borders(t); header_row(t, ["Article", "Title"])
 for num, title_text in [
     ("KB0011988", "Vituity's Travel Tool - Navan (formerly TripActions)"),
     ("KB0010145", "Corporate Hotel Discounts (references Navan)"),
@@ -202,7 +176,7 @@ for num, title_text in [
 add_h(doc, "Jira (13 issues)", 1)
 
 add_h(doc, "Active 2026 — Auth & Okta Integration", 2)
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
 for k, ttl, st, who in [
     ("SDOP-1245", "Navan/Okta Username Alignment — Proactive Remediation", "Done (Apr 2026)", "Beth Vanderheiden"),
     ("SDOP-1134", "Investigate Okta app name change settings", "Done (Mar 2026)", "Dan Spengler"),
@@ -212,7 +186,7 @@ for k, ttl, st, who in [
     cells[1].text = ttl; cells[2].text = st; cells[3].text = who
 
 add_h(doc, "Vendor Risk Assessment", 2)
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
 for k, ttl, st, who in [
     ("PROD-9739", "VRA | TripActions — Phase 1", "Done (Jan 2026)", "Lokesh Dhakad"),
     ("PROD-9926", "Vendor Eval-Scope | TripActions | Phase 1", "Done (Jan 2026)", "Brian Ejesieme"),
@@ -225,7 +199,7 @@ for k, ttl, st, who in [
     cells[1].text = ttl; cells[2].text = st; cells[3].text = who
 
 add_h(doc, "Open / Stale Backlog", 2)
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
 for k, ttl, st, who in [
     ("PROD-4871", "Patti Cordle Navan login (CHG0038147 — canceled)", "To Do (May 2025)", "UNASSIGNED"),
     ("EA-19", "HCM file extract development → TripAction SFTP", "Blocked (since 2020)", "Vamsi Naganathanahalli"),
@@ -237,7 +211,7 @@ for k, ttl, st, who in [
     cells[1].text = ttl; cells[2].text = st; cells[3].text = who
 
 add_h(doc, "Historical Implementation (2020)", 2)
-t = doc.add_table(rows=1, cols=4); borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
+t = doc.add_table(rows=1, cols=4); set_table_borders(t); header_row(t, ["Key", "Title", "Status", "Owner"])
 for k, ttl, st, who in [
     ("SNO-115", "TripActions VERA Category Add", "Done (2020)", "Rosalinda Rafael"),
     ("ENG-1442", "Make product site provision work", "Done (2020)", "Uladzislau Loputs"),
@@ -310,3 +284,4 @@ os.makedirs(out_dir, exist_ok=True)
 out_path = os.path.join(out_dir, f"Navan TripActions Cross-System Inventory {date.today().isoformat()}.docx")
 doc.save(out_path)
 print(out_path)
+print(link_summary(doc))
@@ -1,56 +1,72 @@
 """
 Generate a standalone HTML Change Management Calendar.
 No Excel needed — opens in any browser, embeddable in SharePoint/Teams.
+
+Three views, switched by tabs: the month grid (busy days fold their extra
+changes into a "+N more" list instead of dropping them), a week view with hour
+lanes from the changes' real start/end times, and a Gantt-style timeline
+grouped by assignment group. The week view and timeline are drawn in the
+team's local time (CHANGE_TZ, see tools/snow-pir/schedule_conflicts.py). All three read one CalendarIndex that buckets
+the changes in a single pass.
+
+With --by-group DIR, also writes one page per assignment group (plus an
+index.html) into DIR. The cache is read and filtered once, collisions and
+blackouts are worked out once over every change, and the records are
+partitioned by group in a single pass; the group pages then render
+concurrently, each over only its own changes.
+
+Usage: python create-calendar-html.py [output.html [calendar_changes.json]] [--by-group DIR]    (default: OneDrive)
 """
+import argparse
+import heapq
 import json
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
 import calendar
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "tools", "snow-pir"))
+from schedule_conflicts import LOCAL_TZ, calendar_window, collisions, describe, from_utc, pair_list
+from blackout import BlackoutIndex, describe_window, load_windows, violations, window_names
+
 DATA_FILE = os.path.join(SCRIPT_DIR, "calendar_changes.json")
 OUTPUT = os.path.expanduser(
     r"~\OneDrive - Vituity\Documents\Change Management\Change_Management_Calendar.html"
 )
 SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
 EXCLUDE_STATES = {"Canceled", "New", "Assess"}
-
-with open(DATA_FILE, "r", encoding="utf-8") as f:
-    all_changes = json.load(f)
+TITLE = "Change Management Calendar"
+NO_GROUP = "(not set)"
+RENDER_WORKERS = 8
 
 today = datetime.now().date()
 window_start = today - timedelta(days=30)
 window_end = today + timedelta(days=14)
 
-changes = []
-for c in all_changes:
-    if c.get("state", "") in EXCLUDE_STATES:
-        continue
-    ps = c.get("planned_start", "")
-    if ps and len(ps) >= 10:
-        try:
-            dt = datetime.strptime(ps[:10], "%Y-%m-%d").date()
-            if window_start <= dt <= window_end:
-                changes.append(c)
-        except ValueError:
-            pass
-
-print(f"Filtered to {len(changes)} changes ({window_start} to {window_end})")
-
-# Build date lookup
-by_date = defaultdict(list)
-for c in changes:
-    by_date[c.get("planned_start", "")[:10]].append(c)
-
-# Determine months
-months = sorted(set(c.get("planned_start", "")[:7] for c in changes))
-print(f"Months: {', '.join(months)}")
-
-# Count by type
-from collections import Counter
-type_counts = Counter(c.get("type", "") for c in changes)
-state_counts = Counter(c.get("state", "") for c in changes)
+
+def load_changes(data_file):
+    """Cached changes that fall in the calendar window, minus excluded states."""
+    with open(data_file, "r", encoding="utf-8") as f:
+        all_changes = json.load(f)
+
+    changes = []
+    for c in all_changes:
+        if c.get("state", "") in EXCLUDE_STATES:
+            continue
+        ps = c.get("planned_start", "")
+        if ps and len(ps) >= 10:
+            try:
+                dt = datetime.strptime(ps[:10], "%Y-%m-%d").date()
+                if window_start <= dt <= window_end:
+                    changes.append(c)
+            except ValueError:
+                pass
+    return changes
+
 
 TYPE_COLORS = {
     "Normal": ("#4472C4", "#fff"),
@@ -61,14 +77,278 @@ TYPE_COLORS = {
 def escape(s):
     return (s or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
 
-# Build HTML
-html_parts = []
-html_parts.append(f"""<!DOCTYPE html>
+DOW_NAMES = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+MAX_SHOW = 8            # Month cells show this many; the rest fold into a "+N more" list
+HOUR_PX = 20            # Week view: height of one hour
+LANE_PX = 18            # Timeline: height of one bar lane
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+def _pack(items):
+    """Assign (start, end, payload) items to the fewest lanes with no overlap in a lane.
+
+    Returns ([(payload, start, end, lane)], lane count). Greedy by start time
+    with the earliest-freed lane reused, which is optimal for intervals.
+    """
+    placed, free, lanes = [], [], 0
+    for start, end, payload in sorted(items, key=lambda i: (i[0], i[1])):
+        if free and free[0][0] <= start:
+            lane = heapq.heappop(free)[1]
+        else:
+            lane, lanes = lanes, lanes + 1
+        heapq.heappush(free, (end, lane))
+        placed.append((payload, start, end, lane))
+    return placed, lanes
+
+
+def _entry(c, overlaps, frozen):
+    """Everything the views need about one change, worked out once."""
+    number = c.get("number", "")
+    collides, in_freeze = overlaps.get(number), frozen.get(number)
+    state = c.get("state", "")
+    label = f"{number}: {c.get('short_description', '')}"
+    if collides:
+        label = "⚠ " + label
+    if in_freeze:
+        label = "⛔ " + label
+    tip = c.get("short_description", "")
+    if in_freeze:
+        tip += f"\nScheduled during {window_names(in_freeze)}"
+    if collides:
+        tip += f"\nOverlaps {describe(collides)}"
+    cls = f"chg chg-{escape(c.get('type', 'Normal'))}" + (" freeze" if in_freeze else "") + (" collision" if collides else "")
+    badge = ""
+    if state and state != "Closed":
+        badge = f' <span class="state-badge state-{escape(state)}">{escape(state)}</span>'
+    href = f"{SNOW_URL}{number}"
+    short = label if len(label) <= 35 else label[:33] + ".."
+    span = calendar_window(c)
+    if span:
+        span = (from_utc(span[0]), from_utc(span[1]))
+    return {
+        "day": c.get("planned_start", "")[:10],
+        "group": c.get("assignment_group", "") or NO_GROUP,
+        "label": label,
+        "tip": tip,
+        "cls": cls,
+        "href": href,
+        "start": span[0] if span else None,     # Local time (LOCAL_TZ)
+        "end": span[1] if span else None,
+        "chip": (f'<a class="{cls}" href="{href}" target="_blank" title="{escape(tip)}">'
+                 f'{escape(short)}{badge}</a>'),
+    }
+
+
+class CalendarIndex:
+    """The changes bucketed for every view in one pass.
+
+    Each change becomes an entry once (flags, tooltip, link markup); the month
+    grid reads `by_day`, the week view `segments` (per-day pieces of each
+    change's window, lanes assigned) and the timeline `by_group` (bars packed
+    into lanes), so adding a view doesn't add a scan over the change list.
+    """
+
+    def __init__(self, changes, overlaps, frozen):
+        self.by_day = defaultdict(list)
+        self.month_counts = Counter()
+        day_pieces = defaultdict(list)
+        group_bars = defaultdict(list)
+        first = datetime(window_start.year, window_start.month, window_start.day)
+        self.axis = (first, datetime(window_end.year, window_end.month, window_end.day) + timedelta(days=1))
+
+        for c in changes:
+            e = _entry(c, overlaps, frozen)
+            self.by_day[e["day"]].append(e)
+            self.month_counts[e["day"][:7]] += 1
+            if e["start"] is None:
+                continue
+            start, end = max(e["start"], self.axis[0]), min(e["end"], self.axis[1])
+            if end <= start:
+                continue
+            group_bars[e["group"]].append((start, end, e))
+            day = datetime(start.year, start.month, start.day)
+            while day < end:
+                nxt = day + timedelta(days=1)
+                day_pieces[day.date()].append((max(start, day), min(end, nxt), e))
+                day = nxt
+
+        self.months = sorted(self.month_counts)
+        self.segments = {d: _pack(pieces) for d, pieces in day_pieces.items()}
+        self.by_group = {g: _pack(bars) for g, bars in group_bars.items()}
+
+    def weeks(self):
+        """Sunday-start weeks of the window that have anything scheduled."""
+        start = window_start - timedelta(days=(window_start.weekday() + 1) % 7)
+        while start <= window_end:
+            days = [start + timedelta(days=i) for i in range(7)]
+            if any(d in self.segments for d in days):
+                yield days
+            start += timedelta(days=7)
+
+
+# ---------------------------------------------------------------------------
+# Views
+# ---------------------------------------------------------------------------
+
+def _day_classes(day, col_idx, freezes):
+    classes = []
+    if freezes:
+        classes.append("blackout")
+    if col_idx in (0, 6):
+        classes.append("weekend")
+    if day == today:
+        classes.append("today")
+    return classes
+
+
+def month_view(index, blackout_index):
+    html_parts = []
+    for month_str in index.months:
+        year, month = int(month_str[:4]), int(month_str[5:7])
+        month_name = calendar.month_name[month]
+
+        html_parts.append(f'<div class="month-block">')
+        html_parts.append(f'<div class="month-title">{month_name} {year} <span class="count">{index.month_counts[month_str]} changes</span></div>')
+        html_parts.append('<table><thead><tr>')
+        for dow in DOW_NAMES:
+            html_parts.append(f'<th>{dow}</th>')
+        html_parts.append('</tr></thead><tbody>')
+
+        cal = calendar.Calendar(firstweekday=6)
+        for week in cal.monthdayscalendar(year, month):
+            html_parts.append('<tr>')
+            for col_idx, day in enumerate(week):
+                if day == 0:
+                    html_parts.append('<td class="empty">&nbsp;</td>')
+                    continue
+
+                this_day = datetime(year, month, day).date()
+                day_changes = index.by_day.get(f"{year:04d}-{month:02d}-{day:02d}", [])
+                freezes = blackout_index.on_day(this_day)
+                classes = _day_classes(this_day, col_idx, freezes)
+                cls = f' class="{" ".join(classes)}"' if classes else ""
+
+                html_parts.append(f'<td{cls}>')
+                badge = f' <span class="badge">({len(day_changes)})</span>' if day_changes else ""
+                if freezes:
+                    badge += f'<span class="freeze-name" title="{escape(", ".join(describe_window(w) for w in freezes))}">{escape(window_names(freezes))}</span>'
+                html_parts.append(f'<div class="day-num">{day}{badge}</div>')
+                html_parts.extend(e["chip"] for e in day_changes[:MAX_SHOW])
+                if len(day_changes) > MAX_SHOW:
+                    # Busy days keep every change, folded away until clicked
+                    html_parts.append(f'<details class="more"><summary class="chg chg-more">'
+                                      f'+{len(day_changes) - MAX_SHOW} more...</summary>')
+                    html_parts.extend(e["chip"] for e in day_changes[MAX_SHOW:])
+                    html_parts.append('</details>')
+                html_parts.append('</td>')
+            html_parts.append('</tr>')
+
+        html_parts.append('</tbody></table></div>')
+    return html_parts
+
+
+def _minutes(when, day):
+    return (when - datetime(day.year, day.month, day.day)).total_seconds() / 60
+
+
+def week_view(index, blackout_index):
+    """Hour lanes per day from the changes' real start/end times, in local time (LOCAL_TZ)."""
+    html_parts = []
+    hours = "".join(f'<div style="height:{HOUR_PX}px">{h:02d}:00</div>' for h in range(24))
+    for days in index.weeks():
+        html_parts.append(f'<div class="month-block"><div class="month-title">Week of {days[0]:%b %d, %Y}'
+                          f' <span class="count">times in {LOCAL_TZ.key}</span></div><div class="wk-grid">')
+        html_parts.append('<div></div>')
+        for col_idx, day in enumerate(days):
+            freezes = blackout_index.on_day(day, LOCAL_TZ)
+            classes = " ".join(["wk-head", *_day_classes(day, col_idx, freezes)])
+            title = f' title="{escape(window_names(freezes))}"' if freezes else ""
+            html_parts.append(f'<div class="{classes}"{title}>{DOW_NAMES[col_idx]} {day.day}</div>')
+        html_parts.append(f'<div class="wk-hours">{hours}</div>')
+        for col_idx, day in enumerate(days):
+            placed, lanes = index.segments.get(day, ([], 1))
+            classes = " ".join(["wk-body", *_day_classes(day, col_idx, blackout_index.on_day(day, LOCAL_TZ))])
+            html_parts.append(f'<div class="{classes}" style="height:{24 * HOUR_PX}px">')
+            width = 100 / max(lanes, 1)
+            for e, start, end, lane in placed:
+                top = _minutes(start, day) * HOUR_PX / 60
+                height = max(_minutes(end, day) * HOUR_PX / 60 - top, 14)
+                tip = f"{e['start']:%Y-%m-%d %H:%M} – {e['end']:%Y-%m-%d %H:%M} {LOCAL_TZ.key}\n{e['tip']}"
+                html_parts.append(
+                    f'<a class="{e["cls"]} wk-item" href="{e["href"]}" target="_blank" title="{escape(tip)}" '
+                    f'style="top:{top:.0f}px;height:{height:.0f}px;left:{lane * width:.2f}%;width:{width:.2f}%">'
+                    f'{escape(e["label"])}</a>')
+            html_parts.append('</div>')
+        html_parts.append('</div></div>')
+    if not html_parts:
+        html_parts.append('<div class="month-block">No timed changes in the window.</div>')
+    return html_parts
+
+
+def timeline_view(index, blackout_index):
+    """Gantt-style bars over the whole window, one block of lanes per assignment group."""
+    first, last = index.axis
+    total = (last - first).total_seconds()
+    pct = lambda when: (when - first).total_seconds() / total * 100
+    days = int(total // 86400)
+
+    ticks = []
+    for i in range(days):
+        day = (first + timedelta(days=i)).date()
+        label = f"{day:%b} {day.day}" if day.day == 1 or i == 0 else str(day.day)
+        cls = "tl-tick today" if day == today else "tl-tick"
+        ticks.append(f'<span class="{cls}" style="left:{i / days * 100:.3f}%;width:{100 / days:.3f}%">{label}</span>')
+    freezes = [(w, from_utc(w["start_at"]), from_utc(w["end_at"])) for w in blackout_index.windows]
+    shade = "".join(
+        f'<div class="tl-freeze" title="{escape(describe_window(w))}" style="left:{pct(max(start, first)):.3f}%;'
+        f'width:{pct(min(end, last)) - pct(max(start, first)):.3f}%"></div>'
+        for w, start, end in freezes if end > first and start < last
+    )
+    now_line = f'<div class="tl-now" style="left:{pct(datetime.combine(today, datetime.min.time())):.3f}%"></div>'
+    grid = f"background-size:{100 / days:.4f}% 100%"
+
+    html_parts = ['<div class="month-block"><div class="month-title">Timeline by Assignment Group'
+                  f' <span class="count">{first:%b %d} – {last - timedelta(days=1):%b %d, %Y}, {LOCAL_TZ.key}</span></div>',
+                  f'<div class="tl-row"><div class="tl-name"></div><div class="tl-axis">{"".join(ticks)}</div></div>']
+    for group in sorted(index.by_group, key=lambda g: (g == NO_GROUP, g.lower())):
+        placed, lanes = index.by_group[group]
+        html_parts.append(f'<div class="tl-row"><div class="tl-name">{escape(group)} <span class="badge">({len(placed)})</span></div>'
+                          f'<div class="tl-track" style="height:{lanes * LANE_PX + 4}px;{grid}">{shade}{now_line}')
+        for e, start, end, lane in placed:
+            tip = f"{e['start']:%Y-%m-%d %H:%M} – {e['end']:%Y-%m-%d %H:%M} {LOCAL_TZ.key}\n{e['tip']}"
+            html_parts.append(
+                f'<a class="{e["cls"]} tl-bar" href="{e["href"]}" target="_blank" title="{escape(tip)}" '
+                f'style="top:{lane * LANE_PX + 2}px;left:{pct(start):.3f}%;width:{max(pct(end) - pct(start), 0.3):.3f}%">'
+                f'{escape(e["label"])}</a>')
+        html_parts.append('</div></div>')
+    html_parts.append('</div>')
+    return html_parts
+
+
+def render(changes, overlaps, frozen, blackout_index, collision_pairs, title=TITLE):
+    """The calendar page for `changes`, flagged with the (precomputed) collisions and blackouts."""
+    numbers = {c.get("number", "") for c in changes}
+    overlaps = {n: v for n, v in overlaps.items() if n in numbers}
+    frozen = {n: v for n, v in frozen.items() if n in numbers}
+    collision_pairs = [p for p in collision_pairs if p[0] in numbers or p[1] in numbers]
+
+    index = CalendarIndex(changes, overlaps, frozen)
+
+    # Count by type
+    type_counts = Counter(c.get("type", "") for c in changes)
+    state_counts = Counter(c.get("state", "") for c in changes)
+
+    # Build HTML
+    html_parts = []
+    html_parts.append(f"""<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Change Management Calendar</title>
+<title>{escape(title)}</title>
 <style>
   * {{ margin: 0; padding: 0; box-sizing: border-box; }}
   body {{ font-family: 'Segoe UI', Calibri, Arial, sans-serif; background: #f9f9f9; color: #333; padding: 20px; }}
@@ -87,6 +367,8 @@ html_parts.append(f"""<!DOCTYPE html>
   td.weekend {{ background: #f5f5f5; }}
   td.today {{ border: 2px solid #FF6600; background: #FFF3E0; }}
   td.empty {{ background: #fafafa; }}
+  td.blackout {{ background: repeating-linear-gradient(135deg, #FDECEA, #FDECEA 6px, #fff 6px, #fff 12px); }}
+  .day-num .freeze-name {{ font-size: 9px; font-weight: 600; color: #C00000; margin-left: 4px; }}
   .day-num {{ font-size: 13px; font-weight: 700; color: #333; padding: 4px 6px; }}
   .day-num .badge {{ font-size: 11px; font-weight: 400; color: #888; margin-left: 4px; }}
   .chg {{ display: block; margin: 1px 2px; padding: 2px 5px; border-radius: 3px; font-size: 10px; text-decoration: none; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
@@ -94,7 +376,38 @@ html_parts.append(f"""<!DOCTYPE html>
   .chg-Normal {{ background: #4472C4; color: #fff; }}
   .chg-Standard {{ background: #70AD47; color: #fff; }}
   .chg-Emergency {{ background: #FF4444; color: #fff; font-weight: 700; }}
+  .chg.freeze {{ box-shadow: inset 4px 0 0 #000; }}
+  .chg.collision {{ outline: 2px dashed #C00000; outline-offset: -2px; }}
   .chg-more {{ background: none; color: #888; font-style: italic; font-size: 10px; padding: 1px 5px; }}
+  details.more summary {{ cursor: pointer; list-style: none; }}
+  details.more summary::-webkit-details-marker {{ display: none; }}
+  details.more[open] summary {{ display: none; }}
+  .view-tab {{ display: none; }}
+  .tabs {{ display: flex; gap: 4px; margin-bottom: 12px; border-bottom: 2px solid #003366; }}
+  .tabs label {{ padding: 6px 18px; font-size: 13px; font-weight: 600; color: #003366; background: #e8eef5; border-radius: 4px 4px 0 0; cursor: pointer; }}
+  #view-month:checked ~ .tabs label[for=view-month], #view-week:checked ~ .tabs label[for=view-week],
+  #view-timeline:checked ~ .tabs label[for=view-timeline] {{ background: #003366; color: #fff; }}
+  .view {{ display: none; }}
+  #view-month:checked ~ #month-view, #view-week:checked ~ #week-view, #view-timeline:checked ~ #timeline-view {{ display: block; }}
+  .wk-grid {{ display: grid; grid-template-columns: 44px repeat(7, 1fr); border: 1px solid #e0e0e0; background: #fff; }}
+  .wk-head {{ background: #003366; color: #fff; padding: 6px 4px; font-size: 12px; font-weight: 600; text-align: center; }}
+  .wk-head.today {{ background: #FF6600; }}
+  .wk-hours div {{ font-size: 9px; color: #999; text-align: right; padding-right: 4px; border-top: 1px solid #eee; }}
+  .wk-body {{ position: relative; border-left: 1px solid #e0e0e0; background-image: linear-gradient(#eee 1px, transparent 1px); background-size: 100% {HOUR_PX}px; }}
+  .wk-body.weekend {{ background-color: #f5f5f5; }}
+  .wk-body.today {{ background-color: #FFF3E0; }}
+  .wk-body.blackout {{ background-color: #FDECEA; }}
+  .chg.wk-item {{ position: absolute; margin: 0; white-space: normal; line-height: 1.2; }}
+  .tl-row {{ display: flex; border-bottom: 1px solid #e0e0e0; }}
+  .tl-name {{ flex: 0 0 200px; font-size: 11px; font-weight: 600; color: #003366; padding: 3px 6px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }}
+  .tl-name .badge {{ font-weight: 400; color: #888; }}
+  .tl-axis {{ position: relative; flex: 1; height: 20px; }}
+  .tl-tick {{ position: absolute; top: 3px; font-size: 9px; color: #888; text-align: center; }}
+  .tl-tick.today {{ color: #FF6600; font-weight: 700; }}
+  .tl-track {{ position: relative; flex: 1; background-color: #fff; background-image: linear-gradient(to right, #f0f0f0 1px, transparent 1px); }}
+  .tl-freeze {{ position: absolute; top: 0; bottom: 0; background: rgba(192, 0, 0, 0.08); }}
+  .tl-now {{ position: absolute; top: 0; bottom: 0; width: 2px; background: #FF6600; }}
+  .chg.tl-bar {{ position: absolute; height: {LANE_PX - 2}px; margin: 0; padding: 1px 3px; font-size: 9px; }}
   .state-badge {{ font-size: 9px; padding: 1px 4px; border-radius: 2px; margin-left: 3px; }}
   .state-Scheduled {{ background: #FFF3CD; color: #856404; }}
   .state-Implement {{ background: #D4EDDA; color: #155724; }}
@@ -107,101 +420,39 @@ html_parts.append(f"""<!DOCTYPE html>
 </head>
 <body>
 <div class="header">
-  <h1>Change Management Calendar</h1>
+  <h1>{escape(title)}</h1>
   <div class="subtitle">Source: ServiceNow &nbsp;|&nbsp; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')} &nbsp;|&nbsp; {len(changes)} changes &nbsp;|&nbsp; {window_start.strftime('%b %d')} – {window_end.strftime('%b %d, %Y')}</div>
 </div>
 <div class="legend">
   <span class="legend-item" style="background:#4472C4">Normal ({type_counts.get('Normal',0)})</span>
   <span class="legend-item" style="background:#70AD47">Standard ({type_counts.get('Standard',0)})</span>
   <span class="legend-item" style="background:#FF4444">Emergency ({type_counts.get('Emergency',0)})</span>
+  {f'<span class="legend-item" style="background:#fff;color:#C00000;outline:2px dashed #C00000;outline-offset:-2px">⚠ Collisions ({len(overlaps)})</span>' if overlaps else ''}
+  {f'<span class="legend-item" style="background:#FDECEA;color:#C00000">⛔ In freeze ({len(frozen)})</span>' if blackout_index.windows else ''}
   <span class="legend-stat">Closed: {state_counts.get('Closed',0)} &nbsp;|&nbsp; Scheduled: {state_counts.get('Scheduled',0)} &nbsp;|&nbsp; In Progress: {state_counts.get('Implement',0) + state_counts.get('Review',0)}</span>
 </div>
 """)
 
-DOW_NAMES = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
-MAX_SHOW = 8
-
-for month_str in months:
-    year, month = int(month_str[:4]), int(month_str[5:7])
-    month_name = calendar.month_name[month]
-    month_count = sum(1 for c in changes if c.get("planned_start", "")[:7] == month_str)
-
-    html_parts.append(f'<div class="month-block">')
-    html_parts.append(f'<div class="month-title">{month_name} {year} <span class="count">{month_count} changes</span></div>')
-    html_parts.append('<table><thead><tr>')
-    for dow in DOW_NAMES:
-        html_parts.append(f'<th>{dow}</th>')
-    html_parts.append('</tr></thead><tbody>')
-
-    cal = calendar.Calendar(firstweekday=6)
-    month_days = cal.monthdayscalendar(year, month)
-
-    for week in month_days:
-        html_parts.append('<tr>')
-        for col_idx, day in enumerate(week):
-            if day == 0:
-                html_parts.append('<td class="empty">&nbsp;</td>')
-                continue
-
-            date_key = f"{year:04d}-{month:02d}-{day:02d}"
-            day_changes = by_date.get(date_key, [])
-            is_weekend = col_idx in (0, 6)
-            is_today = False
-            try:
-                is_today = datetime(year, month, day).date() == today
-            except ValueError:
-                pass
-
-            classes = []
-            if is_weekend:
-                classes.append("weekend")
-            if is_today:
-                classes.append("today")
-            cls = f' class="{" ".join(classes)}"' if classes else ""
-
-            html_parts.append(f'<td{cls}>')
-            badge = f' <span class="badge">({len(day_changes)})</span>' if day_changes else ""
-            html_parts.append(f'<div class="day-num">{day}{badge}</div>')
-
-            for i, chg in enumerate(day_changes[:MAX_SHOW]):
-                num = escape(chg.get("number", ""))
-                desc = escape(chg.get("short_description", ""))
-                typ = chg.get("type", "Normal")
-                state = chg.get("state", "")
-                label = f"{num}: {desc}"
-                if len(label) > 35:
-                    label = escape(label[:33] + "..")
-                else:
-                    label = escape(label)
-
-                href = f"{SNOW_URL}{chg.get('number', '')}"
-                state_badge = ""
-                if state and state != "Closed":
-                    state_badge = f' <span class="state-badge state-{escape(state)}">{escape(state)}</span>'
-
-                html_parts.append(
-                    f'<a class="chg chg-{escape(typ)}" href="{href}" target="_blank" title="{escape(chg.get("short_description",""))}">'
-                    f'{label}{state_badge}</a>'
-                )
-
-            if len(day_changes) > MAX_SHOW:
-                remaining = len(day_changes) - MAX_SHOW
-                html_parts.append(f'<span class="chg chg-more">+{remaining} more...</span>')
-
-            html_parts.append('</td>')
-        html_parts.append('</tr>')
+    # Views switch with radio buttons, so the page still works without scripts (SharePoint/Teams embeds)
+    html_parts.append('<input type="radio" name="view" id="view-month" class="view-tab" checked>'
+                      '<input type="radio" name="view" id="view-week" class="view-tab">'
+                      '<input type="radio" name="view" id="view-timeline" class="view-tab">'
+                      '<div class="tabs"><label for="view-month">Month</label><label for="view-week">Week</label>'
+                      '<label for="view-timeline">Timeline</label></div>')
+    for view_id, view in (("month", month_view), ("week", week_view), ("timeline", timeline_view)):
+        html_parts.append(f'<div class="view" id="{view_id}-view">')
+        html_parts.extend(view(index, blackout_index))
+        html_parts.append('</div>')
 
-    html_parts.append('</tbody></table></div>')
+    # Summary section
+    closed = state_counts.get("Closed", 0)
+    successful = sum(1 for c in changes if c.get("close_code") == "Successful")
+    rate = round(successful / closed * 100, 1) if closed > 0 else 0
 
-# Summary section
-closed = state_counts.get("Closed", 0)
-successful = sum(1 for c in changes if c.get("close_code") == "Successful")
-rate = round(successful / closed * 100, 1) if closed > 0 else 0
+    ag_counts = Counter(c.get("assignment_group", "") or NO_GROUP for c in changes)
+    top_groups = ag_counts.most_common(5)
 
-ag_counts = Counter(c.get("assignment_group", "") or "(not set)" for c in changes)
-top_groups = ag_counts.most_common(5)
-
-html_parts.append(f"""
+    html_parts.append(f"""
 <div class="summary">
   <div class="summary-group">
     <h3>Key Metrics</h3>
@@ -218,18 +469,94 @@ html_parts.append(f"""
   <div class="summary-group">
     <h3>Top Assignment Groups</h3>
 """)
-for ag, cnt in top_groups:
-    html_parts.append(f'    <div>{escape(ag)}: <b>{cnt}</b></div>')
-html_parts.append("""
-  </div>
-</div>
-""")
+    for ag, cnt in top_groups:
+        html_parts.append(f'    <div>{escape(ag)}: <b>{cnt}</b></div>')
+    html_parts.append("  </div>")
+    if frozen:
+        html_parts.append('  <div class="summary-group">\n    <h3>Scheduled During a Freeze</h3>')
+        for number, hits in sorted(frozen.items()):
+            html_parts.append(f'    <div>{escape(number)} &nbsp;<span style="color:#C00000">{escape(window_names(hits))}</span></div>')
+        html_parts.append("  </div>")
+    if collision_pairs:
+        html_parts.append('  <div class="summary-group">\n    <h3>Schedule Collisions</h3>')
+        for a, b, label, value in collision_pairs:
+            html_parts.append(f'    <div>{escape(a)} &harr; {escape(b)} &nbsp;<span style="color:#888">same {label}: {escape(value)}</span></div>')
+        html_parts.append("  </div>")
+    html_parts.append("</div>")
+
+    html_parts.append(f'<div class="footer">Auto-refreshed daily at 6:30 AM PST from ServiceNow &nbsp;|&nbsp; Last update: {datetime.now().strftime("%Y-%m-%d %H:%M")}</div>')
+    html_parts.append('</body></html>')
+    return "\n".join(html_parts)
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "group"
+
+
+def write_group_pages(changes, overlaps, frozen, blackout_index, collision_pairs, out_dir):
+    """One page per assignment group plus an index, rendered concurrently. Returns the group count."""
+    groups = defaultdict(list)
+    for c in changes:
+        groups[c.get("assignment_group", "") or NO_GROUP].append(c)
+
+    def write(item):
+        group, mine = item
+        html = render(mine, overlaps, frozen, blackout_index, collision_pairs, f"{TITLE} — {group}")
+        with open(os.path.join(out_dir, f"{_slug(group)}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=RENDER_WORKERS) as pool:
+        list(pool.map(write, groups.items()))
+
+    rows = "\n".join(f'  <li><a href="{_slug(g)}.html">{escape(g)}</a> ({len(groups[g])})</li>'
+                     for g in sorted(groups, key=str.lower))
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="UTF-8"><title>{TITLE} by Assignment Group</title>
+<style>body {{ font-family: 'Segoe UI', Calibri, Arial, sans-serif; padding: 20px; color: #333; }}
+h1 {{ color: #003366; font-size: 22px; }} li {{ line-height: 1.8; font-size: 14px; }}</style></head>
+<body><h1>{TITLE} by Assignment Group</h1>
+<div style="color:#666;font-size:13px">Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')} &nbsp;|&nbsp; {len(changes)} changes</div>
+<ul>
+{rows}
+</ul></body></html>""")
+    return len(groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the HTML change calendar")
+    parser.add_argument("output", nargs="?", default=OUTPUT, help="HTML file to write")
+    parser.add_argument("data", nargs="?", default=DATA_FILE, help="Calendar cache JSON")
+    parser.add_argument("--by-group", metavar="DIR", help="Also write one page per assignment group into DIR")
+    args = parser.parse_args()
+
+    changes = load_changes(args.data)
+    print(f"Filtered to {len(changes)} changes ({window_start} to {window_end})")
+
+    # Overlapping windows on the same CI or assignment group
+    overlaps = collisions(changes)
+    collision_pairs = pair_list(overlaps)
+    print(f"Collisions: {len(collision_pairs)} pair(s) across {len(overlaps)} change(s)")
+
+    # Changes scheduled inside a freeze/blackout window
+    blackout_index = BlackoutIndex(load_windows())
+    frozen = violations(changes, blackout_index)
+    print(f"Blackouts: {len(blackout_index)} window(s), {len(frozen)} change(s) inside one")
+
+    months = sorted(set(c.get("planned_start", "")[:7] for c in changes))
+    print(f"Months: {', '.join(months)}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(render(changes, overlaps, frozen, blackout_index, collision_pairs))
+
+    print(f"\nHTML calendar saved to: {args.output}")
+    print(f"  {len(changes)} changes across {len(months)} months")
 
-html_parts.append(f'<div class="footer">Auto-refreshed daily at 6:30 AM PST from ServiceNow &nbsp;|&nbsp; Last update: {datetime.now().strftime("%Y-%m-%d %H:%M")}</div>')
-html_parts.append('</body></html>')
+    if args.by_group:
+        n = write_group_pages(changes, overlaps, frozen, blackout_index, collision_pairs, args.by_group)
+        print(f"  {n} assignment group page(s) saved to: {args.by_group}")
 
-with open(OUTPUT, "w", encoding="utf-8") as f:
-    f.write("\n".join(html_parts))
 
-print(f"\nHTML calendar saved to: {OUTPUT}")
-print(f"  {len(changes)} changes across {len(months)} months")
+if __name__ == "__main__":
+    main()
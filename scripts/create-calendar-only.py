@@ -1,16 +1,24 @@
 """
 Create a standalone Full Calendar Excel from ServiceNow change data.
 Only includes the last 3 months based on Planned Start date.
+Days with more changes than fit show "+N more", linked to their full list on
+the Busy Days sheet.
 """
 import json
 import os
+import sys
 import calendar
 from datetime import datetime, timedelta
 from collections import defaultdict
 from openpyxl import Workbook
+from openpyxl.comments import Comment
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "snow-pir"))
+from schedule_conflicts import collisions, describe, pair_list
+from blackout import BlackoutIndex, load_windows, violations, window_names
+
 # ── CONFIG ──
 OUTPUT = os.path.expanduser(
     r"~\OneDrive - Vituity\Documents\Change Management\Change_Management_Calendar.xlsx"
@@ -43,6 +51,15 @@ for c in all_changes:
 
 print(f"Filtered to {len(changes)} changes (last 3 months, excl Canceled/New)")
 
+# Overlapping windows on the same CI or assignment group
+overlaps = collisions(changes)
+print(f"Collisions: {len(pair_list(overlaps))} pair(s) across {len(overlaps)} change(s)")
+
+# Changes scheduled inside a freeze/blackout window
+blackout_index = BlackoutIndex(load_windows())
+frozen = violations(changes, blackout_index)
+print(f"Blackouts: {len(blackout_index)} window(s), {len(frozen)} change(s) inside one")
+
 # ── STYLES ──
 TYPE_FILLS = {
     "Normal": PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
@@ -60,12 +77,20 @@ MONTH_TITLE_FONT = Font(name="Calibri", size=16, bold=True, color="003366")
 DOW_FONT = Font(name="Calibri", size=10, bold=True, color="FFFFFF")
 DOW_FILL = PatternFill(start_color="003366", end_color="003366", fill_type="solid")
 WEEKEND_FILL = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
+BLACKOUT_FILL = PatternFill(fill_type="lightUp", fgColor="F4B6B0", bgColor="FDECEA")
+FREEZE_FONT = Font(name="Calibri", size=9, color="FFFFFF", bold=True, underline="single")
 TODAY_BORDER = Border(
     left=Side(style="medium", color="FF6600"),
     right=Side(style="medium", color="FF6600"),
     top=Side(style="medium", color="FF6600"),
     bottom=Side(style="medium", color="FF6600"),
 )
+COLLISION_BORDER = Border(
+    left=Side(style="thick", color="C00000"),
+    right=Side(style="thick", color="C00000"),
+    top=Side(style="thin", color="C00000"),
+    bottom=Side(style="thin", color="C00000"),
+)
 CELL_BORDER = Border(
     left=Side(style="thin", color="D9D9D9"),
     right=Side(style="thin", color="D9D9D9"),
@@ -102,6 +127,32 @@ for col_idx in range(1, 8):
 MAX_CHANGES_PER_DAY = 8
 DOW_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
 
+# Days with more changes than fit get a "+N more" cell linking to their full list here
+BUSY_SHEET = "Busy Days"
+busy_ws = wb.create_sheet(BUSY_SHEET)
+for col_idx, width in enumerate([16, 60, 12, 12, 30, 18], 1):
+    busy_ws.column_dimensions[get_column_letter(col_idx)].width = width
+busy_rows = {}
+
+
+def busy_day_row(date_key, day_changes):
+    """Row of `date_key`'s full list on the Busy Days sheet, writing it the first time."""
+    if date_key in busy_rows:
+        return busy_rows[date_key]
+    row = busy_ws.max_row + 2 if busy_rows else 1
+    busy_rows[date_key] = row
+    busy_ws.cell(row=row, column=1, value=f"{date_key}  ({len(day_changes)} changes)").font = MONTH_TITLE_FONT
+    for offset, chg in enumerate(day_changes, 1):
+        chg_num = chg.get("number", "")
+        values = [chg_num, chg.get("short_description", ""), chg.get("type", ""), chg.get("state", ""),
+                  chg.get("assignment_group", ""), chg.get("start_at", "")]
+        for col_idx, value in enumerate(values, 1):
+            busy_ws.cell(row=row + offset, column=col_idx, value=value)
+        if chg_num.startswith("CHG"):
+            busy_ws.cell(row=row + offset, column=1).hyperlink = SNOW_URL + chg_num
+    return row
+
+
 current_row = 1
 
 # Title
@@ -128,6 +179,16 @@ col = 7
 cell = ws.cell(row=current_row, column=col, value=f"N:{type_counts.get('Normal',0)}  S:{type_counts.get('Standard',0)}  E:{type_counts.get('Emergency',0)}")
 cell.font = Font(name="Calibri", size=9, color="333333", bold=True)
 cell.alignment = Alignment(horizontal="right")
+if blackout_index.windows:
+    cell = ws.cell(row=current_row, column=col - 3, value=f"⛔ {len(frozen)} in freeze")
+    cell.fill = BLACKOUT_FILL
+    cell.font = Font(name="Calibri", size=9, color="C00000", bold=True)
+    cell.alignment = Alignment(horizontal="center")
+if overlaps:
+    cell = ws.cell(row=current_row, column=col - 1, value=f"⚠ {len(overlaps)} colliding")
+    cell.font = Font(name="Calibri", size=9, color="C00000", bold=True)
+    cell.border = COLLISION_BORDER
+    cell.alignment = Alignment(horizontal="center")
 
 current_row += 2
 
@@ -193,6 +254,13 @@ for month_str in months_to_render:
                 # Weekend shading
                 if col_idx in (1, 7) and not (day != 0 and datetime(year, month, day).date() == today):
                     cell.fill = WEEKEND_FILL
+
+                # Freeze shading, with the window names on hover
+                freezes = blackout_index.on_day(datetime(year, month, day).date())
+                if freezes and datetime(year, month, day).date() != today:
+                    cell.fill = BLACKOUT_FILL
+                if freezes:
+                    cell.comment = Comment(f"Change freeze: {window_names(freezes)}", "Change Calendar")
             else:
                 cell.fill = WEEKEND_FILL
 
@@ -212,9 +280,13 @@ for month_str in months_to_render:
 
                 date_key = f"{year:04d}-{month:02d}-{day:02d}"
                 day_changes = changes_by_date.get(date_key, [])
+                # On a day that overflows, the last slot becomes the "+N more" link
+                shown = day_changes if len(day_changes) <= MAX_CHANGES_PER_DAY else day_changes[:MAX_CHANGES_PER_DAY - 1]
 
                 if col_idx in (1, 7):
                     cell.fill = WEEKEND_FILL
+                if blackout_index.on_day(datetime(year, month, day).date()):
+                    cell.fill = BLACKOUT_FILL
 
                 # Carry today highlight
                 try:
@@ -223,16 +295,20 @@ for month_str in months_to_render:
                 except ValueError:
                     pass
 
-                if entry_idx < len(day_changes):
+                if entry_idx < len(shown):
                     has_content = True
-                    chg = day_changes[entry_idx]
+                    chg = shown[entry_idx]
                     chg_num = chg.get("number", "")
                     short_desc = chg.get("short_description", "")
                     chg_type = chg.get("type", "Normal")
                     state = chg.get("state", "")
 
-                    # Format: CHG#: Description
+                    # Format: CHG#: Description (⛔ inside a freeze, ⚠ when it overlaps another change)
                     label = f"{chg_num}: {short_desc}"
+                    if chg_num in overlaps:
+                        label = "⚠ " + label
+                    if chg_num in frozen:
+                        label = "⛔ " + label
                     if len(label) > 32:
                         label = label[:30] + ".."
 
@@ -240,15 +316,27 @@ for month_str in months_to_render:
                     cell.fill = TYPE_FILLS.get(chg_type, TYPE_FILLS["Normal"])
                     cell.font = TYPE_FONTS.get(chg_type, TYPE_FONTS["Normal"])
                     cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=False)
+                    notes = []
+                    if chg_num in frozen:
+                        cell.font = FREEZE_FONT
+                        notes.append(f"Scheduled during {window_names(frozen[chg_num])}")
+                    if chg_num in overlaps:
+                        cell.border = COLLISION_BORDER
+                        notes.append(f"Overlaps {describe(overlaps[chg_num])}")
+                    if notes:
+                        cell.comment = Comment("\n".join(notes), "Change Calendar")
 
                     if chg_num.startswith("CHG"):
                         cell.hyperlink = SNOW_URL + chg_num
 
                 elif entry_idx == MAX_CHANGES_PER_DAY - 1 and len(day_changes) > MAX_CHANGES_PER_DAY:
                     has_content = True
-                    remaining = len(day_changes) - MAX_CHANGES_PER_DAY + 1
-                    cell.value = f"  +{remaining} more..."
-                    cell.font = Font(name="Calibri", size=8, italic=True, color="666666")
+                    hidden = day_changes[len(shown):]
+                    cell.value = f"  +{len(hidden)} more..."
+                    cell.font = Font(name="Calibri", size=8, italic=True, color="0563C1", underline="single")
+                    cell.hyperlink = f"#'{BUSY_SHEET}'!A{busy_day_row(date_key, day_changes)}"
+                    cell.comment = Comment("\n".join(f"{c.get('number', '')}: {c.get('short_description', '')}"
+                                                     for c in hidden), "Change Calendar")
 
             ws.row_dimensions[current_row].height = 14
             current_row += 1
@@ -262,6 +350,8 @@ for month_str in months_to_render:
 # Print area
 ws.sheet_properties.pageSetUpPr = None
 ws.print_area = f"A1:G{current_row}"
+if not busy_rows:
+    wb.remove(busy_ws)
 
 # ── SAVE ──
 wb.save(OUTPUT)
@@ -6,10 +6,37 @@ but posts through the webhook URL so it needs no MSAL/Graph token.
 
 Reads SN OAuth accessToken from ~/.servicenow-mcp/tokens.json and the webhook URL
 from .webhook-url next to this script.
+
+Only what moved since the last post is sent: each run snapshots the scheduled
+changes (.webhook-snapshot.json) and posts a compact delta card of added,
+rescheduled, updated, cancelled and state-changed items, or nothing at all.
+The first run, --full and (with --daily-digest) the first run of each day post
+the full card instead.
+
+Cards go through the durable outbox in tools/snow-pir/teams_outbox.py: they're
+queued before posting and retried with backoff if Teams is down or throttling,
+so a failed post is delivered by a later run instead of being lost. With
+--graph they go through Microsoft Graph instead (tools/snow-pir/teams_graph.py,
+MSAL cache from reauth-msal.py): the Change Control channel gets the full
+card or delta, and each assignment-group channel in teams_channels.json gets
+its own slice of the delta, all in one $batch request. --by-group instead
+builds a full digest per assignment group from the same single fetch.
+
+Usage:
+    python post-calendar-webhook.py                   # Delta card (nothing if nothing changed)
+    python post-calendar-webhook.py --daily-digest    # Full card once a day, deltas otherwise
+    python post-calendar-webhook.py --full --dry-run  # Build the full card without posting
+    python post-calendar-webhook.py --graph           # Post via Graph to the configured channels
+    python post-calendar-webhook.py --by-group --graph  # Each group's own digest to its channel
 """
+import argparse
+import hashlib
 import json
+import re
 import sys
-from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from pathlib import Path
 
 import requests
@@ -17,9 +44,36 @@ import requests
 SN_INSTANCE = "vituity.service-now.com"
 SN_TOKEN_CACHE = Path.home() / ".servicenow-mcp" / "tokens.json"
 WEBHOOK_FILE = Path(__file__).resolve().parent / ".webhook-url"
+SNOW_PIR_DIR = Path(__file__).resolve().parent.parent / "tools" / "snow-pir"
 CARD_OUT = Path(__file__).resolve().parent / "live-adaptive-card.json"
+SNAPSHOT_FILE = Path(__file__).resolve().parent / ".webhook-snapshot.json"
+# Teams rejects webhook payloads over ~28 KB; keep some headroom
+CARD_BUDGET = 27 * 1024
+SUMMARY_DESC = 60
+MAX_OVERLAPS = 3
+# Predicted failure probability at or above which a change always keeps its detailed block
+PREDICTED_FAILURE_FLAG = 0.3
+MAX_CHANGES = 500
+GROUP_CARD_DIR = Path(__file__).resolve().parent / "group-cards"
+DIGEST_WORKERS = 8
+NO_GROUP = "(no assignment group)"
 DASHBOARD_URL = "https://vituity.service-now.com/now/platform-analytics-workspace/dashboards/params/edit/false/sys-id/27df42dbe6770153e1186e1215e19ffb"
 
+SCHEDULED_QUERY = "state=-2^on_hold=false^start_dateRELATIVELE@hour@ahead@168^ORDERBYstart_date"
+CARD_FIELDS = "number,short_description,type,state,risk,start_date,end_date,assigned_to,assignment_group,cmdb_ci"
+# Fields compared between runs; a difference in any of them is worth a notification
+SNAPSHOT_FIELDS = ["number", "short_description", "state", "start_date", "end_date", "risk",
+                   "assigned_to", "assignment_group"]
+# States a change moves into in the normal course of running; leaving the list this way isn't news
+PROGRESSED_STATES = {"Implement", "Review", "Closed"}
+DELTA_SECTIONS = [
+    ("added", "New", "good"),
+    ("rescheduled", "Rescheduled", "warning"),
+    ("state", "State changed", "warning"),
+    ("cancelled", "Cancelled", "attention"),
+    ("updated", "Updated", "default"),
+]
+
 
 def get_sn_token():
     with open(SN_TOKEN_CACHE) as f:
@@ -62,40 +116,61 @@ def fetch(query, fields, limit=50):
     return r.json().get("result", [])
 
 
-def build_card(changes, on_hold_count):
-    date_str = datetime.now().strftime("%b %d, %Y")
-    body = [
-        {"type": "TextBlock", "text": "Change Calendar — Scheduled Changes",
-         "weight": "bolder", "size": "large", "color": "accent"},
-        {"type": "TextBlock",
-         "text": f"{len(changes)} scheduled change(s)  |  {on_hold_count} on-hold excluded  |  Updated {date_str}",
-         "size": "small", "isSubtle": True, "spacing": "none"},
-    ]
-    for c in changes:
-        num = get_field(c.get("number"))
-        desc = get_field(c.get("short_description")) or "(no description)"
-        risk = get_field(c.get("risk")) or "Low"
-        assigned = get_field(c.get("assigned_to")) or "Unassigned"
-        group = get_field(c.get("assignment_group")) or ""
-        tag = f"{assigned} ({group})" if group else assigned
-        risk_color = "attention" if "high" in risk.lower() else "warning" if "moderate" in risk.lower() else "good"
-        body.append({
-            "type": "Container", "separator": True, "items": [
-                {"type": "ColumnSet", "columns": [
-                    {"type": "Column", "width": "auto", "items": [
-                        {"type": "TextBlock",
-                         "text": f"[{num}](https://{SN_INSTANCE}/nav_to.do?uri=change_request.do?sysparm_query=number={num})",
-                         "color": "accent", "size": "small", "weight": "bolder"}]},
-                    {"type": "Column", "width": "stretch", "items": [
-                        {"type": "TextBlock", "text": desc, "size": "small", "wrap": True}]},
-                    {"type": "Column", "width": "auto", "items": [
-                        {"type": "TextBlock", "text": risk, "size": "small", "weight": "bolder", "color": risk_color}]},
-                ]},
-                {"type": "TextBlock",
-                 "text": f"{format_date(c.get('start_date'))} → {format_date(c.get('end_date'))}  |  {tag}",
-                 "size": "small", "isSubtle": True, "spacing": "none"},
-            ],
-        })
+def load_risk_scores(numbers):
+    """Predicted failure probabilities from tools/snow-pir/risk_model.py, if it has been run."""
+    sys.path.insert(0, str(SNOW_PIR_DIR))
+    try:
+        from change_store import load_risk_scores as _load
+    except ImportError:
+        return {}
+    return _load(numbers)
+
+
+def change_window(c):
+    """Planned (start, end) of a fetched change in UTC, like the calendar cache; None without a start date.
+
+    The fetch asks for display values, which are in the instance's local time (CHANGE_TZ).
+    A missing end, or one not after the start, gets DEFAULT_DURATION as calendar_window does.
+    """
+    sys.path.insert(0, str(SNOW_PIR_DIR))
+    from schedule_conflicts import DEFAULT_DURATION, parse_time, to_utc
+
+    start = to_utc(parse_time(get_field(c.get("start_date"))))
+    if start is None:
+        return None
+    end = to_utc(parse_time(get_field(c.get("end_date"))))
+    if end is None or end <= start:
+        end = start + DEFAULT_DURATION
+    return start, end
+
+
+def find_collisions(changes):
+    """Changes overlapping another on the same CI or assignment group (tools/snow-pir/schedule_conflicts.py)."""
+    sys.path.insert(0, str(SNOW_PIR_DIR))
+    from schedule_conflicts import collisions
+
+    return collisions(changes, window=change_window)
+
+
+def find_blackouts(changes):
+    """Changes scheduled inside a freeze window (tools/snow-pir/blackout.py)."""
+    sys.path.insert(0, str(SNOW_PIR_DIR))
+    from blackout import BlackoutIndex, load_windows, violations
+
+    return violations(changes, BlackoutIndex(load_windows()), window=change_window)
+
+
+def change_url(num):
+    # The direct form record URL; ~20 bytes shorter per change than nav_to.do
+    return f"https://{SN_INSTANCE}/change_request.do?sysparm_query=number={num}"
+
+
+def _size(obj):
+    """Bytes on the wire, as post_cards() serialises it."""
+    return len(json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def _message(body):
     adaptive_card = {
         "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
         "type": "AdaptiveCard", "version": "1.2", "body": body,
@@ -105,25 +180,434 @@ def build_card(changes, on_hold_count):
         {"contentType": "application/vnd.microsoft.card.adaptive", "content": adaptive_card}]}
 
 
+def pack_cards(header, items, budget=CARD_BUDGET):
+    """Split body items over as few messages as fit `budget` bytes each, keeping their order.
+
+    Every message repeats `header`; when there is more than one, the first
+    header block's text gets a "(1/3)" part suffix (room for it is reserved).
+    Filling each card greedily in order is optimal for ordered items.
+    """
+    base = _size(_message([{**header[0], "text": header[0]["text"] + " (99/99)"}, *header[1:]]))
+    parts, current, size = [], [], base
+    for item in items:
+        cost = _size(item) + 1      # Plus the separating comma
+        if current and size + cost > budget:
+            parts.append(current)
+            current, size = [], base
+        current.append(item)
+        size += cost
+    parts.append(current)
+    if len(parts) == 1:
+        return [_message([*header, *parts[0]])]
+    return [_message([{**header[0], "text": f"{header[0]['text']} ({i}/{len(parts)})"}, *header[1:], *part])
+            for i, part in enumerate(parts, 1)]
+
+
+def _change_block(c, risk_scores, overlaps, blackouts):
+    num = get_field(c.get("number"))
+    desc = get_field(c.get("short_description")) or "(no description)"
+    risk = get_field(c.get("risk")) or "Low"
+    assigned = get_field(c.get("assigned_to")) or "Unassigned"
+    group = get_field(c.get("assignment_group")) or ""
+    tag = f"{assigned} ({group})" if group else assigned
+    risk_color = "attention" if "high" in risk.lower() else "warning" if "moderate" in risk.lower() else "good"
+    detail = f"{format_date(c.get('start_date'))} → {format_date(c.get('end_date'))}  |  {tag}"
+    if num in risk_scores:
+        detail += f"  |  Predicted failure {risk_scores[num]:.0%}"
+    block = {
+        "type": "Container", "separator": True, "items": [
+            {"type": "ColumnSet", "columns": [
+                {"type": "Column", "width": "auto", "items": [
+                    {"type": "TextBlock", "text": f"[{num}]({change_url(num)})",
+                     "color": "accent", "size": "small", "weight": "bolder"}]},
+                {"type": "Column", "width": "stretch", "items": [
+                    {"type": "TextBlock", "text": desc, "size": "small", "wrap": True}]},
+                {"type": "Column", "width": "auto", "items": [
+                    {"type": "TextBlock", "text": risk, "size": "small", "weight": "bolder", "color": risk_color}]},
+            ]},
+            {"type": "TextBlock",
+             "text": detail,
+             "size": "small", "isSubtle": True, "spacing": "none"},
+        ],
+    }
+    if num in blackouts:
+        block["items"].append({
+            "type": "TextBlock", "text": "⛔ During freeze: " + ", ".join(w["name"] for w in blackouts[num]),
+            "size": "small", "color": "attention", "weight": "bolder", "wrap": True, "spacing": "none"})
+    if num in overlaps:
+        shown = overlaps[num][:MAX_OVERLAPS]
+        more = len(overlaps[num]) - len(shown)
+        block["items"].append({
+            "type": "TextBlock", "text": "⚠ Overlaps " + ", ".join(
+                f"{other} ({label}: {value})" for other, label, value in shown) + (f" +{more} more" if more else ""),
+            "size": "small", "color": "attention", "wrap": True, "spacing": "none"})
+    return block
+
+
+def _summary_row(c, overlaps):
+    """One-line form of a change for collapsed lower-risk items."""
+    num = get_field(c.get("number"))
+    desc = get_field(c.get("short_description")) or "(no description)"
+    if len(desc) > SUMMARY_DESC:
+        desc = desc[:SUMMARY_DESC - 1] + "…"
+    group = get_field(c.get("assignment_group"))
+    text = (("⚠ " if num in overlaps else "") + f"[{num}]({change_url(num)}) {format_date(c.get('start_date'))}  {desc}"
+            + (f"  |  {group}" if group else ""))
+    return {"type": "TextBlock", "text": text, "size": "small", "wrap": True, "spacing": "none"}
+
+
+def build_cards(changes, on_hold_count, risk_scores=None, overlaps=None, blackouts=None, budget=CARD_BUDGET,
+                title="Change Calendar — Scheduled Changes"):
+    """The full calendar as the fewest webhook messages that each fit `budget`.
+
+    Changes get a detailed block each. If that needs more than one post,
+    Low (then Moderate) risk changes with nothing flagged collapse to one-line
+    rows, then overlap-flagged ones too (freeze violations and predicted
+    failures of PREDICTED_FAILURE_FLAG or more always stay detailed) -- the
+    most detailed level that reaches the fewest posts wins.
+    """
+    risk_scores = risk_scores or {}
+    overlaps = overlaps or {}
+    blackouts = blackouts or {}
+    date_str = datetime.now().strftime("%b %d, %Y")
+    header = [
+        {"type": "TextBlock", "text": title,
+         "weight": "bolder", "size": "large", "color": "accent"},
+        {"type": "TextBlock",
+         "text": f"{len(changes)} scheduled change(s)  |  "
+                 + (f"{on_hold_count} on-hold excluded  |  " if on_hold_count is not None else "")
+                 + f"Updated {date_str}",
+         "size": "small", "isSubtle": True, "spacing": "none"},
+    ]
+    if blackouts:
+        header.append({"type": "TextBlock",
+                       "text": f"⛔ {len(blackouts)} change(s) scheduled inside a change freeze",
+                       "size": "small", "color": "attention", "weight": "bolder", "wrap": True, "spacing": "small"})
+    if overlaps:
+        header.append({"type": "TextBlock",
+                       "text": f"⚠ {len(overlaps)} change(s) overlap another on the same CI or assignment group",
+                       "size": "small", "color": "attention", "wrap": True, "spacing": "small"})
+
+    def flagged(c, strict):
+        num = get_field(c.get("number"))
+        return (num in blackouts or risk_scores.get(num, 0) >= PREDICTED_FAILURE_FLAG
+                or (strict and num in overlaps))
+
+    best = None
+    for collapse, strict in (([], True), (["low"], True), (["low", "moderate"], True), (["low", "moderate"], False)):
+        items = []
+        for c in changes:
+            risk = (get_field(c.get("risk")) or "Low").lower()
+            if any(level in risk for level in collapse) and not flagged(c, strict):
+                items.append(_summary_row(c, overlaps))
+            else:
+                items.append(_change_block(c, risk_scores, overlaps, blackouts))
+        cards = pack_cards(header, items, budget)
+        if best is None or len(cards) < len(best):
+            best = cards
+        if len(best) == 1:
+            break
+    return best
+
+
+def group_digests(changes, risk_scores, overlaps, blackouts):
+    """Full cards per assignment group: {group: cards}.
+
+    The records are partitioned in one pass; risk scores, collisions and
+    blackouts come from the single calculation over all of them (so an
+    overlap with another group's change still shows), and the groups' cards
+    are built concurrently.
+    """
+    groups = defaultdict(list)
+    for c in changes:
+        groups[get_field(c.get("assignment_group")) or NO_GROUP].append(c)
+
+    def build(item):
+        group, mine = item
+        nums = {get_field(c.get("number")) for c in mine}
+        pick = lambda flags: {n: v for n, v in flags.items() if n in nums}
+        return group, build_cards(mine, None, pick(risk_scores), pick(overlaps), pick(blackouts),
+                                  title=f"Change Calendar — {group}")
+
+    with ThreadPoolExecutor(max_workers=DIGEST_WORKERS) as pool:
+        return dict(pool.map(build, sorted(groups.items())))
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "group"
+
+
+def snapshot_entry(c):
+    entry = {f: get_field(c.get(f)) for f in SNAPSHOT_FIELDS}
+    entry["hash"] = hashlib.sha1("\x1f".join(entry[f] for f in SNAPSHOT_FIELDS).encode("utf-8")).hexdigest()
+    return entry
+
+
+def load_snapshot():
+    try:
+        return json.loads(SNAPSHOT_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_snapshot(current, last_digest):
+    SNAPSHOT_FILE.write_text(json.dumps({
+        "taken": datetime.now().isoformat(timespec="seconds"),
+        "last_digest": last_digest,
+        "changes": current,
+    }, indent=1), encoding="utf-8")
+
+
+def _started(entry):
+    try:
+        return datetime.fromisoformat(entry["start_date"]) <= datetime.now()
+    except (KeyError, ValueError):
+        return False
+
+
+def diff_snapshot(previous, current, departed):
+    """Delta between two snapshots ({number: entry}) as {kind: [(entry, was)]}.
+
+    `departed` holds the current record of every change that left the scheduled
+    list (None if it no longer exists), to tell cancellations and state changes
+    from changes that were just rescheduled out of the window or have started.
+    """
+    delta = {kind: [] for kind, _, _ in DELTA_SECTIONS}
+    for number, entry in current.items():
+        was = previous.get(number)
+        if was is None:
+            delta["added"].append((entry, None))
+        elif was["hash"] != entry["hash"]:
+            moved = (was["start_date"], was["end_date"]) != (entry["start_date"], entry["end_date"])
+            delta["rescheduled" if moved else "updated"].append((entry, was))
+    for number, was in previous.items():
+        if number in current:
+            continue
+        now = departed.get(number)
+        if now is None or now["state"] == "Canceled":
+            delta["cancelled"].append((now or was, was))
+        elif now["state"] in PROGRESSED_STATES or _started(now):
+            continue
+        elif now["state"] == was["state"] and now["start_date"] != was["start_date"] and not now.get("on_hold"):
+            delta["rescheduled"].append((now, was))
+        else:
+            delta["state"].append((now, was))
+    return {kind: items for kind, items in delta.items() if items}
+
+
+def fetch_departed(numbers):
+    """Current state of changes that dropped off the scheduled list, by number."""
+    if not numbers:
+        return {}
+    rows = fetch(f"numberIN{','.join(sorted(numbers))}", CARD_FIELDS + ",on_hold", limit=len(numbers))
+    departed = {}
+    for r in rows:
+        entry = snapshot_entry(r)
+        entry["on_hold"] = get_field(r.get("on_hold")).lower() == "true"
+        departed[entry["number"]] = entry
+    return departed
+
+
+def _delta_line(kind, entry, was):
+    num = entry["number"]
+    link = f"[{num}]({change_url(num)})"
+    when = f"{format_date(entry['start_date'])} → {format_date(entry['end_date'])}"
+    text = f"{link} {entry['short_description'] or '(no description)'}  |  {when}"
+    if kind == "rescheduled":
+        text += f"  (was {format_date(was['start_date'])} → {format_date(was['end_date'])})"
+    elif kind == "state":
+        now = "On hold" if entry.get("on_hold") else entry["state"]
+        text += f"  ({was['state']} → {now})"
+    elif kind == "updated":
+        moved = [f"{f.replace('_', ' ')}: {was[f] or '—'} → {entry[f] or '—'}"
+                 for f in ("risk", "assigned_to", "assignment_group", "short_description") if was[f] != entry[f]]
+        text += f"  ({'; '.join(moved)})"
+    return text
+
+
+def build_delta_cards(delta, scheduled_count, budget=CARD_BUDGET):
+    date_str = datetime.now().strftime("%b %d, %Y %H:%M")
+    total = sum(len(items) for items in delta.values())
+    header = [
+        {"type": "TextBlock", "text": f"Change Calendar — {total} update(s)",
+         "weight": "bolder", "size": "medium", "color": "accent"},
+        {"type": "TextBlock", "text": f"{scheduled_count} scheduled in the next 7 days  |  {date_str}",
+         "size": "small", "isSubtle": True, "spacing": "none"},
+    ]
+    items = []
+    for kind, title, color in DELTA_SECTIONS:
+        if kind not in delta:
+            continue
+        items.append({"type": "TextBlock", "text": f"{title} ({len(delta[kind])})",
+                      "weight": "bolder", "size": "small", "color": color, "separator": True})
+        items.extend({"type": "TextBlock", "text": _delta_line(kind, entry, was), "size": "small", "wrap": True,
+                      "spacing": "none"} for entry, was in delta[kind])
+    return pack_cards(header, items, budget)
+
+
+def group_delta(delta, group):
+    """The part of a delta that concerns one assignment group (before or after the change)."""
+    picked = {kind: [(entry, was) for entry, was in items
+                     if group in (entry["assignment_group"], (was or {}).get("assignment_group"))]
+              for kind, items in delta.items()}
+    return {kind: items for kind, items in picked.items() if items}
+
+
+def send_queued(posts, mergeable=False, after_queue=None):
+    """Queue [(target, msgs, key)] in the Teams outbox, then deliver everything due
+    (including earlier retries).
+
+    `key` identifies the update; queueing the same key again (a re-run after a crash) is a no-op.
+    """
+    sys.path.insert(0, str(SNOW_PIR_DIR))
+    import teams_outbox
+
+    outbox = teams_outbox.connect()
+    queued = sum(teams_outbox.enqueue(outbox, target, msgs, mergeable=mergeable, key=key or None)
+                 for target, msgs, key in posts)
+    if posts:
+        print(f"  Queued {queued} card(s) for {len(posts)} channel(s) in {teams_outbox.OUTBOX_FILE}")
+    if after_queue:
+        after_queue()
+
+    stats = teams_outbox.deliver(outbox)
+    if stats["sent"]:
+        print(f"  Posted {stats['sent']} card(s) to Teams")
+    counts = teams_outbox.pending_counts(outbox)
+    waiting = counts.get("pending", 0) + counts.get("sending", 0)
+    if waiting:
+        due = teams_outbox.next_due(outbox)
+        print(f"  {waiting} card(s) waiting to retry from {due:%H:%M:%S} UTC "
+              f"(the next run or tools/snow-pir/teams_outbox.py delivers them)")
+    # Only this run's rejections fail it; cards left dead by earlier runs are just reported
+    if stats["dead"]:
+        print(f"  {stats['dead']} card(s) rejected by Teams; see tools/snow-pir/teams_outbox.py --list")
+        sys.exit(1)
+    if counts.get("dead"):
+        print(f"  {counts['dead']} card(s) from earlier runs still dead; "
+              f"see tools/snow-pir/teams_outbox.py --list / --retry-dead")
+    print("  Done!")
+
+
+def post_group_digests(changes, args):
+    """--by-group: one digest per assignment group from the single fetch.
+
+    Writes every group's cards to GROUP_CARD_DIR; with --graph, groups that have
+    a channel in teams_channels.json get theirs posted, all in one $batch round.
+    Doesn't touch the delta snapshot.
+    """
+    risk_scores = load_risk_scores([get_field(c.get("number")) for c in changes])
+    digests = group_digests(changes, risk_scores, find_collisions(changes), find_blackouts(changes))
+    print(f"  Built: {len(digests)} group digest(s), {sum(map(len, digests.values()))} card(s)")
+
+    GROUP_CARD_DIR.mkdir(exist_ok=True)
+    written = set()
+    for group, msgs in digests.items():
+        path = GROUP_CARD_DIR / f"{_slug(group)}.json"
+        path.write_text(json.dumps(msgs, indent=2, ensure_ascii=False), encoding="utf-8")
+        written.add(path)
+    for stale in set(GROUP_CARD_DIR.glob("*.json")) - written:
+        stale.unlink()
+    print(f"  Wrote {len(digests)} digest(s) to {GROUP_CARD_DIR}")
+    if args.dry_run or not args.graph:
+        return
+
+    sys.path.insert(0, str(SNOW_PIR_DIR))
+    import teams_graph
+    channels = teams_graph.load_channels()["groups"]
+    today = date.today().isoformat()
+    posts = []
+    for group, msgs in digests.items():
+        if group in channels:
+            state = hashlib.sha256(json.dumps(msgs, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+            posts.append((channels[group], msgs, f"calendar:group:{today}:{group}:{state}"))
+    unrouted = sorted(set(digests) - set(channels))
+    if unrouted:
+        print(f"  No channel configured for {len(unrouted)} group(s): {', '.join(unrouted)}")
+    send_queued(posts)
+
+
 def main():
-    changes = fetch(
-        "state=-2^on_hold=false^start_dateRELATIVELE@hour@ahead@168^ORDERBYstart_date",
-        "number,short_description,risk,start_date,end_date,assigned_to,assignment_group",
-    )
+    parser = argparse.ArgumentParser(description="Post the scheduled-change calendar to Teams")
+    parser.add_argument("--full", action="store_true", help="Post the full card even if a snapshot exists")
+    parser.add_argument("--daily-digest", action="store_true", help="Post the full card on the first run of each day")
+    parser.add_argument("--dry-run", action="store_true", help="Build the card but don't post or update the snapshot")
+    parser.add_argument("--graph", action="store_true",
+                        help="Post through Microsoft Graph to the channels in tools/snow-pir/teams_channels.json "
+                             "instead of the webhook")
+    parser.add_argument("--by-group", action="store_true",
+                        help="Full digest per assignment group: posted to each group's channel with --graph, "
+                             "otherwise written to scripts/group-cards/")
+    args = parser.parse_args()
+
+    changes = fetch(SCHEDULED_QUERY, CARD_FIELDS, limit=MAX_CHANGES)
     on_hold = len(fetch(
         "state=-2^on_hold=true^start_dateRELATIVELE@hour@ahead@168", "number", limit=50))
-    print(f"  Built: {len(changes)} scheduled changes, {on_hold} on-hold excluded")
+    print(f"  Fetched: {len(changes)} scheduled changes, {on_hold} on-hold excluded")
+    if args.by_group:
+        post_group_digests(changes, args)
+        return
 
-    msg = build_card(changes, on_hold)
-    CARD_OUT.write_text(json.dumps(msg, indent=2), encoding="utf-8")
+    snapshot = load_snapshot()
+    previous = snapshot.get("changes")
+    current = {e["number"]: e for e in map(snapshot_entry, changes)}
+    today = date.today().isoformat()
+    last_digest = snapshot.get("last_digest", "")
+    full = args.full or previous is None or (args.daily_digest and last_digest != today)
 
-    webhook = WEBHOOK_FILE.read_text(encoding="utf-8").strip()
-    r = requests.post(webhook, json=msg, headers={"Content-Type": "application/json"})
-    print(f"  Posted to Teams webhook: HTTP {r.status_code}")
-    if r.status_code not in (200, 202):
-        print(f"  Response: {r.text}")
-        sys.exit(1)
-    print("  Done!")
+    if full:
+        risk_scores = load_risk_scores([get_field(c.get("number")) for c in changes])
+        overlaps = find_collisions(changes)
+        if overlaps:
+            print(f"  {len(overlaps)} change(s) collide on CI or assignment group")
+        blackouts = find_blackouts(changes)
+        if blackouts:
+            print(f"  {len(blackouts)} change(s) scheduled inside a blackout window")
+        msgs = build_cards(changes, on_hold, risk_scores, overlaps, blackouts)
+        last_digest = today
+        print(f"  Built: full calendar in {len(msgs)} card(s)")
+    else:
+        departed = fetch_departed(set(previous) - set(current))
+        delta = diff_snapshot(previous, current, departed)
+        if not delta:
+            print("  No calendar changes since the last post; nothing to send")
+            if not args.dry_run:
+                save_snapshot(current, last_digest)
+                send_queued([])
+            return
+        msgs = build_delta_cards(delta, len(changes))
+        print(f"  Built: delta in {len(msgs)} card(s) ({', '.join(f'{len(v)} {k}' for k, v in delta.items())})")
+    CARD_OUT.write_text(json.dumps(msgs, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.dry_run:
+        print(f"  Dry run: {len(msgs)} card(s) ({', '.join(f'{_size(m) / 1024:.1f} KB' for m in msgs)}) "
+              f"written to {CARD_OUT}")
+        return
+
+    # Queue first: once the cards are in the outbox the snapshot can move on, and a
+    # Teams outage only delays delivery instead of losing (or re-diffing) the update
+    state = hashlib.sha256(json.dumps(current, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    # A delta is the step from the previous snapshot (and when it was taken) to this one, so
+    # A -> B -> A -> B posts every step, while a re-run before the snapshot moved still dedupes
+    prior = hashlib.sha256(json.dumps([snapshot.get("taken"), previous], sort_keys=True)
+                           .encode("utf-8")).hexdigest()[:16]
+    # --full is an explicit request to post again, so it always gets a fresh key
+    stamp = datetime.now().strftime("%Y-%m-%dT%H%M%S") if args.full else today
+    key = f"calendar:full:{stamp}:{state}" if full else f"calendar:delta:{stamp}:{prior}:{state}"
+    if args.graph:
+        sys.path.insert(0, str(SNOW_PIR_DIR))
+        import teams_graph
+        channels = teams_graph.load_channels()
+        posts = [(channels["default"], msgs, key)]
+        if not full:
+            # Each group channel also gets its own slice of the delta, all in the same $batch
+            for group, target in sorted(channels["groups"].items()):
+                mine = group_delta(delta, group)
+                if mine:
+                    scheduled = sum(1 for e in current.values() if e["assignment_group"] == group)
+                    posts.append((target, build_delta_cards(mine, scheduled), f"{key}:{group}"))
+    else:
+        posts = [(WEBHOOK_FILE.read_text(encoding="utf-8").strip(), msgs, key)]
+    send_queued(posts, mergeable=not full, after_queue=lambda: save_snapshot(current, last_digest))
 
 
 if __name__ == "__main__":
@@ -133,8 +133,9 @@ def query_changes(access_token, encoded_query, fields, limit=200):
 
 
 def main():
+    cache_only = "--cache-only" in sys.argv[1:]     # Used by tools/snow-pir/calendar_server.py
     log("=" * 60)
-    log("Calendar refresh started")
+    log("Calendar refresh started" + (" (cache only)" if cache_only else ""))
 
     try:
         access_token = get_access_token()
@@ -159,7 +160,7 @@ def main():
     )
 
     fields = ",".join([
-        "number", "short_description", "type", "state",
+        "sys_id", "number", "short_description", "type", "state",
         "assignment_group", "assigned_to", "start_date", "end_date",
         "cmdb_ci", "close_code", "priority",
     ])
@@ -212,6 +213,7 @@ def main():
         planned_end = raw_end[:10] if raw_end and len(raw_end) >= 10 else ""
 
         changes.append({
+            "sys_id": rv(r.get("sys_id", "")),
             "number": num,
             "short_description": dv(r.get("short_description", "")),
             "type": dv(r.get("type", "")) or "Normal",
@@ -220,6 +222,8 @@ def main():
             "assigned_to": dv(r.get("assigned_to", "")),
             "planned_start": planned_start,
             "planned_end": planned_end,
+            "start_at": raw_start,
+            "end_at": raw_end,
             "cmdb_ci": dv(r.get("cmdb_ci", "")),
             "close_code": dv(r.get("close_code", "")),
             "priority": dv(r.get("priority", "")),
@@ -227,10 +231,15 @@ def main():
 
     log(f"Processed {len(changes)} changes (after dedup/filter)")
 
-    # Save cache
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
+    # Save cache (swap in whole so the calendar server never reads a partial file)
+    tmp_file = CACHE_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
         json.dump(changes, f, indent=2)
+    os.replace(tmp_file, CACHE_FILE)
     log(f"Cache saved: {CACHE_FILE}")
+    if cache_only:
+        log("Calendar refresh complete")
+        return
 
     # Regenerate Excel
     log("Regenerating calendar Excel...")
@@ -247,6 +256,19 @@ def main():
         log(f"ERROR generating Excel: {result.stderr}")
         sys.exit(1)
 
+    # Regenerate the ICS feed (incremental; only changed events are re-rendered)
+    log("Regenerating calendar ICS feed...")
+    ics_script = os.path.join(SCRIPT_DIR, "..", "tools", "snow-pir", "calendar_ics.py")
+    result = subprocess.run(
+        [sys.executable, ics_script, "--cache", CACHE_FILE],
+        capture_output=True, text=True, cwd=SCRIPT_DIR,
+    )
+    if result.returncode == 0:
+        for line in result.stdout.strip().split("\n"):
+            log(f"  {line}")
+    else:
+        log(f"ERROR generating ICS feed: {result.stderr}")
+
     # Post notification to Teams via Graph API
     log("Posting notification to Teams...")
     try:
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Change freeze / blackout windows.
+
+Windows are defined in blackout_windows.json next to this file (override with
+the BLACKOUT_FILE environment variable). The change manager keeps that file;
+copy blackout_windows.example.json to start one:
+
+    {"timezone": "America/Los_Angeles",
+     "windows": [
+        {"name": "Q4 close", "start": "2026-12-28", "end": "2027-01-06",
+         "exempt_types": ["Emergency"], "note": "Finance quarter/year-end close"}
+    ]}
+
+`start`/`end` are dates (the end day is included) or "YYYY-MM-DD HH:MM:SS"
+timestamps (end excluded), local to `timezone` (default CHANGE_TZ, see
+schedule_conflicts.py). They are converted to UTC, the calendar cache's
+convention, so a change's planned window is compared in one time zone.
+Changes whose type is in `exempt_types` may run inside the window.
+
+The windows go into schedule_conflicts.IntervalIndex, so checking a change's
+planned window is O(log n + k) for n windows and k hits -- thousands of
+changes against dozens of windows take a few milliseconds. The calendar
+renderers (scripts/create-calendar-*.py) shade blackout days and flag
+violating changes; the Teams card (scripts/post-calendar-webhook.py) lists
+the violations.
+
+Usage:
+    python blackout.py                        # Windows + violations in scripts/calendar_changes.json
+    python blackout.py path/to/cache.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from schedule_conflicts import CALENDAR_CACHE, LOCAL_TZ, IntervalIndex, _value, calendar_window, parse_time, to_utc
+
+BLACKOUT_FILE = Path(os.environ.get("BLACKOUT_FILE", Path(__file__).resolve().parent / "blackout_windows.json"))
+
+
+# ---------------------------------------------------------------------------
+# Definitions
+# ---------------------------------------------------------------------------
+
+def _bound(text: str, is_end: bool) -> datetime | None:
+    """A date counts as the whole day: start at 00:00, end at the next midnight."""
+    when = parse_time(text)
+    if when is not None and is_end and len(str(text).strip()) <= 10:
+        when += timedelta(days=1)
+    return when
+
+
+def load_windows(path: Path = BLACKOUT_FILE) -> list[dict]:
+    """Parsed windows with UTC `start_at`/`end_at` and local `local_start`/`local_end` datetimes.
+
+    No file means no windows.
+    """
+    if not path.exists():
+        return []
+    try:
+        config = json.loads(path.read_text(encoding="utf-8"))
+        entries = config.get("windows", [])
+    except (json.JSONDecodeError, AttributeError) as exc:
+        print(f"ERROR: {path} is not a valid blackout definition: {exc}")
+        sys.exit(1)
+    try:
+        tz = ZoneInfo(config["timezone"]) if config.get("timezone") else LOCAL_TZ
+    except (ZoneInfoNotFoundError, ValueError):
+        print(f"ERROR: {path} timezone '{config['timezone']}' is not a known IANA time zone")
+        sys.exit(1)
+
+    windows = []
+    for n, entry in enumerate(entries, 1):
+        start, end = _bound(entry.get("start", ""), False), _bound(entry.get("end", ""), True)
+        if start is None or end is None or end <= start:
+            print(f"ERROR: {path} window {n} ({entry.get('name', 'unnamed')}) needs a start before its end")
+            sys.exit(1)
+        windows.append({
+            "name": entry.get("name") or f"Blackout {n}",
+            "start_at": to_utc(start, tz),
+            "end_at": to_utc(end, tz),
+            "local_start": start,
+            "local_end": end,
+            "timezone": tz.key,
+            "exempt_types": {t.lower() for t in entry.get("exempt_types", [])},
+            "note": entry.get("note", ""),
+        })
+    return windows
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class BlackoutIndex:
+    """Blackout windows in an interval tree, for overlap and day lookups."""
+
+    def __init__(self, windows: list[dict]):
+        self.windows = windows
+        self._tree = IntervalIndex([(w["start_at"], w["end_at"], w) for w in windows])
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def during(self, start: datetime, end: datetime, change_type: str = "") -> list[dict]:
+        """Windows that [start, end) runs into, skipping those exempting `change_type`."""
+        if end <= start:
+            end = start + timedelta(seconds=1)
+        return [w for w in self._tree.overlapping(start, end) if change_type.lower() not in w["exempt_types"]]
+
+    def on_day(self, day: date, tz: ZoneInfo | None = None) -> list[dict]:
+        """Windows covering any part of `day`: a UTC day (the month grids bucket changes by UTC
+        date), or a day in `tz` for views drawn in local time."""
+        start = datetime(day.year, day.month, day.day)
+        end = start + timedelta(days=1)
+        if tz is not None:
+            start, end = to_utc(start, tz), to_utc(end, tz)
+        return self._tree.overlapping(start, end)
+
+
+def violations(changes: list[dict], index: BlackoutIndex,
+               window: Callable[[dict], tuple | None] = calendar_window) -> dict[str, list[dict]]:
+    """Blackout windows each change's planned window runs into: number -> [window].
+
+    `window` must return the planned window in UTC, like calendar_window.
+    """
+    found = {}
+    if not len(index):
+        return found
+    for change in changes:
+        span = window(change)
+        if span:
+            hits = index.during(span[0], span[1], _value(change, "type"))
+            if hits:
+                found[_value(change, "number")] = hits
+    return found
+
+
+def window_names(windows: list[dict]) -> str:
+    return ", ".join(w["name"] for w in windows)
+
+
+def describe_window(w: dict) -> str:
+    """'Q4 close (2026-12-28 .. 2027-01-06 America/Los_Angeles)', in the window's own time zone;
+    whole-day windows show their last day."""
+    start, end = w["local_start"], w["local_end"]
+    if end.time() == datetime.min.time() and start.time() == datetime.min.time():
+        span = f"{start:%Y-%m-%d} .. {end - timedelta(days=1):%Y-%m-%d}"
+    else:
+        span = f"{start:%Y-%m-%d %H:%M} .. {end:%Y-%m-%d %H:%M}"
+    return f"{w['name']} ({span} {w['timezone']})"
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Check calendar changes against blackout windows")
+    parser.add_argument("cache", nargs="?", type=Path, default=CALENDAR_CACHE, help="Calendar cache JSON")
+    parser.add_argument("--windows", type=Path, default=BLACKOUT_FILE, help="Blackout definition file")
+    args = parser.parse_args()
+
+    windows = load_windows(args.windows)
+    print(f"{len(windows)} blackout window(s) in {args.windows}")
+    for w in sorted(windows, key=lambda w: w["start_at"]):
+        exempt = f"  (exempt: {', '.join(sorted(w['exempt_types']))})" if w["exempt_types"] else ""
+        print(f"  {describe_window(w)}{exempt}")
+
+    if not args.cache.exists():
+        print(f"ERROR: {args.cache} not found. Run scripts/refresh-calendar.py first.")
+        sys.exit(1)
+    changes = json.loads(args.cache.read_text(encoding="utf-8"))
+    found = violations(changes, BlackoutIndex(windows))
+    print(f"\n{len(changes)} change(s), {len(found)} scheduled inside a blackout")
+    for number, hits in sorted(found.items()):
+        print(f"  {number}  {window_names(hits)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+iCalendar (ICS) feed of the change calendar, for Outlook/Teams subscriptions.
+
+Reads the same cache as the HTML/Excel calendars (scripts/calendar_changes.json,
+written by scripts/refresh-calendar.py) and writes one VEVENT per change.
+
+Regeneration is incremental. Each event's rendered text is kept in a per-event
+cache (calendar_ics_cache.json next to the calendar cache) with a hash of the
+fields it was rendered from; unchanged changes reuse that text verbatim, so
+thousands of events regenerate in milliseconds. A change's UID (from its
+sys_id, or its number in caches that predate sys_id) never changes once issued,
+and its SEQUENCE / LAST-MODIFIED only move when the change itself does, so
+subscribers only see real updates. The .ics file is rewritten only when its
+content differs.
+
+Usage:
+    python calendar_ics.py                           # Default cache -> OneDrive feed
+    python calendar_ics.py --output changes.ics
+    python calendar_ics.py --rebuild                 # Re-render every event (e.g. after a template change)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from schedule_conflicts import CALENDAR_CACHE, parse_time
+
+SN_HOST = "vituity.service-now.com"
+SNOW_URL = f"https://{SN_HOST}/nav_to.do?uri=change_request.do?sysparm_query=number="
+OUTPUT = Path(os.path.expanduser(
+    r"~\OneDrive - Vituity\Documents\Change Management\Change_Management_Calendar.ics"
+))
+EVENT_CACHE = CALENDAR_CACHE.with_name("calendar_ics_cache.json")
+EXCLUDE_STATES = {"Canceled", "New", "Assess"}
+# Approved but not yet scheduled; everything else on the calendar is firm
+TENTATIVE_STATES = {"Authorize"}
+
+CALENDAR_NAME = "Change Management Calendar"
+REFRESH = "PT1H"
+
+# Record fields an event is rendered from; any difference re-renders it and bumps SEQUENCE
+EVENT_FIELDS = [
+    "number", "short_description", "type", "state", "assignment_group", "assigned_to",
+    "planned_start", "planned_end", "start_at", "end_at", "cmdb_ci", "close_code", "priority",
+]
+ICS_TS_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _escape(text: str) -> str:
+    """RFC 5545 TEXT escaping."""
+    return (str(text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting a UTF-8 character."""
+    if len(line.encode("utf-8")) <= 75:
+        return line
+    if line.isascii():
+        return "\r\n ".join([line[:75], *(line[i:i + 74] for i in range(75, len(line), 74))])
+    parts, current, size = [], "", 0
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += ch
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts)
+
+
+def _timing(change: dict) -> list[str] | None:
+    """DTSTART/DTEND lines: exact UTC times when cached, else all-day dates."""
+    start, end = parse_time(change.get("start_at")), parse_time(change.get("end_at"))
+    if start is not None:
+        if end is None or end <= start:
+            end = start + timedelta(hours=1)
+        return [f"DTSTART:{start:{ICS_TS_FORMAT}}", f"DTEND:{end:{ICS_TS_FORMAT}}"]
+    start = parse_time(change.get("planned_start"))
+    if start is None:
+        return None
+    end = max(parse_time(change.get("planned_end")) or start, start) + timedelta(days=1)
+    return [f"DTSTART;VALUE=DATE:{start:%Y%m%d}", f"DTEND;VALUE=DATE:{end:%Y%m%d}"]
+
+
+def render_event(change: dict, uid: str, sequence: int, modified: str) -> str | None:
+    """One VEVENT block (CRLF line endings, folded), or None if the change has no dates."""
+    timing = _timing(change)
+    if timing is None:
+        return None
+    number = change.get("number", "")
+    details = [
+        ("Type", change.get("type")), ("State", change.get("state")),
+        ("Assignment group", change.get("assignment_group")), ("Assigned to", change.get("assigned_to")),
+        ("CI", change.get("cmdb_ci")), ("Priority", change.get("priority")), ("Close code", change.get("close_code")),
+    ]
+    description = "\n".join([*(f"{label}: {value}" for label, value in details if value), SNOW_URL + number])
+    summary = f"{number}: {change.get('short_description', '')}"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"SEQUENCE:{sequence}",
+        f"DTSTAMP:{modified}",
+        f"LAST-MODIFIED:{modified}",
+        *timing,
+        f"SUMMARY:{_escape(summary)}",
+        f"DESCRIPTION:{_escape(description)}",
+        f"URL:{SNOW_URL}{number}",
+        f"CATEGORIES:{_escape(change.get('type') or 'Normal')}",
+        f"STATUS:{'TENTATIVE' if change.get('state') in TENTATIVE_STATES else 'CONFIRMED'}",
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+def _last_modified(entry: dict) -> str | None:
+    """LAST-MODIFIED of a cached event (from the rendered text in caches that predate the field)."""
+    if entry.get("modified"):
+        return entry["modified"]
+    match = re.search(r"^LAST-MODIFIED:(\S+)", entry.get("vevent", ""), re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def _digest(change: dict) -> str:
+    payload = "\x1f".join(str(change.get(f) or "") for f in EVENT_FIELDS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Incremental build
+# ---------------------------------------------------------------------------
+
+def build_feed(changes: list[dict], events: dict[str, dict], now: datetime | None = None,
+               rebuild: bool = False) -> tuple[str, dict]:
+    """The full VCALENDAR text, updating `events` (the per-event cache) in place.
+
+    With rebuild, unchanged events are re-rendered anyway (after a template
+    change) but keep their SEQUENCE and LAST-MODIFIED, so subscribers don't see
+    an update. Returns (text, stats) where stats counts reused / updated /
+    added / removed events and how many reused ones were re-rendered.
+    """
+    modified = (now or datetime.now(timezone.utc)).strftime(ICS_TS_FORMAT)
+    stats = {"reused": 0, "updated": 0, "added": 0, "removed": 0, "rerendered": 0}
+    blocks, seen = [], set()
+    for change in sorted(changes, key=lambda c: (c.get("start_at") or c.get("planned_start", ""), c.get("number", ""))):
+        number = change.get("number", "")
+        if not number or number in seen or change.get("state", "") in EXCLUDE_STATES:
+            continue
+        seen.add(number)
+        digest = _digest(change)
+        cached = events.get(number)
+        if cached and cached["hash"] == digest:
+            if rebuild:
+                kept = _last_modified(cached) or modified
+                vevent = render_event(change, cached["uid"], cached["sequence"], kept)
+                if vevent and vevent != cached["vevent"]:
+                    events[number] = cached = {**cached, "modified": kept, "vevent": vevent}
+                    stats["rerendered"] += 1
+            stats["reused"] += 1
+            blocks.append(cached["vevent"])
+            continue
+        uid = cached["uid"] if cached else f"{change.get('sys_id') or number}@{SN_HOST}"
+        sequence = cached["sequence"] + 1 if cached else 0
+        vevent = render_event(change, uid, sequence, modified)
+        if vevent is None:
+            continue
+        stats["updated" if cached else "added"] += 1
+        events[number] = {"uid": uid, "hash": digest, "sequence": sequence, "modified": modified, "vevent": vevent}
+        blocks.append(vevent)
+
+    for number in [n for n in events if n not in seen]:
+        # Dropped from the calendar; if it comes back, keep counting from its last SEQUENCE
+        if events[number].get("vevent"):
+            events[number] = {**events[number], "hash": "", "vevent": ""}
+            stats["removed"] += 1
+
+    header = "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Vituity//Change Management Calendar//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{CALENDAR_NAME}",
+        f"X-PUBLISHED-TTL:{REFRESH}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH}",
+    ]) + "\r\n"
+    return header + "".join(blocks) + "END:VCALENDAR\r\n", stats
+
+
+def load_event_cache(path: Path = EVENT_CACHE) -> dict[str, dict]:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        print(f"  Event cache {path} unreadable; rebuilding all events")
+        return {}
+
+
+def save_event_cache(events: dict[str, dict], path: Path = EVENT_CACHE) -> bool:
+    return _write_if_changed(path, json.dumps(events, ensure_ascii=False).encode("utf-8"))
+
+
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+def export(cache: Path = CALENDAR_CACHE, output: Path = OUTPUT, event_cache: Path = EVENT_CACHE,
+           rebuild: bool = False) -> tuple[bool, dict]:
+    """Regenerate the feed from the calendar cache. Returns (feed rewritten, stats)."""
+    changes = json.loads(cache.read_text(encoding="utf-8"))
+    events = load_event_cache(event_cache)
+    text, stats = build_feed(changes, events, rebuild=rebuild)
+    if stats["updated"] or stats["added"] or stats["removed"] or stats["rerendered"] or not event_cache.exists():
+        save_event_cache(events, event_cache)
+    return _write_if_changed(output, text.encode("utf-8")), stats
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the change calendar as an iCalendar feed")
+    parser.add_argument("--cache", type=Path, default=CALENDAR_CACHE, help="Calendar cache JSON")
+    parser.add_argument("--output", type=Path, default=OUTPUT, help="ICS file to write")
+    parser.add_argument("--event-cache", type=Path, default=EVENT_CACHE, help="Per-event render cache")
+    parser.add_argument("--rebuild", action="store_true", help="Re-render every event (UIDs are kept; SEQUENCE only moves for real changes)")
+    args = parser.parse_args()
+
+    if not args.cache.exists():
+        print(f"ERROR: {args.cache} not found. Run scripts/refresh-calendar.py first.")
+        sys.exit(1)
+    start = time.perf_counter()
+    written, stats = export(args.cache, args.output, args.event_cache, args.rebuild)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{stats['reused'] + stats['updated'] + stats['added']} event(s) in {elapsed:.0f} ms: "
+          f"{stats['added']} added, {stats['updated']} updated, {stats['reused']} unchanged, {stats['removed']} removed"
+          + (f" ({stats['rerendered']} re-rendered)" if args.rebuild else ""))
+    print(f"  {'Wrote' if written else 'Unchanged:'} {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Local HTTP server for the change calendar.
+
+Serves the HTML calendar, the ICS feed and a JSON API from an in-memory
+snapshot of scripts/calendar_changes.json, so any number of teammates can
+poll it without a ServiceNow call:
+
+    GET /                  HTML calendar (rendered by scripts/create-calendar-html.py)
+    GET /calendar.ics      iCalendar feed (calendar_ics.py; UIDs/SEQUENCE shared with the file export)
+    GET /api/changes       JSON; filters: from, to (YYYY-MM-DD, inclusive), group, type, state
+    GET /api/status        Snapshot and refresh status
+
+Each snapshot renders every response body once, gzips it and tags it with a
+strong ETag (a hash of the exact bytes sent). Clients that send
+If-None-Match get a bodyless 304 until the data actually changes. Date-range
+queries use the same interval tree as the collision check, so they cost
+O(log n + k).
+
+A background loop runs `refresh-calendar.py --cache-only` every --refresh
+minutes (the only ServiceNow traffic), reloads the snapshot whenever the cache
+file changes -- including when the scheduled refresh task rewrites it -- and
+re-renders at midnight so "today" and the date window move on.
+
+Usage:
+    python calendar_server.py                          # http://127.0.0.1:8765, refresh every 30 min
+    python calendar_server.py --host 0.0.0.0 --port 8080
+    python calendar_server.py --refresh 0              # Never call ServiceNow; just watch the cache file
+    python calendar_server.py --refresh 0 --cache test.json   # Serve another cache (its own ICS event cache)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from calendar_ics import EVENT_CACHE, build_feed, load_event_cache, save_event_cache
+from schedule_conflicts import CALENDAR_CACHE, IntervalIndex, calendar_window, parse_time
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent.parent / "scripts"
+HTML_SCRIPT = SCRIPTS_DIR / "create-calendar-html.py"
+REFRESH_SCRIPT = SCRIPTS_DIR / "refresh-calendar.py"
+
+DEFAULT_PORT = 8765
+DEFAULT_REFRESH = 30        # Minutes between ServiceNow refreshes
+WATCH_SECONDS = 5           # How often the cache file's mtime is checked
+REFRESH_TIMEOUT = 300
+GZIP_MIN = 512              # Smaller bodies aren't worth compressing
+MAX_CACHED = 256            # Distinct API responses memoised per snapshot
+EXCLUDE_STATES = {"Canceled", "New", "Assess"}
+
+
+def _log(msg: str) -> None:
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+class _Response:
+    """A rendered body with its gzip form and strong ETags (one per encoding)."""
+
+    __slots__ = ("content_type", "body", "gzipped", "etag", "gzip_etag")
+
+    def __init__(self, body: bytes, content_type: str):
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.content_type = content_type
+        self.body = body
+        self.gzipped = gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN else None
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+
+
+class CalendarSnapshot:
+    """One version of the calendar: records, lookup indexes and memoised responses."""
+
+    def __init__(self, changes: list[dict], html: bytes | None, ics: bytes, source_mtime: float):
+        self.loaded_at = time.time()
+        self.day = date.today()
+        self.source_mtime = source_mtime
+        self.changes = [c for c in changes if c.get("state", "") not in EXCLUDE_STATES]
+        self._tree = IntervalIndex([
+            (span[0], span[1], i) for i, span in enumerate(map(calendar_window, self.changes)) if span
+        ])
+        self._by = {field: {} for field in ("assignment_group", "type", "state")}
+        for i, change in enumerate(self.changes):
+            for field, index in self._by.items():
+                index.setdefault((change.get(field) or "").lower(), set()).add(i)
+        self.html = html
+        self.page = _Response(html, "text/html; charset=utf-8") if html is not None else None
+        self.feed = _Response(ics, "text/calendar; charset=utf-8")
+        self._responses: dict[tuple, _Response] = {}
+
+    def query(self, start: datetime | None = None, end: datetime | None = None,
+              group: str = "", change_type: str = "", state: str = "") -> list[dict]:
+        """Changes whose planned window overlaps [start, end), filtered by exact (case-insensitive) field values."""
+        if start or end:
+            hits = self._tree.overlapping(start or datetime.min, end or datetime.max)
+        else:
+            hits = range(len(self.changes))
+        for field, value in (("assignment_group", group), ("type", change_type), ("state", state)):
+            if value:
+                allowed = self._by[field].get(value.lower(), set())
+                hits = [i for i in hits if i in allowed]
+        return [self.changes[i] for i in hits]
+
+    def response(self, key: tuple, render) -> _Response:
+        """The memoised response for `key`, rendering it on first use."""
+        resp = self._responses.get(key)
+        if resp is None:
+            if len(self._responses) >= MAX_CACHED:
+                self._responses = {}
+            resp = self._responses[key] = render()
+        return resp
+
+
+def _render_html(cache: Path) -> bytes | None:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "calendar.html"
+        result = subprocess.run([sys.executable, str(HTML_SCRIPT), str(out), str(cache)],
+                                capture_output=True, text=True, cwd=SCRIPTS_DIR)
+        if result.returncode != 0 or not out.exists():
+            _log(f"WARN: HTML render failed: {result.stderr.strip()[-500:]}")
+            return None
+        return out.read_bytes()
+
+
+def load_snapshot(cache: Path, previous: CalendarSnapshot | None = None) -> CalendarSnapshot:
+    """Read the cache and render the page and feed once for the new snapshot."""
+    mtime = cache.stat().st_mtime
+    changes = json.loads(cache.read_text(encoding="utf-8"))
+    # UIDs/SEQUENCE live next to the cache they describe, so a test cache never touches the real one
+    event_cache = cache.with_name(EVENT_CACHE.name)
+    events = load_event_cache(event_cache)
+    ics, stats = build_feed(changes, events)
+    if stats["added"] or stats["updated"] or stats["removed"]:
+        save_event_cache(events, event_cache)
+    html = _render_html(cache)
+    if html is None and previous is not None:
+        html = previous.html        # Keep serving the last good page
+    return CalendarSnapshot(changes, html, ics.encode("utf-8"), mtime)
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+def _accepts_gzip(header: str) -> bool:
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip().lower()
+            return not q.startswith("q=") or q[2:].strip("0.") != ""
+    return False
+
+
+def _day(params: dict, name: str, end: bool = False) -> datetime | None:
+    text = params.get(name, [""])[0]
+    if not text:
+        return None
+    when = parse_time(text)
+    if when is None:
+        raise ValueError(f"'{name}' must be YYYY-MM-DD, got {text!r}")
+    return when + timedelta(days=1) if end and len(text) <= 10 else when
+
+
+def _api_changes(snap: CalendarSnapshot, params: dict) -> _Response:
+    start, end = _day(params, "from"), _day(params, "to", end=True)
+    filters = {name: params.get(name, [""])[0] for name in ("group", "type", "state")}
+    key = ("/api/changes", start, end, *filters.values())
+
+    def render():
+        rows = snap.query(start, end, filters["group"], filters["type"], filters["state"])
+        body = json.dumps({"count": len(rows), "changes": rows}, ensure_ascii=False)
+        return _Response(body.encode("utf-8"), "application/json; charset=utf-8")
+
+    return snap.response(key, render)
+
+
+class CalendarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache: Path, verbose: bool = False):
+        self.cache = cache
+        self.verbose = verbose
+        self.snapshot = load_snapshot(cache)
+        self.status = {"last_refresh": None, "last_refresh_ok": None, "next_refresh": None}
+        super().__init__(address, _Handler)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: CalendarServer
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def _serve(self, head: bool):
+        url = urlsplit(self.path)
+        snap = self.server.snapshot      # One consistent snapshot per request
+        try:
+            if url.path in ("/", "/index.html"):
+                resp = snap.page
+                if resp is None:
+                    return self._error(503, "Calendar page not rendered yet")
+            elif url.path == "/calendar.ics":
+                resp = snap.feed
+            elif url.path == "/api/changes":
+                resp = _api_changes(snap, parse_qs(url.query))
+            elif url.path == "/api/status":
+                status = {"changes": len(snap.changes),
+                          "loaded_at": datetime.fromtimestamp(snap.loaded_at, timezone.utc).isoformat(),
+                          "source_modified": datetime.fromtimestamp(snap.source_mtime, timezone.utc).isoformat(),
+                          **self.server.status}
+                resp = _Response(json.dumps(status).encode("utf-8"), "application/json; charset=utf-8")
+            else:
+                return self._error(404, "Not found")
+        except ValueError as exc:
+            return self._error(400, str(exc))
+
+        use_gzip = resp.gzipped is not None and _accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        etag = resp.gzip_etag if use_gzip else resp.etag
+        match = {t.strip().removeprefix("W/") for t in self.headers.get("If-None-Match", "").split(",")}
+        not_modified = etag in match or "*" in match
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")     # Always revalidate; a 304 costs nothing
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Last-Modified", formatdate(snap.source_mtime, usegmt=True))
+        if not_modified:
+            self.end_headers()
+            return
+        body = resp.gzipped if use_gzip else resp.body
+        self.send_header("Content-Type", resp.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _error(self, code: int, message: str):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# ---------------------------------------------------------------------------
+# Background refresh
+# ---------------------------------------------------------------------------
+
+def refresh_loop(server: CalendarServer, refresh_minutes: float, stop: threading.Event) -> None:
+    """Refresh from ServiceNow on the interval; reload whenever the cache or the date changes."""
+    next_refresh = time.monotonic() if refresh_minutes else None
+    while not stop.is_set():
+        if next_refresh is not None and time.monotonic() >= next_refresh:
+            try:
+                result = subprocess.run([sys.executable, str(REFRESH_SCRIPT), "--cache-only"],
+                                        capture_output=True, text=True, cwd=SCRIPTS_DIR, timeout=REFRESH_TIMEOUT)
+                ok, detail = result.returncode == 0, (result.stderr or result.stdout).strip()[-500:]
+            except subprocess.TimeoutExpired:
+                ok, detail = False, f"timed out after {REFRESH_TIMEOUT}s"
+            if not ok:
+                _log(f"WARN: ServiceNow refresh failed: {detail}")
+            next_refresh = time.monotonic() + refresh_minutes * 60
+            server.status.update(
+                last_refresh=datetime.now(timezone.utc).isoformat(), last_refresh_ok=ok,
+                next_refresh=(datetime.now(timezone.utc) + timedelta(minutes=refresh_minutes)).isoformat())
+
+        snap = server.snapshot
+        try:
+            if server.cache.stat().st_mtime != snap.source_mtime or date.today() != snap.day:
+                server.snapshot = load_snapshot(server.cache, snap)
+                _log(f"Reloaded {len(server.snapshot.changes)} change(s) from {server.cache.name}")
+        except (OSError, ValueError) as exc:
+            _log(f"WARN: reload failed, still serving the previous snapshot: {exc}")
+        stop.wait(WATCH_SECONDS)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the change calendar (HTML, ICS, JSON) over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (0.0.0.0 to share on the LAN)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache", type=Path, default=CALENDAR_CACHE, help="Calendar cache JSON")
+    parser.add_argument("--refresh", type=float, default=DEFAULT_REFRESH,
+                        help=f"Minutes between ServiceNow refreshes; 0 = only watch the cache file (default: {DEFAULT_REFRESH})")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if not args.cache.exists():
+        print(f"ERROR: {args.cache} not found. Run scripts/refresh-calendar.py first.")
+        sys.exit(1)
+    if args.refresh and args.cache.resolve() != CALENDAR_CACHE.resolve():
+        # refresh-calendar.py only ever writes the default cache
+        print(f"ERROR: --refresh updates {CALENDAR_CACHE}; use --refresh 0 to serve {args.cache}")
+        sys.exit(1)
+
+    server = CalendarServer((args.host, args.port), args.cache, args.verbose)
+    stop = threading.Event()
+    threading.Thread(target=refresh_loop, args=(server, args.refresh, stop), daemon=True).start()
+    _log(f"Serving {len(server.snapshot.changes)} change(s) on http://{args.host}:{args.port}/ "
+         f"(/calendar.ics, /api/changes, /api/status). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping calendar server.")
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+CCB prep pack generated from live change data.
+
+Pulls the agenda for a CCB meeting -- changes at Assess/Authorize plus
+Emergency changes implemented since the previous meeting, for ratification --
+in one bulk query against the change store (or the Table API), runs the PIR
+field checks to fill in the "Ready?" column, and renders the Word pack from a
+precompiled section template through docx_builder. Similar past changes and
+predicted failure risk are included when the change store has them, and
+each change gets the rule-generated questions from ccb_questions.py.
+
+Usage:
+    python ccb_pack.py 2026-03-05                  # Sync change store, build pack for that CCB
+    python ccb_pack.py 2026-03-05 --source api     # Query ServiceNow directly
+    python ccb_pack.py 2026-03-05 --similar 0 --no-dup-check --no-sync
+"""
+
+import argparse
+import string
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+try:
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt, RGBColor
+except ImportError:
+    print("ERROR: 'python-docx' package required. Install with: pip install python-docx")
+    sys.exit(1)
+
+from change_store import STORE_FIELDS, connect, iter_changes, load_risk_scores, sync, upsert_changes
+from docx_builder import add_hyperlink, build_table, chg_url, link_summary
+from pir_review import REQUIRED_FIELDS, _field_value, analyze_change, query_changes
+
+try:
+    MEETING_TZ = ZoneInfo("America/Los_Angeles")
+except ZoneInfoNotFoundError:
+    print("ERROR: time zone data not found. Install with: pip install tzdata")
+    sys.exit(1)
+
+# CCB meets Thursdays 1:00 PM Pacific; changes must not start before it
+MEETING_TIME = time(13, 0)
+AGENDA_STATES = ("-4", "-3")    # Assess, Authorize
+RATIFY_STATES = ("-1", "0")     # Implement, Review -- emergencies already executed
+EMERGENCY = "emergency"
+
+OUTPUT_DIR = Path.home() / "OneDrive - Vituity" / "Documents" / "Change Management" / "CCB"
+SN_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Ready? verdict -> (recommendation, colour)
+VERDICTS = {
+    "REVIEW": ("REVIEW / RATIFY", "0070C0"),
+    "YES*": ("AUTHORIZE WITH DISCUSSION", "CC8800"),
+    "YES": ("AUTHORIZE", "008000"),
+    "NO": ("DEFER", "CC0000"),
+}
+VERDICT_ORDER = ["REVIEW", "NO", "YES*", "YES"]
+STATUS_COLORS = {"OK": "008000", "WEAK": "CC8800", "MISSING": "CC0000"}
+
+# Per-change detail table: (label, format string over display values). Rows
+# whose fields are all empty are dropped.
+DETAIL_TEMPLATE = [
+    ("Type", "{type}"),
+    ("State", "{state}"),
+    ("Assignee", "{assigned_to} ({assignment_group})"),
+    ("Requested By", "{requested_by}"),
+    ("Risk / Impact", "{risk} / {impact}"),
+    ("Planned Window", "{window}"),
+    ("Configuration Item", "{cmdb_ci} ({u_environment})"),
+    ("Justification", "{justification}"),
+    ("Description", "{description}"),
+]
+PLAN_TEMPLATE = [
+    ("Implementation", "implementation_plan"),
+    ("Backout", "backout_plan"),
+    ("Test", "test_plan"),
+    ("Risk Analysis", "risk_impact_analysis"),
+]
+TEXT_LIMIT = 400
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def _local(raw: str) -> datetime | None:
+    try:
+        return datetime.strptime(raw, SN_TS_FORMAT).replace(tzinfo=timezone.utc).astimezone(MEETING_TZ)
+    except ValueError:
+        return None
+
+
+def _clock(dt: datetime) -> str:
+    return f"{dt.hour % 12 or 12}:{dt:%M} {'AM' if dt.hour < 12 else 'PM'}"
+
+
+def short_window(change: dict) -> str:
+    """Compact Pacific-time schedule for the summary table, e.g. '3/12 10:00 AM-11:00 AM'."""
+    start, end = _local(_raw(change, "start_date")), _local(_raw(change, "end_date"))
+    if not start:
+        return "TBD"
+    if end and end.date() != start.date():
+        return f"{start.month}/{start.day}–{end.month}/{end.day}"
+    return f"{start.month}/{start.day} {_clock(start)}" + (f"–{_clock(end)}" if end else "")
+
+
+def full_window(change: dict) -> str:
+    start, end = _local(_raw(change, "start_date")), _local(_raw(change, "end_date"))
+    if not start:
+        return ""
+    text = f"{start:%m/%d} {_clock(start)}"
+    if end:
+        text += f" – {'' if end.date() == start.date() else f'{end:%m/%d} '}{_clock(end)}"
+    return text + " PT"
+
+
+# ---------------------------------------------------------------------------
+# Template
+# ---------------------------------------------------------------------------
+
+def compile_template(template: list[tuple[str, str]]) -> list[tuple[str, str, list[str]]]:
+    """Parse each row's format string once: [(label, format, field names)]."""
+    formatter = string.Formatter()
+    return [(label, fmt, [name for _, name, _, _ in formatter.parse(fmt) if name]) for label, fmt in template]
+
+
+DETAIL_ROWS = compile_template(DETAIL_TEMPLATE)
+DETAIL_FIELDS = sorted({f for _, _, fields in DETAIL_ROWS for f in fields} - {"window"})
+
+
+def render_rows(compiled: list[tuple[str, str, list[str]]], values: dict) -> list[list]:
+    rows = []
+    for label, fmt, fields in compiled:
+        if not any(values[f] for f in fields):
+            continue
+        text = fmt.format_map(values).replace(" ()", "").strip()
+        rows.append([{"text": label, "bold": True}, text])
+    return rows
+
+
+def _truncate(text: str, limit: int = TEXT_LIMIT) -> str:
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+# ---------------------------------------------------------------------------
+# Agenda
+# ---------------------------------------------------------------------------
+
+def meeting_start(meeting: date) -> datetime:
+    return datetime.combine(meeting, MEETING_TIME, MEETING_TZ)
+
+
+def _utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime(SN_TS_FORMAT)
+
+
+def _agenda_order(change: dict) -> tuple:
+    return (_raw(change, "type") != EMERGENCY, _raw(change, "start_date") or "9999", _raw(change, "number"))
+
+
+def agenda_from_store(conn, since_utc: str) -> list[dict]:
+    """Changes awaiting the CCB, plus emergencies started since the previous meeting."""
+    records = iter_changes(
+        conn, "state IN (?, ?) OR (state IN (?, ?) AND start_date >= ?)",
+        (*AGENDA_STATES, *RATIFY_STATES, since_utc),
+    )
+    agenda = [r for r in records if _raw(r, "state") in AGENDA_STATES or _raw(r, "type") == EMERGENCY]
+    return sorted(agenda, key=_agenda_order)
+
+
+def agenda_from_api(since_utc: str) -> list[dict]:
+    """Same agenda as agenda_from_store in one encoded Table API query."""
+    query = (
+        f"stateIN{','.join(AGENDA_STATES)}"
+        f"^NQtype={EMERGENCY}^stateIN{','.join(RATIFY_STATES)}^start_date>={since_utc}"
+    )
+    return sorted(query_changes(query, fields=STORE_FIELDS), key=_agenda_order)
+
+
+def readiness(change: dict, analysis: dict, meeting_utc: str) -> tuple[str, list[str]]:
+    """Ready? verdict and the reasons behind anything short of YES."""
+    if _raw(change, "type") == EMERGENCY:
+        if _raw(change, "state") in RATIFY_STATES:
+            return "REVIEW", ["Emergency change already executed — ratify and confirm PIR"]
+        return "REVIEW", ["Emergency change — confirm emergency approval before implementation"]
+    status = analysis["field_status"]
+    missing = [REQUIRED_FIELDS[f] for f, s in status.items() if s == "MISSING"]
+    weak = [REQUIRED_FIELDS[f] for f, s in status.items() if s == "WEAK"]
+    reasons = []
+    if missing:
+        reasons.append(f"Missing: {', '.join(missing)}")
+    if weak:
+        reasons.append(f"Weak (no discrete steps): {', '.join(weak)}")
+    start = _raw(change, "start_date")
+    if start and start < meeting_utc:
+        reasons.append("Planned start is before the CCB meeting")
+    for field, matches in analysis.get("plan_duplicates", {}).items():
+        reasons.append(f"{REQUIRED_FIELDS[field]} near-copies {matches[0]['number']} "
+                       f"({matches[0]['similarity']:.0%})")
+    if missing:
+        return "NO", reasons
+    return ("YES*" if reasons else "YES"), reasons
+
+
+def prepare(changes: list[dict], meeting: date, plan_index=None, change_index=None,
+            similar_k: int = 3, risk_scores: dict | None = None) -> list[dict]:
+    """Analyze every agenda change once; the renderer only reads these items."""
+    meeting_utc = _utc(meeting_start(meeting))
+    items = []
+    for change in changes:
+        analysis = analyze_change(change, plan_index)
+        verdict, reasons = readiness(change, analysis, meeting_utc)
+        items.append({
+            "change": change,
+            "analysis": analysis,
+            "number": analysis["number"],
+            "verdict": verdict,
+            "reasons": reasons,
+            "similar": change_index.search(change, similar_k) if change_index and similar_k else [],
+            "risk_score": (risk_scores or {}).get(analysis["number"]),
+        })
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _verdict_cell(verdict: str) -> dict:
+    return {"text": verdict, "bold": True, "color": VERDICTS[verdict][1]}
+
+
+def _heading_para(doc, label: str, value: str) -> None:
+    p = doc.add_paragraph()
+    p.add_run(f"{label}: ").bold = True
+    p.add_run(value)
+
+
+def _add_summary(doc, items: list[dict]) -> None:
+    with_risk = any(i["risk_score"] is not None for i in items)
+    headers = ["CHG #", "Title", "Type", "Group", "Risk", "Schedule"]
+    headers += ["Pred. Fail"] if with_risk else []
+    headers += ["Ready?"]
+    rows = []
+    for item in items:
+        change = item["change"]
+        change_type = _field_value(change, "type")
+        row = [
+            {"text": item["number"], "url": chg_url(item["number"])},
+            _field_value(change, "short_description"),
+            {"text": change_type, "bold": True, "color": "CC0000"} if _raw(change, "type") == EMERGENCY
+            else change_type,
+            _field_value(change, "assignment_group"),
+            _field_value(change, "risk"),
+            short_window(change),
+        ]
+        if with_risk:
+            row.append("" if item["risk_score"] is None else f"{item['risk_score']:.0%}")
+        row.append(_verdict_cell(item["verdict"]))
+        rows.append(row)
+    build_table(doc, headers, rows, style="Light Grid Accent 1", align="center", space_pt=None,
+                header_fill=None, header_color=None)
+
+
+def _add_detail(doc, index: int, item: dict) -> None:
+    change, analysis = item["change"], item["analysis"]
+    title = _field_value(change, "short_description")
+    suffix = " (EMERGENCY)" if _raw(change, "type") == EMERGENCY else ""
+    doc.add_heading(f"{index}. {item['number']} — {title}{suffix}", level=2)
+
+    values = {f: _truncate(_field_value(change, f)) for f in DETAIL_FIELDS}
+    values["window"] = full_window(change)
+    build_table(doc, None, render_rows(DETAIL_ROWS, values), style="Light Grid Accent 1",
+                widths=[1.6, 5.4], size=10, space_pt=None)
+
+    doc.add_paragraph("")
+    p = doc.add_paragraph()
+    p.add_run("Plan Assessment:").bold = True
+    plan_rows = []
+    for label, field in PLAN_TEMPLATE:
+        status = analysis["field_status"].get(field, "OK")
+        excerpt = _truncate(_field_value(change, field).split("\n")[0], 120)
+        text = status + (f" — {excerpt}" if excerpt else "")
+        plan_rows.append([{"text": label, "bold": True}, {"text": text, "color": STATUS_COLORS[status]}])
+    build_table(doc, None, plan_rows, style="Light Grid Accent 1", widths=[1.6, 5.4],
+                size=10, space_pt=None)
+
+    if item["reasons"]:
+        p = doc.add_paragraph()
+        p.add_run("Readiness Notes:").bold = True
+        for reason in item["reasons"]:
+            doc.add_paragraph(reason, style="List Bullet")
+
+    if item.get("questions"):
+        p = doc.add_paragraph()
+        p.add_run("CCB Questions:").bold = True
+        for q in item["questions"]:
+            doc.add_paragraph(q["text"], style="List Bullet")
+
+    if item["similar"]:
+        p = doc.add_paragraph()
+        p.add_run("Similar Past Changes:").bold = True
+        for hit in item["similar"]:
+            p = doc.add_paragraph(style="List Bullet")
+            add_hyperlink(p, hit["number"], chg_url(hit["number"]))
+            p.add_run(f" ({hit['start_date']}, {hit['close_code'] or hit['state'] or '-'}) "
+                      f"{hit['short_description'][:80]}")
+
+    if item["risk_score"] is not None:
+        p = doc.add_paragraph()
+        p.add_run("Predicted failure risk: ").bold = True
+        p.add_run(f"{item['risk_score']:.0%} (historical outcome model)")
+
+    recommendation, color = VERDICTS[item["verdict"]]
+    p = doc.add_paragraph()
+    run = p.add_run(f"Recommendation: {recommendation}")
+    run.bold = True
+    run.font.color.rgb = RGBColor.from_string(color)
+
+
+def _takeaways(items: list[dict], meeting: date) -> list[str]:
+    by_verdict = {v: [i["number"] for i in items if i["verdict"] == v] for v in VERDICT_ORDER}
+    type_counts = {}
+    for item in items:
+        t = _field_value(item["change"], "type") or "Unknown"
+        type_counts[t] = type_counts.get(t, 0) + 1
+    lines = [f"{len(items)} total changes: " + " + ".join(f"{n} {t}" for t, n in sorted(type_counts.items()))]
+    lines.append(f"{len(by_verdict['YES'])} changes ready for straight authorization")
+    if by_verdict["REVIEW"]:
+        lines.append(f"{len(by_verdict['REVIEW'])} emergencies for review/ratification ({', '.join(by_verdict['REVIEW'])})")
+    if by_verdict["YES*"]:
+        lines.append(f"{len(by_verdict['YES*'])} warrant CCB discussion: " + "; ".join(
+            f"{i['number']} ({i['reasons'][0]})" for i in items if i["verdict"] == "YES*"))
+    if by_verdict["NO"]:
+        lines.append(f"{len(by_verdict['NO'])} not ready — missing required fields ({', '.join(by_verdict['NO'])})")
+    same_day = [i["number"] for i in items if (_local(_raw(i["change"], "start_date")) or datetime.min).date() == meeting]
+    if same_day:
+        lines.append(f"{len(same_day)} changes scheduled same day as CCB ({meeting.month}/{meeting.day})")
+    elevated = [i["number"] for i in items if _field_value(i["change"], "risk").lower() in ("moderate", "high", "very high")]
+    if elevated:
+        lines.append(f"{len(elevated)} changes have Moderate or higher risk ({', '.join(elevated)})")
+    scored = sorted((i for i in items if i["risk_score"] is not None), key=lambda i: -i["risk_score"])
+    if scored:
+        lines.append("Highest predicted failure risk: " + ", ".join(
+            f"{i['number']} ({i['risk_score']:.0%})" for i in scored[:3]))
+    return lines
+
+
+def build_pack(items: list[dict], meeting: date, prepared_by: str = "") -> Document:
+    doc = Document()
+    style = doc.styles["Normal"]
+    style.font.name = "Calibri"
+    style.font.size = Pt(10)
+
+    long_date = f"{meeting:%B} {meeting.day}, {meeting.year}"
+    title = doc.add_heading(f"CCB Meeting Preparation — {long_date}", level=0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph("")
+    _heading_para(doc, "Meeting", f"Change Control Board (CCB) — {meeting:%A}, {long_date}, "
+                                  f"{_clock(meeting_start(meeting))} PT")
+    if prepared_by:
+        _heading_para(doc, "Prepared by", prepared_by)
+    _heading_para(doc, "Changes for Review", f"{len(items)} Changes")
+    _heading_para(doc, "Prepared", datetime.now().strftime("%B %d, %Y %H:%M"))
+
+    doc.add_heading("Executive Summary", level=1)
+    _add_summary(doc, items)
+
+    doc.add_heading("Detailed Change Reviews", level=1)
+    for i, item in enumerate(items, 1):
+        _add_detail(doc, i, item)
+
+    doc.add_page_break()
+    doc.add_heading("Summary of Recommendations", level=1)
+    build_table(doc, ["CHG #", "Title", "Recommendation"], [
+        [{"text": i["number"], "url": chg_url(i["number"])},
+         _field_value(i["change"], "short_description"),
+         {"text": VERDICTS[i["verdict"]][0], "bold": True, "color": VERDICTS[i["verdict"]][1]}]
+        for i in items
+    ], style="Light Grid Accent 1", space_pt=None, header_fill=None, header_color=None)
+
+    doc.add_paragraph("")
+    p = doc.add_paragraph()
+    p.add_run("Key Takeaways:").bold = True
+    for line in _takeaways(items, meeting):
+        doc.add_paragraph(line, style="List Bullet")
+    return doc
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def add_agenda_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by the tools that build on the CCB agenda (see ccb_questions.py)."""
+    parser.add_argument("meeting", type=date.fromisoformat, help="CCB meeting date (YYYY-MM-DD)")
+    parser.add_argument("--source", choices=["store", "api"], default="store",
+                        help="Read the agenda from the synced change store (default) or the Table API")
+    parser.add_argument("--no-sync", action="store_true", help="Use the change store as-is without a ServiceNow sync")
+    parser.add_argument("--similar", type=int, metavar="K", default=3,
+                        help="Similar past changes to list per change (default: 3, 0 to skip)")
+    parser.add_argument("--no-dup-check", action="store_true", help="Skip near-duplicate plan detection")
+
+
+def load_agenda(args: argparse.Namespace) -> list[dict]:
+    """Fetch and prepare the agenda for args.meeting; empty if nothing is on it."""
+    since_utc = _utc(meeting_start(args.meeting - timedelta(days=7)))
+    conn = connect()
+    if args.source == "api":
+        print("Querying CCB agenda from ServiceNow...")
+        changes = agenda_from_api(since_utc)
+        upsert_changes(conn, changes)
+    else:
+        if not args.no_sync:
+            print("Syncing change store...")
+            print(f"  {sync(conn)} change(s) updated")
+        changes = agenda_from_store(conn, since_utc)
+    if not changes:
+        print(f"No changes on the agenda for {args.meeting}.")
+        return []
+    print(f"Agenda: {len(changes)} change(s)")
+
+    plan_index = change_index = None
+    if not args.no_dup_check:
+        from plan_similarity import PlanIndex
+        plan_index = PlanIndex(conn)
+        plan_index.update_from_store()
+    if args.similar:
+        from change_index import ChangeIndex
+        change_index = ChangeIndex(conn)
+        change_index.update_from_store()
+
+    numbers = [_field_value(c, "number") for c in changes]
+    return prepare(changes, args.meeting, plan_index, change_index, args.similar, load_risk_scores(numbers))
+
+
+def main():
+    from ccb_questions import attach_questions
+
+    parser = argparse.ArgumentParser(description="Generate the CCB prep pack from live change data")
+    add_agenda_arguments(parser)
+    parser.add_argument("--prepared-by", default="", help="Name for the 'Prepared by' line")
+    parser.add_argument("--output", type=Path, help="Output .docx path")
+    args = parser.parse_args()
+
+    items = load_agenda(args)
+    if not items:
+        return
+    attach_questions(items, args.meeting)
+    doc = build_pack(items, args.meeting, args.prepared_by)
+
+    out_path = args.output
+    if not out_path:
+        filename = f"CCB_Prep_{args.meeting.isoformat()}.docx"
+        out_dir = OUTPUT_DIR / str(args.meeting.year)
+        out_path = out_dir / filename if out_dir.exists() else Path.cwd() / filename
+    doc.save(str(out_path))
+    for verdict in VERDICT_ORDER:
+        count = sum(1 for i in items if i["verdict"] == verdict)
+        if count:
+            print(f"  {verdict:<7} {count}")
+    print(f"Saved: {out_path}")
+    print(link_summary(doc))
+
+
+if __name__ == "__main__":
+    main()
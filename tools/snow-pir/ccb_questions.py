@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Rule-driven CCB question pack.
+
+Replaces the hand-written question()/note() calls of gen_ccb_questions_*.py.
+The field and plan gaps from the PIR policy checks, plus risk, type, CI,
+schedule, near-duplicate plans, similar past outcomes and predicted failure
+risk, are extracted once per agenda change into boolean/numeric feature
+columns. Every rule in RULES is a predicate over those columns, so the whole
+agenda is evaluated in one vectorised pass; each (rule, change) hit then
+formats that rule's question. Changes no rule fires on get FALLBACK_QUESTIONS.
+
+The agenda comes from ccb_pack (same store/API query and readiness verdicts),
+and ccb_pack.py includes the questions in each change's detail section.
+
+Usage:
+    python ccb_questions.py 2026-03-05                  # Sync change store, build question pack
+    python ccb_questions.py 2026-03-05 --no-sync --similar 0
+    python ccb_questions.py 2026-03-05 --source api --output questions.docx
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: 'numpy' package required. Install with: pip install numpy")
+    sys.exit(1)
+
+try:
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt, RGBColor
+except ImportError:
+    print("ERROR: 'python-docx' package required. Install with: pip install python-docx")
+    sys.exit(1)
+
+from docx_builder import add_hyperlink, chg_url, link_summary
+from pir_review import PLAN_FIELDS, REQUIRED_FIELDS, _field_value
+
+import ccb_pack
+from ccb_pack import EMERGENCY, RATIFY_STATES, VERDICTS, _clock, _local, _raw, full_window, meeting_start
+
+ELEVATED_RISKS = ("moderate", "high", "very high")
+HIGH_RISKS = ("high", "very high")
+PREDICTED_HIGH = 0.30       # Model failure probability worth raising at the board
+LONG_WINDOW_HOURS = 8
+SHORT_LEAD_DAYS = 3
+
+NOTE_COLOR = RGBColor(0x59, 0x56, 0x59)
+
+# Question pack sections: (heading, intro, verdicts)
+SECTIONS = [
+    ("Emergency Changes — Ratification Questions",
+     "Emergency changes for review. Confirm the emergency was justified and approved, and that "
+     "the outcome is recorded.", ("REVIEW",)),
+    ("Not Ready — Missing Information",
+     "These changes are missing required fields. Agree what must be added before they can be "
+     "authorized.", ("NO",)),
+    ("Advisory Changes — Discussion Questions",
+     "These changes have findings that require discussion or acknowledgment on the record.", ("YES*",)),
+    ("Ready Changes — Quick Confirmation Questions",
+     "These changes are ready for approval. Questions below are for verbal confirmation on the "
+     "record. Expect brief answers — keep momentum.", ("YES",)),
+]
+
+POLICY_REFERENCES = [
+    "ISMS-STA-11.01-01: Enterprise Change Management Program",
+    "ISMS-PROC-11.01-05: Procedure for Managing Change Request",
+    "ISMS-WI-11.01-06: Work Instruction for Submitting Change Request",
+]
+
+
+# ---------------------------------------------------------------------------
+# Features
+# ---------------------------------------------------------------------------
+
+def _hours(start: datetime | None, end: datetime | None) -> float:
+    return (end - start).total_seconds() / 3600 if start and end else 0.0
+
+
+def _join(names: list[str]) -> str:
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+
+def extract(items: list[dict], meeting: date) -> tuple[dict[str, np.ndarray], list[dict]]:
+    """One pass over the agenda: feature columns for the rules, plus per-change
+    values the question templates format with."""
+    meeting_at = meeting_start(meeting)
+    rows, context = [], []
+    for item in items:
+        change, status = item["change"], item["analysis"]["field_status"]
+        start, end = _local(_raw(change, "start_date")), _local(_raw(change, "end_date"))
+        created = _local(_raw(change, "sys_created_on"))
+        risk = _field_value(change, "risk")
+        failed = [h["number"] for h in item["similar"]
+                  if h["close_code"] and h["close_code"].lower() != "successful"]
+        dups = item["analysis"].get("plan_duplicates", {})
+        missing = [REQUIRED_FIELDS[f] for f, s in status.items() if s == "MISSING" and f not in PLAN_FIELDS]
+
+        row = {f"{s.lower()}:{f}": status.get(f) == s for f in REQUIRED_FIELDS for s in ("MISSING", "WEAK")}
+        row.update({
+            "emergency": _raw(change, "type") == EMERGENCY,
+            "executed": _raw(change, "state") in RATIFY_STATES,
+            "missing_fields": bool(missing),
+            "risk_elevated": risk.lower() in ELEVATED_RISKS,
+            "risk_high": risk.lower() in HIGH_RISKS,
+            "production": "prod" in _field_value(change, "u_environment").lower(),
+            "before_ccb": bool(start and start < meeting_at),
+            "same_day": bool(start and start.date() == meeting and start >= meeting_at),
+            "window_hours": _hours(start, end),
+            # Backdated or retro-entered records are raised after their start; ask about those separately
+            "lead_days": max(_hours(created, start) / 24, 0.0) if created and start else float("inf"),
+            "raised_late": bool(created and start and created > start),
+            "plan_duplicate": bool(dups),
+            "similar_failed": bool(failed),
+            "predicted": item["risk_score"] if item["risk_score"] is not None else 0.0,
+        })
+        rows.append(row)
+
+        dup_field = next(iter(dups), None)
+        context.append({
+            "start": f"{start:%m/%d} {_clock(start)} PT" if start else "TBD",
+            "window": full_window(change),
+            "window_hours": row["window_hours"],
+            "lead_days": row["lead_days"],
+            "risk": risk,
+            "cmdb_ci": _field_value(change, "cmdb_ci") or "the CI",
+            "environment": _field_value(change, "u_environment"),
+            "missing": _join(missing) if missing else "",
+            "missing_verb": "is" if len(missing) == 1 else "are",
+            "dup_plan": REQUIRED_FIELDS[dup_field].lower() if dup_field else "",
+            "dup_number": dups[dup_field][0]["number"] if dup_field else "",
+            "dup_similarity": dups[dup_field][0]["similarity"] if dup_field else 0.0,
+            "failed": _join(failed) if failed else "",
+            "failed_verb": "was" if len(failed) == 1 else "were",
+            "predicted": row["predicted"],
+        })
+
+    columns = {key: np.array([r[key] for r in rows]) for key in (rows[0] if rows else {})}
+    return columns, context
+
+
+# ---------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------
+
+# (rule id, predicate over the feature columns, question template). Order is
+# the order questions are asked in.
+RULES = [
+    ("emergency-justification", lambda F: F["emergency"] & F["executed"],
+     "This emergency was implemented {start}. What made it an emergency rather than a Normal "
+     "change, and who gave emergency approval before work started?"),
+    ("emergency-outcome", lambda F: F["emergency"] & F["executed"],
+     "Did the change achieve its objective? Any incidents, user impact, or follow-up work "
+     "that should be recorded in the PIR?"),
+    ("emergency-pending", lambda F: F["emergency"] & ~F["executed"],
+     "What is the business impact if this waits for the next regular CCB, and who has "
+     "approved it as an emergency?"),
+    ("missing-fields", lambda F: F["missing_fields"],
+     "{missing} {missing_verb} not filled in on the record. Can the change owner update it "
+     "before authorization?"),
+    ("missing-implementation", lambda F: F["missing:implementation_plan"],
+     "There is no implementation plan on the record. Walk us through the steps, who performs "
+     "each one, and how long it takes."),
+    ("missing-backout", lambda F: F["missing:backout_plan"],
+     "There is no backout plan. If the change fails mid-window, how do you restore service "
+     "and how long does that take?"),
+    ("missing-test", lambda F: F["missing:test_plan"],
+     "There is no test plan. How will you confirm the change worked, and who signs off?"),
+    ("weak-implementation", lambda F: F["weak:implementation_plan"],
+     "The implementation plan has no discrete steps. Can you break it into ordered steps "
+     "with owners and timings?"),
+    ("weak-backout", lambda F: F["weak:backout_plan"],
+     "The backout plan is a single statement. What exactly gets rolled back, in what order, "
+     "and what is the decision point to start it?"),
+    ("weak-test", lambda F: F["weak:test_plan"],
+     "The test plan doesn't list specific checks. What will you verify after implementation, "
+     "and what result means success?"),
+    ("plan-duplicate", lambda F: F["plan_duplicate"],
+     "The {dup_plan} is a {dup_similarity:.0%} match to {dup_number}. Has it been reviewed "
+     "for this change specifically, or carried over from the earlier one?"),
+    ("before-ccb", lambda F: F["before_ccb"] & ~F["emergency"],
+     "The planned start ({start}) is before this CCB. Has work already begun, or does the "
+     "schedule need to move?"),
+    ("same-day", lambda F: F["same_day"] & ~F["emergency"],
+     "This is scheduled for today ({start}), right after CCB. Are the implementers, "
+     "communications and support ready to go immediately on approval?"),
+    ("short-lead", lambda F: (F["lead_days"] < SHORT_LEAD_DAYS) & ~F["raised_late"] & ~F["emergency"],
+     "The request was raised {lead_days:.0f} day(s) before its planned start. Why the short "
+     "lead time, and have affected teams had enough notice?"),
+    ("raised-late", lambda F: F["raised_late"] & ~F["emergency"],
+     "The request was raised after its planned start ({start}). Was the work done before it "
+     "was recorded, and who approved it at the time?"),
+    ("high-risk", lambda F: F["risk_high"],
+     "Risk is rated {risk}. What is the blast radius if this fails, and will the vendor or "
+     "escalation contacts be on standby during the window?"),
+    ("production-elevated", lambda F: F["risk_elevated"] & ~F["risk_high"] & F["production"],
+     "This is a {risk}-risk change to {cmdb_ci} in {environment}. Have end users and the "
+     "Service Desk been told what to expect?"),
+    ("long-window", lambda F: (F["window_hours"] > LONG_WINDOW_HOURS) & ~F["emergency"],
+     "The window runs {window} ({window_hours:.0f} hours). Where are the checkpoints to "
+     "decide whether to continue or back out?"),
+    ("similar-failed", lambda F: F["similar_failed"],
+     "Similar past work ({failed}) {failed_verb} not closed Successful. What is different "
+     "this time, and were those lessons applied to the plan?"),
+    ("predicted-risk", lambda F: F["predicted"] >= PREDICTED_HIGH,
+     "The historical outcome model puts failure risk at {predicted:.0%}. Is there anything "
+     "about this change the board should know that the record doesn't show?"),
+]
+
+FALLBACK_QUESTIONS = [
+    "Any concerns or dependencies the board should know about before approving?",
+    "Have stakeholders and the Service Desk been notified of the planned window ({window})?",
+]
+
+
+def evaluate(columns: dict[str, np.ndarray], n: int) -> np.ndarray:
+    """(len(RULES), n) boolean matrix: which rules fire for which change."""
+    if not n:
+        return np.zeros((len(RULES), 0), dtype=bool)
+    return np.vstack([np.broadcast_to(when(columns), (n,)) for _, when, _ in RULES]).astype(bool)
+
+
+def generate(items: list[dict], meeting: date) -> list[list[dict]]:
+    """CCB questions for every agenda item: [[{"rule", "text"}, ...], ...] in agenda order."""
+    columns, context = extract(items, meeting)
+    hits = evaluate(columns, len(items))
+    questions = []
+    for i, values in enumerate(context):
+        fired = [{"rule": RULES[r][0], "text": RULES[r][2].format_map(values)} for r in np.flatnonzero(hits[:, i])]
+        if not fired:
+            fired = [{"rule": "fallback", "text": q.format_map(values).replace(" ()", "")}
+                     for q in FALLBACK_QUESTIONS]
+        questions.append(fired)
+    return questions
+
+
+def attach_questions(items: list[dict], meeting: date) -> list[dict]:
+    """Store each item's generated questions under item["questions"]."""
+    for item, questions in zip(items, generate(items, meeting)):
+        item["questions"] = questions
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _subtitle(doc, text: str) -> None:
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = p.add_run(text)
+    run.font.size = Pt(11)
+    run.font.color.rgb = NOTE_COLOR
+
+
+def chg_heading(doc, item: dict) -> None:
+    label, color = VERDICTS[item["verdict"]]
+    p = doc.add_paragraph()
+    add_hyperlink(p, item["number"], chg_url(item["number"]))
+    for text, rgb in ((f" — {_field_value(item['change'], 'short_description')}  |  ", None), (label, color)):
+        run = p.add_run(text)
+        run.font.size = Pt(11)
+        run.bold = True
+        if rgb:
+            run.font.color.rgb = RGBColor.from_string(rgb)
+
+
+def note(doc, bold_text: str, normal_text: str) -> None:
+    p = doc.add_paragraph()
+    p.paragraph_format.left_indent = Pt(18)
+    for text, bold in ((bold_text, True), (normal_text, False)):
+        run = p.add_run(text)
+        run.bold = bold
+        run.font.size = Pt(9)
+        run.font.color.rgb = NOTE_COLOR
+
+
+def add_questions(doc, questions: list[dict]) -> None:
+    for q in questions:
+        p = doc.add_paragraph(style="List Bullet")
+        p.add_run(q["text"]).font.size = Pt(10)
+
+
+def build_question_pack(items: list[dict], meeting: date, prepared_by: str = "") -> Document:
+    doc = Document()
+    style = doc.styles["Normal"]
+    style.font.name = "Calibri"
+    style.font.size = Pt(10)
+
+    title = doc.add_heading(f"CCB Meeting Questions — {meeting.isoformat()}", level=0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    _subtitle(doc, f"{meeting:%A}, {meeting:%B} {meeting.day}, {meeting.year} | "
+                   f"{_clock(meeting_start(meeting))} PT")
+    _subtitle(doc, f"{len(items)} Changes" + (f" | Prepared for: {prepared_by}" if prepared_by else ""))
+    doc.add_paragraph()
+
+    for heading, intro, verdicts in SECTIONS:
+        section = [i for i in items if i["verdict"] in verdicts]
+        if not section:
+            continue
+        doc.add_heading(heading, level=1)
+        doc.add_paragraph(f"{len(section)} change(s). {intro}")
+        for item in section:
+            chg_heading(doc, item)
+            assignee = _field_value(item["change"], "assigned_to")
+            group = _field_value(item["change"], "assignment_group")
+            note(doc, "Ask: ", assignee + (f" ({group})" if group else "") if assignee else group or "Change owner")
+            for reason in item["reasons"]:
+                note(doc, "Finding: ", reason)
+            add_questions(doc, item["questions"])
+            doc.add_paragraph()
+
+    doc.add_heading("Policy References", level=1)
+    for ref in POLICY_REFERENCES:
+        doc.add_paragraph(ref, style="List Bullet")
+    return doc
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate CCB meeting questions from the agenda's gaps")
+    ccb_pack.add_agenda_arguments(parser)
+    parser.add_argument("--prepared-for", default="", help="Name for the 'Prepared for' line")
+    parser.add_argument("--output", type=Path, help="Output .docx path")
+    args = parser.parse_args()
+
+    items = ccb_pack.load_agenda(args)
+    if not items:
+        return
+    attach_questions(items, args.meeting)
+    doc = build_question_pack(items, args.meeting, args.prepared_for)
+
+    out_path = args.output
+    if not out_path:
+        filename = f"CCB Questions {args.meeting.isoformat()}.docx"
+        out_dir = ccb_pack.OUTPUT_DIR / str(args.meeting.year)
+        out_path = out_dir / filename if out_dir.exists() else Path.cwd() / filename
+    doc.save(str(out_path))
+
+    counts = {}
+    for item in items:
+        for q in item["questions"]:
+            counts[q["rule"]] = counts.get(q["rule"], 0) + 1
+    print(f"  {sum(counts.values())} question(s) across {len(items)} change(s)")
+    for rule, count in sorted(counts.items(), key=lambda kv: -kv[1]):
+        print(f"    {rule:<24} {count}")
+    print(f"Saved: {out_path}")
+    print(link_summary(doc))
+
+
+if __name__ == "__main__":
+    main()
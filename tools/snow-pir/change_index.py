@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Similar-past-change retrieval over the change store.
+
+BM25 inverted index over short_description, description and the plan fields,
+with the configuration item and assignment group added as exact-match terms,
+so "how did changes like this one close?" is a few indexed lookups instead of
+a manual ServiceNow search. Postings live in the change store database and are
+rebuilt only for changes whose text changed since the last update.
+
+Usage:
+    python change_index.py CHG0039412            # Top 5 similar closed changes
+    python change_index.py CHG0039412 -k 10 --all-states
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+
+from change_store import connect, get_change, get_meta, iter_changes, set_meta
+from pir_review import _field_value
+
+# Short description counts double: it's the most deliberate summary of intent
+TEXT_FIELDS = {
+    "short_description": 2,
+    "description": 1,
+    "implementation_plan": 1,
+    "backout_plan": 1,
+    "test_plan": 1,
+}
+# Exact-match attributes, each contributed as one weighted token
+ATTR_FIELDS = {"cmdb_ci": ("ci", 3), "assignment_group": ("group", 2)}
+
+CLOSED_STATE = "3"
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Query terms beyond this many (by IDF) add latency but rarely change the ranking
+MAX_QUERY_TERMS = 40
+
+STOPWORDS = frozenset("""
+a an and are as at be been by can for from has have if in into is it its of on or that the
+their then there these this to was were will with we our you your all any not no n/a na
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sim_docs (
+    sys_id     TEXT PRIMARY KEY,
+    number     TEXT NOT NULL,
+    state      TEXT,
+    doc_len    INTEGER NOT NULL,
+    text_hash  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sim_postings (
+    term    TEXT NOT NULL,
+    sys_id  TEXT NOT NULL,
+    tf      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sim_postings_term ON sim_postings(term);
+CREATE INDEX IF NOT EXISTS sim_postings_doc ON sim_postings(sys_id);
+"""
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9\-\._]*[a-z0-9]|[a-z0-9]")
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def terms(change: dict) -> Counter:
+    """Weighted term frequencies for a change record."""
+    tf = Counter()
+    for field, weight in TEXT_FIELDS.items():
+        for word in _WORD.findall(_field_value(change, field).lower()):
+            if word not in STOPWORDS:
+                tf[word] += weight
+    for field, (prefix, weight) in ATTR_FIELDS.items():
+        value = _field_value(change, field).lower()
+        if value:
+            tf[f"{prefix}={value}"] += weight
+    return tf
+
+
+class ChangeIndex:
+    """BM25 index over stored changes."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        conn.executescript(SCHEMA)
+
+    def update(self, records: list[dict]) -> int:
+        """Index the given records. Returns how many had their postings rebuilt."""
+        known = dict(self.conn.execute("SELECT sys_id, text_hash FROM sim_docs"))
+        rebuilt = 0
+        for record in records:
+            sys_id = _raw(record, "sys_id")
+            if not sys_id:
+                continue
+            tf = terms(record)
+            text_hash = hashlib.sha1(repr(sorted(tf.items())).encode("utf-8")).hexdigest()
+            if known.get(sys_id) != text_hash:
+                if sys_id in known:
+                    self.conn.execute("DELETE FROM sim_postings WHERE sys_id = ?", (sys_id,))
+                self.conn.executemany(
+                    "INSERT INTO sim_postings (term, sys_id, tf) VALUES (?, ?, ?)",
+                    [(term, sys_id, n) for term, n in tf.items()],
+                )
+                rebuilt += 1
+            # State moves on without the text changing, so metadata is always refreshed
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sim_docs (sys_id, number, state, doc_len, text_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sys_id, _field_value(record, "number"), _raw(record, "state"), sum(tf.values()), text_hash),
+            )
+        self.conn.commit()
+        return rebuilt
+
+    def update_from_store(self) -> int:
+        """Index changes the store received since the last index update."""
+        watermark = get_meta(self.conn, "sim_index_watermark") or ""
+        # Inclusive, so a change synced later with the same sys_updated_on as the watermark
+        # isn't skipped; re-reading the ones already indexed costs a hash compare each
+        records = list(iter_changes(self.conn, "sys_updated_on >= ?", (watermark,)))
+        rebuilt = self.update(records)
+        if records:
+            set_meta(self.conn, "sim_index_watermark", max(_raw(r, "sys_updated_on") for r in records))
+            self.conn.commit()
+        return rebuilt
+
+    def search(self, change: dict, k: int = 5, closed_only: bool = True) -> list[dict]:
+        """Top-k stored changes most similar to `change`, best first.
+
+        Each hit is {"number", "score", "short_description", "cmdb_ci",
+        "assignment_group", "state", "close_code", "start_date"}.
+        """
+        n_docs, avg_len = self.conn.execute("SELECT COUNT(*), AVG(doc_len) FROM sim_docs").fetchone()
+        if not n_docs:
+            return []
+        query_tf = terms(change)
+        placeholders = ",".join("?" * len(query_tf))
+        df = dict(self.conn.execute(
+            f"SELECT term, COUNT(*) FROM sim_postings WHERE term IN ({placeholders}) GROUP BY term",
+            tuple(query_tf)))
+        idf = {t: math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+        query_terms = sorted(idf, key=idf.get, reverse=True)[:MAX_QUERY_TERMS]
+        if not query_terms:
+            return []
+
+        placeholders = ",".join("?" * len(query_terms))
+        state_filter = "AND d.state = ?" if closed_only else ""
+        params = (*query_terms, CLOSED_STATE) if closed_only else tuple(query_terms)
+        scores = Counter()
+        for term, sys_id, tf, doc_len in self.conn.execute(
+            "SELECT p.term, p.sys_id, p.tf, d.doc_len FROM sim_postings p JOIN sim_docs d USING (sys_id) "
+            f"WHERE p.term IN ({placeholders}) {state_filter}", params
+        ):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+            scores[sys_id] += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.pop(_raw(change, "sys_id"), None)
+
+        self_number = _field_value(change, "number")
+        hits = []
+        for sys_id, score in scores.most_common(k + 1):
+            row = self.conn.execute("SELECT record FROM changes WHERE sys_id = ?", (sys_id,)).fetchone()
+            if not row:
+                continue
+            record = json.loads(row[0])
+            if _field_value(record, "number") == self_number:
+                continue
+            hits.append({
+                "number": _field_value(record, "number"),
+                "score": round(score, 2),
+                "short_description": _field_value(record, "short_description"),
+                "cmdb_ci": _field_value(record, "cmdb_ci"),
+                "assignment_group": _field_value(record, "assignment_group"),
+                "state": _field_value(record, "state"),
+                "close_code": _field_value(record, "close_code"),
+                "start_date": _raw(record, "start_date")[:10],
+            })
+        return hits[:k]
+
+
+def open_index(sync_store: bool = True) -> ChangeIndex:
+    """Open the change store, optionally sync it, and bring the index up to date."""
+    from change_store import sync
+    conn = connect()
+    if sync_store:
+        sync(conn)
+    index = ChangeIndex(conn)
+    index.update_from_store()
+    return index
+
+
+def similar_changes(change: dict, k: int = 5, closed_only: bool = True,
+                    index: ChangeIndex | None = None) -> list[dict]:
+    """Top-k similar historical changes for a change record (see ChangeIndex.search)."""
+    return (index or open_index()).search(change, k, closed_only)
+
+
+def format_similar(hits: list[dict]) -> list[str]:
+    """Render search hits as one line each."""
+    return [
+        f"{h['number']}  {h['start_date']}  {h['close_code'] or h['state'] or '-':<28} "
+        f"{h['short_description'][:60]}"
+        for h in hits
+    ]
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Find similar past changes in the change store")
+    parser.add_argument("changes", nargs="+", help="CHG numbers to look up")
+    parser.add_argument("-k", type=int, default=5, help="Number of similar changes to show (default: 5)")
+    parser.add_argument("--all-states", action="store_true", help="Include changes that are not Closed")
+    parser.add_argument("--no-sync", action="store_true", help="Use the store as-is without a ServiceNow sync")
+    args = parser.parse_args()
+
+    index = open_index(sync_store=not args.no_sync)
+    for number in args.changes:
+        change = get_change(index.conn, number)
+        if not change:
+            print(f"  WARN: {number} not in change store, skipping")
+            continue
+        start = time.perf_counter()
+        hits = index.search(change, args.k, closed_only=not args.all_states)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"--- {number}: {_field_value(change, 'short_description')} ({elapsed_ms:.0f} ms) ---")
+        for line in format_similar(hits) or ["No similar changes found."]:
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+ITIL 4 Change Enablement / ISMS practice indicators from the change store.
+
+Aggregates the change store into additive per-month counters (by planned start
+month) in one pass over the records, and keeps them in the store's
+metrics_monthly table. Later runs only re-aggregate months that received new or
+updated records since the last run, or whose record count no longer matches
+(a change moved to another month). Any window of months is then summed and
+turned into the practice indicators the compliance reports show:
+
+  - complete plans: implementation, backout and test plan all assessed OK
+  - emergency ratio
+  - PIR completion: closed changes with a close code and close notes
+  - unauthorized changes: non-emergency work started before, or ran past, the
+    authorized planned window (work_start/work_end vs start_date/end_date)
+  - lead time (created -> planned start) distribution for non-emergency changes
+
+Usage:
+    python change_metrics.py                    # Update, then show the trailing 12 months
+    python change_metrics.py --months 6 --end 2026-02
+    python change_metrics.py --rebuild
+"""
+
+import argparse
+from datetime import date, datetime
+from pathlib import Path
+
+from change_store import (
+    STORE_FILE, connect, get_meta, iter_changes, load_monthly_metrics, save_monthly_metrics, set_meta,
+)
+from pir_review import PLAN_FIELDS, _assess_plan, _field_value
+
+CLOSED_STATE = "3"
+CANCELED_STATE = "4"
+EMERGENCY = "emergency"
+SUCCESS_CODE = "successful"
+SN_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Lead-time histogram bucket lower edges, in days; the last bucket is open-ended
+LEAD_EDGES = [0, 1, 2, 3, 5, 7, 14, 30, 60]
+
+# (key, label, target text, passes(value)) -- value None means no data
+INDICATORS = [
+    ("complete_plan_rate", "Changes with complete plans", ">= 90%", lambda v: v >= 0.90),
+    ("emergency_ratio", "Emergency change ratio", "<= 10%", lambda v: v <= 0.10),
+    ("pir_rate", "PIR completion (closed changes)", ">= 95%", lambda v: v >= 0.95),
+    ("emergency_pir_rate", "PIR completion (emergency changes)", "100%", lambda v: v >= 1.0),
+    ("success_rate", "Closed Successful", ">= 95%", lambda v: v >= 0.95),
+    ("unauthorized", "Unauthorized changes (outside window)", "0", lambda v: v == 0),
+    ("lead_median", "Lead time, median (non-emergency)", ">= 5 days", lambda v: v >= 5),
+    ("lead_short_rate", "Lead time under 3 days (non-emergency)", "<= 10%", lambda v: v <= 0.10),
+]
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def _days_between(start: str, end: str) -> float | None:
+    try:
+        delta = datetime.strptime(end, SN_TS_FORMAT) - datetime.strptime(start, SN_TS_FORMAT)
+    except ValueError:
+        return None
+    return delta.total_seconds() / 86400
+
+
+# ---------------------------------------------------------------------------
+# Monthly counters
+# ---------------------------------------------------------------------------
+
+def empty_counters() -> dict:
+    return {
+        "records": 0, "canceled": 0, "changes": 0, "by_type": {},
+        "plans_complete": 0, "plan_missing": {f: 0 for f in sorted(PLAN_FIELDS)},
+        "plan_weak": {f: 0 for f in sorted(PLAN_FIELDS)},
+        "emergency": 0, "closed": 0, "pir_complete": 0, "successful": 0,
+        "emergency_closed": 0, "emergency_pir_complete": 0,
+        "unauthorized": 0, "unauthorized_numbers": [],
+        "lead_hist": [0] * len(LEAD_EDGES), "lead_days_sum": 0.0,
+    }
+
+
+def _lead_bucket(days: float) -> int:
+    for i in range(len(LEAD_EDGES) - 1, -1, -1):
+        if days >= LEAD_EDGES[i]:
+            return i
+    return 0
+
+
+def accumulate(c: dict, record: dict) -> None:
+    """Add one change record to a month's counters."""
+    c["records"] += 1
+    if _raw(record, "state") == CANCELED_STATE:
+        c["canceled"] += 1
+        return
+    c["changes"] += 1
+    change_type = _raw(record, "type") or "unknown"
+    c["by_type"][change_type] = c["by_type"].get(change_type, 0) + 1
+    emergency = change_type == EMERGENCY
+
+    statuses = {f: _assess_plan(_field_value(record, f)) for f in PLAN_FIELDS}
+    if all(s == "OK" for s in statuses.values()):
+        c["plans_complete"] += 1
+    for f, s in statuses.items():
+        if s == "MISSING":
+            c["plan_missing"][f] += 1
+        elif s == "WEAK":
+            c["plan_weak"][f] += 1
+
+    if _raw(record, "state") == CLOSED_STATE:
+        pir = bool(_raw(record, "close_code") and _field_value(record, "close_notes"))
+        c["closed"] += 1
+        c["pir_complete"] += pir
+        c["successful"] += _raw(record, "close_code").lower() == SUCCESS_CODE
+        if emergency:
+            c["emergency_closed"] += 1
+            c["emergency_pir_complete"] += pir
+
+    if emergency:
+        c["emergency"] += 1
+        return
+    start, end = _raw(record, "start_date"), _raw(record, "end_date")
+    work_start, work_end = _raw(record, "work_start"), _raw(record, "work_end")
+    if (work_start and start and work_start < start) or (work_end and end and work_end > end):
+        c["unauthorized"] += 1
+        c["unauthorized_numbers"].append(_raw(record, "number"))
+    lead = _days_between(_raw(record, "sys_created_on"), start)
+    if lead is not None:
+        c["lead_hist"][_lead_bucket(max(lead, 0.0))] += 1
+        c["lead_days_sum"] += max(lead, 0.0)
+
+
+def _stale_months(conn, rebuild: bool) -> list[str]:
+    """Months whose stored counters may be out of date.
+
+    Includes stored months that no longer have any changes (their last change
+    was rescheduled into another month), so their counters get dropped.
+    """
+    counts = dict(conn.execute(
+        "SELECT substr(start_date, 1, 7), COUNT(*) FROM changes WHERE start_date != '' GROUP BY 1"
+    ).fetchall())
+    if rebuild:
+        return sorted(counts)
+    stored = load_monthly_metrics(conn)
+    stale = {m for m, n in counts.items() if m not in stored or stored[m]["records"] != n}
+    stale.update(m for m in stored if m not in counts)
+    watermark = get_meta(conn, "metrics_watermark")
+    if watermark:
+        stale.update(m for (m,) in conn.execute(
+            "SELECT DISTINCT substr(start_date, 1, 7) FROM changes WHERE sys_updated_on >= ? AND start_date != ''",
+            (watermark,)))
+    return sorted(stale)
+
+
+def update_monthly(conn, rebuild: bool = False) -> list[str]:
+    """Re-aggregate stale months in a single pass. Returns the months recomputed."""
+    months = _stale_months(conn, rebuild)
+    if rebuild:
+        conn.execute("DELETE FROM metrics_monthly")
+    if months:
+        counters = {m: empty_counters() for m in months}
+        placeholders = ",".join("?" * len(months))
+        for record in iter_changes(conn, f"substr(start_date, 1, 7) IN ({placeholders})", tuple(months)):
+            accumulate(counters[_raw(record, "start_date")[:7]], record)
+        emptied = [m for m, c in counters.items() if not c["records"]]
+        if emptied:
+            conn.executemany("DELETE FROM metrics_monthly WHERE month = ?", [(m,) for m in emptied])
+        save_monthly_metrics(conn, {m: c for m, c in counters.items() if c["records"]})
+    latest = conn.execute("SELECT MAX(sys_updated_on) FROM changes").fetchone()[0]
+    if latest:
+        set_meta(conn, "metrics_watermark", latest)
+        conn.commit()
+    return months
+
+
+# ---------------------------------------------------------------------------
+# Indicators
+# ---------------------------------------------------------------------------
+
+def combine(months: list[dict]) -> dict:
+    """Sum per-month counters into one window."""
+    total = empty_counters()
+    for c in months:
+        for key, value in c.items():
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    total[key][k] = total[key].get(k, 0) + v
+            elif isinstance(value, list) and key == "lead_hist":
+                total[key] = [a + b for a, b in zip(total[key], value)]
+            else:
+                total[key] += value
+    return total
+
+
+def _hist_percentile(hist: list[int], q: float) -> float | None:
+    """q-th quantile in days, interpolated linearly within its bucket."""
+    n = sum(hist)
+    if not n:
+        return None
+    target, seen = q * n, 0
+    for i, count in enumerate(hist):
+        if count and seen + count >= target:
+            lo = LEAD_EDGES[i]
+            hi = LEAD_EDGES[i + 1] if i + 1 < len(LEAD_EDGES) else lo
+            return lo + (hi - lo) * (target - seen) / count
+        seen += count
+    return float(LEAD_EDGES[-1])
+
+
+def _ratio(num: int, den: int) -> float | None:
+    return num / den if den else None
+
+
+def indicators(c: dict) -> dict:
+    lead_n = sum(c["lead_hist"])
+    short = sum(n for edge, n in zip(LEAD_EDGES, c["lead_hist"]) if edge < 3)
+    return {
+        "changes": c["changes"],
+        "canceled": c["canceled"],
+        "by_type": c["by_type"],
+        "complete_plan_rate": _ratio(c["plans_complete"], c["changes"]),
+        "emergency_ratio": _ratio(c["emergency"], c["changes"]),
+        "pir_rate": _ratio(c["pir_complete"], c["closed"]),
+        "emergency_pir_rate": _ratio(c["emergency_pir_complete"], c["emergency_closed"]),
+        "success_rate": _ratio(c["successful"], c["closed"]),
+        "unauthorized": c["unauthorized"],
+        "unauthorized_numbers": c["unauthorized_numbers"],
+        "lead_median": _hist_percentile(c["lead_hist"], 0.5),
+        "lead_p90": _hist_percentile(c["lead_hist"], 0.9),
+        "lead_mean": c["lead_days_sum"] / lead_n if lead_n else None,
+        "lead_short_rate": _ratio(short, lead_n),
+        "lead_hist": dict(zip((f"{e}+" for e in LEAD_EDGES), c["lead_hist"])),
+        "plan_missing": c["plan_missing"],
+        "plan_weak": c["plan_weak"],
+    }
+
+
+def _shift_month(month: str, delta: int) -> str:
+    y, m = map(int, month.split("-"))
+    index = y * 12 + m - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def window_indicators(conn, end_month: str, months: int = 12) -> dict:
+    first = _shift_month(end_month, -(months - 1))
+    result = indicators(combine(list(load_monthly_metrics(conn, first, end_month).values())))
+    result["window"] = (first, end_month)
+    return result
+
+
+def format_value(key: str, value) -> str:
+    if value is None:
+        return "—"
+    if key.startswith("lead_") and not key.endswith("_rate"):
+        return f"{value:.1f} days"
+    if key.endswith("_rate") or key.endswith("_ratio"):
+        return f"{value:.0%}"
+    return str(value)
+
+
+def indicator_rows(result: dict) -> list[tuple[str, str, str, str]]:
+    """(label, value, PASS/FLAG/N/A, target) for each practice indicator."""
+    rows = []
+    for key, label, target, passes in INDICATORS:
+        value = result[key]
+        status = "N/A" if value is None else ("PASS" if passes(value) else "FLAG")
+        rows.append((label, format_value(key, value), status, target))
+    return rows
+
+
+def trailing_indicators(before: date, months: int = 12, path: Path = STORE_FILE) -> dict | None:
+    """Indicators for the `months` whole months before `before`, updating the
+    store's monthly counters first. None if there is no change store."""
+    if not Path(path).exists():
+        return None
+    conn = connect(path)
+    update_monthly(conn)
+    result = window_indicators(conn, _shift_month(before.strftime("%Y-%m"), -1), months)
+    conn.close()
+    return result
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute change practice indicators from the change store")
+    parser.add_argument("--months", type=int, default=12, help="Window length in months (default: 12)")
+    parser.add_argument("--end", help="Last month of the window, YYYY-MM (default: last complete month)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-aggregate every month from scratch")
+    args = parser.parse_args()
+
+    conn = connect()
+    recomputed = update_monthly(conn, args.rebuild)
+    print(f"Aggregated {len(recomputed)} month(s)" + (f": {', '.join(recomputed)}" if recomputed else ""))
+
+    end = args.end or _shift_month(date.today().strftime("%Y-%m"), -1)
+    first = _shift_month(end, -(args.months - 1))
+    monthly = load_monthly_metrics(conn, first, end)
+    print(f"\n  {'Month':<8} {'Changes':>7} {'Emerg':>6} {'Plans OK':>9} {'PIR':>6} {'Unauth':>7} {'Lead p50':>9}")
+    for month, counters in monthly.items():
+        m = indicators(counters)
+        print(f"  {month:<8} {m['changes']:>7} {format_value('emergency_ratio', m['emergency_ratio']):>6} "
+              f"{format_value('complete_plan_rate', m['complete_plan_rate']):>9} "
+              f"{format_value('pir_rate', m['pir_rate']):>6} {m['unauthorized']:>7} "
+              f"{format_value('lead_median', m['lead_median']):>9}")
+
+    result = window_indicators(conn, end, args.months)
+    print(f"\nPractice indicators {first} .. {end} ({result['changes']} changes, {result['canceled']} canceled):")
+    for label, value, status, target in indicator_rows(result):
+        print(f"  {status:<4}  {label:<42} {value:>10}  (target {target})")
+    if result["unauthorized_numbers"]:
+        print(f"  Outside window: {', '.join(result['unauthorized_numbers'][:20])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Local change_request history store.
+
+Keeps a SQLite copy of change_request records (as returned by the Table API
+with sysparm_display_value=all) so analyses that need history -- duplicate
+plan detection, similar-change lookup, outcome models -- don't have to page
+through ServiceNow on every run. Syncs incrementally on sys_updated_on.
+
+Usage:
+    python change_store.py                   # Incremental sync since last watermark
+    python change_store.py --since 2025-01-01
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+STORE_FILE = Path(os.environ.get("CHANGE_STORE_DB", Path(__file__).resolve().parent / "change_store.db"))
+
+# Fields mirrored locally: everything analyze_change needs plus outcome/scheduling data
+STORE_FIELDS = [
+    "sys_id", "number", "state", "sys_created_on", "sys_updated_on",
+    "type", "requested_by", "cmdb_ci", "u_environment", "assignment_group", "assigned_to",
+    "short_description", "description", "justification",
+    "implementation_plan", "risk_impact_analysis", "backout_plan", "test_plan",
+    "start_date", "end_date", "work_start", "work_end",
+    "risk", "impact", "priority", "on_hold",
+    "close_code", "close_notes", "closed_at",
+]
+
+# Incident fields mirrored for change/incident correlation (see incident_correlation.py)
+INCIDENT_FIELDS = [
+    "sys_id", "number", "short_description", "cmdb_ci", "opened_at", "priority", "state",
+    "assignment_group", "caused_by", "sys_updated_on",
+]
+
+# First sync with no watermark backfills this far
+DEFAULT_BACKFILL = timedelta(days=365)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    sys_id          TEXT PRIMARY KEY,
+    number          TEXT NOT NULL,
+    state           TEXT,
+    start_date      TEXT,
+    sys_updated_on  TEXT,
+    record          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_number ON changes(number);
+CREATE INDEX IF NOT EXISTS changes_start ON changes(start_date);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS risk_scores (
+    number     TEXT PRIMARY KEY,
+    score      REAL NOT NULL,
+    scored_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics_monthly (
+    month        TEXT PRIMARY KEY,
+    data         TEXT NOT NULL,
+    computed_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state_transitions (
+    sys_id     TEXT NOT NULL,
+    at         TEXT NOT NULL,
+    old_state  TEXT,
+    new_state  TEXT NOT NULL,
+    PRIMARY KEY (sys_id, at, new_state)
+);
+CREATE TABLE IF NOT EXISTS audit_fetched (
+    sys_id   TEXT PRIMARY KEY,
+    through  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cycle_times (
+    period_start  TEXT NOT NULL,
+    period_end    TEXT NOT NULL,
+    dimension     TEXT NOT NULL,
+    value         TEXT NOT NULL,
+    state         TEXT NOT NULL,
+    n             INTEGER NOT NULL,
+    mean_days     REAL,
+    p50_days      REAL,
+    p75_days      REAL,
+    p90_days      REAL,
+    computed_at   TEXT NOT NULL,
+    PRIMARY KEY (period_start, period_end, dimension, value, state)
+);
+CREATE TABLE IF NOT EXISTS incidents (
+    sys_id          TEXT PRIMARY KEY,
+    number          TEXT NOT NULL,
+    cmdb_ci         TEXT,
+    opened_at       TEXT,
+    priority        TEXT,
+    sys_updated_on  TEXT,
+    record          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_opened ON incidents(opened_at);
+CREATE TABLE IF NOT EXISTS ci_relations (
+    parent  TEXT NOT NULL,
+    child   TEXT NOT NULL,
+    PRIMARY KEY (parent, child)
+);
+CREATE TABLE IF NOT EXISTS change_incidents (
+    change       TEXT NOT NULL,
+    incident     TEXT NOT NULL,
+    relation     TEXT NOT NULL,
+    hours_after  REAL,
+    priority     TEXT,
+    computed_at  TEXT NOT NULL,
+    PRIMARY KEY (change, incident)
+);
+"""
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def connect(path: Path = STORE_FILE) -> sqlite3.Connection:
+    """Open (creating if needed) the change store."""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def upsert_changes(conn: sqlite3.Connection, records: list[dict]) -> int:
+    """Insert or replace change records. Returns the number written."""
+    rows = [
+        (_raw(r, "sys_id"), _raw(r, "number"), _raw(r, "state"), _raw(r, "start_date"),
+         _raw(r, "sys_updated_on"), json.dumps(r))
+        for r in records
+        if _raw(r, "sys_id")
+    ]
+    conn.executemany(
+        "INSERT OR REPLACE INTO changes (sys_id, number, state, start_date, sys_updated_on, record) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    return len(rows)
+
+
+def iter_changes(conn: sqlite3.Connection, where: str = "", params: tuple = ()) -> Iterator[dict]:
+    """Yield stored records, optionally filtered by a SQL WHERE clause on the indexed columns."""
+    sql = "SELECT record FROM changes" + (f" WHERE {where}" if where else "")
+    for (record,) in conn.execute(sql, params):
+        yield json.loads(record)
+
+
+def get_change(conn: sqlite3.Connection, number: str) -> dict | None:
+    row = conn.execute("SELECT record FROM changes WHERE number = ?", (number,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_risk_scores(conn: sqlite3.Connection, scores: dict[str, float]) -> None:
+    """Record predicted failure probabilities by change number (see risk_model.py)."""
+    scored_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    conn.executemany(
+        "INSERT OR REPLACE INTO risk_scores (number, score, scored_at) VALUES (?, ?, ?)",
+        [(number, score, scored_at) for number, score in scores.items()],
+    )
+    conn.commit()
+
+
+def load_risk_scores(numbers: list[str] | None = None, path: Path = STORE_FILE) -> dict[str, float]:
+    """Predicted failure probability by change number; empty if the store doesn't exist."""
+    if not Path(path).exists():
+        return {}
+    conn = connect(path)
+    rows = conn.execute("SELECT number, score FROM risk_scores").fetchall()
+    conn.close()
+    wanted = set(numbers) if numbers is not None else None
+    return {n: s for n, s in rows if wanted is None or n in wanted}
+
+
+def save_monthly_metrics(conn: sqlite3.Connection, months: dict[str, dict]) -> None:
+    """Record per-month practice counters by YYYY-MM (see change_metrics.py)."""
+    computed_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    conn.executemany(
+        "INSERT OR REPLACE INTO metrics_monthly (month, data, computed_at) VALUES (?, ?, ?)",
+        [(month, json.dumps(data), computed_at) for month, data in months.items()],
+    )
+    conn.commit()
+
+
+def load_monthly_metrics(conn: sqlite3.Connection, first: str = "", last: str = "9999-99") -> dict[str, dict]:
+    """Per-month practice counters for months first..last inclusive."""
+    rows = conn.execute(
+        "SELECT month, data FROM metrics_monthly WHERE month BETWEEN ? AND ? ORDER BY month", (first, last)
+    ).fetchall()
+    return {month: json.loads(data) for month, data in rows}
+
+
+def save_transitions(conn: sqlite3.Connection, rows: list[tuple], fetched: dict[str, str]) -> None:
+    """Record (sys_id, at, old_state, new_state) rows and how far each change's audit was read."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO state_transitions (sys_id, at, old_state, new_state) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO audit_fetched (sys_id, through) VALUES (?, ?)", list(fetched.items())
+    )
+    conn.commit()
+
+
+def load_transitions(conn: sqlite3.Connection, sys_ids: list[str]) -> dict[str, list[tuple]]:
+    """Cached state transitions by sys_id as (at, old_state, new_state), oldest first."""
+    found = {sys_id: [] for sys_id in sys_ids}
+    for start in range(0, len(sys_ids), 500):
+        chunk = sys_ids[start:start + 500]
+        rows = conn.execute(
+            f"SELECT sys_id, at, old_state, new_state FROM state_transitions "
+            f"WHERE sys_id IN ({','.join('?' * len(chunk))}) ORDER BY at",
+            chunk,
+        )
+        for sys_id, at, old, new in rows:
+            found[sys_id].append((at, old, new))
+    return found
+
+
+def save_cycle_times(conn: sqlite3.Connection, period: tuple[str, str], rows: list[tuple]) -> None:
+    """Replace a period's dwell-time percentiles (see cycle_time.py).
+
+    Rows are (dimension, value, state, n, mean, p50, p75, p90) in days.
+    """
+    computed_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("DELETE FROM cycle_times WHERE period_start = ? AND period_end = ?", period)
+    conn.executemany(
+        "INSERT INTO cycle_times (period_start, period_end, dimension, value, state, n, "
+        "mean_days, p50_days, p75_days, p90_days, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(*period, *row, computed_at) for row in rows],
+    )
+    conn.commit()
+
+
+def upsert_incidents(conn: sqlite3.Connection, records: list[dict]) -> int:
+    """Insert or replace incident records. Returns the number written."""
+    rows = [
+        (_raw(r, "sys_id"), _raw(r, "number"), _raw(r, "cmdb_ci"), _raw(r, "opened_at"), _raw(r, "priority"),
+         _raw(r, "sys_updated_on"), json.dumps(r))
+        for r in records
+        if _raw(r, "sys_id")
+    ]
+    conn.executemany(
+        "INSERT OR REPLACE INTO incidents (sys_id, number, cmdb_ci, opened_at, priority, sys_updated_on, record) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    return len(rows)
+
+
+def save_ci_relations(conn: sqlite3.Connection, cis: list[str], pairs: list[tuple[str, str]]) -> None:
+    """Replace the stored cmdb_rel_ci (parent, child) pairs touching these CIs."""
+    for start in range(0, len(cis), 500):
+        chunk = cis[start:start + 500]
+        marks = ",".join("?" * len(chunk))
+        conn.execute(f"DELETE FROM ci_relations WHERE parent IN ({marks}) OR child IN ({marks})", chunk * 2)
+    conn.executemany("INSERT OR IGNORE INTO ci_relations (parent, child) VALUES (?, ?)", pairs)
+    conn.commit()
+
+
+def save_change_incidents(conn: sqlite3.Connection, changes: list[str], rows: list[tuple]) -> None:
+    """Replace the correlated incidents of these change numbers.
+
+    Rows are (change, incident, relation, hours_after, priority).
+    """
+    computed_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    for start in range(0, len(changes), 500):
+        chunk = changes[start:start + 500]
+        conn.execute(f"DELETE FROM change_incidents WHERE change IN ({','.join('?' * len(chunk))})", chunk)
+    conn.executemany(
+        "INSERT OR REPLACE INTO change_incidents (change, incident, relation, hours_after, priority, computed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(*row, computed_at) for row in rows],
+    )
+    conn.commit()
+
+
+def load_change_incidents(conn: sqlite3.Connection, relations: tuple[str, ...] | None = None,
+                          max_priority: str = "5") -> dict[str, list[tuple]]:
+    """Correlated incidents by change number as (incident, relation, hours_after, priority)."""
+    found: dict[str, list[tuple]] = {}
+    rows = conn.execute(
+        "SELECT change, incident, relation, hours_after, priority FROM change_incidents "
+        "WHERE priority != '' AND priority <= ? ORDER BY change, hours_after", (max_priority,)
+    )
+    for change, incident, relation, hours, priority in rows:
+        if relations is None or relation in relations:
+            found.setdefault(change, []).append((incident, relation, hours, priority))
+    return found
+
+
+def sync_incidents(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Pull every incident updated since the stored incident watermark (or `since`)."""
+    from pir_review import query_table
+
+    since = since or get_meta(conn, "incident_watermark")
+    if not since:
+        since = (datetime.now(timezone.utc) - DEFAULT_BACKFILL).strftime("%Y-%m-%d %H:%M:%S")
+    records = query_table("incident", f"sys_updated_on>={since}^ORDERBYsys_updated_on",
+                          fields=INCIDENT_FIELDS, limit=1000)
+    written = upsert_incidents(conn, records)
+    if records:
+        set_meta(conn, "incident_watermark", max(_raw(r, "sys_updated_on") for r in records))
+        conn.commit()
+    return written
+
+
+def sync(conn: sqlite3.Connection, since: str | None = None) -> int:
+    """Pull every change updated since the stored watermark (or `since`)."""
+    from pir_review import query_changes_since
+
+    since = since or get_meta(conn, "watermark")
+    if not since:
+        since = (datetime.now(timezone.utc) - DEFAULT_BACKFILL).strftime("%Y-%m-%d %H:%M:%S")
+    records = query_changes_since(since, fields=STORE_FIELDS)
+    written = upsert_changes(conn, records)
+    if records:
+        set_meta(conn, "watermark", max(_raw(r, "sys_updated_on") for r in records))
+        conn.commit()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local change_request history store")
+    parser.add_argument("--since", type=str, help="Sync changes updated since this UTC date/time (default: watermark)")
+    args = parser.parse_args()
+
+    conn = connect()
+    since = args.since
+    if since and len(since) == 10:
+        since += " 00:00:00"
+    print(f"Syncing change store {STORE_FILE}...")
+    written = sync(conn, since)
+    total = conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+    print(f"  {written} change(s) updated, {total} in store (watermark {get_meta(conn, 'watermark')})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Change lifecycle cycle times: how long changes spend in each state.
+
+Streams every change_request state transition in sys_audit for a date range
+-- one-day slices fetched concurrently, each parsed page by page -- into the
+change store's state_transitions cache (see state_audit.py). The streamed
+range is checkpointed in the store's meta table after every slice, in order,
+so an interrupted run resumes where it stopped and later runs only fetch what
+lies outside the range already covered.
+
+Dwell times for changes created in the range are then computed with NumPy
+from completed state segments (time in a change's current state is still
+running, so it is left out) and summarised as n / mean / p50 / p75 / p90 days
+per state, overall and by assignment group and type. The percentiles are
+written to the store's cycle_times table for the Power BI workbook.
+
+Usage:
+    python cycle_time.py                              # Last 90 days
+    python cycle_time.py --since 2026-01-01 --until 2026-04-01 --groups
+    python cycle_time.py --since 2025-10-01 --csv cycle_times.csv --workers 8
+"""
+
+import argparse
+import csv
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: 'numpy' package required. Install with: pip install numpy")
+    sys.exit(1)
+
+from change_store import (
+    STORE_FILE, connect, get_meta, iter_changes, load_transitions, save_cycle_times, save_transitions, set_meta, sync,
+)
+from pir_review import _field_value
+from state_audit import AUDIT_FIELDS, AUDIT_LAG, SN_TS_FORMAT, STATE_LABELS, STATES, _raw, dwell_matrix, segments
+
+SLICE = timedelta(days=1)
+PAGE_SIZE = 1000
+DEFAULT_WORKERS = 4
+DEFAULT_DAYS = 90
+PERCENTILES = [50, 75, 90]
+
+# States whose dwell time is a queue the CAB can act on (Closed/Canceled are terminal)
+LIFECYCLE_STATES = ["-5", "-4", "-3", "-2", "-1", "0"]
+DIMENSIONS = [("all", None), ("type", "type"), ("assignment_group", "assignment_group")]
+
+
+# ---------------------------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------------------------
+
+def _fetch_slice(bounds: tuple[str, str]) -> list[tuple]:
+    """All state transitions audited in [lo, hi), parsed page by page."""
+    from pir_review import iter_table
+
+    lo, hi = bounds
+    query = (f"tablename=change_request^fieldname=state^sys_created_on>={lo}^sys_created_on<{hi}"
+             f"^ORDERBYsys_created_on")
+    rows = []
+    for page in iter_table("sys_audit", query, fields=AUDIT_FIELDS, limit=PAGE_SIZE):
+        rows.extend(
+            (_raw(r, "documentkey"), _raw(r, "sys_created_on"), _raw(r, "oldvalue"), _raw(r, "newvalue"))
+            for r in page
+            if _raw(r, "newvalue")
+        )
+    return rows
+
+
+def _slices(lo: datetime, hi: datetime) -> list[tuple[str, str]]:
+    bounds = []
+    while lo < hi:
+        step = min(lo + SLICE, hi)
+        bounds.append((lo.strftime(SN_TS_FORMAT), step.strftime(SN_TS_FORMAT)))
+        lo = step
+    return bounds
+
+
+def _stream(conn, slices: list[tuple[str, str]], checkpoint: str, backwards: bool, workers: int) -> int:
+    """Fetch slices concurrently; save each and move the checkpoint in slice order."""
+    fetched = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (lo, hi), rows in zip(slices, pool.map(_fetch_slice, slices)):
+            save_transitions(conn, rows, {})
+            set_meta(conn, checkpoint, lo if backwards else hi)
+            conn.commit()
+            fetched += len(rows)
+            print(f"  {lo[:10]}: {len(rows)} transition(s)")
+    return fetched
+
+
+def extract(conn, since: datetime, until: datetime, workers: int = DEFAULT_WORKERS) -> int:
+    """Extend the streamed audit range to cover [since, until). Returns transitions fetched.
+
+    The covered range (meta audit_stream_from .. audit_stream_through) stays
+    contiguous: it grows backwards to `since` and forwards to `until`.
+    """
+    until = min(until, datetime.now(timezone.utc) - AUDIT_LAG)
+    start, through = get_meta(conn, "audit_stream_from"), get_meta(conn, "audit_stream_through")
+    if not start:
+        start = through = since.strftime(SN_TS_FORMAT)
+        set_meta(conn, "audit_stream_from", start)
+        set_meta(conn, "audit_stream_through", through)
+        conn.commit()
+
+    def parse(text):
+        return datetime.strptime(text, SN_TS_FORMAT).replace(tzinfo=timezone.utc)
+
+    back = _slices(since, parse(start))[::-1]
+    ahead = _slices(parse(through), until)
+    if not back and not ahead:
+        return 0
+
+    from pir_review import get_access_token
+
+    get_access_token()      # Refresh once up front rather than racing in every thread
+    fetched = 0
+    if back:
+        print(f"Back-filling sys_audit {back[-1][0][:10]} .. {back[0][1][:10]} ({len(back)} day(s))...")
+        fetched += _stream(conn, back, "audit_stream_from", True, workers)
+    if ahead:
+        print(f"Streaming sys_audit {ahead[0][0][:10]} .. {ahead[-1][1][:10]} ({len(ahead)} day(s))...")
+        fetched += _stream(conn, ahead, "audit_stream_through", False, workers)
+    _mark_complete(conn)
+    return fetched
+
+
+def _mark_complete(conn) -> None:
+    """Changes created inside the streamed range now have full history cached.
+
+    Record that in audit_fetched so state_audit.update_transitions only asks
+    sys_audit for what came after.
+    """
+    start, through = get_meta(conn, "audit_stream_from"), get_meta(conn, "audit_stream_through")
+    complete = [
+        (_raw(r, "sys_id"), through) for r in iter_changes(conn)
+        if _raw(r, "sys_created_on") >= start
+    ]
+    conn.executemany(
+        "INSERT INTO audit_fetched (sys_id, through) VALUES (?, ?) "
+        "ON CONFLICT(sys_id) DO UPDATE SET through = excluded.through WHERE excluded.through > through",
+        complete,
+    )
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Dwell statistics
+# ---------------------------------------------------------------------------
+
+def cohort(conn, since: datetime, until: datetime) -> list[dict]:
+    """Stored changes created in [since, until)."""
+    lo, hi = since.strftime(SN_TS_FORMAT), until.strftime(SN_TS_FORMAT)
+    return [r for r in iter_changes(conn) if lo <= _raw(r, "sys_created_on") < hi]
+
+
+def dwell_stats(records: list[dict], transitions: dict[str, list[tuple]], now: datetime) -> list[tuple]:
+    """(dimension, value, state label, n, mean, p50, p75, p90) rows, in days.
+
+    A change counts towards a state once it has left it; repeat visits (e.g.
+    sent back to Assess) are summed per change.
+    """
+    n = len(records)
+    segs = segments(records, transitions, now)
+    closed = ~segs["open"] & (segs["state"] >= 0)
+    dwell = dwell_matrix(segs, n, closed_only=True)
+    visited = np.zeros((n, len(STATES)), dtype=bool)
+    visited[segs["change"][closed], segs["state"][closed]] = True
+
+    columns = [STATES.index(s) for s in LIFECYCLE_STATES]
+    rows = []
+    for dimension, field in DIMENSIONS:
+        values = np.array([(_field_value(r, field) or "(none)") if field else "All" for r in records])
+        for value in np.unique(values):
+            members = values == value
+            for col in columns:
+                sample = dwell[members & visited[:, col], col]
+                if not sample.size:
+                    continue
+                p50, p75, p90 = np.percentile(sample, PERCENTILES)
+                rows.append((dimension, str(value), STATE_LABELS[STATES[col]], int(sample.size),
+                             round(float(sample.mean()), 2), round(float(p50), 2),
+                             round(float(p75), 2), round(float(p90), 2)))
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def print_stats(rows: list[tuple], dimension: str) -> None:
+    selected = [r for r in rows if r[0] == dimension]
+    if not selected:
+        return
+    width = max(len(r[1]) for r in selected)
+    print(f"\n  {dimension.replace('_', ' ').title():<{width}}  {'State':<10} {'n':>5} "
+          f"{'mean':>7} {'p50':>7} {'p75':>7} {'p90':>7}")
+    for _, value, state, n, mean, p50, p75, p90 in selected:
+        print(f"  {value:<{width}}  {state:<10} {n:>5} {mean:>6.1f}d {p50:>6.1f}d {p75:>6.1f}d {p90:>6.1f}d")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-state change cycle times from sys_audit")
+    parser.add_argument("--since", type=str, help=f"Changes created on/after this UTC date (default: {DEFAULT_DAYS} days ago)")
+    parser.add_argument("--until", type=str, help="Changes created before this UTC date (default: now)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent sys_audit fetches")
+    parser.add_argument("--no-sync", action="store_true", help="Don't sync the change store first")
+    parser.add_argument("--no-fetch", action="store_true", help="Use cached sys_audit history only")
+    parser.add_argument("--groups", action="store_true", help="Also print the per-assignment-group breakdown")
+    parser.add_argument("--csv", type=Path, help="Also write the percentiles to a CSV file")
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    try:
+        since = (datetime.strptime(args.since, "%Y-%m-%d").replace(tzinfo=timezone.utc) if args.since
+                 else (now - timedelta(days=DEFAULT_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0))
+        until = datetime.strptime(args.until, "%Y-%m-%d").replace(tzinfo=timezone.utc) if args.until else now
+    except ValueError as exc:
+        print(f"ERROR: {exc} (expected YYYY-MM-DD)")
+        sys.exit(1)
+    if since >= until:
+        print("ERROR: --since must be before --until")
+        sys.exit(1)
+
+    conn = connect()
+    if not args.no_sync:
+        print(f"Syncing change store {STORE_FILE}...")
+        sync(conn)
+    if not args.no_fetch:
+        # Transitions of changes created in the range can't predate it, but run until now
+        fetched = extract(conn, since, now, args.workers)
+        print(f"  {fetched} transition(s) fetched "
+              f"(covered {get_meta(conn, 'audit_stream_from')} .. {get_meta(conn, 'audit_stream_through')})")
+
+    records = cohort(conn, since, until)
+    if not records:
+        print("No stored changes created in that range.")
+        return
+    transitions = load_transitions(conn, [_raw(r, "sys_id") for r in records])
+    rows = dwell_stats(records, transitions, now)
+    period = (since.strftime(SN_TS_FORMAT), until.strftime(SN_TS_FORMAT))
+    save_cycle_times(conn, period, rows)
+
+    without = sum(1 for r in records if not transitions[_raw(r, "sys_id")])
+    print(f"\n{len(records)} change(s) created {period[0][:10]} .. {period[1][:10]}"
+          + (f" ({without} without audit history)" if without else ""))
+    print_stats(rows, "all")
+    print_stats(rows, "type")
+    if args.groups:
+        print_stats(rows, "assignment_group")
+
+    queues = [r for r in rows if r[0] == "all" and r[2] not in ("Implement", "Review")]
+    if queues:
+        worst = max(queues, key=lambda r: r[5])
+        print(f"\n  Slowest pre-implementation state: {worst[2]} (p50 {worst[5]:.1f}d, p90 {worst[7]:.1f}d)")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["period_start", "period_end", "dimension", "value", "state", "n",
+                             "mean_days", "p50_days", "p75_days", "p90_days"])
+            writer.writerows((*period, *row) for row in rows)
+        print(f"  Wrote {len(rows)} row(s) to {args.csv}")
+    print(f"  Saved {len(rows)} row(s) to cycle_times in {STORE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
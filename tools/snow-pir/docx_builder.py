@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Shared python-docx helpers for the CCB, compliance, PIR and vendor reports.
+
+One copy of the hyperlink / shading / header-row helpers that used to be pasted
+into every report script, plus build_table(), which emits a whole table as a
+single lxml subtree instead of going through python-docx's per-cell API
+(table.add_row() and row.cells rescan the table on every call, so large tables
+cost O(rows^2)). Run properties, cell properties, shading and borders are built
+once per distinct style and cloned, never rebuilt per cell.
+
+Hyperlinks go through a per-document URL -> rId cache: each distinct URL gets
+one relationship in document.xml.rels however often it is linked, without
+python-docx's linear scan of every existing relationship per link.
+link_summary(doc) reports the counts.
+
+Report scripts outside this directory import it with:
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "tools" / "snow-pir"))
+    from docx_builder import add_hyperlink, build_table, ...
+
+Table rows for build_table are sequences of cell values. A value is either
+plain text or a dict with any of:
+    text   cell text ("\\n" becomes a line break)
+    url    make the text a hyperlink
+    bold   True/False
+    color  run colour, hex "RRGGBB"
+    size   font size in points, overriding the table's
+    fill   cell shading, hex "RRGGBB"
+    align  "center" or "right"
+"""
+
+import re
+import sys
+import weakref
+from collections import Counter
+from copy import deepcopy
+from functools import lru_cache
+
+try:
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.table import Table, _Cell
+    from lxml import etree
+except ImportError:
+    print("ERROR: 'python-docx' package required. Install with: pip install python-docx")
+    sys.exit(1)
+
+SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
+LINK_COLOR = "0563C1"
+HEADER_FILL = "2F5496"
+BORDER_COLOR = "BFBFBF"
+
+# 1/20 pt, the unit of table and cell widths
+_TWIPS_PER_EMU = 1 / 635
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_TR, _TC, _P, _R, _T, _BR = (_W + t for t in ("tr", "tc", "p", "r", "t", "br"))
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+# Document part -> {"rids": {url: rId}, "counts": Counter(url), "next": next free rId number}
+_LINKS = weakref.WeakKeyDictionary()
+
+
+def chg_url(number: str) -> str:
+    return f"{SNOW_URL}{number}"
+
+
+# ---------------------------------------------------------------------------
+# Hyperlink relationships
+# ---------------------------------------------------------------------------
+
+def _link_state(part) -> dict:
+    state = _LINKS.get(part)
+    if state is None:
+        # Seed from relationships already in the part (e.g. a template document)
+        rids = {rel.target_ref: rel.rId for rel in part.rels.values()
+                if rel.is_external and rel.reltype == RT.HYPERLINK}
+        used = [int(r_id[3:]) for r_id in part.rels if r_id[3:].isdigit()]
+        state = _LINKS[part] = {"rids": rids, "counts": Counter(), "next": max(used, default=0) + 1}
+    return state
+
+
+def hyperlink_rid(part, url: str) -> str:
+    """rId of the external hyperlink relationship for `url`, added on first use."""
+    state = _link_state(part)
+    state["counts"][url] += 1
+    r_id = state["rids"].get(url)
+    if r_id is None:
+        while f"rId{state['next']}" in part.rels:
+            state["next"] += 1
+        r_id = f"rId{state['next']}"
+        part.rels.add_relationship(RT.HYPERLINK, url, r_id, is_external=True)
+        state["rids"][url] = r_id
+    return r_id
+
+
+def link_counts(doc) -> Counter:
+    """Links created through this module in `doc`, by URL."""
+    return Counter(_link_state(doc.part)["counts"])
+
+
+def link_summary(doc) -> str:
+    counts = link_counts(doc)
+    total, distinct = sum(counts.values()), len(counts)
+    line = f"  Hyperlinks: {total} link(s) to {distinct} distinct URL(s)"
+    if total > distinct:
+        top = ", ".join(f"{re.split('[=/]', url)[-1]} x{n}" for url, n in counts.most_common(3) if n > 1)
+        line += f"; {total - distinct} relationship(s) reused (most linked: {top})"
+    return line
+
+
+# ---------------------------------------------------------------------------
+# Cached property templates (clone with deepcopy, never mutate)
+# ---------------------------------------------------------------------------
+
+def _el(tag: str, **attrs) -> "etree._Element":
+    el = OxmlElement(tag)
+    for name, value in attrs.items():
+        el.set(qn(f"w:{name}"), str(value))
+    return el
+
+
+@lru_cache(maxsize=None)
+def _shd(fill: str):
+    return _el("w:shd", val="clear", color="auto", fill=fill)
+
+
+@lru_cache(maxsize=None)
+def _rpr(bold: bool = False, color: str | None = None, size: float | None = None,
+         link: bool = False, font: str | None = None):
+    rPr = OxmlElement("w:rPr")
+    if font:
+        rPr.append(_el("w:rFonts", ascii=font, hAnsi=font, cs=font))
+    if bold:
+        rPr.append(_el("w:b"))
+    if color or link:
+        rPr.append(_el("w:color", val=color or LINK_COLOR))
+    if size:
+        rPr.append(_el("w:sz", val=int(size * 2)))
+    if link:
+        rPr.append(_el("w:u", val="single"))
+    return rPr
+
+
+@lru_cache(maxsize=None)
+def _ppr(space_pt: float | None, align: str | None):
+    pPr = OxmlElement("w:pPr")
+    if space_pt is not None:
+        twips = int(space_pt * 20)
+        pPr.append(_el("w:spacing", before=twips, after=twips))
+    if align:
+        pPr.append(_el("w:jc", val=align))
+    return pPr
+
+
+@lru_cache(maxsize=None)
+def _tcpr(width: int, fill: str | None):
+    tcPr = OxmlElement("w:tcPr")
+    tcPr.append(_el("w:tcW", w=width, type="dxa"))
+    if fill:
+        tcPr.append(deepcopy(_shd(fill)))
+    return tcPr
+
+
+@lru_cache(maxsize=None)
+def _borders(color: str, size: int):
+    borders = OxmlElement("w:tblBorders")
+    for edge in ("top", "left", "bottom", "right", "insideH", "insideV"):
+        borders.append(_el(f"w:{edge}", val="single", sz=size, space=0, color=color))
+    return borders
+
+
+# ---------------------------------------------------------------------------
+# Paragraph / cell helpers
+# ---------------------------------------------------------------------------
+
+def add_hyperlink(paragraph, text: str, url: str, bold: bool = False, size: float | None = 10):
+    """Append a clickable link run to a paragraph. `size` is in points (None = inherit)."""
+    r_id = hyperlink_rid(paragraph.part, url)
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.set(qn("r:id"), r_id)
+    _append_run(hyperlink, text, _rpr(bold, None, size, True))
+    paragraph._p.append(hyperlink)
+    return paragraph
+
+
+def set_cell_shading(cell, color: str) -> None:
+    cell._tc.get_or_add_tcPr().append(deepcopy(_shd(color)))
+
+
+def set_table_borders(table, color: str = BORDER_COLOR, size: int = 4) -> None:
+    """Single-line borders on every edge; `size` is in eighths of a point."""
+    table._tbl.tblPr.append(deepcopy(_borders(color, size)))
+
+
+def _fill_cell(cell, text: str | None, bold: bool = False, size: float | None = 9,
+               color: str | None = None, space_pt: float | None = 1) -> None:
+    tc = cell._tc
+    for p in tc.findall(_P)[1:]:
+        tc.remove(p)
+    p = tc.find(_P)
+    for child in list(p):
+        p.remove(child)
+    if space_pt is not None:
+        p.append(deepcopy(_ppr(space_pt, None)))
+    if text is not None:
+        _append_run(p, text, _rpr(bold, color, size))
+
+
+def styled_header_row(table, headers: list[str], fill: str = HEADER_FILL, size: float | None = 9,
+                      space_pt: float | None = 1) -> None:
+    """Bold white header text on a coloured fill in the table's first row."""
+    tr = table._tbl.tr_lst[0]
+    for tc, text in zip(tr.tc_lst, headers):
+        cell = _Cell(tc, table)
+        _fill_cell(cell, text, bold=True, size=size, color="FFFFFF", space_pt=space_pt)
+        set_cell_shading(cell, fill)
+
+
+def add_data_row(table, chg: str, rest: list, shade: str | None = None):
+    """Append a row: CHG number linked to ServiceNow, then plain 9 pt cells."""
+    row = table.add_row()
+    # row._tr.tc_lst instead of row.cells, which re-walks the whole table
+    cells = [_Cell(tc, table) for tc in row._tr.tc_lst]
+    _fill_cell(cells[0], None)
+    add_hyperlink(cells[0].paragraphs[0], chg, chg_url(chg), size=10)
+    for cell, val in zip(cells[1:], rest):
+        _fill_cell(cell, str(val))
+    if shade:
+        for cell in cells:
+            set_cell_shading(cell, shade)
+    return row
+
+
+# ---------------------------------------------------------------------------
+# Batched table construction
+# ---------------------------------------------------------------------------
+
+def _append_run(parent, text: str, rPr) -> None:
+    r = etree.SubElement(parent, _R)
+    r.append(deepcopy(rPr))
+    for i, line in enumerate(str(text).split("\n")):
+        if i:
+            etree.SubElement(r, _BR)
+        t = etree.SubElement(r, _T)
+        t.text = line
+        t.set(_XML_SPACE, "preserve")
+
+
+def _column_widths(doc, widths: list[float] | None, ncols: int) -> list[int]:
+    if widths:
+        return [int(w * 1440) for w in widths]
+    section = doc.sections[-1]
+    usable = section.page_width - section.left_margin - section.right_margin
+    return [int(usable * _TWIPS_PER_EMU / ncols)] * ncols
+
+
+def build_table(doc, headers: list[str] | None, rows, *, style: str | None = "Table Grid",
+                widths: list[float] | None = None, size: float | None = 9,
+                header_fill: str | None = HEADER_FILL, header_color: str | None = "FFFFFF",
+                borders: bool = False, align: str | None = None, space_pt: float | None = 1,
+                font: str | None = None, repeat_header: bool = True) -> Table:
+    """Append a table to `doc` in one pass and return it as a python-docx Table.
+
+    `widths` are column widths in inches (default: equal split of the page).
+    With `headers` None there is no header row and `rows` must be a list.
+    Rows are sequences of cell values (see module docstring). `align` sets the
+    table alignment ("center"). The header row repeats on every page unless
+    `repeat_header` is False.
+    """
+    ncols = len(headers) if headers is not None else max(map(len, rows), default=1)
+    col_widths = _column_widths(doc, widths, ncols)
+
+    tbl = OxmlElement("w:tbl")
+    tblPr = etree.SubElement(tbl, _W + "tblPr")
+    if style:
+        tblPr.append(_el("w:tblStyle", val=doc.styles[style].style_id))
+    tblPr.append(_el("w:tblW", w=0, type="auto"))
+    if align:
+        tblPr.append(_el("w:jc", val=align))
+    if borders:
+        tblPr.append(deepcopy(_borders(BORDER_COLOR, 4)))
+    tblPr.append(_el("w:tblLook", val="04A0", firstRow=1, lastRow=0, firstColumn=1,
+                     lastColumn=0, noHBand=0, noVBand=1))
+    grid = etree.SubElement(tbl, _W + "tblGrid")
+    for w in col_widths:
+        grid.append(_el("w:gridCol", w=w))
+
+    part = doc.part
+
+    def add_row(values, header=False):
+        tr = etree.SubElement(tbl, _TR)
+        if header and repeat_header:
+            trPr = etree.SubElement(tr, _W + "trPr")
+            trPr.append(_el("w:tblHeader"))
+        for col in range(ncols):
+            value = values[col] if col < len(values) else ""
+            spec = value if isinstance(value, dict) else {"text": value}
+            if header:
+                spec = {"text": value, "bold": True, "color": header_color, "fill": header_fill}
+            tc = etree.SubElement(tr, _TC)
+            tc.append(deepcopy(_tcpr(col_widths[col], spec.get("fill"))))
+            p = etree.SubElement(tc, _P)
+            if space_pt is not None or spec.get("align"):
+                p.append(deepcopy(_ppr(space_pt, spec.get("align"))))
+            text = "" if spec.get("text") is None else spec["text"]
+            run_size = spec.get("size", size)
+            url = spec.get("url")
+            if url:
+                r_id = hyperlink_rid(part, url)
+                hyperlink = etree.SubElement(p, _W + "hyperlink")
+                hyperlink.set(qn("r:id"), r_id)
+                _append_run(hyperlink, text, _rpr(bool(spec.get("bold")), None, run_size, True, font))
+            elif text != "":
+                _append_run(p, text, _rpr(bool(spec.get("bold")), spec.get("color"), run_size, False, font))
+
+    if headers is not None:
+        add_row(headers, header=True)
+    for values in rows:
+        add_row(values)
+
+    doc.element.body._insert_tbl(tbl)
+    return Table(tbl, doc._body)
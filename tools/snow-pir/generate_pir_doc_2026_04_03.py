@@ -8,43 +8,14 @@ from pathlib import Path
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+
+from docx_builder import add_hyperlink, build_table, link_summary
 
 OUTPUT_DIR = Path.home() / "OneDrive - Vituity" / "Documents" / "Change Management"
 SNOW_URL = "https://vituity.service-now.com/nav_to.do?uri=change_request.do?sysparm_query=number="
 
 REVIEW_DATE = "2026-04-03"
 
-# ---------------------------------------------------------------------------
-# Hyperlink helper
-# ---------------------------------------------------------------------------
-
-def add_hyperlink(paragraph, text, url):
-    """Add a clickable hyperlink to a paragraph."""
-    part = paragraph.part
-    r_id = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-    new_run = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-    c = OxmlElement("w:color")
-    c.set(qn("w:val"), "0563C1")
-    rPr.append(c)
-    u = OxmlElement("w:u")
-    u.set(qn("w:val"), "single")
-    rPr.append(u)
-    sz = OxmlElement("w:sz")
-    sz.set(qn("w:val"), "22")
-    rPr.append(sz)
-    new_run.append(rPr)
-    new_run.text = text
-    hyperlink.append(new_run)
-    paragraph._p.append(hyperlink)
-    return hyperlink
-
-
 # ---------------------------------------------------------------------------
 # PIR data — 2026-04-03 review of Enterprise Applications changes
 # ---------------------------------------------------------------------------
@@ -327,45 +298,25 @@ def build_document() -> Document:
     )
 
     # Scorecard table
-    table = doc.add_table(rows=1, cols=7)
-    table.style = "Light Grid Accent 1"
-    table.alignment = WD_TABLE_ALIGNMENT.CENTER
-    headers = ["Change", "Score", "Status", "Type", "Assigned To", "Closure Ready", "Release"]
-    hdr = table.rows[0].cells
-    for i, label in enumerate(headers):
-        hdr[i].text = label
-        for paragraph in hdr[i].paragraphs:
-            for run in paragraph.runs:
-                run.bold = True
-
+    green, amber = "228B22", "CC7A00"
+    rows = []
     for item in SCORECARD:
         note = NOTES[item["number"]]
-        row = table.add_row().cells
-        # Hyperlinked change number
-        row[0].paragraphs[0].clear()
-        add_hyperlink(row[0].paragraphs[0], item["number"], SNOW_URL + item["number"])
-        row[1].text = item["score"]
-        row[2].text = item["status"]
-        row[3].text = item["type"]
-        row[4].text = item["assigned"]
-        row[5].text = "Yes" if note["closure_ready"] else "Pending"
-        row[6].text = item.get("release", "")
-        # Color status
-        for paragraph in row[2].paragraphs:
-            for run in paragraph.runs:
-                run.bold = True
-                if item["status"] == "PASS":
-                    run.font.color.rgb = RGBColor(0x22, 0x8B, 0x22)
-                else:
-                    run.font.color.rgb = RGBColor(0xCC, 0x7A, 0x00)
-        # Color closure ready
-        for paragraph in row[5].paragraphs:
-            for run in paragraph.runs:
-                run.bold = True
-                if note["closure_ready"]:
-                    run.font.color.rgb = RGBColor(0x22, 0x8B, 0x22)
-                else:
-                    run.font.color.rgb = RGBColor(0xCC, 0x7A, 0x00)
+        rows.append([
+            {"text": item["number"], "url": SNOW_URL + item["number"]},
+            item["score"],
+            {"text": item["status"], "bold": True, "color": green if item["status"] == "PASS" else amber},
+            item["type"],
+            item["assigned"],
+            {"text": "Yes" if note["closure_ready"] else "Pending", "bold": True,
+             "color": green if note["closure_ready"] else amber},
+            item.get("release", ""),
+        ])
+    build_table(
+        doc, ["Change", "Score", "Status", "Type", "Assigned To", "Closure Ready", "Release"], rows,
+        style="Light Grid Accent 1", align="center", size=None, space_pt=None,
+        header_fill=None, header_color=None,
+    )
 
     doc.add_paragraph()
 
@@ -378,7 +329,7 @@ def build_document() -> Document:
 
         # Change heading with hyperlink
         h = doc.add_heading(level=2)
-        add_hyperlink(h, chg, SNOW_URL + chg)
+        add_hyperlink(h, chg, SNOW_URL + chg, size=11)
         h.add_run(f" \u2014 {item['short_desc']}")
 
         # Metadata
@@ -461,22 +412,11 @@ def build_document() -> Document:
         "The following patterns were observed across the reviewed changes."
     )
 
-    table2 = doc.add_table(rows=1, cols=4)
-    table2.style = "Light Grid Accent 1"
-    table2.alignment = WD_TABLE_ALIGNMENT.CENTER
-    hdr2 = table2.rows[0].cells
-    for i, label in enumerate(["Finding", "Frequency", "Severity", "Detail"]):
-        hdr2[i].text = label
-        for paragraph in hdr2[i].paragraphs:
-            for run in paragraph.runs:
-                run.bold = True
-
-    for finding, freq, sev, detail in CROSS_CUTTING:
-        row = table2.add_row().cells
-        row[0].text = finding
-        row[1].text = freq
-        row[2].text = sev
-        row[3].text = detail
+    build_table(
+        doc, ["Finding", "Frequency", "Severity", "Detail"], CROSS_CUTTING,
+        style="Light Grid Accent 1", align="center", size=None, space_pt=None,
+        header_fill=None, header_color=None,
+    )
 
     doc.add_paragraph()
 
@@ -497,6 +437,7 @@ def main():
         out_path = Path.cwd() / filename
     doc.save(str(out_path))
     print(f"Document saved to: {out_path}")
+    print(link_summary(doc))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Change-to-incident correlation over configuration items and time windows.
+
+For every change with a planned end date, finds the incidents opened within
+--hours after `end_date` on the same CI, or on a CI related to it through
+cmdb_rel_ci (one hop, either direction). Incidents whose caused_by points at
+the change are always included.
+
+Incidents are mirrored into the change store (incremental on
+sys_updated_on, like the changes), and the join runs on sorted NumPy arrays:
+incidents are keyed by (CI code, opened time) and sorted once, and each
+(change, CI) probe finds its window with two binary searches -- a sort-merge
+join, O((n + m) log m + k) rather than n x m -- so a year of incidents
+correlates in well under a second.
+
+Matches go to the store's change_incidents table. The close_code check below
+and risk_model.py (which counts a Successful change followed by a P1/P2
+incident on its own CI as a failure) read them from there.
+
+Usage:
+    python incident_correlation.py                     # Sync, correlate the last 365 days
+    python incident_correlation.py --hours 48 --since 2026-01-01
+    python incident_correlation.py --relations --no-sync
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: 'numpy' package required. Install with: pip install numpy")
+    sys.exit(1)
+
+from change_store import (
+    STORE_FILE, connect, iter_changes, save_change_incidents, save_ci_relations, sync, sync_incidents,
+)
+from pir_review import _field_value
+
+DEFAULT_HOURS = 24
+DEFAULT_DAYS = 365
+CLOSED_STATE = "3"
+SUCCESS_CODE = "successful"
+# Incidents at or above this priority (1 = Critical) on a change's own CI cast doubt on "Successful"
+SUSPECT_PRIORITY = "2"
+SN_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+MAX_WINDOW = timedelta(days=30)
+
+DIRECT, RELATED, CAUSED_BY = "direct", "related", "caused_by"
+RELATION_RANK = {CAUSED_BY: 0, DIRECT: 1, RELATED: 2}
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def _ts(values) -> np.ndarray:
+    return np.array([v or "NaT" for v in values], dtype="datetime64[s]")
+
+
+# ---------------------------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------------------------
+
+def fetch_relations(conn, cis: list[str]) -> int:
+    """Refresh the cmdb_rel_ci pairs touching these CIs. Returns pairs stored."""
+    from pir_review import query_table
+
+    pairs = []
+    for start in range(0, len(cis), 100):
+        chunk = ",".join(cis[start:start + 100])
+        rows = query_table("cmdb_rel_ci", f"parentIN{chunk}^ORchildIN{chunk}", fields=["parent", "child"], limit=1000)
+        pairs.extend((_raw(r, "parent"), _raw(r, "child")) for r in rows if _raw(r, "parent") and _raw(r, "child"))
+    save_ci_relations(conn, cis, pairs)
+    return len(pairs)
+
+
+def load_incidents(conn, since: str) -> dict[str, np.ndarray]:
+    """Incident columns opened on/after `since`, read from the indexed columns only."""
+    rows = conn.execute(
+        "SELECT sys_id, number, cmdb_ci, opened_at, priority, "
+        "COALESCE(json_extract(record, '$.caused_by.value'), json_extract(record, '$.caused_by')) "
+        "FROM incidents WHERE opened_at >= ?", (since,)
+    ).fetchall()
+    sys_id, number, ci, opened, priority, caused_by = zip(*rows) if rows else ((),) * 6
+    return {
+        "sys_id": np.array(sys_id, dtype=object),
+        "number": np.array(number, dtype=object),
+        "ci": np.array([c or "" for c in ci], dtype=object),
+        "opened": _ts(opened),
+        "priority": np.array([p or "" for p in priority], dtype=object),
+        "caused_by": np.array([c or "" for c in caused_by], dtype=object),
+    }
+
+
+def neighbours(conn) -> dict[str, list[str]]:
+    adjacency: dict[str, list[str]] = {}
+    for parent, child in conn.execute("SELECT parent, child FROM ci_relations"):
+        adjacency.setdefault(parent, []).append(child)
+        adjacency.setdefault(child, []).append(parent)
+    return adjacency
+
+
+# ---------------------------------------------------------------------------
+# Sort-merge join
+# ---------------------------------------------------------------------------
+
+def correlate(changes: list[dict], incidents: dict[str, np.ndarray], adjacency: dict[str, list[str]],
+              hours: float) -> list[tuple[int, int, str, float]]:
+    """(change index, incident index, relation, hours after end) for every match.
+
+    Each change probes its own CI and its related CIs for incidents opened in
+    [end_date, end_date + hours]. A change/incident pair found more than one
+    way keeps its strongest relation (caused_by > direct > related).
+    """
+    end = _ts([_raw(c, "end_date") for c in changes])
+    opened = incidents["opened"]
+
+    # Probes: one per (change, CI it could affect)
+    probes = []
+    for i, change in enumerate(changes):
+        ci = _raw(change, "cmdb_ci")
+        if not ci or np.isnat(end[i]):
+            continue
+        probes.append((i, ci, RELATION_RANK[DIRECT]))
+        probes.extend((i, other, RELATION_RANK[RELATED]) for other in adjacency.get(ci, ()))
+
+    matches = []
+    has_ci = (incidents["ci"] != "") & ~np.isnat(opened)
+    if probes and has_ci.any():
+        probe_change = np.array([p[0] for p in probes])
+        probe_ci = np.array([p[1] for p in probes], dtype=object)
+        probe_rel = np.array([p[2] for p in probes])
+        # Integer-code the CIs and build one sortable key per incident: ci * span + seconds
+        inc_idx = np.flatnonzero(has_ci)
+        _, inverse = np.unique(np.concatenate([incidents["ci"][inc_idx], probe_ci]),
+                                   return_inverse=True)
+        inc_code, probe_code = inverse[:len(inc_idx)], inverse[len(inc_idx):]
+        t0 = min(opened[inc_idx].min(), end[probe_change].min())
+        window = int(hours * 3600)
+        inc_t = (opened[inc_idx] - t0).astype(np.int64)
+        probe_t = (end[probe_change] - t0).astype(np.int64)
+        span = max(int(inc_t.max()), int(probe_t.max())) + window + 1
+
+        keys = inc_code.astype(np.int64) * span + inc_t
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        lo = probe_code.astype(np.int64) * span + probe_t
+        left = np.searchsorted(keys, lo, side="left")
+        right = np.searchsorted(keys, lo + window, side="right")
+
+        # Expand each probe's [left, right) run into (probe, incident) pairs without a loop
+        counts = right - left
+        probe_of = np.repeat(np.arange(len(lo)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        matched = inc_idx[order[left[probe_of] + offset]]
+        matches = list(zip(probe_change[probe_of].tolist(), matched.tolist(),
+                           probe_rel[probe_of].tolist()))
+
+    # Explicit caused_by links, whatever the timing
+    by_sys_id = {_raw(c, "sys_id"): i for i, c in enumerate(changes)}
+    for j in np.flatnonzero(incidents["caused_by"] != ""):
+        i = by_sys_id.get(incidents["caused_by"][j])
+        if i is not None:
+            matches.append((i, int(j), RELATION_RANK[CAUSED_BY]))
+
+    best: dict[tuple[int, int], int] = {}
+    for i, j, rank in matches:
+        if rank < best.get((i, j), len(RELATION_RANK)):
+            best[(i, j)] = rank
+    if not best:
+        return []
+    names = {rank: name for name, rank in RELATION_RANK.items()}
+    pairs = sorted(best)
+    chg, inc = np.array([i for i, _ in pairs]), np.array([j for _, j in pairs])
+    delta = opened[inc] - end[chg]
+    hours_after = np.where(np.isnat(delta), np.nan, delta.astype(np.int64) / 3600)
+    return [(i, j, names[best[(i, j)]], float(h)) for (i, j), h in zip(pairs, hours_after)]
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def suspect_closures(changes: list[dict], incidents: dict[str, np.ndarray], links: list[tuple]) -> list[tuple]:
+    """Closed Successful changes followed by a P1/P2 incident on their own CI (or linked by caused_by)."""
+    suspect = []
+    for i, j, relation, hours in links:
+        change = changes[i]
+        if (relation != RELATED and _raw(change, "state") == CLOSED_STATE
+                and _field_value(change, "close_code").lower() == SUCCESS_CODE
+                and incidents["priority"][j] and incidents["priority"][j] <= SUSPECT_PRIORITY):
+            suspect.append((_raw(change, "number"), incidents["number"][j], relation, hours, incidents["priority"][j]))
+    return suspect
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correlate changes with incidents that followed them")
+    parser.add_argument("--since", type=str, help=f"Changes ending on/after this UTC date (default: {DEFAULT_DAYS} days ago)")
+    parser.add_argument("--hours", type=float, default=DEFAULT_HOURS,
+                        help=f"Window after planned end to look for incidents (default: {DEFAULT_HOURS})")
+    parser.add_argument("--relations", action="store_true", help="Refresh cmdb_rel_ci relations for the changes' CIs")
+    parser.add_argument("--no-sync", action="store_true", help="Don't sync changes and incidents first")
+    args = parser.parse_args()
+
+    try:
+        since = (datetime.strptime(args.since, "%Y-%m-%d") if args.since
+                 else datetime.now(timezone.utc) - timedelta(days=DEFAULT_DAYS)).strftime(SN_TS_FORMAT)
+    except ValueError:
+        print(f"ERROR: --since must be YYYY-MM-DD, got {args.since!r}")
+        sys.exit(1)
+
+    conn = connect()
+    if not args.no_sync:
+        print(f"Syncing change store {STORE_FILE}...")
+        print(f"  {sync(conn)} change(s), {sync_incidents(conn)} incident(s) updated")
+
+    # start_date is indexed; no planned window runs longer than MAX_WINDOW
+    lookback = (datetime.strptime(since, SN_TS_FORMAT) - MAX_WINDOW).strftime(SN_TS_FORMAT)
+    changes = sorted((c for c in iter_changes(conn, "start_date >= ?", (lookback,)) if _raw(c, "end_date") >= since),
+                     key=lambda c: _raw(c, "number"))
+    if args.relations:
+        cis = sorted({_raw(c, "cmdb_ci") for c in changes} - {""})
+        print(f"  {fetch_relations(conn, cis)} CI relation(s) for {len(cis)} CI(s)")
+
+    start = time.perf_counter()
+    incidents = load_incidents(conn, since)
+    links = correlate(changes, incidents, neighbours(conn), args.hours)
+    elapsed = time.perf_counter() - start
+
+    rows = [(_raw(changes[i], "number"), incidents["number"][j], relation, round(hours, 2), incidents["priority"][j])
+            for i, j, relation, hours in links]
+    save_change_incidents(conn, [_raw(c, "number") for c in changes], rows)
+
+    linked = {row[0] for row in rows}
+    by_relation = {name: sum(1 for row in rows if row[2] == name) for name in RELATION_RANK}
+    print(f"\n{len(changes)} change(s) x {len(incidents['number'])} incident(s) in {elapsed:.2f}s: "
+          f"{len(rows)} link(s) on {len(linked)} change(s) "
+          f"({', '.join(f'{n} {name}' for name, n in by_relation.items())})")
+
+    suspect = suspect_closures(changes, incidents, links)
+    if suspect:
+        print(f"\nClosed Successful but followed by a P1/P2 incident ({len(suspect)}):")
+        for change, incident, relation, hours, priority in suspect:
+            when = "" if np.isnan(hours) else f"{hours:+.1f}h"
+            print(f"  {change}  {incident}  P{priority}  {relation:<9} {when}")
+    print(f"\nSaved to change_incidents in {STORE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Async execution path for pir_review.
+
+Runs the ServiceNow reads (Review-queue query, per-change lookups) and writes
+(work note PATCHes) on an aiohttp session behind a semaphore, so a large run
+costs roughly total latency / concurrency instead of the sum of latencies.
+429 responses are retried after the server's Retry-After delay.
+
+Used via `pir_review.py --async [--concurrency N]`; analysis and output are
+unchanged. --watch and --post-note stay synchronous, so --async is rejected
+with them.
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+try:
+    import aiohttp
+except ImportError:
+    print("ERROR: 'aiohttp' package required for --async. Install with: pip install aiohttp")
+    sys.exit(1)
+
+from pir_review import INSTANCE_URL, REVIEW_STATE, _headers
+
+TABLE_URL = f"{INSTANCE_URL}/api/now/table/change_request"
+PAGE_SIZE = 50
+MAX_RETRIES = 5
+TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
+def _retry_after(value: str | None, attempt: int) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    return float(2 ** attempt)
+
+
+class _Client:
+    """aiohttp session with a bounded number of in-flight requests."""
+
+    def __init__(self, concurrency: int):
+        self.sem = asyncio.Semaphore(concurrency)
+        self.headers = _headers()
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(headers=self.headers, timeout=TIMEOUT)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def request(self, method: str, url: str, **kwargs) -> tuple[int, dict, dict]:
+        """Return (status, headers, json body); retries 429s honouring Retry-After.
+
+        Never raises for one bad response, so a single failure can't cancel the
+        rest of a gather: a body that isn't JSON comes back as {"error": text},
+        and a connection error or timeout as status 0.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            async with self.sem:
+                try:
+                    async with self.session.request(method, url, **kwargs) as resp:
+                        if resp.status == 429 and attempt < MAX_RETRIES:
+                            delay = _retry_after(resp.headers.get("Retry-After"), attempt)
+                        else:
+                            text = await resp.text()
+                            try:
+                                body = json.loads(text) if text.strip() else {}
+                            except ValueError:
+                                body = {"error": text[:500]}
+                            return resp.status, dict(resp.headers), body or {}
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                    return 0, {}, {"error": f"{type(exc).__name__}: {exc}"}
+            # Sleep outside the semaphore so throttled calls don't hold a slot
+            await asyncio.sleep(delay)
+
+
+# ---------------------------------------------------------------------------
+# Read side
+# ---------------------------------------------------------------------------
+
+async def _get_page(client: _Client, query: str, limit: int, offset: int) -> tuple[list[dict], int]:
+    status, headers, body = await client.request("GET", TABLE_URL, params={
+        "sysparm_query": query,
+        "sysparm_display_value": "all",
+        "sysparm_limit": str(limit),
+        "sysparm_offset": str(offset),
+    })
+    if status != 200:
+        raise RuntimeError(f"GET change_request returned {status}: {str(body)[:200]}")
+    return body.get("result", []), int(headers.get("X-Total-Count", 0))
+
+
+async def query_review_changes(client: _Client) -> list[dict]:
+    """All Review-state changes; pages after the first are fetched concurrently."""
+    query = f"state={REVIEW_STATE}^ORDERBYnumber"
+    first, total = await _get_page(client, query, PAGE_SIZE, 0)
+    rest = await asyncio.gather(*(
+        _get_page(client, query, PAGE_SIZE, offset) for offset in range(PAGE_SIZE, total, PAGE_SIZE)
+    ))
+    return first + [c for page, _ in rest for c in page]
+
+
+async def get_change_detail(client: _Client, number: str) -> dict | None:
+    results, _ = await _get_page(client, f"number={number}", 1, 0)
+    return results[0] if results else None
+
+
+# ---------------------------------------------------------------------------
+# Write side
+# ---------------------------------------------------------------------------
+
+async def post_work_note(client: _Client, sys_id: str, note: str) -> bool:
+    status, _, body = await client.request("PATCH", f"{TABLE_URL}/{sys_id}", json={"work_notes": note})
+    if status in (200, 204):
+        return True
+    print(f"  WARN: PATCH returned {status}: {str(body)[:200]}")
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Sync entry points for pir_review.main
+# ---------------------------------------------------------------------------
+
+def fetch_changes(numbers: list[str] | None, concurrency: int) -> list[dict | None]:
+    """Fetch the given changes (None entries for not-found) or, without numbers, the Review queue."""
+    async def _run():
+        async with _Client(concurrency) as client:
+            if numbers is None:
+                return await query_review_changes(client)
+            return await asyncio.gather(*(get_change_detail(client, n) for n in numbers))
+    return asyncio.run(_run())
+
+
+def post_notes(items: list[tuple[str, str]], concurrency: int) -> list[bool]:
+    """PATCH (sys_id, note) pairs concurrently; results are in input order."""
+    async def _run():
+        async with _Client(concurrency) as client:
+            return await asyncio.gather(*(post_work_note(client, s, n) for s, n in items))
+    return asyncio.run(_run())
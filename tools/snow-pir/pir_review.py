@@ -10,6 +10,10 @@ Usage:
     python pir_review.py --post                       # Analyze and post work notes
     python pir_review.py --post --changes CHG0039282,CHG0039278
     python pir_review.py --post-note CHG0039282 "Your note text"
+    python pir_review.py --post --async --concurrency 16  # Concurrent fetch/post for large queues
+    python pir_review.py --similar 5                  # Also list 5 most similar closed changes
+    python pir_review.py --watch --post               # Poll Review queue, post notes as changes arrive
+    python pir_review.py --watch --post --listen 8765 # ...and accept webhook pushes on localhost
 """
 
 import argparse
@@ -179,6 +183,83 @@ def get_change_detail(number: str) -> dict | None:
     return results[0] if results else None
 
 
+def iter_table(table: str, query: str, fields: list[str] | None = None, limit: int = 200):
+    """Yield pages (lists of records) of `table` matching an encoded query, `limit` at a time."""
+    params = {
+        "sysparm_query": query,
+        "sysparm_display_value": "all",
+        "sysparm_exclude_reference_link": "true",
+        "sysparm_limit": limit,
+    }
+    if fields:
+        params["sysparm_fields"] = ",".join(fields)
+    offset = 0
+    while True:
+        resp = requests.get(
+            f"{INSTANCE_URL}/api/now/table/{table}",
+            headers=_headers(),
+            params={**params, "sysparm_offset": offset},
+            timeout=30,
+        )
+        resp.raise_for_status()
+        batch = resp.json().get("result", [])
+        yield batch
+        if len(batch) < limit:
+            return
+        offset += limit
+
+
+def query_table(table: str, query: str, fields: list[str] | None = None, limit: int = 200,
+                max_records: int | None = None) -> list[dict]:
+    """Fetch every record of `table` matching an encoded query, paging `limit` at a time.
+
+    Stops after `max_records` when given (the query's ORDERBY decides which).
+    """
+    results = []
+    for batch in iter_table(table, query, fields, limit):
+        results.extend(batch)
+        if max_records is not None and len(results) >= max_records:
+            return results[:max_records]
+    return results
+
+
+def query_changes(query: str, fields: list[str] | None = None, limit: int = 200) -> list[dict]:
+    """Fetch every change_request matching an encoded query, paging `limit` at a time."""
+    return query_table("change_request", query, fields, limit)
+
+
+def query_changes_since(since: str, query: str = "", fields: list[str] | None = None,
+                        limit: int = 200) -> list[dict]:
+    """Fetch change_requests updated at or after `since` (UTC 'YYYY-MM-DD HH:MM:SS').
+
+    Results are paged in sys_updated_on order so the caller can advance its
+    watermark to the last record seen. `query` is ANDed onto the delta filter.
+    """
+    encoded = f"sys_updated_on>={since}^ORDERBYsys_updated_on"
+    if query:
+        encoded = f"{query}^{encoded}"
+    return query_changes(encoded, fields, limit)
+
+
+def query_review_changes_since(since: str) -> list[dict]:
+    """Delta query for watch mode: Review-state changes, projected to analyzed fields."""
+    return query_changes_since(
+        since,
+        query=f"state={REVIEW_STATE}",
+        fields=["sys_id", "number", "sys_updated_on", "assigned_to", *REQUIRED_FIELDS],
+    )
+
+
+def query_review_changes_by_id(sys_ids: list[str]) -> list[dict]:
+    """Watch-mode retry fetch: the given changes, if still in Review, with the delta query's fields."""
+    if not sys_ids:
+        return []
+    return query_changes(
+        f"state={REVIEW_STATE}^sys_idIN{','.join(sys_ids)}",
+        ["sys_id", "number", "sys_updated_on", "assigned_to", *REQUIRED_FIELDS],
+    )
+
+
 def post_work_note(sys_id: str, note: str) -> bool:
     """PATCH a work note onto a change request."""
     url = f"{INSTANCE_URL}/api/now/table/change_request/{sys_id}"
@@ -225,8 +306,12 @@ def _assess_plan(text: str) -> str:
     return "WEAK"
 
 
-def analyze_change(change: dict) -> dict:
-    """Analyze a change against policy requirements. Returns analysis dict."""
+def analyze_change(change: dict, plan_index=None) -> dict:
+    """Analyze a change against policy requirements. Returns analysis dict.
+
+    With a plan_similarity.PlanIndex, plans that near-copy another change's
+    plan are reported under "plan_duplicates".
+    """
     number = _field_value(change, "number")
     short_desc = _field_value(change, "short_description")
 
@@ -247,6 +332,8 @@ def analyze_change(change: dict) -> dict:
         else:
             field_status[field] = "OK"
 
+    plan_duplicates = plan_index.find_duplicates(change) if plan_index else {}
+
     # Summary counts
     ok_count = sum(1 for s in field_status.values() if s == "OK")
     total = len(REQUIRED_FIELDS)
@@ -257,6 +344,7 @@ def analyze_change(change: dict) -> dict:
         "sys_id": change.get("sys_id", {}).get("value", change.get("sys_id", "")),
         "field_status": field_status,
         "gaps": gaps,
+        "plan_duplicates": plan_duplicates,
         "score": f"{ok_count}/{total}",
         "ok_count": ok_count,
         "total": total,
@@ -300,6 +388,12 @@ def generate_pir_note(analysis: dict) -> str:
         lines.extend(gaps)
         lines.append("")
 
+    if analysis.get("plan_duplicates"):
+        from plan_similarity import format_duplicates
+        lines.append("Possible copy-pasted plans (confirm they are specific to this change):")
+        lines.extend(format_duplicates(analysis["plan_duplicates"]))
+        lines.append("")
+
     if analysis["ok_count"] == analysis["total"]:
         lines.append("Recommendation: All required fields present. Change may proceed to closure.")
     elif analysis["ok_count"] >= analysis["total"] - 2:
@@ -332,12 +426,81 @@ def print_scorecard(analyses: list[dict]) -> None:
     print()
 
 
+def print_analysis(analysis: dict, note: str, show_note: bool) -> None:
+    """Print the per-field breakdown for one analyzed change."""
+    print(f"--- {analysis['number']} ---")
+    print(f"  {analysis['short_description']}")
+    print(f"  Score: {analysis['score']}")
+    for field, label in REQUIRED_FIELDS.items():
+        status = analysis["field_status"][field]
+        marker = "OK" if status == "OK" else f"** {status} **"
+        print(f"    {label}: {marker}")
+    for field, matches in analysis.get("plan_duplicates", {}).items():
+        print(f"    {REQUIRED_FIELDS[field]}: ** NEAR-COPY of {matches[0]['number']} "
+              f"({matches[0]['similarity']:.0%}) **")
+    if analysis.get("similar_changes"):
+        from change_index import format_similar
+        print("  Similar past changes:")
+        for line in format_similar(analysis["similar_changes"]):
+            print(f"    {line}")
+    print()
+    if show_note:
+        print("  Generated note:")
+        for line in note.split("\n"):
+            print(f"    {line}")
+        print()
+
+
+def open_plan_index(enabled: bool = True):
+    """Sync the change store and bring the plan index up to date.
+
+    Returns None when disabled or when the change store hasn't been created
+    (run change_store.py once to backfill history).
+    """
+    if not enabled:
+        return None
+    from change_store import STORE_FILE, connect, sync
+    if not STORE_FILE.exists():
+        return None
+    from plan_similarity import PlanIndex
+    conn = connect()
+    print("Syncing change store for duplicate-plan check...")
+    sync(conn)
+    index = PlanIndex(conn)
+    print(f"  Plan index updated ({index.update_from_store()} plan(s) hashed)")
+    return index
+
+
 def main():
     parser = argparse.ArgumentParser(description="ServiceNow PIR Review Automation")
     parser.add_argument("--post", action="store_true", help="Post generated work notes to ServiceNow")
     parser.add_argument("--changes", type=str, help="Comma-separated CHG numbers (default: all in Review)")
     parser.add_argument("--post-note", nargs=2, metavar=("CHG", "NOTE"), help="Post a raw note to a single change")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and review changes as they enter or are edited in Review")
+    parser.add_argument("--interval", type=float, default=15,
+                        help="Watch mode: poll interval in seconds while changes are arriving (default: 15)")
+    parser.add_argument("--max-interval", type=float, default=300,
+                        help="Watch mode: longest idle backoff between polls in seconds (default: 300)")
+    parser.add_argument("--listen", type=int, metavar="PORT",
+                        help="Watch mode: also accept webhook pushes on 127.0.0.1:PORT")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Fetch and post concurrently (requires aiohttp; not with --watch/--post-note)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Async mode: maximum in-flight ServiceNow requests (default: 8)")
+    parser.add_argument("--similar", type=int, metavar="K", default=0,
+                        help="Show the K most similar closed changes from the change store")
+    parser.add_argument("--no-dup-check", action="store_true",
+                        help="Skip near-duplicate plan detection against the change store")
     args = parser.parse_args()
+    if args.use_async and (args.watch or args.post_note):
+        parser.error("--async applies to batch review and posting only, not --watch or --post-note")
+
+    # Mode: long-running watcher
+    if args.watch:
+        from pir_watch import watch
+        watch(post=args.post, interval=args.interval, max_interval=args.max_interval, listen_port=args.listen)
+        return
 
     # Mode: post a raw note
     if args.post_note:
@@ -362,58 +525,69 @@ def main():
     if args.changes:
         chg_numbers = [c.strip() for c in args.changes.split(",")]
         print(f"Fetching {len(chg_numbers)} specified changes...")
+        if args.use_async:
+            from pir_async import fetch_changes
+            fetched = fetch_changes(chg_numbers, args.concurrency)
+        else:
+            fetched = (get_change_detail(num) for num in chg_numbers)
         changes = []
-        for num in chg_numbers:
-            c = get_change_detail(num)
+        for num, c in zip(chg_numbers, fetched):
             if c:
                 changes.append(c)
             else:
                 print(f"  WARN: {num} not found, skipping")
     else:
         print("Querying all changes in Review state...")
-        changes = query_review_changes()
+        if args.use_async:
+            from pir_async import fetch_changes
+            changes = fetch_changes(None, args.concurrency)
+        else:
+            changes = query_review_changes()
 
     if not changes:
         print("No changes found.")
         return
 
+    plan_index = open_plan_index(not args.no_dup_check)
+    if plan_index:
+        plan_index.update(changes)
+    change_index = None
+    if args.similar:
+        from change_index import open_index
+        print("Updating similar-change index...")
+        change_index = open_index(sync_store=plan_index is None)
+
     print(f"Found {len(changes)} change(s). Analyzing...\n")
 
     analyses = []
     notes = []
     for change in changes:
-        analysis = analyze_change(change)
+        analysis = analyze_change(change, plan_index)
+        if change_index:
+            analysis["similar_changes"] = change_index.search(change, args.similar)
         note = generate_pir_note(analysis)
         analyses.append(analysis)
         notes.append(note)
-
-        # Print each analysis
-        print(f"--- {analysis['number']} ---")
-        print(f"  {analysis['short_description']}")
-        print(f"  Score: {analysis['score']}")
-        for field, label in REQUIRED_FIELDS.items():
-            status = analysis["field_status"][field]
-            marker = "OK" if status == "OK" else f"** {status} **"
-            print(f"    {label}: {marker}")
-        print()
-        if not args.post:
-            print("  Generated note:")
-            for line in note.split("\n"):
-                print(f"    {line}")
-            print()
+        print_analysis(analysis, note, show_note=not args.post)
 
     print_scorecard(analyses)
 
     if args.post:
         print("Posting work notes to ServiceNow...\n")
-        for analysis, note in zip(analyses, notes):
-            sys_id = analysis["sys_id"]
-            number = analysis["number"]
-            print(f"  Posting to {number}...", end=" ")
-            if post_work_note(sys_id, note):
-                print("OK")
-            else:
-                print("FAILED")
+        if args.use_async:
+            from pir_async import post_notes
+            results = post_notes([(a["sys_id"], n) for a, n in zip(analyses, notes)], args.concurrency)
+            for analysis, ok in zip(analyses, results):
+                print(f"  Posting to {analysis['number']}... {'OK' if ok else 'FAILED'}")
+        else:
+            for analysis, note in zip(analyses, notes):
+                sys_id = analysis["sys_id"]
+                number = analysis["number"]
+                print(f"  Posting to {number}...", end=" ")
+                if post_work_note(sys_id, note):
+                    print("OK")
+                else:
+                    print("FAILED")
         print("\nDone.")
     else:
         print("DRY RUN - no notes posted. Use --post to post work notes.")
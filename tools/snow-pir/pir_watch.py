@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Review-queue watcher for near-real-time PIR feedback.
+
+Polls change_request with a sys_updated_on delta query and runs the standard
+PIR analysis on changes that entered Review or were edited while in Review.
+Polling backs off exponentially while the queue is idle and snaps back to the
+short interval as soon as something arrives. An optional localhost webhook
+receiver (e.g. fed by a ServiceNow outbound REST message on change_request
+update) wakes the loop immediately instead of waiting out the backoff.
+
+Started via `pir_review.py --watch`; see that module for the CLI flags.
+"""
+
+import hashlib
+import json
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from pir_review import (
+    REQUIRED_FIELDS,
+    _field_value,
+    analyze_change,
+    generate_pir_note,
+    post_work_note,
+    print_analysis,
+    query_review_changes_by_id,
+    query_review_changes_since,
+)
+
+STATE_FILE = Path(__file__).resolve().parent / ".pir_watch_state.json"
+
+# Fingerprints for changes not touched in this long are dropped from the state file
+FINGERPRINT_RETENTION = timedelta(days=30)
+
+SN_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).strftime(SN_TS_FORMAT)
+
+
+def _load_state() -> dict:
+    """Load the watermark and per-change fingerprints from disk."""
+    if STATE_FILE.exists():
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    # First start: only react to activity from now on
+    return {"watermark": _utc_now(), "fingerprints": {}, "failed": []}
+
+
+def _save_state(state: dict) -> None:
+    cutoff = (datetime.strptime(state["watermark"], SN_TS_FORMAT) - FINGERPRINT_RETENTION).strftime(SN_TS_FORMAT)
+    state["fingerprints"] = {
+        sys_id: entry for sys_id, entry in state["fingerprints"].items() if entry["updated"] >= cutoff
+    }
+    STATE_FILE.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def _raw_value(change: dict, field: str) -> str:
+    val = change.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def _fingerprint(change: dict) -> str:
+    """Hash the policy-relevant field values of a change.
+
+    Posting a work note bumps sys_updated_on, so the delta query alone would
+    re-trigger on our own notes. Only re-review when a required field changed.
+    """
+    values = [_field_value(change, field) for field in REQUIRED_FIELDS]
+    return hashlib.sha1(json.dumps(values).encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Webhook receiver
+# ---------------------------------------------------------------------------
+
+def _start_listener(port: int, wakeups: queue.Queue) -> ThreadingHTTPServer:
+    """Accept POSTs on 127.0.0.1:port; any push wakes the poll loop."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                payload = {}
+            wakeups.put(payload.get("number") or payload.get("sys_id") or "push")
+            self.send_response(202)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Listening for webhook pushes on http://127.0.0.1:{port}/")
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Watch loop
+# ---------------------------------------------------------------------------
+
+def poll_once(state: dict, post: bool) -> int:
+    """Run one delta poll. Returns the number of changes (re)reviewed.
+
+    The watermark moves past every record seen, so changes whose note failed
+    to post are kept in state["failed"] and fetched again by sys_id on each
+    poll until the post goes through (or they leave Review).
+    """
+    changes = query_review_changes_since(state["watermark"])
+    seen = {_raw_value(c, "sys_id") for c in changes}
+    retry = [sys_id for sys_id in state.get("failed", []) if sys_id not in seen]
+    changes += query_review_changes_by_id(retry)
+    failed = []
+    reviewed = 0
+    for change in changes:
+        sys_id = _raw_value(change, "sys_id")
+        updated = _raw_value(change, "sys_updated_on")
+        if updated > state["watermark"]:
+            state["watermark"] = updated
+
+        fp = _fingerprint(change)
+        previous = state["fingerprints"].get(sys_id)
+        if previous and previous["fp"] == fp:
+            previous["updated"] = updated
+            continue
+
+        analysis = analyze_change(change)
+        note = generate_pir_note(analysis)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {'Edited' if previous else 'Entered Review'}: "
+              f"{analysis['number']}")
+        print_analysis(analysis, note, show_note=not post)
+        if post:
+            print(f"  Posting to {analysis['number']}...", end=" ")
+            if not post_work_note(analysis["sys_id"], note):
+                # Leave the fingerprint unset and re-fetch it next poll
+                print("FAILED (will retry)")
+                failed.append(sys_id)
+                continue
+            print("OK")
+        state["fingerprints"][sys_id] = {"fp": fp, "updated": updated}
+        reviewed += 1
+    # Retries that weren't returned have left Review; nothing more to post for them
+    state["failed"] = failed
+    return reviewed
+
+
+def watch(post: bool, interval: float = 15, max_interval: float = 300, listen_port: int | None = None) -> None:
+    """Poll the Review queue until interrupted, with adaptive idle backoff."""
+    state = _load_state()
+    wakeups: queue.Queue = queue.Queue()
+    server = _start_listener(listen_port, wakeups) if listen_port else None
+
+    mode = "posting" if post else "dry run"
+    print(f"Watching Review queue ({mode}) from {state['watermark']} UTC. Ctrl+C to stop.")
+
+    delay = interval
+    try:
+        while True:
+            try:
+                reviewed = poll_once(state, post)
+            except Exception as e:
+                print(f"  WARN: poll failed: {e}")
+                reviewed = 0
+            _save_state(state)
+
+            # Activity keeps the short interval; each idle poll doubles the wait
+            delay = interval if reviewed else min(delay * 2, max_interval)
+            try:
+                source = wakeups.get(timeout=delay)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Woken by push ({source})")
+                delay = interval
+                # Coalesce bursts of pushes into a single poll
+                while not wakeups.empty():
+                    wakeups.get_nowait()
+            except queue.Empty:
+                pass
+    except KeyboardInterrupt:
+        print("\nStopping watcher.")
+    finally:
+        _save_state(state)
+        if server:
+            server.shutdown()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate plan detection across the change history.
+
+Implementation, backout and test plans are reduced to word shingles, hashed
+into MinHash signatures and bucketed with banded LSH, so finding copies of a
+plan among tens of thousands of changes costs a handful of indexed lookups
+instead of a pairwise scan. Signatures and buckets live in the change store
+database; updates only re-hash plans whose text changed since the last run.
+
+Usage:
+    python plan_similarity.py                 # Update index from change store
+    python plan_similarity.py CHG0039282      # Show near-copies of a change's plans
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: 'numpy' package required. Install with: pip install numpy")
+    sys.exit(1)
+
+from change_store import connect, get_change, get_meta, iter_changes, set_meta
+from pir_review import PLAN_FIELDS, REQUIRED_FIELDS, _field_value
+
+NUM_PERM = 128
+# 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+BANDS, ROWS = 16, 8
+SHINGLE_WORDS = 5
+# Shorter plans ("Revert the change.") are too generic to call copies
+MIN_WORDS = 15
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures must stay comparable across runs
+_rng = np.random.RandomState(20260212)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_signatures (
+    sys_id     TEXT NOT NULL,
+    field      TEXT NOT NULL,
+    number     TEXT NOT NULL,
+    text_hash  TEXT NOT NULL,
+    signature  BLOB,
+    PRIMARY KEY (sys_id, field)
+);
+CREATE TABLE IF NOT EXISTS plan_bands (
+    band    INTEGER NOT NULL,
+    bucket  TEXT NOT NULL,
+    sys_id  TEXT NOT NULL,
+    field   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plan_bands_bucket ON plan_bands(band, bucket);
+CREATE INDEX IF NOT EXISTS plan_bands_owner ON plan_bands(sys_id, field);
+"""
+
+_LIST_MARKER = re.compile(r"(?m)^\s*(?:\d+[\.\)]|[-*•])\s*")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# ---------------------------------------------------------------------------
+# MinHash
+# ---------------------------------------------------------------------------
+
+def _tokens(text: str) -> list[str]:
+    """Lowercase words with list numbering/bullets stripped, so renumbered copies still match."""
+    return _WORD.findall(_LIST_MARKER.sub(" ", text.lower()))
+
+
+def shingles(tokens: list[str]) -> np.ndarray:
+    """32-bit hashes of overlapping SHINGLE_WORDS-word windows."""
+    grams = {" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(shingle_hashes: np.ndarray) -> np.ndarray:
+    """NUM_PERM-value MinHash signature, all permutations in one vectorized pass."""
+    permuted = (np.outer(shingle_hashes, _PERM_A) + _PERM_B) % _MERSENNE & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_buckets(signature: np.ndarray) -> list[str]:
+    return [
+        hashlib.blake2b(signature[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+        for b in range(BANDS)
+    ]
+
+
+def _text_hash(tokens: list[str]) -> str:
+    return hashlib.sha1(" ".join(tokens).encode("utf-8")).hexdigest()
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class PlanIndex:
+    """MinHash/LSH index over plan fields, persisted in the change store."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        conn.executescript(SCHEMA)
+
+    def update(self, records: list[dict]) -> int:
+        """Index plan fields of the given change records. Returns plans re-hashed."""
+        known = dict(
+            ((sys_id, field), text_hash)
+            for sys_id, field, text_hash in self.conn.execute(
+                "SELECT sys_id, field, text_hash FROM plan_signatures")
+        )
+        hashed = 0
+        for record in records:
+            sys_id = _raw(record, "sys_id")
+            number = _field_value(record, "number")
+            if not sys_id:
+                continue
+            for field in PLAN_FIELDS:
+                tokens = _tokens(_field_value(record, field))
+                text_hash = _text_hash(tokens)
+                if known.get((sys_id, field)) == text_hash:
+                    continue
+                self.conn.execute("DELETE FROM plan_bands WHERE sys_id = ? AND field = ?", (sys_id, field))
+                signature = None
+                if len(tokens) >= MIN_WORDS:
+                    sig = minhash(shingles(tokens))
+                    signature = sig.tobytes()
+                    self.conn.executemany(
+                        "INSERT INTO plan_bands (band, bucket, sys_id, field) VALUES (?, ?, ?, ?)",
+                        [(b, bucket, sys_id, field) for b, bucket in enumerate(_band_buckets(sig))],
+                    )
+                    hashed += 1
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO plan_signatures (sys_id, field, number, text_hash, signature) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (sys_id, field, number, text_hash, signature),
+                )
+                known[(sys_id, field)] = text_hash
+        self.conn.commit()
+        return hashed
+
+    def update_from_store(self) -> int:
+        """Index changes the store received since the last index update."""
+        watermark = get_meta(self.conn, "plan_index_watermark") or ""
+        # Inclusive, so a change synced later with the same sys_updated_on as the watermark
+        # isn't skipped; re-reading the ones already indexed costs a hash compare each
+        records = list(iter_changes(self.conn, "sys_updated_on >= ?", (watermark,)))
+        hashed = self.update(records)
+        if records:
+            set_meta(self.conn, "plan_index_watermark", max(_raw(r, "sys_updated_on") for r in records))
+            self.conn.commit()
+        return hashed
+
+    def find_duplicates(self, change: dict, threshold: float = DUPLICATE_THRESHOLD) -> dict[str, list[dict]]:
+        """Return {plan_field: [match, ...]} for plans that near-copy another change's plan.
+
+        Each match is {"number", "field", "similarity"}, best first, at most three.
+        """
+        sys_id = _raw(change, "sys_id")
+        number = _field_value(change, "number")
+        found = {}
+        for field in sorted(PLAN_FIELDS):
+            tokens = _tokens(_field_value(change, field))
+            if len(tokens) < MIN_WORDS:
+                continue
+            sig = minhash(shingles(tokens))
+            candidates = set()
+            for band, bucket in enumerate(_band_buckets(sig)):
+                candidates.update(self.conn.execute(
+                    "SELECT sys_id, field FROM plan_bands WHERE band = ? AND bucket = ?", (band, bucket)))
+            candidates.discard((sys_id, field))
+            matches = []
+            for cand_id, cand_field in candidates:
+                cand_number, blob = self.conn.execute(
+                    "SELECT number, signature FROM plan_signatures WHERE sys_id = ? AND field = ?",
+                    (cand_id, cand_field)).fetchone()
+                if cand_id == sys_id or cand_number == number:
+                    continue
+                similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == sig))
+                if similarity >= threshold:
+                    matches.append({"number": cand_number, "field": cand_field, "similarity": similarity})
+            if matches:
+                found[field] = sorted(matches, key=lambda m: -m["similarity"])[:3]
+        return found
+
+
+def format_duplicates(duplicates: dict[str, list[dict]]) -> list[str]:
+    """Render find_duplicates output as note/gap lines."""
+    lines = []
+    for field, matches in duplicates.items():
+        refs = ", ".join(
+            f"{m['number']} {REQUIRED_FIELDS[m['field']]} ({m['similarity']:.0%})" for m in matches)
+        lines.append(f"- **{REQUIRED_FIELDS[field]}**: near-copy of {refs}")
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate plan index over the change store")
+    parser.add_argument("changes", nargs="*", help="CHG numbers to check against the index")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                        help=f"Minimum estimated Jaccard similarity (default: {DUPLICATE_THRESHOLD})")
+    args = parser.parse_args()
+
+    index = PlanIndex(connect())
+    print(f"Plan index: {index.update_from_store()} plan(s) hashed")
+
+    for number in args.changes:
+        change = get_change(index.conn, number)
+        if not change:
+            print(f"  WARN: {number} not in change store, skipping")
+            continue
+        lines = format_duplicates(index.find_duplicates(change, args.threshold))
+        print(f"--- {number} ---")
+        for line in lines or ["  No near-duplicate plans found."]:
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Historical-outcome risk scoring for changes.
+
+Learns P(change does not close "Successful") from the closed changes in the
+change store -- real close_code values from the Table API, not the estimated
+caches under scripts/ -- using a small L2-regularised logistic regression in
+NumPy. A "Successful" change that was followed by a P1/P2 incident on its own
+CI (incident_correlation.py) is also counted as failed. Upcoming changes are
+scored in one vectorised pass and written to the change store's risk_scores
+table, where the Teams card and CCB pack pick them up.
+
+Features: change type, assignment group, configuration item (top-N one-hot with
+an "other" bucket), _assess_plan quality of the three plans, lead time
+(created -> planned start) and planned window length.
+
+Usage:
+    python risk_model.py                # Train on history, then score upcoming changes
+    python risk_model.py train
+    python risk_model.py score
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: 'numpy' package required. Install with: pip install numpy")
+    sys.exit(1)
+
+from change_store import STORE_FILE, connect, iter_changes, load_change_incidents, save_risk_scores
+from pir_review import PLAN_FIELDS, _assess_plan, _field_value
+
+MODEL_FILE = STORE_FILE.with_name("risk_model.json")
+
+CLOSED_STATE = "3"
+# States that will never run again: Closed, Canceled
+FINISHED_STATES = ("3", "4")
+SUCCESS_CODE = "successful"
+# Correlated incidents (see incident_correlation.py) that make a "Successful" change a failure
+INCIDENT_RELATIONS = ("caused_by", "direct")
+INCIDENT_PRIORITY = "2"
+
+TOP_GROUPS = 25
+TOP_CIS = 50
+PLAN_SCORES = {"OK": 0.0, "WEAK": 0.5, "MISSING": 1.0}
+
+L2 = 1.0
+LEARNING_RATE = 0.1
+EPOCHS = 2000
+
+SN_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def _hours_between(start: str, end: str) -> float:
+    try:
+        delta = datetime.strptime(end, SN_TS_FORMAT) - datetime.strptime(start, SN_TS_FORMAT)
+    except ValueError:
+        return 0.0
+    return max(delta.total_seconds() / 3600, 0.0)
+
+
+# ---------------------------------------------------------------------------
+# Features
+# ---------------------------------------------------------------------------
+
+def _vocab(records: list[dict], field: str, top_n: int) -> list[str]:
+    counts = {}
+    for r in records:
+        value = _field_value(r, field)
+        if value:
+            counts[value] = counts.get(value, 0) + 1
+    return sorted(counts, key=lambda v: (-counts[v], v))[:top_n]
+
+
+def build_vocabulary(records: list[dict]) -> dict:
+    return {
+        "type": _vocab(records, "type", 10),
+        "assignment_group": _vocab(records, "assignment_group", TOP_GROUPS),
+        "cmdb_ci": _vocab(records, "cmdb_ci", TOP_CIS),
+    }
+
+
+def feature_names(vocab: dict) -> list[str]:
+    names = []
+    for field, values in vocab.items():
+        names.extend(f"{field}={v}" for v in values)
+        names.append(f"{field}=<other>")
+    names.extend(f"{f}_quality" for f in sorted(PLAN_FIELDS))
+    names.extend(["log_lead_time_days", "log_window_hours"])
+    return names
+
+
+def extract_features(records: list[dict], vocab: dict) -> np.ndarray:
+    """Build the (n_records, n_features) design matrix, bias column excluded."""
+    columns = {name: i for i, name in enumerate(feature_names(vocab))}
+    X = np.zeros((len(records), len(columns)), dtype=np.float64)
+    for row, r in enumerate(records):
+        for field, values in vocab.items():
+            value = _field_value(r, field)
+            X[row, columns.get(f"{field}={value}", columns[f"{field}=<other>"])] = 1.0
+        for field in PLAN_FIELDS:
+            X[row, columns[f"{field}_quality"]] = PLAN_SCORES[_assess_plan(_field_value(r, field))]
+        lead_days = _hours_between(_raw(r, "sys_created_on"), _raw(r, "start_date")) / 24
+        X[row, columns["log_lead_time_days"]] = np.log1p(lead_days)
+        X[row, columns["log_window_hours"]] = np.log1p(_hours_between(_raw(r, "start_date"), _raw(r, "end_date")))
+    return X
+
+
+def labels(records: list[dict], incident_failures: set[str] = frozenset()) -> np.ndarray:
+    """1 where the change closed with anything other than Successful, or is in incident_failures."""
+    return np.array([
+        _field_value(r, "close_code").lower() != SUCCESS_CODE or _field_value(r, "number") in incident_failures
+        for r in records
+    ], dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def train(X: np.ndarray, y: np.ndarray) -> dict:
+    """Full-batch gradient descent on standardised features. Returns model params."""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Xs = np.hstack([np.ones((len(X), 1)), (X - mean) / std])
+    # Unweighted loss keeps outputs calibrated, so scores read as probabilities
+    w = np.zeros(Xs.shape[1])
+    for _ in range(EPOCHS):
+        p = _sigmoid(Xs @ w)
+        grad = Xs.T @ (p - y) / len(y)
+        grad[1:] += L2 * w[1:] / len(y)
+        w -= LEARNING_RATE * grad
+    return {"weights": w.tolist(), "mean": mean.tolist(), "std": std.tolist()}
+
+
+def predict(model: dict, X: np.ndarray) -> np.ndarray:
+    """Failure probability for every row of X in one matrix product."""
+    Xs = (X - np.asarray(model["mean"])) / np.asarray(model["std"])
+    w = np.asarray(model["weights"])
+    return _sigmoid(w[0] + Xs @ w[1:])
+
+
+def _history(conn) -> list[dict]:
+    records = [r for r in iter_changes(conn, "state = ?", (CLOSED_STATE,)) if _field_value(r, "close_code")]
+    return sorted(records, key=lambda r: _raw(r, "start_date"))
+
+
+def train_from_store(conn) -> dict:
+    records = _history(conn)
+    if len(records) < 50:
+        print(f"ERROR: Only {len(records)} closed changes with a close code in the store; need at least 50.")
+        print("Run change_store.py --since <earlier date> to backfill history.")
+        sys.exit(1)
+    vocab = build_vocabulary(records)
+    incident_failures = set(load_change_incidents(conn, INCIDENT_RELATIONS, INCIDENT_PRIORITY))
+    X, y = extract_features(records, vocab), labels(records, incident_failures)
+
+    # Hold out the most recent 20% to report how well it generalises forward in time
+    split = int(len(records) * 0.8)
+    holdout = train(X[:split], y[:split])
+    p = predict(holdout, X[split:])
+    eps = 1e-9
+    log_loss = -np.mean(y[split:] * np.log(p + eps) + (1 - y[split:]) * np.log(1 - p + eps))
+    relabelled = sum(1 for r in records if _field_value(r, "number") in incident_failures
+                     and _field_value(r, "close_code").lower() == SUCCESS_CODE)
+    print(f"  {len(records)} closed changes, {y.mean():.1%} not Successful"
+          + (f" ({relabelled} Successful with a P1/P2 incident)" if relabelled else ""))
+    print(f"  Holdout ({len(records) - split}): log loss {log_loss:.3f}, "
+          f"mean score failed {p[y[split:] == 1].mean() if y[split:].any() else float('nan'):.2f} "
+          f"vs successful {p[y[split:] == 0].mean():.2f}")
+
+    model = {**train(X, y), "vocab": vocab, "features": feature_names(vocab),
+             "trained_at": datetime.now(timezone.utc).strftime(SN_TS_FORMAT), "n_train": len(records)}
+    MODEL_FILE.write_text(json.dumps(model, indent=2), encoding="utf-8")
+    print(f"  Model saved: {MODEL_FILE}")
+    return model
+
+
+def score_upcoming(conn, model: dict) -> dict[str, float]:
+    """Score every unfinished change with a planned start from now on."""
+    now = datetime.now(timezone.utc).strftime(SN_TS_FORMAT)
+    records = list(iter_changes(conn, "start_date >= ? AND state NOT IN (?, ?)", (now, *FINISHED_STATES)))
+    if not records:
+        return {}
+    scores = predict(model, extract_features(records, model["vocab"]))
+    result = {_field_value(r, "number"): round(float(s), 3) for r, s in zip(records, scores)}
+    save_risk_scores(conn, result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and apply the change outcome risk model")
+    parser.add_argument("command", nargs="?", choices=["train", "score", "all"], default="all")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command in ("train", "all"):
+        print("Training risk model on change store history...")
+        model = train_from_store(conn)
+    else:
+        if not MODEL_FILE.exists():
+            print(f"ERROR: No model at {MODEL_FILE}. Run: python risk_model.py train")
+            sys.exit(1)
+        model = json.loads(MODEL_FILE.read_text(encoding="utf-8"))
+
+    if args.command in ("score", "all"):
+        scores = score_upcoming(conn, model)
+        print(f"Scored {len(scores)} upcoming change(s)")
+        for number, score in sorted(scores.items(), key=lambda kv: -kv[1])[:10]:
+            print(f"  {number}  {score:.0%}")
+
+
+if __name__ == "__main__":
+    main()
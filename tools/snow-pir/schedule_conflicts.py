@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Schedule collision detection for the change calendar.
+
+Builds a static interval tree over the planned windows (start, end) of the
+changes sharing each configuration item, and of those sharing each
+assignment group, and reports every overlapping pair. Intervals are sorted
+by start once, so listing all k overlapping pairs costs O(n log n + k); the
+tree's max-end augmentation answers "what overlaps [lo, hi)?" in
+O(log n + k) for ad-hoc lookups.
+
+The calendar renderers (scripts/create-calendar-*.py) and the Teams card
+(scripts/post-calendar-webhook.py) use collisions() to flag changes.
+
+Usage:
+    python schedule_conflicts.py                     # Collisions in scripts/calendar_changes.json
+    python schedule_conflicts.py path/to/cache.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+CALENDAR_CACHE = Path(__file__).resolve().parent.parent.parent / "scripts" / "calendar_changes.json"
+
+# (record field, label) pairs whose shared values make overlapping windows a collision
+COLLISION_KEYS = [("cmdb_ci", "CI"), ("assignment_group", "group")]
+
+# Time zone of ServiceNow display values and of blackout definitions; the calendar
+# cache's start_at/end_at are UTC, so everything is compared in UTC
+try:
+    LOCAL_TZ = ZoneInfo(os.environ.get("CHANGE_TZ", "America/Los_Angeles"))
+except ZoneInfoNotFoundError:
+    print("ERROR: time zone data not found. Install with: pip install tzdata")
+    sys.exit(1)
+
+# Window assumed when a change has a start but no (or an earlier) end
+DEFAULT_DURATION = timedelta(hours=1)
+
+
+# ---------------------------------------------------------------------------
+# Interval tree
+# ---------------------------------------------------------------------------
+
+class IntervalIndex:
+    """Static interval tree over half-open [start, end) intervals.
+
+    Intervals are sorted by start and stored as an implicit balanced tree
+    (the middle of each slice is its root) with each node's subtree max end,
+    so queries skip any subtree that ends before the range starts.
+    """
+
+    def __init__(self, intervals: list[tuple]):
+        """`intervals` are (start, end, item); starts/ends need only be comparable."""
+        ordered = sorted(intervals, key=lambda iv: iv[0])
+        self.starts = [iv[0] for iv in ordered]
+        self.ends = [max(iv[0], iv[1]) for iv in ordered]
+        self.items = [iv[2] for iv in ordered]
+        self._max_end = list(self.ends)
+        self._augment(0, len(self.items))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _augment(self, lo: int, hi: int):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        best = self.ends[mid]
+        for child in (self._augment(lo, mid), self._augment(mid + 1, hi)):
+            if child is not None and child > best:
+                best = child
+        self._max_end[mid] = best
+        return best
+
+    def overlapping(self, lo, hi) -> list:
+        """Items whose interval intersects [lo, hi), in start order."""
+        found = []
+        stack = [(0, len(self.items))]
+        while stack:
+            a, b = stack.pop()
+            if a >= b:
+                continue
+            mid = (a + b) // 2
+            if self._max_end[mid] <= lo:
+                continue        # Nothing in this subtree ends after lo
+            stack.append((a, mid))
+            if self.starts[mid] < hi:
+                if self.ends[mid] > lo:
+                    found.append(mid)
+                stack.append((mid + 1, b))
+        return [self.items[i] for i in sorted(found)]
+
+    def covering(self, point) -> list:
+        """Items whose interval contains `point`, in start order."""
+        found = []
+        stack = [(0, len(self.items))]
+        while stack:
+            a, b = stack.pop()
+            if a >= b:
+                continue
+            mid = (a + b) // 2
+            if self._max_end[mid] <= point:
+                continue
+            stack.append((a, mid))
+            if self.starts[mid] <= point:
+                if self.ends[mid] > point:
+                    found.append(mid)
+                stack.append((mid + 1, b))
+        return [self.items[i] for i in sorted(found)]
+
+    def pairs(self) -> Iterator[tuple]:
+        """Every pair of items whose intervals overlap, each pair once."""
+        starts, ends, items = self.starts, self.ends, self.items
+        for i in range(len(items)):
+            j = i + 1
+            # Later starts only; they overlap i until one starts at or after i ends
+            while j < len(items) and starts[j] < ends[i]:
+                if ends[j] > starts[j]:
+                    yield items[i], items[j]
+                j += 1
+
+
+# ---------------------------------------------------------------------------
+# Calendar collisions
+# ---------------------------------------------------------------------------
+
+def parse_time(text: str) -> datetime | None:
+    """'YYYY-MM-DD[ HH:MM[:SS]]' (or ISO 8601) to a naive datetime."""
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(str(text).replace("Z", "")[:19])
+    except ValueError:
+        return None
+
+
+def to_utc(when: datetime | None, tz: ZoneInfo = LOCAL_TZ) -> datetime | None:
+    """Naive local time in `tz` to naive UTC (the calendar cache's convention)."""
+    if when is None:
+        return None
+    return when.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def from_utc(when: datetime | None, tz: ZoneInfo = LOCAL_TZ) -> datetime | None:
+    """Naive UTC to naive local time in `tz`, for display."""
+    if when is None:
+        return None
+    return when.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None)
+
+
+def calendar_window(change: dict) -> tuple[datetime, datetime] | None:
+    """Planned window (UTC) of a calendar cache record.
+
+    Uses the full start_at/end_at timestamps when the cache has them; older
+    caches only carry planned_start/planned_end dates, which count as whole days.
+    """
+    start, end = parse_time(change.get("start_at")), parse_time(change.get("end_at"))
+    if start is None:
+        start = parse_time(change.get("planned_start"))
+        if start is None:
+            return None
+        end = parse_time(change.get("planned_end")) or start
+        end += timedelta(days=1)
+    if end is None or end <= start:
+        end = start + DEFAULT_DURATION
+    return start, end
+
+
+def _value(change: dict, field: str) -> str:
+    val = change.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("display_value") or val.get("value", "")
+    return (val or "").strip()
+
+
+def collisions(changes: list[dict], window: Callable[[dict], tuple | None] = calendar_window,
+               keys: list[tuple[str, str]] = COLLISION_KEYS) -> dict[str, list[tuple[str, str, str]]]:
+    """Overlapping changes by change number: number -> [(other number, label, shared value)].
+
+    One interval tree per distinct value of each key field; pairs found under
+    several keys are listed once per key.
+    """
+    windows = [(c, window(c)) for c in changes]
+    found: dict[str, list[tuple[str, str, str]]] = {}
+    for field, label in keys:
+        groups: dict[str, list[tuple]] = {}
+        for change, span in windows:
+            value = _value(change, field)
+            if value and span:
+                groups.setdefault(value, []).append((span[0], span[1], _value(change, "number")))
+        for value, intervals in groups.items():
+            if len(intervals) < 2:
+                continue
+            for a, b in IntervalIndex(intervals).pairs():
+                if a == b:
+                    continue
+                found.setdefault(a, []).append((b, label, value))
+                found.setdefault(b, []).append((a, label, value))
+    return found
+
+
+def describe(entries: list[tuple[str, str, str]]) -> str:
+    """'CHG0039001 (CI: ORDC-HX), CHG0039002 (group: Infosec)'."""
+    return ", ".join(f"{other} ({label}: {value})" for other, label, value in entries)
+
+
+def pair_list(found: dict[str, list[tuple[str, str, str]]]) -> list[tuple[str, str, str, str]]:
+    """Each colliding pair once, as (number, other, label, value), sorted."""
+    return sorted({(a, b, label, value) for a, entries in found.items()
+                   for b, label, value in entries if a < b})
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="List overlapping changes on the same CI or group")
+    parser.add_argument("cache", nargs="?", type=Path, default=CALENDAR_CACHE, help="Calendar cache JSON")
+    args = parser.parse_args()
+
+    if not args.cache.exists():
+        print(f"ERROR: {args.cache} not found. Run scripts/refresh-calendar.py first.")
+        sys.exit(1)
+    changes = json.loads(args.cache.read_text(encoding="utf-8"))
+    found = collisions(changes)
+    pairs = pair_list(found)
+    print(f"{len(changes)} change(s), {len(pairs)} colliding pair(s) across {len(found)} change(s)")
+    for a, b, label, value in pairs:
+        print(f"  {a}  <->  {b}   same {label}: {value}")
+
+
+if __name__ == "__main__":
+    main()
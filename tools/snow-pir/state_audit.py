@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+change_request state history from sys_audit, cached in the change store.
+
+sys_audit is enormous and slow to query, so transitions are fetched in bulk
+(`documentkeyIN` chunks of CHUNK_SIZE changes, filtered to fieldname=state and
+projected to four fields) and kept in the store's state_transitions table. Each
+change remembers how far its audit has been read (audit_fetched); later runs
+only ask for rows newer than that, so a change is never re-read from scratch.
+
+Transitions become time-in-state segments -- flat NumPy arrays of (change,
+state, start, end) -- that the reports aggregate without per-change loops.
+
+Usage:
+    python state_audit.py CHG0039327 CHG0039351    # Show state history and dwell times
+"""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: 'numpy' package required. Install with: pip install numpy")
+    sys.exit(1)
+
+from change_store import connect, get_change, load_transitions, save_transitions
+
+# State codes: -5=New, -4=Assess, -3=Authorize, -2=Scheduled, -1=Implement,
+# 0=Review, 3=Closed, 4=Canceled
+STATE_LABELS = {
+    "-5": "New", "-4": "Assess", "-3": "Authorize", "-2": "Scheduled",
+    "-1": "Implement", "0": "Review", "3": "Closed", "4": "Canceled",
+}
+STATES = list(STATE_LABELS)
+NEW_STATE = "-5"
+
+AUDIT_FIELDS = ["documentkey", "oldvalue", "newvalue", "sys_created_on"]
+CHUNK_SIZE = 100        # sys_ids per documentkeyIN query; keeps the URL well under limits
+FETCH_WORKERS = 4
+# Audit rows can land a little after the change they record; re-read this much overlap
+AUDIT_LAG = timedelta(minutes=10)
+SN_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+# ---------------------------------------------------------------------------
+# Fetch
+# ---------------------------------------------------------------------------
+
+def _fetch_chunk(sys_ids: list[str], after: str | None) -> list[tuple]:
+    from pir_review import query_table
+
+    query = f"tablename=change_request^fieldname=state^documentkeyIN{','.join(sys_ids)}"
+    if after:
+        # Inclusive: cycle_time writes `through` as an exclusive slice bound, so rows stamped
+        # exactly then are still unread; rows already stored are dropped by INSERT OR IGNORE
+        query += f"^sys_created_on>={after}"
+    rows = query_table("sys_audit", query + "^ORDERBYsys_created_on", fields=AUDIT_FIELDS, limit=1000)
+    return [
+        (_raw(r, "documentkey"), _raw(r, "sys_created_on"), _raw(r, "oldvalue"), _raw(r, "newvalue"))
+        for r in rows
+        if _raw(r, "newvalue")
+    ]
+
+
+def update_transitions(conn, sys_ids: list[str]) -> int:
+    """Fetch audit rows the store hasn't seen for these changes. Returns rows fetched.
+
+    Changes are grouped by how far their audit was last read so each group is
+    one filtered query per chunk; never-read changes get their full history.
+    """
+    fetched = dict(conn.execute("SELECT sys_id, through FROM audit_fetched"))
+    groups: dict[str | None, list[str]] = {}
+    for sys_id in dict.fromkeys(sys_ids):
+        groups.setdefault(fetched.get(sys_id), []).append(sys_id)
+    jobs = [(ids[i:i + CHUNK_SIZE], after) for after, ids in groups.items() for i in range(0, len(ids), CHUNK_SIZE)]
+    if not jobs:
+        return 0
+
+    from pir_review import get_access_token
+
+    through = (datetime.now(timezone.utc) - AUDIT_LAG).strftime(SN_TS_FORMAT)
+    get_access_token()      # Refresh once up front rather than racing in every thread
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(jobs))) as pool:
+        results = list(pool.map(lambda job: _fetch_chunk(*job), jobs))
+    rows = [row for chunk in results for row in chunk]
+    save_transitions(conn, rows, {sys_id: through for ids, _ in jobs for sys_id in ids})
+    return len(rows)
+
+
+def transitions_for(conn, records: list[dict], fetch: bool = True) -> dict[str, list[tuple]]:
+    """State transitions by sys_id for these change records, topping up the cache first."""
+    sys_ids = [_raw(r, "sys_id") for r in records if _raw(r, "sys_id")]
+    if fetch:
+        update_transitions(conn, sys_ids)
+    return load_transitions(conn, sys_ids)
+
+
+# ---------------------------------------------------------------------------
+# Time in state
+# ---------------------------------------------------------------------------
+
+def _ts(values) -> np.ndarray:
+    return np.array([v or "NaT" for v in values], dtype="datetime64[s]")
+
+
+def segments(records: list[dict], transitions: dict[str, list[tuple]], now: datetime) -> dict[str, np.ndarray]:
+    """Flatten state history into time-in-state segments.
+
+    Returns parallel arrays: `change` (index into records), `state` (index
+    into STATES, -1 if unknown), `start`/`end` (datetime64[s]), `days` and
+    `open`. Each change starts in its first audited old state (New if the
+    insert was audited) at sys_created_on; its last segment is open and runs
+    until `now`.
+    """
+    rows = []
+    now_text = now.astimezone(timezone.utc).strftime(SN_TS_FORMAT)
+    for i, record in enumerate(records):
+        history = transitions.get(_raw(record, "sys_id"), [])
+        if not history:
+            continue
+        at, current = _raw(record, "sys_created_on") or history[0][0], history[0][1] or NEW_STATE
+        for when, _, new in history:
+            if new == current:
+                continue
+            rows.append((i, current, at, when, False))
+            at, current = when, new
+        rows.append((i, current, at, now_text, True))
+
+    idx, state, start, end, is_open = zip(*rows) if rows else ((), (), (), (), ())
+    position = {s: n for n, s in enumerate(STATES)}
+    start_ts, end_ts = _ts(start), _ts(end)
+    return {
+        "change": np.array(idx, dtype=np.int64),
+        "state": np.array([position.get(s, -1) for s in state], dtype=np.int64),
+        "start": start_ts,
+        "end": end_ts,
+        "days": np.maximum((end_ts - start_ts).astype(np.float64) / 86400, 0.0),
+        "open": np.array(is_open, dtype=bool),
+    }
+
+
+def dwell_matrix(segs: dict[str, np.ndarray], n: int, closed_only: bool = False) -> np.ndarray:
+    """Total days each of n changes spent in each state: shape (n, len(STATES)).
+
+    With closed_only, time in the current (still open) state is left out.
+    """
+    out = np.zeros((n, len(STATES)))
+    known = segs["state"] >= 0
+    if closed_only:
+        known &= ~segs["open"]
+    np.add.at(out, (segs["change"][known], segs["state"][known]), segs["days"][known])
+    return out
+
+
+def current_entry(segs: dict[str, np.ndarray], n: int) -> np.ndarray:
+    """When each change entered its current state (NaT where there is no audit history)."""
+    out = np.full(n, np.datetime64("NaT"), dtype="datetime64[s]")
+    change = segs["change"]
+    if len(change):
+        # Segments are grouped by change in time order, so each group's last is current
+        last = np.r_[change[1:] != change[:-1], True]
+        out[change[last]] = segs["start"][last]
+    return out
+
+
+def state_path(dwell_row: np.ndarray, min_days: float = 0.05) -> str:
+    """'Assess 1.2d → Authorize 0.8d → ...' in lifecycle order, skipping blips."""
+    return " → ".join(
+        f"{STATE_LABELS[s]} {d:.1f}d" for s, d in zip(STATES, dwell_row) if d >= min_days
+    )
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Show change_request state history from sys_audit")
+    parser.add_argument("numbers", nargs="+", help="Change numbers (must be in the change store)")
+    parser.add_argument("--no-fetch", action="store_true", help="Use cached audit rows only")
+    args = parser.parse_args()
+
+    conn = connect()
+    records = []
+    for number in args.numbers:
+        record = get_change(conn, number.upper())
+        if not record:
+            print(f"ERROR: {number} is not in the change store (run change_store.py first)")
+            sys.exit(1)
+        records.append(record)
+
+    transitions = transitions_for(conn, records, fetch=not args.no_fetch)
+    now = datetime.now(timezone.utc)
+    dwell = dwell_matrix(segments(records, transitions, now), len(records))
+    for record, row in zip(records, dwell):
+        number = _raw(record, "number")
+        print(f"\n{number}  ({STATE_LABELS.get(_raw(record, 'state'), _raw(record, 'state'))})")
+        for at, old, new in transitions[_raw(record, "sys_id")]:
+            print(f"  {at}  {STATE_LABELS.get(old, old or '(insert)'):>10} -> {STATE_LABELS.get(new, new)}")
+        print(f"  {state_path(row) or 'no audit history'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Microsoft Graph delivery for Teams posts.
+
+Posts adaptive cards as channel messages (or thread replies) through Graph's
+JSON $batch endpoint, so fanning one update out to a dozen assignment-group
+channels is a single round trip with a status per message. The token comes
+silently from the MSAL cache that scripts/reauth-msal.py maintains
+(ChannelMessage.Send); refreshed tokens are written back to it.
+
+Targets are strings "graph:<team id>/<channel id>[/<message id>]" -- with a
+message id the card is posted as a reply in that thread. teams_outbox.py
+routes any target with this prefix here, so Graph posts get the same queueing,
+retry and ordering as webhook posts.
+
+Channels per assignment group are configured in teams_channels.json next to
+this file (TEAMS_CHANNELS_FILE to override):
+
+    {"default": {"team": "<team id>", "channel": "19:...@thread.tacv2"},
+     "groups": {"Infosec": {"team": "<team id>", "channel": "19:...", "thread": "<message id>"}}}
+
+Without the file everything goes to the Change Control channel
+(TEAMS_GROUP_ID / TEAMS_CHANNEL_ID).
+
+Usage:
+    python teams_graph.py                  # Check the token and list configured channels
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:
+    print("ERROR: 'requests' package required. Install with: pip install requests")
+    sys.exit(1)
+
+TENANT_ID = os.environ.get("AZURE_TENANT_ID", "56b24b68-e3c8-4895-89a0-05a74d0f8c84")
+MSAL_CLIENT_ID = os.environ.get("MSAL_CLIENT_ID", "14d82eec-204b-4c2f-b7e8-296a70dab67e")
+MSAL_TOKEN_CACHE = Path(os.environ.get(
+    "MSAL_TOKEN_CACHE", Path.home() / ".email_ingest" / "vituity_token_cache.json"))
+GROUP_ID = os.environ.get("TEAMS_GROUP_ID", "fb1fa849-3b0d-4d15-a72f-f1b56d60186a")
+CHANNEL_ID = os.environ.get("TEAMS_CHANNEL_ID", "19:77c7ce1868b546108d5e77c65eff8a3b@thread.skype")
+CHANNELS_FILE = Path(os.environ.get("TEAMS_CHANNELS_FILE", Path(__file__).resolve().parent / "teams_channels.json"))
+
+SCOPES = ["ChannelMessage.Send"]
+GRAPH = "https://graph.microsoft.com/v1.0"
+GRAPH_PREFIX = "graph:"
+BATCH_LIMIT = 20            # Graph accepts at most 20 requests per $batch
+TIMEOUT = (5, 60)
+TOKEN_MARGIN = 300          # Refresh this many seconds before the token expires
+
+_token = None
+_token_expires = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Targets
+# ---------------------------------------------------------------------------
+
+def target(team: str, channel: str, thread: str = "") -> str:
+    return f"{GRAPH_PREFIX}{team}/{channel}" + (f"/{thread}" if thread else "")
+
+
+def _message_url(target_: str) -> str:
+    team, channel, *thread = target_[len(GRAPH_PREFIX):].split("/")
+    url = f"/teams/{team}/channels/{channel}/messages"
+    return f"{url}/{thread[0]}/replies" if thread else url
+
+
+def load_channels(path: Path = CHANNELS_FILE) -> dict:
+    """{"default": target, "groups": {assignment group: target}}."""
+    config = {}
+    if path.exists():
+        try:
+            config = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as exc:
+            print(f"ERROR: {path} is not valid JSON: {exc}")
+            sys.exit(1)
+    default = config.get("default") or {"team": GROUP_ID, "channel": CHANNEL_ID}
+    groups = {}
+    for name, entry in config.get("groups", {}).items():
+        if not entry.get("channel"):
+            print(f"ERROR: {path} group '{name}' needs a channel id")
+            sys.exit(1)
+        groups[name] = target(entry.get("team") or default["team"], entry["channel"], entry.get("thread", ""))
+    return {"default": target(default["team"], default["channel"], default.get("thread", "")), "groups": groups}
+
+
+# ---------------------------------------------------------------------------
+# Auth
+# ---------------------------------------------------------------------------
+
+def acquire_token() -> str:
+    """Access token from the MSAL cache, without prompting. Raises RuntimeError when a re-auth is needed.
+
+    The token is reused until TOKEN_MARGIN seconds before it expires, so a
+    long --watch run picks up a refreshed one instead of posting with a dead one.
+    """
+    global _token, _token_expires
+    if _token and time.time() < _token_expires - TOKEN_MARGIN:
+        return _token
+    try:
+        import msal
+    except ImportError:
+        print("ERROR: 'msal' package required for Graph posting. Install with: pip install msal")
+        sys.exit(1)
+    if not MSAL_TOKEN_CACHE.exists():
+        raise RuntimeError(f"No MSAL token cache at {MSAL_TOKEN_CACHE}. Run scripts/reauth-msal.py.")
+    cache = msal.SerializableTokenCache()
+    cache.deserialize(MSAL_TOKEN_CACHE.read_text())
+    app = msal.PublicClientApplication(
+        MSAL_CLIENT_ID,
+        authority=f"https://login.microsoftonline.com/{TENANT_ID}",
+        token_cache=cache,
+    )
+    accounts = app.get_accounts()
+    if not accounts:
+        raise RuntimeError("No MSAL accounts found. Run scripts/reauth-msal.py.")
+    result = app.acquire_token_silent(SCOPES, account=accounts[0])
+    if not result or "access_token" not in result:
+        raise RuntimeError("MSAL token expired. Run scripts/reauth-msal.py.")
+    if cache.has_state_changed:
+        MSAL_TOKEN_CACHE.write_text(cache.serialize())
+    _token = result["access_token"]
+    _token_expires = time.time() + int(result.get("expires_in", 3600))
+    return _token
+
+
+def _drop_token():
+    """Forget the cached token after Graph rejected it; the next batch acquires a fresh one."""
+    global _token
+    _token = None
+
+
+# ---------------------------------------------------------------------------
+# Posting
+# ---------------------------------------------------------------------------
+
+def chat_message(message: dict) -> dict:
+    """Incoming-webhook message (adaptive card attachments) -> Graph chatMessage."""
+    attachments = [
+        {"id": f"card{i}", "contentType": a["contentType"], "content": json.dumps(a["content"], ensure_ascii=False)}
+        for i, a in enumerate(message.get("attachments", []), 1)
+    ]
+    return {
+        "body": {"contentType": "html", "content": "".join(f'<attachment id="{a["id"]}"></attachment>'
+                                                           for a in attachments)},
+        "attachments": attachments,
+    }
+
+
+def post_batch(posts: list[tuple[str, bytes]]) -> list[tuple]:
+    """Send [(target, webhook-style payload)] in $batch requests.
+
+    Returns one (HTTP status or None, headers, detail) per post, in order;
+    None means the post never reached Teams (network or token trouble) and is
+    worth retrying.
+    """
+    results: list[tuple] = []
+    for start in range(0, len(posts), BATCH_LIMIT):
+        chunk = posts[start:start + BATCH_LIMIT]
+        try:
+            token = acquire_token()
+        except RuntimeError as exc:
+            results.extend([(None, {}, str(exc))] * len(chunk))
+            continue
+        body = {"requests": [
+            {"id": str(i), "method": "POST", "url": _message_url(t),
+             "headers": {"Content-Type": "application/json"}, "body": chat_message(json.loads(payload))}
+            for i, (t, payload) in enumerate(chunk)
+        ]}
+        try:
+            r = requests.post(f"{GRAPH}/$batch", json=body, timeout=TIMEOUT,
+                              headers={"Authorization": f"Bearer {token}"})
+        except requests.RequestException as exc:
+            results.extend([(None, {}, str(exc))] * len(chunk))
+            continue
+        if r.status_code != 200:
+            # The batch itself failed (throttled, token rejected); every post in it shares the outcome
+            status = None if r.status_code == 401 else r.status_code
+            if r.status_code == 401:
+                _drop_token()
+            results.extend([(status, r.headers, f"$batch HTTP {r.status_code}: {r.text[:300]}")] * len(chunk))
+            continue
+        by_id = {item["id"]: item for item in r.json().get("responses", [])}
+        for i in range(len(chunk)):
+            item = by_id.get(str(i))
+            if item is None:
+                results.append((None, {}, "missing from $batch response"))
+                continue
+            detail = item.get("body", {}).get("error", {}).get("message", "") if isinstance(item.get("body"), dict) else ""
+            status = None if item["status"] == 401 else item["status"]
+            if item["status"] == 401:
+                _drop_token()
+            results.append((status, item.get("headers", {}), detail or str(item["status"])))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    channels = load_channels()
+    print(f"Default channel: {channels['default']}")
+    for name, t in sorted(channels["groups"].items()):
+        print(f"  {name}: {t}")
+    try:
+        acquire_token()
+    except RuntimeError as exc:
+        print(f"ERROR: {exc}")
+        sys.exit(1)
+    print(f"Token OK from {MSAL_TOKEN_CACHE}")
+
+
+if __name__ == "__main__":
+    main()
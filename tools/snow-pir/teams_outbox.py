@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Durable outbox for Teams posts.
+
+Card posts are written to a SQLite outbox (TEAMS_OUTBOX_DB, default
+teams_outbox.db next to this file) before anything goes over the network,
+then delivered by deliver(). A post that fails transiently -- connection
+errors, timeouts, 408/429/5xx -- stays queued with exponential backoff
+(honouring Retry-After when Teams throttles), so a notification survives an
+outage without re-running the ServiceNow fetch that produced it. Other 4xx
+responses mean the card itself is bad; those posts are parked as dead after
+the first attempt.
+
+Every post has an idempotency key (by default a hash of target and payload):
+enqueueing the same card twice is a no-op, and a post already delivered is
+never sent again. Targets are webhook URLs or "graph:" channel targets
+(teams_graph.py), whose posts share $batch requests. Posts to one target go
+out in order; queued posts marked mergeable (calendar deltas) are coalesced
+into as few requests as fit the payload budget when they've piled up.
+
+Several processes may deliver from one outbox (a --watch loop and the
+scheduled calendar post, say). deliver() claims the rows it is about to send
+inside a write transaction, marking them 'sending' with a lease in
+next_attempt_at, so no post goes out twice; a target with posts claimed by
+another process is left alone until that lease ends, which keeps its order.
+Claims left by a process that died are picked up again once the lease ends.
+
+Usage:
+    python teams_outbox.py                 # Deliver whatever is due
+    python teams_outbox.py --watch         # Keep delivering until the queue is empty
+    python teams_outbox.py --list          # Show pending and dead posts
+    python teams_outbox.py --retry-dead    # Re-queue dead posts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:
+    print("ERROR: 'requests' package required. Install with: pip install requests")
+    sys.exit(1)
+
+OUTBOX_FILE = Path(os.environ.get("TEAMS_OUTBOX_DB", Path(__file__).resolve().parent / "teams_outbox.db"))
+
+# Teams rejects webhook payloads over ~28 KB; merged posts stay under this
+MAX_PAYLOAD = 27 * 1024
+BACKOFF_BASE = 30           # Seconds before the first retry; doubles per attempt
+BACKOFF_MAX = 3600
+MAX_ATTEMPTS = 12           # ~9 hours of retries before a post is parked as dead
+TIMEOUT = (5, 30)           # Connect / read seconds
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+SENT_RETENTION = timedelta(days=30)
+CLAIM_LEASE = timedelta(minutes=10)   # How long a delivering process owns the posts it claimed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    key             TEXT NOT NULL UNIQUE,
+    target          TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    mergeable       INTEGER NOT NULL DEFAULT 0,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    created_at      TEXT NOT NULL,
+    next_attempt_at TEXT NOT NULL,
+    sent_at         TEXT,
+    last_error      TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt_at);
+"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _ts(when: datetime) -> str:
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def connect(path: Path = OUTBOX_FILE) -> sqlite3.Connection:
+    """Open (creating if needed) the outbox."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+# ---------------------------------------------------------------------------
+# Enqueue
+# ---------------------------------------------------------------------------
+
+def enqueue(conn: sqlite3.Connection, target: str, messages: list[dict], mergeable: bool = False,
+            key: str | None = None) -> int:
+    """Queue messages for `target` (a webhook URL or a teams_graph target). Returns how many were new.
+
+    Keys default to a hash of target + payload; with an explicit `key`, part
+    i of n is keyed "key:i". Already-queued or already-sent keys are skipped.
+    """
+    now = _ts(_now())
+    rows = []
+    for i, message in enumerate(messages, 1):
+        payload = _encode(message)
+        post_key = f"{key}:{i}" if key else hashlib.sha256(f"{target}\n{payload}".encode("utf-8")).hexdigest()
+        rows.append((post_key, target, payload, int(mergeable), now, now))
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO outbox (key, target, payload, mergeable, created_at, next_attempt_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)", rows,
+    )
+    conn.commit()
+    return conn.total_changes - before
+
+
+# ---------------------------------------------------------------------------
+# Delivery
+# ---------------------------------------------------------------------------
+
+def _retry_after(headers, attempt: int) -> float:
+    """Seconds to wait: Retry-After when given (seconds or HTTP date), else jittered exponential backoff."""
+    value = (headers or {}).get("Retry-After")
+    if value:
+        try:
+            return max(float(value), 1.0)
+        except ValueError:
+            try:
+                return max((parsedate_to_datetime(value) - _now()).total_seconds(), 1.0)
+            except (TypeError, ValueError):
+                pass
+    delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def post_webhook(target: str, payload: bytes):
+    """POST one payload. Returns (HTTP status or None on a network error, headers, detail)."""
+    try:
+        r = requests.post(target, data=payload, headers={"Content-Type": "application/json; charset=utf-8"},
+                          timeout=TIMEOUT)
+    except requests.RequestException as exc:
+        return None, {}, str(exc)
+    detail = r.text[:500]
+    # Teams webhooks answer 200 with a body of "1"; anything else in the body is an error message,
+    # e.g. "Microsoft Teams endpoint returned HTTP error 429 ..." -- retry those, drop the rest
+    if 200 <= r.status_code < 300 and r.text.strip() != "1":
+        match = re.search(r"\b(429|5\d\d)\b", r.text)
+        return (int(match.group(1)) if match else 400), r.headers, f"HTTP {r.status_code} with error body: {detail}"
+    return r.status_code, r.headers, detail
+
+
+def merge_messages(messages: list[dict]) -> dict:
+    """One adaptive-card message holding the bodies of several, in order."""
+    merged = json.loads(json.dumps(messages[0]))
+    body = merged["attachments"][0]["content"]["body"]
+    for message in messages[1:]:
+        extra = message["attachments"][0]["content"]["body"]
+        if extra:
+            body.append({**extra[0], "separator": True})
+            body.extend(extra[1:])
+    return merged
+
+
+def _batches(rows: list[tuple], budget: int) -> list[list[tuple]]:
+    """Group a target's due rows in order; consecutive mergeable rows share a post while they fit."""
+    batches: list[list[tuple]] = []
+    size = 0
+    for row in rows:
+        payload_size = len(row[2].encode("utf-8"))
+        last = batches[-1] if batches else None
+        if last and row[3] and last[-1][3] and size + payload_size <= budget:
+            last.append(row)
+            size += payload_size
+        else:
+            batches.append([row])
+            size = payload_size
+    return batches
+
+
+def send_all(posts: list[tuple[str, bytes]]) -> list[tuple]:
+    """Send [(target, payload)]; Graph targets share $batch requests, webhooks go one by one."""
+    results: list[tuple | None] = [None] * len(posts)
+    graph = [i for i, (target, _) in enumerate(posts) if target.startswith("graph:")]
+    if graph:
+        import teams_graph
+        for i, result in zip(graph, teams_graph.post_batch([posts[i] for i in graph])):
+            results[i] = result
+    for i, (target, payload) in enumerate(posts):
+        if results[i] is None:
+            results[i] = post_webhook(target, payload)
+    return results
+
+
+def _record(conn: sqlite3.Connection, batch: list[tuple], result: tuple, stats: dict) -> bool:
+    """Store the outcome of sending one batch. True if it was sent or dropped, False if it will be retried."""
+    status, headers, detail = result
+    ids = [r[0] for r in batch]
+    marks = ",".join("?" * len(ids))
+    if status is not None and 200 <= status < 300:
+        conn.execute(f"UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, "
+                     f"last_error = NULL WHERE id IN ({marks})", (_ts(_now()), *ids))
+        stats["sent"] += len(ids)
+        return True
+    attempt = max(r[4] for r in batch) + 1
+    error = f"HTTP {status}: {detail}" if status is not None else detail
+    permanent = status is not None and status not in RETRY_STATUSES and 400 <= status < 500
+    if permanent or attempt >= MAX_ATTEMPTS:
+        conn.execute(f"UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id IN ({marks})",
+                     (attempt, error, *ids))
+        stats["dead"] += len(ids)
+        return True         # A bad card mustn't hold up the ones behind it
+    retry_at = _ts(_now() + timedelta(seconds=_retry_after(headers, attempt)))
+    conn.execute(f"UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ? "
+                 f"WHERE id IN ({marks})", (attempt, error, retry_at, *ids))
+    stats["retrying"] += len(ids)
+    return False
+
+
+def _claim(conn: sqlite3.Connection, now: datetime, stats: dict) -> dict[str, list[tuple]]:
+    """Claim the due posts of every target no other process is sending to. Returns target -> rows."""
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")     # Serialises claims between processes sharing the outbox
+    rows = conn.execute(
+        "SELECT id, target, payload, mergeable, attempts, next_attempt_at, status FROM outbox "
+        "WHERE status IN ('pending', 'sending') ORDER BY id"
+    ).fetchall()
+    by_target: dict[str, list[tuple]] = {}
+    for row in rows:
+        by_target.setdefault(row[1], []).append(row)
+    claimed: dict[str, list[tuple]] = {}
+    for target, rows in by_target.items():
+        # Order is per target: wait if the oldest post isn't due yet or another process holds it
+        if rows[0][5] > _ts(now):
+            stats["blocked"] += len(rows)
+        else:
+            claimed[target] = [r[:6] for r in rows]
+    ids = [r[0] for rows in claimed.values() for r in rows]
+    if ids:
+        lease = _ts(now + CLAIM_LEASE)
+        conn.executemany("UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                         [(lease, i) for i in ids])
+    conn.commit()
+    return claimed
+
+
+def _release(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    """Hand claimed but unsent posts back to the queue with their own due times."""
+    conn.executemany("UPDATE outbox SET status = 'pending', next_attempt_at = ? WHERE id = ? AND status = 'sending'",
+                     [(r[5], r[0]) for r in rows])
+
+
+def deliver(conn: sqlite3.Connection, send=send_all, budget: int = MAX_PAYLOAD) -> dict:
+    """Send every due post once. Returns counts of sent / retrying / dead / blocked posts.
+
+    Each round sends the next post of every target together (one $batch for
+    all Graph channels). A target whose post fails is dropped for the rest of
+    the pass, so its posts never arrive out of order.
+    """
+    now = _now()
+    stats = {"sent": 0, "retrying": 0, "dead": 0, "blocked": 0}
+    queues = {target: _batches(rows, budget) for target, rows in _claim(conn, now, stats).items()}
+
+    while queues:
+        heads = [(target, batches.pop(0)) for target, batches in queues.items()]
+        payloads = []
+        for target, batch in heads:
+            messages = [json.loads(r[2]) for r in batch]
+            payloads.append((target, _encode(merge_messages(messages) if len(batch) > 1 else messages[0]).encode("utf-8")))
+        for (target, batch), result in zip(heads, send(payloads)):
+            if not _record(conn, batch, result, stats):
+                stats["blocked"] += sum(len(b) for b in queues[target])
+                _release(conn, [r for b in queues[target] for r in b])
+                queues[target] = []
+        conn.commit()
+        queues = {target: batches for target, batches in queues.items() if batches}
+    conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (_ts(now - SENT_RETENTION),))
+    conn.commit()
+    return stats
+
+
+def next_due(conn: sqlite3.Connection) -> datetime | None:
+    row = conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status IN ('pending', 'sending')").fetchone()
+    return datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc) if row[0] else None
+
+
+def pending_counts(conn: sqlite3.Connection) -> dict[str, int]:
+    return dict(conn.execute("SELECT status, COUNT(*) FROM outbox WHERE status != 'sent' GROUP BY status"))
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued Teams posts")
+    parser.add_argument("--watch", action="store_true", help="Keep delivering until nothing is pending")
+    parser.add_argument("--list", action="store_true", help="List pending and dead posts")
+    parser.add_argument("--retry-dead", action="store_true", help="Re-queue dead posts for another round")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.list:
+        rows = conn.execute("SELECT id, status, attempts, created_at, next_attempt_at, last_error FROM outbox "
+                            "WHERE status != 'sent' ORDER BY id").fetchall()
+        for post_id, status, attempts, created, next_at, error in rows:
+            print(f"  #{post_id:<5} {status:<8} {attempts:>2} attempt(s)  queued {created}  "
+                  f"next {next_at}  {error or ''}")
+        print(f"{len(rows)} post(s) waiting in {OUTBOX_FILE}")
+        return
+    if args.retry_dead:
+        n = conn.execute("UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? "
+                         "WHERE status = 'dead'", (_ts(_now()),)).rowcount
+        conn.commit()
+        print(f"Re-queued {n} dead post(s)")
+
+    died = 0
+    while True:
+        stats = deliver(conn)
+        died += stats["dead"]
+        print(f"  {stats['sent']} sent, {stats['retrying']} retrying, {stats['dead']} dead, {stats['blocked']} waiting")
+        due = next_due(conn)
+        if not args.watch or due is None:
+            break
+        wait = max((due - _now()).total_seconds(), 1)
+        print(f"  Next attempt in {wait:.0f}s")
+        time.sleep(wait)
+    counts = pending_counts(conn)
+    if counts.get("dead"):
+        print(f"  {counts['dead']} dead post(s); see --list")
+    # Only posts that died in this run fail it; older dead posts don't fail every later run
+    if died:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
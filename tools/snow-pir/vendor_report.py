@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Vendor / SaaS application cross-system inventory from live ServiceNow data.
+
+Generalises scripts/build_{coupa,concur,navan}_report.py: given a vendor
+keyword and its CI names, queries cmdb_ci, change_request, incident, problem,
+sc_req_item and kb_knowledge concurrently (one thread per table, projected
+fields, paged) and caches each table's result under .vendor_cache/ so reruns
+and re-renders don't hit the instance. The fetched records are reduced to one
+structured summary that drives the Word report (and --json). Jira keys
+mentioned in record titles are linked in their own section.
+
+Usage:
+    python vendor_report.py Coupa                           # CI list defaults to the keyword
+    python vendor_report.py Navan --ci Navan --ci TripActions
+    python vendor_report.py Concur --since 2024-01-01 --refresh --json concur.json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+try:
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt, RGBColor
+except ImportError:
+    print("ERROR: 'python-docx' package required. Install with: pip install python-docx")
+    sys.exit(1)
+
+from docx_builder import add_hyperlink, build_table, link_summary
+from pir_review import INSTANCE_URL, _field_value, get_access_token, query_table
+
+CACHE_DIR = Path(__file__).resolve().parent / ".vendor_cache"
+OUTPUT_DIR = Path.home() / "OneDrive - Vituity" / "Documents" / "Change Management" / "Application Review"
+
+JIRA_URL = "https://medamerica.atlassian.net/browse/"
+JIRA_KEY = re.compile(r"\b(?:EDA|PROD|INFOSEC|SDOP|ENTAPP|TOP|WP|EA|SNO)-\d+\b")
+
+HEADING_COLOR = "1F4E79"
+DEFAULT_HISTORY = timedelta(days=730)
+DEFAULT_MAX_AGE_HOURS = 12
+MAX_RECORDS = 500           # Per table, newest first
+TABLE_ROWS = 15             # Rows shown per "recent" table
+STALE_DAYS = 90             # Open changes older than this are a hotspot
+HIGH_PRIORITIES = ("1", "2")
+
+TASK_FIELDS = ["sys_id", "number", "short_description", "state", "active", "priority",
+               "assigned_to", "assignment_group", "cmdb_ci", "opened_at", "sys_created_on"]
+
+# table -> (projected fields, encoded query template, record URL template). The
+# query template sees {kw}, {cis} and {since}.
+TABLES = {
+    "cmdb_ci": (
+        ["sys_id", "name", "sys_class_name", "operational_status", "support_group", "owned_by"],
+        "nameIN{cis}^ORnameLIKE{kw}^ORDERBYname",
+        "/cmdb_ci.do?sys_id={sys_id}",
+    ),
+    "change_request": (
+        TASK_FIELDS + ["type", "risk", "start_date", "close_code"],
+        "cmdb_ci.nameIN{cis}^ORshort_descriptionLIKE{kw}^sys_created_on>={since}^ORDERBYDESCsys_created_on",
+        "/change_request.do?sysparm_query=number={number}",
+    ),
+    "incident": (
+        TASK_FIELDS,
+        "cmdb_ci.nameIN{cis}^ORshort_descriptionLIKE{kw}^sys_created_on>={since}^ORDERBYDESCsys_created_on",
+        "/incident.do?sysparm_query=number={number}",
+    ),
+    "problem": (
+        TASK_FIELDS,
+        "cmdb_ci.nameIN{cis}^ORshort_descriptionLIKE{kw}^sys_created_on>={since}^ORDERBYDESCsys_created_on",
+        "/problem.do?sysparm_query=number={number}",
+    ),
+    "sc_req_item": (
+        TASK_FIELDS + ["cat_item"],
+        "cat_item.nameLIKE{kw}^ORshort_descriptionLIKE{kw}^ORcmdb_ci.nameIN{cis}"
+        "^sys_created_on>={since}^ORDERBYDESCsys_created_on",
+        "/sc_req_item.do?sysparm_query=number={number}",
+    ),
+    "kb_knowledge": (
+        ["sys_id", "number", "short_description", "workflow_state", "kb_category", "sys_updated_on"],
+        "short_descriptionLIKE{kw}^workflow_state=published^ORDERBYnumber",
+        "/kb_view.do?sysparm_article={number}",
+    ),
+}
+TABLE_LABELS = {
+    "cmdb_ci": "Configuration Items",
+    "change_request": "Change Requests",
+    "incident": "Incidents",
+    "problem": "Problems",
+    "sc_req_item": "Request Items",
+    "kb_knowledge": "Knowledge Articles",
+}
+
+
+def _raw(record: dict, field: str) -> str:
+    val = record.get(field, "")
+    if isinstance(val, dict):
+        val = val.get("value", "")
+    return val or ""
+
+
+def record_url(table: str, record: dict) -> str:
+    return INSTANCE_URL + TABLES[table][2].format(number=_raw(record, "number"), sys_id=_raw(record, "sys_id"))
+
+
+# ---------------------------------------------------------------------------
+# Fetch
+# ---------------------------------------------------------------------------
+
+def build_queries(keyword: str, cis: list[str], since: str) -> dict[str, str]:
+    values = {"kw": keyword, "cis": ",".join(cis), "since": since}
+    return {table: template.format(**values) for table, (_, template, _) in TABLES.items()}
+
+
+def _cache_path(table: str, query: str) -> Path:
+    key = hashlib.sha1(json.dumps([table, query, TABLES[table][0], MAX_RECORDS]).encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{table}-{key[:16]}.json"
+
+
+def _read_cache(path: Path, max_age: timedelta) -> list[dict] | None:
+    if not path.exists():
+        return None
+    entry = json.loads(path.read_text(encoding="utf-8"))
+    if datetime.now() - datetime.fromisoformat(entry["fetched_at"]) > max_age:
+        return None
+    return entry["records"]
+
+
+def _fetch(table: str, query: str) -> tuple[list[dict], float]:
+    start = time.perf_counter()
+    records = query_table(table, query, TABLES[table][0], max_records=MAX_RECORDS)
+    return records, time.perf_counter() - start
+
+
+def fetch_vendor(keyword: str, cis: list[str], since: str,
+                 max_age: timedelta = timedelta(hours=DEFAULT_MAX_AGE_HOURS)) -> dict[str, list[dict]]:
+    """Records per table, from cache where fresh, otherwise fetched concurrently."""
+    queries = build_queries(keyword, cis, since)
+    data, stale = {}, []
+    for table, query in queries.items():
+        cached = _read_cache(_cache_path(table, query), max_age)
+        if cached is None:
+            stale.append(table)
+        else:
+            data[table] = cached
+            print(f"  {table:<16} {len(cached):>4} (cached)")
+
+    if stale:
+        get_access_token()      # Refresh once up front rather than racing in every thread
+        CACHE_DIR.mkdir(exist_ok=True)
+        with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+            futures = {table: pool.submit(_fetch, table, queries[table]) for table in stale}
+            for table, future in futures.items():
+                records, seconds = future.result()
+                data[table] = records
+                _cache_path(table, queries[table]).write_text(json.dumps({
+                    "fetched_at": datetime.now().isoformat(timespec="seconds"),
+                    "query": queries[table],
+                    "records": records,
+                }), encoding="utf-8")
+                print(f"  {table:<16} {len(records):>4} in {seconds:.1f}s")
+    return {table: data[table] for table in TABLES}
+
+
+# ---------------------------------------------------------------------------
+# Summary
+# ---------------------------------------------------------------------------
+
+def _active(record: dict) -> bool:
+    return _raw(record, "active") == "true"
+
+
+def _created(record: dict) -> str:
+    return (_raw(record, "opened_at") or _raw(record, "sys_created_on"))[:10]
+
+
+def _top(records: list[dict], field: str, n: int = 5) -> list[tuple[str, int]]:
+    return Counter(_field_value(r, field) for r in records if _field_value(r, field)).most_common(n)
+
+
+def summarize(data: dict[str, list[dict]], today: date) -> dict:
+    """Reduce the fetched records to the structure both renderers read."""
+    changes, incidents = data["change_request"], data["incident"]
+    problems, ritms = data["problem"], data["sc_req_item"]
+    stale_before = (today - timedelta(days=STALE_DAYS)).isoformat()
+
+    hotspots = []
+    for c in changes:
+        if _active(c) and _raw(c, "state") in ("-5", "-4") and _created(c) < stale_before:
+            hotspots.append(("change_request", c, f"{_field_value(c, 'state')} since {_created(c)} — "
+                                                  "close as superseded, cancel, or schedule"))
+    for i in incidents:
+        if _raw(i, "priority") in HIGH_PRIORITIES:
+            hotspots.append(("incident", i, f"{_field_value(i, 'priority')}, {_field_value(i, 'state')}"))
+    for p in problems:
+        if _active(p):
+            hotspots.append(("problem", p, f"Open problem ({_field_value(p, 'state')})"))
+
+    jira = {}
+    for table in ("change_request", "incident", "problem", "sc_req_item"):
+        for record in data[table]:
+            for key in JIRA_KEY.findall(_field_value(record, "short_description")):
+                jira.setdefault(key, []).append((table, record))
+
+    return {
+        "counts": {t: len(records) for t, records in data.items()},
+        "open": {t: sum(1 for r in data[t] if _active(r)) for t in ("change_request", "incident", "problem", "sc_req_item")},
+        "cis": data["cmdb_ci"],
+        "open_changes": [c for c in changes if _active(c)],
+        "closed_changes": [c for c in changes if not _active(c) and _raw(c, "state") == "3"][:TABLE_ROWS],
+        "canceled_changes": sum(1 for c in changes if _raw(c, "state") == "4"),
+        "change_types": _top(changes, "type"),
+        "incident_priorities": sorted(Counter(_field_value(i, "priority") or "—" for i in incidents).items()),
+        "incident_groups": _top(incidents, "assignment_group"),
+        "incident_assignees": _top(incidents, "assigned_to"),
+        "incidents": sorted(incidents, key=lambda i: (not _active(i), _raw(i, "priority")))[:TABLE_ROWS],
+        "problems": problems,
+        "ritm_items": _top(ritms, "cat_item"),
+        "ritms": sorted(ritms, key=lambda r: not _active(r))[:TABLE_ROWS],
+        "kb": data["kb_knowledge"],
+        "jira": dict(sorted(jira.items())),
+        "hotspots": hotspots,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def add_h(doc, text: str, level: int = 1):
+    h = doc.add_heading(text, level=level)
+    for run in h.runs:
+        run.font.color.rgb = RGBColor.from_string(HEADING_COLOR)
+    return h
+
+
+def _link(table: str, record: dict) -> dict:
+    return {"text": _raw(record, "number"), "url": record_url(table, record)}
+
+
+def _table(doc, headers: list[str], rows: list[list]) -> None:
+    build_table(doc, headers, rows, style=None, borders=True, size=None, space_pt=None,
+                header_fill=HEADING_COLOR, font=None)
+
+
+def _task_table(doc, table: str, records: list[dict], columns: list[tuple[str, str]]) -> None:
+    _table(doc, ["Number", "Short Description"] + [label for label, _ in columns], [
+        [_link(table, r), _field_value(r, "short_description")] + [_field_value(r, f) for _, f in columns]
+        for r in records
+    ])
+
+
+def _counts_line(pairs: list[tuple[str, int]]) -> str:
+    return ", ".join(f"{name} ({n})" for name, n in pairs)
+
+
+def build_report(vendor: str, cis: list[str], summary: dict, today: date) -> Document:
+    doc = Document()
+    style = doc.styles["Normal"]
+    style.font.name = "Calibri"
+    style.font.size = Pt(11)
+
+    title = doc.add_paragraph()
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = title.add_run(f"{vendor} Application — Cross-System Inventory")
+    run.bold = True
+    run.font.size = Pt(20)
+    run.font.color.rgb = RGBColor.from_string(HEADING_COLOR)
+    sub = doc.add_paragraph()
+    sub.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    sub.add_run(f"Source: ServiceNow   |   Generated {today.isoformat()}   |   CIs: {', '.join(cis)}").italic = True
+
+    counts, open_ = summary["counts"], summary["open"]
+    add_h(doc, "Executive Summary", 1)
+    bullets = [("Footprint", "; ".join(
+        f"{counts[t]} {TABLE_LABELS[t].lower()}" + (f" ({open_[t]} open)" if open_.get(t) else "")
+        for t in TABLES))]
+    if summary["change_types"]:
+        bullets.append(("Change Types", _counts_line(summary["change_types"])))
+    if summary["incident_groups"]:
+        bullets.append(("Incident Routing", _counts_line(summary["incident_groups"])))
+    if summary["ritm_items"]:
+        bullets.append(("Top Catalog Items", _counts_line(summary["ritm_items"])))
+    for label, body in bullets:
+        p = doc.add_paragraph(style="List Bullet")
+        p.add_run(f"{label}: ").bold = True
+        p.add_run(body)
+
+    if summary["hotspots"]:
+        add_h(doc, "Cross-System Hotspots", 1)
+        for table, record, note in summary["hotspots"]:
+            p = doc.add_paragraph(style="List Bullet")
+            add_hyperlink(p, _raw(record, "number"), record_url(table, record), bold=True, size=None)
+            p.add_run(f" — {_field_value(record, 'short_description')}. {note}")
+
+    add_h(doc, "ServiceNow CMDB", 1)
+    if summary["cis"]:
+        _table(doc, ["Name", "Class", "Status", "Support Group"], [
+            [{"text": _field_value(ci, "name"), "url": record_url("cmdb_ci", ci)},
+             _field_value(ci, "sys_class_name"), _field_value(ci, "operational_status"),
+             _field_value(ci, "support_group") or "—"]
+            for ci in summary["cis"]
+        ])
+    else:
+        doc.add_paragraph("No matching Configuration Items.")
+
+    add_h(doc, f"ServiceNow — Change Requests ({counts['change_request']})", 1)
+    if summary["open_changes"]:
+        add_h(doc, "Open / In-Flight", 2)
+        _task_table(doc, "change_request", summary["open_changes"],
+                    [("State", "state"), ("Type", "type"), ("Planned Start", "start_date"), ("Assignee", "assigned_to")])
+    if summary["closed_changes"]:
+        add_h(doc, "Recent Closed Changes", 2)
+        _task_table(doc, "change_request", summary["closed_changes"],
+                    [("Type", "type"), ("Close Code", "close_code"), ("Assignee", "assigned_to")])
+    if summary["canceled_changes"]:
+        doc.add_paragraph(f"{summary['canceled_changes']} canceled change(s) not listed.")
+
+    add_h(doc, f"ServiceNow — Incidents ({counts['incident']})", 1)
+    if summary["incidents"]:
+        doc.add_paragraph(f"By priority: {_counts_line(summary['incident_priorities'])}. "
+                          f"Top assignees: {_counts_line(summary['incident_assignees'])}.")
+        _task_table(doc, "incident", summary["incidents"],
+                    [("Priority", "priority"), ("State", "state"), ("Assignee", "assigned_to")])
+
+    add_h(doc, f"ServiceNow — Problems ({counts['problem']})", 1)
+    if summary["problems"]:
+        _task_table(doc, "problem", summary["problems"],
+                    [("Priority", "priority"), ("State", "state"), ("Assignee", "assigned_to")])
+
+    add_h(doc, f"ServiceNow — Request Items ({counts['sc_req_item']})", 1)
+    if summary["ritms"]:
+        _task_table(doc, "sc_req_item", summary["ritms"],
+                    [("Item", "cat_item"), ("State", "state"), ("Opened", "opened_at")])
+
+    add_h(doc, f"ServiceNow — Knowledge Base ({counts['kb_knowledge']})", 1)
+    if summary["kb"]:
+        _table(doc, ["Article", "Title", "Category"], [
+            [_link("kb_knowledge", kb), _field_value(kb, "short_description"), _field_value(kb, "kb_category")]
+            for kb in summary["kb"]
+        ])
+
+    if summary["jira"]:
+        add_h(doc, f"Jira References ({len(summary['jira'])})", 1)
+        for key, refs in summary["jira"].items():
+            p = doc.add_paragraph(style="List Bullet")
+            add_hyperlink(p, key, JIRA_URL + key, size=None)
+            p.add_run(" — referenced by ")
+            for n, (table, record) in enumerate(refs):
+                if n:
+                    p.add_run(", ")
+                add_hyperlink(p, _raw(record, "number"), record_url(table, record), size=None)
+
+    doc.add_paragraph()
+    foot = doc.add_paragraph()
+    foot.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    foot.add_run("Sources: ServiceNow CMDB, Change/Incident/Problem/RITM/KB tables.").italic = True
+    return doc
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a vendor cross-system inventory from ServiceNow")
+    parser.add_argument("vendor", help="Vendor / application keyword, e.g. Coupa")
+    parser.add_argument("--ci", action="append", metavar="NAME",
+                        help="Configuration Item name (repeatable; default: the vendor keyword)")
+    parser.add_argument("--since", type=date.fromisoformat,
+                        help="Only tasks created on/after this date (default: 2 years ago)")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_HOURS, metavar="HOURS",
+                        help=f"Reuse cached table results up to this old (default: {DEFAULT_MAX_AGE_HOURS})")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cache and re-query every table")
+    parser.add_argument("--json", type=Path, metavar="PATH", help="Also write the structured summary as JSON")
+    parser.add_argument("--output", type=Path, help="Output .docx path")
+    args = parser.parse_args()
+
+    today = date.today()
+    cis = args.ci or [args.vendor]
+    since = (args.since or today - DEFAULT_HISTORY).isoformat()
+    max_age = timedelta(hours=0 if args.refresh else args.max_age)
+
+    print(f"Querying ServiceNow for {args.vendor} (CIs: {', '.join(cis)}; tasks since {since})...")
+    data = fetch_vendor(args.vendor, cis, since, max_age)
+    summary = summarize(data, today)
+    doc = build_report(args.vendor, cis, summary, today)
+
+    out_path = args.output
+    if not out_path:
+        filename = f"{args.vendor} Cross-System Inventory {today.isoformat()}.docx"
+        out_path = OUTPUT_DIR / filename if OUTPUT_DIR.exists() else Path.cwd() / filename
+    doc.save(str(out_path))
+    print(f"Saved: {out_path}")
+    print(link_summary(doc))
+
+    if args.json:
+        args.json.write_text(json.dumps({"vendor": args.vendor, "cis": cis, "since": since, **summary}, indent=2),
+                             encoding="utf-8")
+        print(f"Summary JSON: {args.json}")
+
+
+if __name__ == "__main__":
+    main()